@@ -0,0 +1,69 @@
+from fastapi import APIRouter, HTTPException, Query
+from ..models.parametros import PrioridadeAlerta
+from ..db.repositorio import repositorio
+from ..db.alertas_ativos import indice_alertas
+from ..utils.datetime_utils import now_br
+from ..utils.error_handling import handle_firestore_exceptions
+from ..utils.paginacao import codificar_cursor, decodificar_cursor
+from typing import Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["alertas"], prefix="/alertas")
+
+
+@router.get("/ativos", response_model=dict)
+async def listar_alertas_ativos(
+    id_compressor: Optional[int] = Query(default=None, gt=0, description="Filtrar por compressor"),
+    prioridade: Optional[PrioridadeAlerta] = Query(default=None, description="Filtrar por prioridade")
+):
+    """Alertas ativos (mais graves primeiro), servidos do índice em memória."""
+    alertas = indice_alertas.listar(id_compressor, prioridade)
+    return {
+        "total": len(alertas),
+        "data_consulta": now_br(),
+        # False nos primeiros instantes após o startup, antes de o índice ser recarregado
+        "indice_carregado": indice_alertas.carregado,
+        "alertas": [alerta.model_dump() for alerta in alertas]
+    }
+
+
+@router.get("/historico", response_model=dict)
+async def historico_alertas(
+    id_compressor: Optional[int] = Query(default=None, gt=0, description="Filtrar por compressor"),
+    page_size: int = Query(default=100, ge=1, le=1000, description="Número de eventos por página"),
+    cursor: Optional[str] = Query(default=None, description="Cursor opaco retornado em next_cursor")
+):
+    """
+    Transições de nível dos alertas, da mais recente para a mais antiga.
+    
+    Com `id_compressor`, usa o índice composto (id_compressor ASC, data_evento DESC)
+    definido em firestore.indexes.json.
+    """
+    logger.info(f"Buscando histórico de alertas (id_compressor={id_compressor})")
+    posicao = decodificar_cursor(cursor) if cursor else None
+    try:
+        @handle_firestore_exceptions
+        async def buscar_eventos():
+            # Buscar um registro extra para saber se existe próxima página
+            return await repositorio.listar_eventos_alerta_async(id_compressor, page_size + 1, posicao)
+        
+        eventos = await buscar_eventos()
+        
+        next_cursor = None
+        if len(eventos) > page_size:
+            eventos = eventos[:page_size]
+            next_cursor = codificar_cursor(eventos[-1]["data_evento"], eventos[-1]["firestore_id"])
+        
+        return {
+            "total": len(eventos),
+            "next_cursor": next_cursor,
+            "eventos": eventos
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro inesperado ao buscar histórico de alertas: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erro ao buscar histórico de alertas: {str(e)}")
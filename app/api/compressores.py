@@ -1,55 +1,121 @@
-from fastapi import APIRouter, HTTPException, Query
-from fastapi.concurrency import run_in_threadpool
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 from ..models.compressor import CompressorData, CompressorOut, CompressorUpdate
-from ..db.firebase import db
-from ..utils.datetime_utils import now_br
-from ..utils.error_handling import handle_firestore_exceptions, log_operation
-from typing import List, Optional
+from ..db.repositorio import repositorio
+from ..db.cache_compressores import cache_compressores
+from ..db.configuracoes_compressor import cache_limites
+from ..db.escritas_compressor import escritas_compressor
+from ..db.alertas_ativos import indice_alertas
+from ..db.ultimas_leituras import ultimas_leituras
+from ..db.coalescencia import leituras_coalescidas
+from ..utils.datetime_utils import now_br, to_utc_timezone
+from ..utils.error_handling import documento_ja_existe, handle_firestore_exceptions, log_operation
+from ..utils.cache_http import CACHE_CONTROL_COMPRESSORES, calcular_etag, definir_cabecalhos, etag_confere, nao_modificado
+from ..utils.invalidacao import barramento_invalidacao
+from ..utils.respostas_json import resposta_json
+from typing import Any, Dict, List, Optional, Tuple
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["compressores"], prefix="/compressores")
 
+# Campos retornados por /compressores/estado-atual
+CAMPOS_ESTADO_ATUAL = [
+    "id_compressor", "nome_marca", "localizacao", "esta_ligado",
+    "data_ultima_atualizacao", "alertas", "alertas_servidor", "ultima_leitura"
+]
+
+
+def versao_compressor(compressor: dict) -> tuple:
+    """Campos que mudam a cada escrita no documento do compressor (base das ETags)."""
+    return (
+        compressor.get("firestore_id"),
+        compressor.get("data_ultima_atualizacao"),
+        compressor.get("ultima_atualizacao_alertas"),
+        compressor.get("ultima_atualizacao_alertas_servidor"),
+        compressor.get("data_cadastro")
+    )
+
+
+# ETags das últimas respostas, validadas pelo cache de compressores sem ler o documento:
+# id -> (entrada do cache, campos quentes na leitura, ETag) e
+# (ativo_apenas, limit) -> (cache_compressores.modificacoes na leitura, expira_em, ETag)
+_etags_compressor: Dict[int, Tuple[Any, Dict[str, Any], str]] = {}
+_etags_listagem: Dict[tuple, Tuple[int, float, str]] = {}
+MAXIMO_ETAGS_LISTAGEM = 256
+
+
+def etag_conhecida_compressor(id_compressor: int) -> Optional[str]:
+    """ETag da última resposta do compressor, se o cache indica que o documento não mudou."""
+    lembrada = _etags_compressor.get(id_compressor)
+    if lembrada is None:
+        return None
+    entrada_lembrada, dados, etag = lembrada
+    entrada = cache_compressores.obter(id_compressor)
+    # Invalidação (CRUD, neste ou em outro worker) troca a entrada; escritas de status mudam os campos
+    if entrada is not entrada_lembrada or entrada.dados != dados:
+        return None
+    return etag
+
+
+def lembrar_etag_compressor(
+    id_compressor: int, geracao, entrada_antes, dados_antes: Optional[Dict[str, Any]], compressor: dict, etag: str
+):
+    """Guarda a ETag lida se o cache não mudou durante a leitura (registrando o compressor, se preciso)."""
+    if cache_compressores.geracao(id_compressor) != geracao:
+        # Invalidado durante a leitura: o documento lido pode estar obsoleto
+        return
+    entrada = cache_compressores.obter(id_compressor)
+    if entrada is None:
+        if entrada_antes is not None:
+            return
+        entrada = cache_compressores.registrar(id_compressor, compressor["firestore_id"], compressor, geracao)
+    elif not entrada.existe or entrada is not entrada_antes or entrada.dados != dados_antes:
+        return
+    if len(_etags_compressor) >= cache_compressores.max_entradas:
+        _etags_compressor.clear()
+    _etags_compressor[id_compressor] = (entrada, dict(entrada.dados), etag)
+
 
 @router.post("/", response_model=dict)
 async def criar_compressor(compressor: CompressorData):
     """Cria um novo compressor no sistema."""
     logger.info(f"Iniciando criação do compressor {compressor.id_compressor}")
     try:
-        # Verificar se já existe um compressor com o mesmo ID
-        @handle_firestore_exceptions
-        def verificar_compressor_existente():
-            existing = list(db.collection("compressores").where("id_compressor", "==", compressor.id_compressor).limit(1).stream())
-            return len(existing) > 0
-        
-        existe = await run_in_threadpool(verificar_compressor_existente)
-        if existe:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Já existe um compressor com ID '{compressor.id_compressor}'"
-            )
-        
         # Preparar dados para salvar
         compressor_dict = compressor.model_dump()
         compressor_dict["data_cadastro"] = now_br()
         
-        # Salvar no Firestore
+        # Salvar no banco de dados: o documento tem o ID do compressor e a criação
+        # falha se ele já existir (sem consulta prévia nem corrida entre verificar e inserir)
         @handle_firestore_exceptions
-        def salvar_compressor():
-            doc_ref = db.collection("compressores").add(compressor_dict)
-            return doc_ref[1].id
+        async def salvar_compressor():
+            try:
+                return await repositorio.criar_compressor_async(compressor_dict)
+            except Exception as e:
+                if documento_ja_existe(e):
+                    return None
+                raise
         
-        firestore_id = await run_in_threadpool(salvar_compressor)
+        firestore_id = await salvar_compressor()
+        if firestore_id is None:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Já existe um compressor com ID '{compressor.id_compressor}'"
+            )
+        # Descartar eventual resultado negativo em cache para este ID
+        cache_compressores.invalidar(compressor.id_compressor)
+        leituras_coalescidas.invalidar(compressor.id_compressor)
         logger.info(f"Compressor {compressor.id_compressor} criado com sucesso (ID: {firestore_id})")
         
-        return {
+        return resposta_json({
             "status": "sucesso",
             "message": "Compressor cadastrado com sucesso",
             "firestore_id": firestore_id,
             "id_compressor": compressor.id_compressor,
             "data_cadastro": compressor_dict["data_cadastro"]
-        }
+        })
         
     except HTTPException:
         raise
@@ -60,56 +126,117 @@ async def criar_compressor(compressor: CompressorData):
 
 @router.get("/", response_model=dict)
 async def listar_compressores(
+    request: Request,
+    response: Response,
     ativo_apenas: Optional[bool] = Query(default=None, description="Filtrar apenas compressores ligados"),
     limit: Optional[int] = Query(default=50, ge=1, le=1000, description="Número máximo de registros")
 ):
-    """Lista todos os compressores cadastrados."""
+    """Lista todos os compressores cadastrados (ETag/If-None-Match -> 304)."""
     logger.info(f"Listando compressores (ativo_apenas={ativo_apenas}, limit={limit})")
     try:
+        # Nenhuma escrita conhecida desde a última listagem: 304 sem consultar o Firestore
+        chave = (ativo_apenas, limit)
+        modificacoes = cache_compressores.modificacoes
+        lembrada = _etags_listagem.get(chave)
+        if (
+            lembrada is not None and lembrada[0] == modificacoes and lembrada[1] > time.monotonic()
+            and etag_confere(request, lembrada[2])
+        ):
+            return nao_modificado(lembrada[2], CACHE_CONTROL_COMPRESSORES)
+        
         @handle_firestore_exceptions
-        def buscar_compressores():
-            if ativo_apenas is not None:
-                # Buscar apenas por filtro, sem ordenação para evitar índice composto
-                docs = list(db.collection("compressores").where("esta_ligado", "==", ativo_apenas).limit(limit).stream())
-            else:
-                # Buscar todos, ordenados por timestamp
-                docs = list(db.collection("compressores").order_by("data_cadastro", direction="DESCENDING").limit(limit).stream())
-            
-            return [{
-                "firestore_id": doc.id,
-                **doc.to_dict()
-            } for doc in docs]
+        async def buscar_compressores():
+            # Filtrados por status (sem ordenação) ou todos, dos mais recentes para os mais antigos
+            return await repositorio.listar_compressores_async(ativo_apenas, limit)
         
-        compressores = await run_in_threadpool(buscar_compressores)
+        compressores = await buscar_compressores()
         logger.info(f"Encontrados {len(compressores)} compressores")
         
-        return {
+        etag = calcular_etag(ativo_apenas, limit, [versao_compressor(c) for c in compressores])
+        if cache_compressores.modificacoes == modificacoes:
+            if len(_etags_listagem) >= MAXIMO_ETAGS_LISTAGEM:
+                _etags_listagem.clear()
+            # Escritas em outras máquinas não passam pelo cache: a ETag lembrada vale pelo TTL dele
+            _etags_listagem[chave] = (modificacoes, time.monotonic() + cache_compressores.ttl, etag)
+        if etag_confere(request, etag):
+            return nao_modificado(etag, CACHE_CONTROL_COMPRESSORES)
+        definir_cabecalhos(response, etag, CACHE_CONTROL_COMPRESSORES)
+        
+        return resposta_json({
             "total": len(compressores),
             "compressores": compressores
-        }
+        }, response)
         
     except Exception as e:
         logger.error(f"Erro inesperado ao listar compressores: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erro ao buscar compressores: {str(e)}")
 
 
+@router.get("/estado-atual", response_model=dict)
+async def estado_atual_compressores():
+    """Retorna a última leitura e os alertas de todos os compressores com uma única consulta."""
+    logger.info("Buscando estado atual dos compressores")
+    try:
+        @handle_firestore_exceptions
+        async def buscar_estado():
+            return await repositorio.estado_compressores_async(CAMPOS_ESTADO_ATUAL)
+        
+        compressores = await buscar_estado()
+        
+        for compressor in compressores:
+            # Leituras aceitas mas ainda não gravadas (write-behind/spool) estão apenas em memória
+            em_memoria = ultimas_leituras.obter(compressor.get("id_compressor"))
+            persistida = compressor.get("ultima_leitura")
+            if em_memoria and (
+                not persistida
+                or to_utc_timezone(em_memoria["data_medicao"]) > to_utc_timezone(persistida["data_medicao"])
+            ):
+                compressor["ultima_leitura"] = em_memoria
+                compressor["esta_ligado"] = em_memoria["ligado"]
+                compressor["data_ultima_atualizacao"] = em_memoria["data_medicao"]
+        
+        compressores.sort(key=lambda c: c.get("id_compressor") or 0)
+        logger.info(f"Estado atual de {len(compressores)} compressores obtido")
+        
+        return resposta_json({
+            "total": len(compressores),
+            "data_consulta": now_br(),
+            "compressores": compressores
+        })
+        
+    except Exception as e:
+        logger.error(f"Erro inesperado ao buscar estado atual dos compressores: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erro ao buscar estado atual dos compressores: {str(e)}")
+
+
 @router.get("/{id_compressor}", response_model=dict)
-async def obter_compressor(id_compressor: int):
-    """Obtém informações detalhadas de um compressor específico."""
+async def obter_compressor(id_compressor: int, request: Request, response: Response):
+    """Obtém informações detalhadas de um compressor específico (ETag/If-None-Match -> 304)."""
     logger.info(f"Buscando compressor {id_compressor}")
     try:
+        # Documento inalterado segundo o cache: 304 sem consultar o Firestore
+        etag = etag_conhecida_compressor(id_compressor)
+        if etag is not None and etag_confere(request, etag):
+            return nao_modificado(etag, CACHE_CONTROL_COMPRESSORES)
+        geracao = cache_compressores.geracao(id_compressor)
+        entrada_antes = cache_compressores.obter(id_compressor)
+        dados_antes = dict(entrada_antes.dados) if entrada_antes is not None and entrada_antes.existe else None
+        if dados_antes is None:
+            entrada_antes = None
+        
         @handle_firestore_exceptions
-        def buscar_compressor():
-            docs = list(db.collection("compressores").where("id_compressor", "==", id_compressor).limit(1).stream())
-            if not docs:
+        async def buscar_compressor():
+            encontrado = await repositorio.carregar_compressor_async(id_compressor)
+            if encontrado is None:
                 return None
-            doc = docs[0]
+            doc_id, dados = encontrado
             return {
-                "firestore_id": doc.id,
-                **doc.to_dict()
+                "firestore_id": doc_id,
+                **dados
             }
         
-        compressor = await run_in_threadpool(buscar_compressor)
+        # Requisições simultâneas pelo mesmo compressor compartilham a mesma leitura
+        compressor = await leituras_coalescidas.executar(("compressor", id_compressor), buscar_compressor)
         
         if not compressor:
             logger.warning(f"Compressor {id_compressor} não encontrado")
@@ -120,9 +247,15 @@ async def obter_compressor(id_compressor: int):
         
         logger.info(f"Compressor {id_compressor} encontrado com sucesso")
         
-        return {
+        etag = calcular_etag(versao_compressor(compressor))
+        lembrar_etag_compressor(id_compressor, geracao, entrada_antes, dados_antes, compressor, etag)
+        if etag_confere(request, etag):
+            return nao_modificado(etag, CACHE_CONTROL_COMPRESSORES)
+        definir_cabecalhos(response, etag, CACHE_CONTROL_COMPRESSORES)
+        
+        return resposta_json({
             "compressor": compressor
-        }
+        }, response)
         
     except HTTPException:
         raise
@@ -138,13 +271,11 @@ async def atualizar_compressor(id_compressor: int, atualizacao: CompressorUpdate
     try:
         # Buscar o compressor
         @handle_firestore_exceptions
-        def buscar_e_atualizar():
-            docs = list(db.collection("compressores").where("id_compressor", "==", id_compressor).limit(1).stream())
-            if not docs:
+        async def buscar_e_atualizar():
+            encontrado = await repositorio.carregar_compressor_async(id_compressor)
+            if encontrado is None:
                 return None
             
-            doc = docs[0]
-            
             # Preparar dados para atualização (apenas campos não nulos)
             dados_atualizacao = {k: v for k, v in atualizacao.model_dump().items() if v is not None}
             
@@ -153,17 +284,12 @@ async def atualizar_compressor(id_compressor: int, atualizacao: CompressorUpdate
             
             dados_atualizacao["data_ultima_atualizacao"] = now_br()
             
-            # Atualizar documento
-            doc.reference.update(dados_atualizacao)
-            
-            # Retornar dados atualizados
-            doc_atualizado = doc.reference.get()
-            return {
-                "firestore_id": doc_atualizado.id,
-                **doc_atualizado.to_dict()
-            }
+            # Atualizar documento e retornar os dados atualizados
+            return await repositorio.atualizar_compressor_async(encontrado[0], dados_atualizacao)
         
-        resultado = await run_in_threadpool(buscar_e_atualizar)
+        resultado = await buscar_e_atualizar()
+        cache_compressores.invalidar(id_compressor)
+        leituras_coalescidas.invalidar(id_compressor)
         
         if resultado is None:
             logger.warning(f"Compressor {id_compressor} não encontrado para atualização")
@@ -181,11 +307,11 @@ async def atualizar_compressor(id_compressor: int, atualizacao: CompressorUpdate
         
         logger.info(f"Compressor {id_compressor} atualizado com sucesso")
         
-        return {
+        return resposta_json({
             "status": "sucesso",
             "message": "Compressor atualizado com sucesso",
             "compressor": resultado
-        }
+        })
         
     except HTTPException:
         raise
@@ -200,16 +326,24 @@ async def excluir_compressor(id_compressor: int):
     logger.info(f"Excluindo compressor {id_compressor}")
     try:
         @handle_firestore_exceptions
-        def buscar_e_excluir():
-            docs = list(db.collection("compressores").where("id_compressor", "==", id_compressor).limit(1).stream())
-            if not docs:
+        async def buscar_e_excluir():
+            encontrado = await repositorio.carregar_compressor_async(id_compressor)
+            if encontrado is None:
                 return False
             
-            doc = docs[0]
-            doc.reference.delete()
+            # Remove também a configuração de limites do compressor (se houver)
+            await repositorio.excluir_compressor_async(encontrado[0], id_compressor)
             return True
         
-        excluido = await run_in_threadpool(buscar_e_excluir)
+        excluido = await buscar_e_excluir()
+        cache_compressores.invalidar(id_compressor)
+        cache_limites.invalidar(id_compressor)
+        leituras_coalescidas.invalidar(id_compressor)
+        escritas_compressor.esquecer(id_compressor)
+        ultimas_leituras.remover(id_compressor)
+        if excluido:
+            indice_alertas.remover_compressor(id_compressor)
+            barramento_invalidacao.publicar("compressor_excluido", id_compressor)
         
         if not excluido:
             logger.warning(f"Compressor {id_compressor} não encontrado para exclusão")
@@ -220,10 +354,10 @@ async def excluir_compressor(id_compressor: int):
         
         logger.info(f"Compressor {id_compressor} excluído com sucesso")
         
-        return {
+        return resposta_json({
             "status": "sucesso",
             "message": f"Compressor '{id_compressor}' excluído com sucesso"
-        }
+        })
         
     except HTTPException:
         raise
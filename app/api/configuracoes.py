@@ -1,23 +1,35 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Request
+from ..models.parametros import ConfiguracaoParametros, ConfiguracaoParametrosUpdate
+from ..db.cache_compressores import buscar_compressor_async
+from ..db.configuracoes_compressor import cache_limites
+from ..db.repositorio import repositorio
 from ..utils.alertas import obter_configuracao_fixa
+from ..utils.cache_http import CACHE_CONTROL_CONFIGURACAO, RespostaEstatica
+from ..utils.datetime_utils import now_br
+from ..utils.error_handling import handle_firestore_exceptions
 import logging
 
 logger = logging.getLogger(__name__)
 router = APIRouter(tags=["configuracoes"], prefix="/configuracoes")
 
 
-@router.get("/", response_model=dict)
-async def obter_configuracao():
-    """Obtém a configuração fixa do sistema de monitoramento."""
-    logger.info("Buscando configuração fixa do sistema")
-    
-    configuracao = obter_configuracao_fixa()
-    
-    return {
+# Resposta de GET /configuracoes/ serializada uma única vez; o conteúdo é constante,
+# então a ETag do corpo é a mesma em todos os workers e após reinícios
+RESPOSTA_CONFIGURACAO_FIXA = RespostaEstatica(
+    {
         "status": "sucesso",
         "message": "Configuração obtida com sucesso",
-        **configuracao
-    }
+        **obter_configuracao_fixa()
+    },
+    CACHE_CONTROL_CONFIGURACAO
+)
+
+
+@router.get("/", response_model=dict)
+async def obter_configuracao(request: Request):
+    """Obtém a configuração fixa do sistema de monitoramento (ETag/If-None-Match -> 304)."""
+    logger.debug("Buscando configuração fixa do sistema")
+    return RESPOSTA_CONFIGURACAO_FIXA.responder(request)
 
 
 @router.get("/info", response_model=dict)
@@ -45,4 +57,137 @@ async def informacoes_sistema():
             "alto",
             "critico"
         ]
-    }
\ No newline at end of file
+    }
+
+
+@router.get("/compressores/{id_compressor}", response_model=dict)
+async def obter_configuracao_compressor(id_compressor: int):
+    """Obtém a configuração de limites de um compressor (usada na avaliação de alertas da ingestão)."""
+    logger.info(f"Buscando configuração do compressor {id_compressor}")
+    try:
+        @handle_firestore_exceptions
+        async def buscar_configuracao():
+            return await repositorio.carregar_configuracao_async(id_compressor)
+        
+        configuracao = await buscar_configuracao()
+        
+        if configuracao is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Compressor '{id_compressor}' não possui configuração própria (usa a configuração fixa)"
+            )
+        
+        return {"configuracao": configuracao}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro inesperado ao buscar configuração do compressor {id_compressor}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erro ao buscar configuração: {str(e)}")
+
+
+@router.post("/compressores/", response_model=dict)
+async def criar_configuracao_compressor(configuracao: ConfiguracaoParametros):
+    """Cria a configuração de limites de um compressor cadastrado."""
+    id_compressor = configuracao.id_compressor
+    logger.info(f"Criando configuração do compressor {id_compressor}")
+    try:
+        entrada = await handle_firestore_exceptions(buscar_compressor_async)(id_compressor)
+        if not entrada.existe:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Compressor com ID {id_compressor} não encontrado. Cadastre o compressor primeiro."
+            )
+        
+        configuracao_dict = configuracao.model_dump()
+        configuracao_dict["data_criacao"] = now_br()
+        
+        @handle_firestore_exceptions
+        async def salvar_configuracao():
+            # create() falha se o documento já existir (409)
+            await repositorio.criar_configuracao_async(id_compressor, configuracao_dict)
+        
+        await salvar_configuracao()
+        cache_limites.invalidar(id_compressor)
+        logger.info(f"Configuração do compressor {id_compressor} criada com sucesso")
+        
+        return {
+            "status": "sucesso",
+            "message": "Configuração criada com sucesso",
+            "firestore_id": str(id_compressor),
+            "id_compressor": id_compressor,
+            "data_criacao": configuracao_dict["data_criacao"]
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro inesperado ao criar configuração do compressor {id_compressor}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erro ao criar configuração: {str(e)}")
+
+
+@router.put("/compressores/{id_compressor}", response_model=dict)
+async def atualizar_configuracao_compressor(id_compressor: int, atualizacao: ConfiguracaoParametrosUpdate):
+    """Atualiza a configuração de limites de um compressor; vale a partir da próxima leitura."""
+    logger.info(f"Atualizando configuração do compressor {id_compressor}")
+    try:
+        dados_atualizacao = {k: v for k, v in atualizacao.model_dump().items() if v is not None}
+        if not dados_atualizacao:
+            raise HTTPException(
+                status_code=400,
+                detail="Nenhum campo válido fornecido para atualização"
+            )
+        dados_atualizacao["data_ultima_atualizacao"] = now_br()
+        
+        @handle_firestore_exceptions
+        async def atualizar_configuracao():
+            # Falha se a configuração não existir (404)
+            return await repositorio.atualizar_configuracao_async(id_compressor, dados_atualizacao)
+        
+        resultado = await atualizar_configuracao()
+        cache_limites.invalidar(id_compressor)
+        logger.info(f"Configuração do compressor {id_compressor} atualizada com sucesso")
+        
+        return {
+            "status": "sucesso",
+            "message": "Configuração atualizada com sucesso",
+            "configuracao": resultado
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro inesperado ao atualizar configuração do compressor {id_compressor}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erro ao atualizar configuração: {str(e)}")
+
+
+@router.delete("/compressores/{id_compressor}", response_model=dict)
+async def excluir_configuracao_compressor(id_compressor: int):
+    """Exclui a configuração de um compressor, que volta a usar a configuração fixa."""
+    logger.info(f"Excluindo configuração do compressor {id_compressor}")
+    try:
+        @handle_firestore_exceptions
+        async def excluir_configuracao():
+            return await repositorio.excluir_configuracao_async(id_compressor)
+        
+        excluida = await excluir_configuracao()
+        cache_limites.invalidar(id_compressor)
+        
+        if not excluida:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Compressor '{id_compressor}' não possui configuração própria"
+            )
+        
+        logger.info(f"Configuração do compressor {id_compressor} excluída com sucesso")
+        
+        return {
+            "status": "sucesso",
+            "message": f"Configuração do compressor '{id_compressor}' excluída com sucesso"
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro inesperado ao excluir configuração do compressor {id_compressor}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erro ao excluir configuração: {str(e)}")
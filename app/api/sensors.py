@@ -1,76 +1,163 @@
-from fastapi import APIRouter, HTTPException, Query
-from fastapi.concurrency import run_in_threadpool
+from fastapi import APIRouter, HTTPException, Query, Body, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 from ..models.sensor import SensorData, SensorOut, ESP32AlertasData, ESP32AlertasOut
-from ..db.firebase import db
-from ..utils.datetime_utils import now_br
-from ..utils.error_handling import handle_firestore_exceptions
-from typing import List, Optional, Dict
+from ..db.repositorio import repositorio
+from ..db.cache_compressores import cache_compressores, buscar_compressor_async, EntradaCompressor
+from ..db.escritas_compressor import escritas_compressor
+from ..db.alertas_ativos import indice_alertas
+from ..db.ingestao import campos_cache_status, gravar_leitura, gravar_leituras, novo_id_leitura
+from ..db.fila_ingestao import fila_ingestao, WRITE_BEHIND_ATIVO
+from ..db.spool import spool_ingestao, replayer_spool, registro_spool
+from ..db.ultimas_leituras import ultimas_leituras
+from ..db.coalescencia import leituras_coalescidas
+from ..db.rollups import agregador_rollups, buscar_serie, mesclar_pontos, ROLLUPS_ATIVOS, RESOLUCOES, METRICAS
+from ..db.configuracoes_compressor import cache_limites, carregar_limites, LimitesCompressor, ALERTAS_SERVIDOR_ATIVO
+from ..utils.alertas import avaliar_leitura
+from ..utils.datetime_utils import now_br, to_utc_timezone, to_br_timezone
+from ..utils.error_handling import erro_transitorio, handle_firestore_exceptions, logger_amostrado
+from ..utils.invalidacao import barramento_invalidacao
+from ..utils.metricas import executar_no_threadpool
+from ..utils.difusao import barramento_eventos
+from ..utils.paginacao import codificar_cursor, decodificar_cursor, linha_ndjson
+from ..utils.respostas_json import resposta_json
+from ..utils.leitura_binaria import OPENAPI_LEITURA_BINARIA, decodificar_leitura, decodificar_lote, rota_leitura_binaria
+from typing import Any, List, Optional, Dict
+from datetime import datetime, timedelta, timezone
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
+# Logs info por leitura recebida, amostrados por rota (LOG_AMOSTRAGEM)
+log_sensor = logger_amostrado(logger, "/sensor")
+log_lote = logger_amostrado(logger, "/sensor/batch")
+log_esp32 = logger_amostrado(logger, "/esp32/alertas")
 
-router = APIRouter(tags=["sensors"])
+# POST /sensor e /sensor/batch também aceitam o formato binário compacto (application/vnd.ordem-da-fenix.leitura)
+router = APIRouter(tags=["sensors"], route_class=rota_leitura_binaria({
+	"/sensor": decodificar_leitura,
+	"/sensor/batch": decodificar_lote
+}))
 
+# Número máximo de leituras aceitas por requisição em /sensor/batch
+LIMITE_LEITURAS_LOTE = 5000
 
-async def atualizar_alertas_compressor(id_compressor: int, alertas: Dict[str, str]):
-	"""Atualiza os alertas nas informações do compressor."""
+# Documentos lidos por página no streaming NDJSON de /dados
+TAMANHO_PAGINA_STREAM = 500
+
+# Número máximo de pontos retornados por /dados/{id_compressor}/serie
+MAXIMO_PONTOS_SERIE = 1500
+
+
+def registrar_leitura_aceita(leitura: Dict[str, Any], alertas: Optional[Dict[str, str]] = None, limites: Optional[Dict[str, Any]] = None):
+	"""Alimenta os agregados em memória da ingestão (última leitura, rollups, transições de alertas e streams)."""
+	ultimas_leituras.registrar(leitura)
+	if ROLLUPS_ATIVOS:
+		agregador_rollups.registrar(leitura)
+	barramento_eventos.publicar("leitura", leitura["id_compressor"], leitura)
+	if alertas is not None:
+		publicar_transicoes(indice_alertas.processar(leitura["id_compressor"], alertas, leitura["data_medicao"], "servidor", leitura, limites))
+
+
+def publicar_transicoes(eventos: List[Dict[str, Any]]):
+	"""Envia as transições de nível de alertas para os streams em tempo real."""
+	for evento in eventos:
+		barramento_eventos.publicar("alerta", evento["id_compressor"], evento)
+
+
+async def resolver_compressor(id_compressor: int) -> EntradaCompressor:
+	"""Resolve o compressor pelo cache do registro, consultando o Firestore apenas em caso de miss."""
+	return await handle_firestore_exceptions(buscar_compressor_async)(id_compressor)
+
+
+async def resolver_compressor_para_spool(id_compressor: int) -> Optional[EntradaCompressor]:
+	"""Como `resolver_compressor`, mas retorna None se o Firestore estiver indisponível e o spool ativo.
+
+	A leitura é então aceita no spool sem a verificação: o replayer resolve o
+	compressor quando o Firestore voltar (e descarta a leitura se ele não existir).
+	"""
 	try:
-		@handle_firestore_exceptions
-		def atualizar_alertas():
-			# Buscar o compressor
-			docs = list(db.collection("compressores").where("id_compressor", "==", id_compressor).limit(1).stream())
-			if not docs:
-				return False
-			
-			doc = docs[0]
-			# Atualizar com os novos alertas
-			doc.reference.update({
-				"alertas": alertas,
-				"ultima_atualizacao_alertas": now_br()
-			})
-			return True
-		
-		sucesso = await run_in_threadpool(atualizar_alertas)
-		if sucesso:
-			logger.info(f"Alertas atualizados para compressor {id_compressor}: {alertas}")
-		else:
-			logger.warning(f"Compressor {id_compressor} não encontrado para atualizar alertas")
-			
-	except Exception as e:
-		logger.error(f"Erro ao atualizar alertas do compressor {id_compressor}: {str(e)}")
+		return await resolver_compressor(id_compressor)
+	except HTTPException as e:
+		if spool_ingestao is None or not erro_transitorio(e):
+			raise
+		logger.warning("Firestore indisponível ao resolver o compressor %s, leitura enviada ao spool sem verificação", id_compressor)
+		return None
+
+
+async def obter_limites(id_compressor: int) -> Optional[LimitesCompressor]:
+	"""Limites compilados do compressor (cache); None se a configuração não pôde ser lida."""
+	limites = cache_limites.obter(id_compressor)
+	if limites is None:
+		try:
+			limites = await carregar_limites(id_compressor)
+		except Exception as e:
+			# A leitura segue sendo gravada; apenas a avaliação de alertas é pulada
+			logger.error(f"Erro ao carregar limites do compressor {id_compressor}: {str(e)}")
+	return limites
+
 
+def alertas_alterados(entrada: EntradaCompressor, leitura: Dict[str, Any], limites: Optional[LimitesCompressor]) -> Optional[Dict[str, str]]:
+	"""Avalia os alertas da leitura; retorna o mapa a gravar, ou None quando nenhum nível mudou.
 
-async def atualizar_status_compressor(id_compressor: int, esta_ligado: bool, data_medicao):
-	"""Atualiza o status (ligado/desligado) de um compressor específico no Firestore."""
+	A avaliação do servidor (5 níveis) é comparada com `alertas_servidor` do compressor;
+	o campo `alertas` é do ESP32 (3 níveis) e não é tocado.
+	"""
+	if limites is None:
+		return None
+	avaliados = avaliar_leitura(leitura, limites)
+	if avaliados == entrada.dados.get("alertas_servidor"):
+		return None
+	logger.info("Alertas do compressor %s alterados: %s", leitura["id_compressor"], avaliados)
+	return avaliados
+
+
+async def atualizar_alertas_compressor(id_compressor: int, alertas: Dict[str, str]) -> bool:
+	"""Atualiza os alertas nas informações do compressor (apenas se mudaram ou o heartbeat venceu).
+
+	Grava o campo `alertas` (níveis do ESP32); a avaliação do servidor fica em
+	`alertas_servidor`. Retorna False se a atualização falhou (as transições desses
+	alertas não devem ser registradas).
+	"""
+	campos = None
 	try:
-		@handle_firestore_exceptions
-		def atualizar_status():
-			# Buscar o compressor
-			docs = list(db.collection("compressores").where("id_compressor", "==", id_compressor).limit(1).stream())
-			if not docs:
-				return False
-			
-			doc = docs[0]
-			# Atualizar com o novo status e data da última atualização
-			doc.reference.update({
-				"esta_ligado": esta_ligado,
-				"data_ultima_atualizacao": data_medicao
-			})
+		entrada = await resolver_compressor(id_compressor)
+		if not entrada.existe:
+			logger.warning("Compressor %s não encontrado para atualizar alertas", id_compressor)
+			return False
+		
+		campos = escritas_compressor.propor(id_compressor, entrada.ref, {
+			"alertas": alertas,
+			"ultima_atualizacao_alertas": now_br()
+		})
+		if campos is None:
+			# Sem alteração, ou agrupado com outra escrita dentro da janela
+			cache_compressores.atualizar_campos(id_compressor, {"alertas": alertas})
 			return True
 		
-		sucesso = await run_in_threadpool(atualizar_status)
-		if sucesso:
-			status_texto = "ligado" if esta_ligado else "desligado"
-			logger.info(f"Status do compressor {id_compressor} atualizado para: {status_texto}")
-		else:
-			logger.warning(f"Compressor {id_compressor} não encontrado para atualizar status")
+		@handle_firestore_exceptions
+		async def atualizar_alertas():
+			# Atualizar com os novos alertas
+			await repositorio.atualizar_compressores_async([(entrada.ref, campos)])
+		
+		await atualizar_alertas()
+		escritas_compressor.confirmar(id_compressor, entrada.ref, campos)
+		cache_compressores.atualizar_campos(id_compressor, campos)
+		logger.info("Alertas atualizados para compressor %s: %s", id_compressor, alertas)
+		return True
 			
 	except Exception as e:
-		logger.error(f"Erro ao atualizar status do compressor {id_compressor}: {str(e)}")
+		# A referência em cache pode estar obsoleta (ex.: compressor excluído)
+		cache_compressores.invalidar(id_compressor)
+		if campos is not None:
+			# Ninguém reenvia estes alertas: voltam a ficar pendentes para o flush
+			escritas_compressor.falhou(id_compressor, campos, e, regravar=True)
+		logger.error(f"Erro ao atualizar alertas do compressor {id_compressor}: {str(e)}")
+		return False
 
 
-@router.post("/sensor")
-async def receive_sensor_data(data: SensorData):
+@router.post("/sensor", openapi_extra=OPENAPI_LEITURA_BINARIA)
+async def receive_sensor_data(data: SensorData, response: Response):
 	"""
 	Recebe e armazena dados do sensor no Firestore.
 	
@@ -85,18 +172,22 @@ async def receive_sensor_data(data: SensorData):
 	- vibracao: Detecção de vibração anormal (true/false)
 	- corrente: Corrente elétrica em amperes (≥0)
 	- data_medicao: Data da medição (opcional, preenchida automaticamente)
+	
+	Aceita também o registro binário de 38 bytes (Content-Type
+	application/vnd.ordem-da-fenix.leitura, ver app/utils/leitura_binaria.py).
+	
+	Com INGESTAO_SPOOL_DIR configurado, a leitura é gravada primeiro no spool em
+	disco e a resposta é 202; o replayer grava no Firestore em segundo plano.
+	Com INGESTAO_WRITE_BEHIND ativo, a leitura é enfileirada e a resposta é 202
+	(429 quando a fila está cheia); a gravação ocorre em lote em segundo plano.
 	"""
-	logger.info(f"Recebendo dados do sensor para compressor {data.id_compressor}")
+	log_sensor.info("Recebendo dados do sensor para compressor %s", data.id_compressor)
 	try:
-		# Verificar se o compressor existe
-		@handle_firestore_exceptions
-		def verificar_compressor():
-			docs = list(db.collection("compressores").where("id_compressor", "==", data.id_compressor).limit(1).stream())
-			return len(docs) > 0
-		
-		compressor_existe = await run_in_threadpool(verificar_compressor)
-		if not compressor_existe:
-			logger.warning(f"Tentativa de envio de dados para compressor inexistente: {data.id_compressor}")
+		# Verificar se o compressor existe (cache do registro de compressores);
+		# None: Firestore indisponível, a verificação fica com o replayer do spool
+		entrada = await resolver_compressor_para_spool(data.id_compressor)
+		if entrada is not None and not entrada.existe:
+			logger.warning("Tentativa de envio de dados para compressor inexistente: %s", data.id_compressor)
 			raise HTTPException(
 				status_code=404,
 				detail=f"Compressor com ID {data.id_compressor} não encontrado. Cadastre o compressor primeiro."
@@ -107,19 +198,66 @@ async def receive_sensor_data(data: SensorData):
 		if data_dict["data_medicao"] is None:
 			data_dict["data_medicao"] = now_br()
 		
-		# Salvar no Firestore de forma thread-safe
-		@handle_firestore_exceptions
-		def add_to_firestore():
-			doc_ref = db.collection("sensor_data").add(data_dict)
-			return doc_ref[1].id
+		# Avaliar alertas no servidor; o campo `alertas` só é gravado quando o nível muda
+		alertas, limites = None, None
+		if ALERTAS_SERVIDOR_ATIVO and entrada is not None:
+			limites = await obter_limites(data.id_compressor)
+			alertas = alertas_alterados(entrada, data_dict, limites)
 		
-		doc_id = await run_in_threadpool(add_to_firestore)
+		# Modo spool: gravar primeiro em disco; o replayer envia ao Firestore
+		if spool_ingestao is not None:
+			doc_id = novo_id_leitura()
+			try:
+				await executar_no_threadpool(spool_ingestao.anexar, [registro_spool(doc_id, data_dict, alertas=alertas)])
+			except OSError as e:
+				# Sem spool disponível (ex.: disco cheio): seguir com a gravação direta
+				logger.error(f"Falha ao gravar leitura no spool, gravando diretamente no Firestore: {str(e)}")
+				if entrada is None:
+					# Sem spool e sem Firestore: não há onde guardar a leitura
+					raise HTTPException(status_code=503, detail="Serviço de banco de dados temporariamente indisponível")
+			else:
+				registrar_leitura_aceita(data_dict, alertas, limites)
+				response.status_code = 202
+				return {
+					"status": "aceito",
+					"message": "Dados do sensor gravados no spool para envio ao Firestore",
+					"firestore_id": doc_id,
+					"id_compressor": data_dict["id_compressor"],
+					"data_medicao": data_dict["data_medicao"]
+				}
 		
-		# Atualizar o status do compressor com o status do sensor
-		await atualizar_status_compressor(data.id_compressor, data.ligado, data_dict["data_medicao"])
+		# Modo write-behind: enfileirar e responder imediatamente
+		if WRITE_BEHIND_ATIVO:
+			doc_id = novo_id_leitura()
+			if not fila_ingestao.enfileirar({"ref": entrada.ref, "leitura": data_dict, "doc_id": doc_id, "alertas": alertas}):
+				logger.warning("Fila de ingestão cheia, leitura do compressor %s rejeitada", data.id_compressor)
+				raise HTTPException(
+					status_code=429,
+					detail="Fila de ingestão cheia. Tente novamente em alguns segundos",
+					headers={"Retry-After": "1"}
+				)
+			registrar_leitura_aceita(data_dict, alertas, limites)
+			response.status_code = 202
+			return {
+				"status": "aceito",
+				"message": "Dados do sensor enfileirados para gravação",
+				"firestore_id": doc_id,
+				"id_compressor": data_dict["id_compressor"],
+				"data_medicao": data_dict["data_medicao"]
+			}
+		
+		# Salvar a leitura e atualizar o status do compressor em um único commit
+		try:
+			doc_id = await handle_firestore_exceptions(gravar_leitura)(entrada.ref, data_dict, alertas)
+		except Exception:
+			# A referência em cache pode estar obsoleta (ex.: compressor excluído)
+			cache_compressores.invalidar(data.id_compressor)
+			raise
+		cache_compressores.atualizar_campos(data.id_compressor, campos_cache_status(data_dict, alertas))
+		registrar_leitura_aceita(data_dict, alertas, limites)
 		
 		status_texto = "ligado" if data.ligado else "desligado"
-		logger.info(f"Dados do sensor salvos com sucesso (ID: {doc_id}), status do compressor atualizado para: {status_texto}")
+		log_sensor.info("Dados do sensor salvos com sucesso (ID: %s), status do compressor atualizado para: %s", doc_id, status_texto)
 	
 		return {
 			"status": "sucesso",
@@ -128,11 +266,192 @@ async def receive_sensor_data(data: SensorData):
 			"id_compressor": data_dict["id_compressor"],
 			"data_medicao": data_dict["data_medicao"]
 		}
+	except HTTPException:
+		raise
 	except Exception as e:
 		logger.error(f"Erro inesperado ao salvar dados do sensor: {str(e)}")
 		raise HTTPException(status_code=500, detail=f"Erro ao salvar dados do sensor: {str(e)}")
 
 
+@router.post("/sensor/batch", openapi_extra=OPENAPI_LEITURA_BINARIA)
+async def receive_sensor_batch(
+	leituras: List[Any] = Body(..., description="Lista de leituras no mesmo formato de POST /sensor (compressores podem ser misturados)")
+):
+	"""
+	Recebe um lote de leituras de sensores (buffer do ESP32 ou gateway da planta).
+	
+	- Cada item é validado individualmente; itens inválidos não impedem os demais
+	- As leituras são gravadas em commits de até 500 operações
+	- O status de cada compressor é atualizado apenas pela sua leitura mais recente
+	- O resultado é retornado por item, na mesma ordem do envio
+	- Em formato binário, o corpo é a concatenação dos registros de 38 bytes
+	"""
+	if len(leituras) > LIMITE_LEITURAS_LOTE:
+		raise HTTPException(
+			status_code=413,
+			detail=f"Lote com {len(leituras)} leituras excede o limite de {LIMITE_LEITURAS_LOTE}"
+		)
+	log_lote.info("Recebendo lote com %d leituras de sensores", len(leituras))
+	try:
+		resultados: List[Optional[Dict[str, Any]]] = [None] * len(leituras)
+		
+		# Validar todas as leituras em uma única passada
+		validas: Dict[int, Dict[str, Any]] = {}
+		for indice, item in enumerate(leituras):
+			try:
+				data_dict = SensorData.model_validate(item).model_dump()
+			except ValidationError as e:
+				resultados[indice] = {
+					"indice": indice,
+					"status": "erro",
+					"codigo": 422,
+					"detail": e.errors(include_url=False, include_context=False, include_input=False)
+				}
+				continue
+			if data_dict["data_medicao"] is None:
+				data_dict["data_medicao"] = now_br()
+			validas[indice] = data_dict
+		
+		# Resolver cada compressor uma única vez (cache do registro de compressores)
+		ids_compressores = sorted({d["id_compressor"] for d in validas.values()})
+		# (None: Firestore indisponível, a verificação fica com o replayer do spool)
+		entradas = dict(zip(ids_compressores, await asyncio.gather(*(resolver_compressor_para_spool(i) for i in ids_compressores))))
+		limites: Dict[int, Optional[LimitesCompressor]] = {}
+		if ALERTAS_SERVIDOR_ATIVO:
+			existentes = [i for i in ids_compressores if entradas[i] is not None and entradas[i].existe]
+			limites = dict(zip(existentes, await asyncio.gather(*(obter_limites(i) for i in existentes))))
+		
+		itens = []
+		indices_itens = []
+		for indice, data_dict in validas.items():
+			entrada = entradas[data_dict["id_compressor"]]
+			if entrada is None:
+				itens.append({"ref": None, "leitura": data_dict, "atualizar_status": True})
+				indices_itens.append(indice)
+				continue
+			if not entrada.existe:
+				resultados[indice] = {
+					"indice": indice,
+					"status": "erro",
+					"codigo": 404,
+					"detail": f"Compressor com ID {data_dict['id_compressor']} não encontrado. Cadastre o compressor primeiro."
+				}
+				continue
+			# Leituras antigas de um buffer não devem sobrescrever um status mais recente
+			ultima_atualizacao = entrada.dados.get("data_ultima_atualizacao")
+			atualizar_status = (
+				ultima_atualizacao is None
+				or to_utc_timezone(data_dict["data_medicao"]) >= to_utc_timezone(ultima_atualizacao)
+			)
+			item = {"ref": entrada.ref, "leitura": data_dict, "atualizar_status": atualizar_status}
+			if atualizar_status and ALERTAS_SERVIDOR_ATIVO:
+				# Apenas os alertas da leitura mais recente de cada compressor são gravados
+				item["alertas"] = alertas_alterados(entrada, data_dict, limites.get(data_dict["id_compressor"]))
+			itens.append(item)
+			indices_itens.append(indice)
+		
+		# Modo spool: gravar o lote inteiro em disco com um único append
+		if spool_ingestao is not None and itens:
+			for item in itens:
+				item["doc_id"] = novo_id_leitura()
+			try:
+				await executar_no_threadpool(
+					spool_ingestao.anexar,
+					[registro_spool(item["doc_id"], item["leitura"], item["atualizar_status"], item.get("alertas")) for item in itens]
+				)
+			except OSError as e:
+				# Sem spool disponível (ex.: disco cheio): seguir com a gravação direta
+				logger.error(f"Falha ao gravar lote no spool, gravando diretamente no Firestore: {str(e)}")
+				resolvidos = []
+				for indice, item in zip(indices_itens, itens):
+					if item["ref"] is not None:
+						resolvidos.append((indice, item))
+						continue
+					# Sem spool e sem Firestore: não há onde guardar a leitura
+					resultados[indice] = {
+						"indice": indice,
+						"status": "erro",
+						"codigo": 503,
+						"detail": "Serviço de banco de dados temporariamente indisponível"
+					}
+				indices_itens = [indice for indice, _ in resolvidos]
+				itens = [item for _, item in resolvidos]
+			else:
+				for indice, item in zip(indices_itens, itens):
+					registrar_leitura_aceita(item["leitura"], item.get("alertas"), limites.get(item["leitura"]["id_compressor"]))
+					resultados[indice] = {
+						"indice": indice,
+						"status": "aceito",
+						"firestore_id": item["doc_id"],
+						"id_compressor": item["leitura"]["id_compressor"],
+						"data_medicao": item["leitura"]["data_medicao"]
+					}
+				itens, indices_itens = [], []
+		
+		gravados = await executar_no_threadpool(gravar_leituras, itens) if itens else []
+		
+		status_atualizado: Dict[int, Dict[str, Any]] = {}
+		for indice, item, gravado in zip(indices_itens, itens, gravados):
+			leitura = item["leitura"]
+			if isinstance(gravado, Exception):
+				cache_compressores.invalidar(leitura["id_compressor"])
+				resultados[indice] = {
+					"indice": indice,
+					"status": "erro",
+					"codigo": 500,
+					"detail": f"Erro ao salvar leitura: {str(gravado)}"
+				}
+				continue
+			registrar_leitura_aceita(leitura, item.get("alertas"), limites.get(leitura["id_compressor"]))
+			resultados[indice] = {
+				"indice": indice,
+				"status": "sucesso",
+				"firestore_id": gravado,
+				"id_compressor": leitura["id_compressor"],
+				"data_medicao": leitura["data_medicao"]
+			}
+			if item["atualizar_status"]:
+				anterior = status_atualizado.get(leitura["id_compressor"])
+				if anterior is None or to_utc_timezone(leitura["data_medicao"]) >= to_utc_timezone(anterior["leitura"]["data_medicao"]):
+					status_atualizado[leitura["id_compressor"]] = item
+		
+		for id_compressor, item in status_atualizado.items():
+			cache_compressores.atualizar_campos(id_compressor, campos_cache_status(item["leitura"], item.get("alertas")))
+		
+		total_sucesso = sum(1 for r in resultados if r["status"] in ("sucesso", "aceito"))
+		total_falhas = len(resultados) - total_sucesso
+		if total_falhas:
+			logger.warning("Lote de sensores processado com %d falhas de %d leituras", total_falhas, len(resultados))
+		else:
+			log_lote.info("Lote de sensores salvo com sucesso (%d leituras)", total_sucesso)
+		
+		return {
+			"status": "sucesso" if not total_falhas else ("parcial" if total_sucesso else "erro"),
+			"total": len(resultados),
+			"sucesso": total_sucesso,
+			"falhas": total_falhas,
+			"resultados": resultados
+		}
+	except HTTPException:
+		raise
+	except Exception as e:
+		logger.error(f"Erro inesperado ao salvar lote de dados do sensor: {str(e)}")
+		raise HTTPException(status_code=500, detail=f"Erro ao salvar lote de dados do sensor: {str(e)}")
+
+
+@router.get("/sensor/fila")
+async def get_ingest_queue_stats():
+	"""Profundidade e contadores da fila de ingestão write-behind e do spool em disco."""
+	return {
+		"write_behind": WRITE_BEHIND_ATIVO,
+		**fila_ingestao.estatisticas(),
+		"spool": replayer_spool.estatisticas() if replayer_spool is not None else None,
+		"escritas_compressor": escritas_compressor.estatisticas(),
+		"invalidacao_workers": barramento_invalidacao.estatisticas(),
+		"coalescencia_leituras": leituras_coalescidas.estatisticas()
+	}
+
+
 @router.post("/esp32/alertas", response_model=ESP32AlertasOut)
 async def update_esp32_alertas(data: ESP32AlertasData):
 	"""
@@ -150,17 +469,12 @@ async def update_esp32_alertas(data: ESP32AlertasData):
 	- vibracao: Status de vibração (true=detectada, false=normal)
 	- data_medicao: Data da medição (opcional, preenchida automaticamente)
 	"""
-	logger.info(f"Atualizando alertas do ESP32 para compressor {data.id_compressor}")
+	log_esp32.info("Atualizando alertas do ESP32 para compressor %s", data.id_compressor)
 	try:
-		# Verificar se o compressor existe
-		@handle_firestore_exceptions
-		def verificar_compressor():
-			docs = list(db.collection("compressores").where("id_compressor", "==", data.id_compressor).limit(1).stream())
-			return len(docs) > 0
-		
-		compressor_existe = await run_in_threadpool(verificar_compressor)
-		if not compressor_existe:
-			logger.warning(f"Tentativa de atualizar alertas para compressor inexistente: {data.id_compressor}")
+		# Verificar se o compressor existe (cache do registro de compressores)
+		entrada = await resolver_compressor(data.id_compressor)
+		if not entrada.existe:
+			logger.warning("Tentativa de atualizar alertas para compressor inexistente: %s", data.id_compressor)
 			raise HTTPException(
 				status_code=404,
 				detail=f"Compressor com ID {data.id_compressor} não encontrado. Cadastre o compressor primeiro."
@@ -180,40 +494,76 @@ async def update_esp32_alertas(data: ESP32AlertasData):
 			"vibracao": "detectada" if data.vibracao else "normal"
 		}
 		
-		# Atualizar alertas do compressor com os dados do ESP32
-		await atualizar_alertas_compressor(data.id_compressor, alertas_esp32)
+		# Atualizar alertas do compressor com os dados do ESP32; as transições só são
+		# registradas se a atualização foi aceita (senão o próximo envio as detecta de novo)
+		if await atualizar_alertas_compressor(data.id_compressor, alertas_esp32):
+			publicar_transicoes(indice_alertas.processar(data.id_compressor, alertas_esp32, data_medicao, "esp32"))
 		
-		logger.info(f"Alertas do ESP32 atualizados com sucesso para compressor {data.id_compressor}: {alertas_esp32}")
+		log_esp32.info("Alertas do ESP32 atualizados com sucesso para compressor %s: %s", data.id_compressor, alertas_esp32)
 	
 		return ESP32AlertasOut(
 			id_compressor=data.id_compressor,
 			alertas_atualizados=alertas_esp32,
 			data_atualizacao=data_medicao
 		)
+	except HTTPException:
+		raise
 	except Exception as e:
 		logger.error(f"Erro inesperado ao atualizar alertas do ESP32: {str(e)}")
 		raise HTTPException(status_code=500, detail=f"Erro ao atualizar alertas do ESP32: {str(e)}")
 
 
+async def gerar_ndjson_dados(cursor: Optional[tuple]):
+	"""Gera os documentos de sensor_data em NDJSON, página a página, com memória constante."""
+	try:
+		while True:
+			dados = await repositorio.listar_leituras_async(None, TAMANHO_PAGINA_STREAM, cursor)
+			if not dados:
+				return
+			yield "".join(linha_ndjson(documento) for documento in dados)
+			if len(dados) < TAMANHO_PAGINA_STREAM:
+				return
+			cursor = (dados[-1]["data_medicao"], dados[-1]["firestore_id"])
+	except Exception as e:
+		# O status 200 já foi enviado: sinalizar o erro na última linha do stream
+		logger.error(f"Erro durante o streaming dos dados dos sensores: {str(e)}")
+		yield linha_ndjson({"erro": f"Erro ao buscar dados dos sensores: {str(e)}"})
+
+
 @router.get("/dados")
-async def get_sensor_data():
-	"""Busca todos os dados dos sensores armazenados."""
-	logger.info("Buscando todos os dados dos sensores")
+async def get_sensor_data(
+	page_size: int = Query(default=100, ge=1, le=1000, description="Número de registros por página"),
+	cursor: Optional[str] = Query(default=None, description="Cursor opaco retornado em next_cursor"),
+	formato: str = Query(default="json", pattern="^(json|ndjson)$", description="json (paginado) ou ndjson (streaming de todos os registros a partir do cursor)")
+):
+	"""Busca os dados dos sensores, do mais recente para o mais antigo, com paginação por cursor."""
+	logger.info("Buscando dados dos sensores (page_size=%s, formato=%s)", page_size, formato)
+	posicao = decodificar_cursor(cursor) if cursor else None
+	
+	if formato == "ndjson":
+		return StreamingResponse(gerar_ndjson_dados(posicao), media_type="application/x-ndjson")
+	
 	try:
 		@handle_firestore_exceptions
-		def fetch_data():
-			docs = list(db.collection("sensor_data").order_by("data_medicao", direction="DESCENDING").stream())
-			return [{
-				"firestore_id": doc.id,
-				**doc.to_dict()
-			} for doc in docs]
-		
-		dados = await run_in_threadpool(fetch_data)
-		logger.info(f"Encontrados {len(dados)} registros de sensores")
-		return {
+		async def fetch_data():
+			# Buscar um registro extra para saber se existe próxima página
+			return await repositorio.listar_leituras_async(None, page_size + 1, posicao)
+		
+		dados = await fetch_data()
+		next_cursor = None
+		if len(dados) > page_size:
+			dados = dados[:page_size]
+			next_cursor = codificar_cursor(dados[-1]["data_medicao"], dados[-1]["firestore_id"])
+		
+		logger.info("Encontrados %d registros de sensores", len(dados))
+		return resposta_json({
 			"total": len(dados),
+			"page_size": page_size,
+			"next_cursor": next_cursor,
 			"dados": dados
-		}
+		})
+	except HTTPException:
+		raise
 	except Exception as e:
 		logger.error(f"Erro inesperado ao buscar dados dos sensores: {str(e)}")
 		raise HTTPException(status_code=500, detail=f"Erro ao buscar dados dos sensores: {str(e)}")
@@ -222,45 +572,55 @@ async def get_sensor_data():
 @router.get("/dados/{id_compressor}")
 async def get_compressor_data(
 	id_compressor: int,
-	limit: Optional[int] = Query(default=50, ge=1, le=1000, description="Número máximo de registros a retornar")
+	limit: Optional[int] = Query(default=50, ge=1, le=1000, description="Número máximo de registros a retornar"),
+	desde: Optional[datetime] = Query(default=None, description="Data/hora inicial (inclusive) de data_medicao"),
+	ate: Optional[datetime] = Query(default=None, description="Data/hora final (inclusive) de data_medicao"),
+	cursor: Optional[str] = Query(default=None, description="Cursor opaco retornado em next_cursor")
 ):
-	"""Busca dados de um compressor específico."""
-	logger.info(f"Buscando dados do sensor para compressor {id_compressor}")
+	"""
+	Busca os dados de um compressor específico, do mais recente para o mais antigo.
+	
+	Usa o índice composto (id_compressor ASC, data_medicao DESC) definido em
+	firestore.indexes.json: lê exatamente `limit` documentos (+1 para detectar a
+	próxima página) e retorna as leituras mais recentes de fato.
+	"""
+	logger.info("Buscando dados do sensor para compressor %s", id_compressor)
+	# Datas sem fuso são do horário de Brasília; em UTC, todos os backends comparam igual
+	desde = to_utc_timezone(desde) if desde is not None else None
+	ate = to_utc_timezone(ate) if ate is not None else None
+	if desde is not None and ate is not None and desde > ate:
+		raise HTTPException(status_code=400, detail="Parâmetro 'desde' deve ser anterior a 'ate'")
+	posicao = decodificar_cursor(cursor) if cursor else None
 	try:
 		@handle_firestore_exceptions
-		def fetch_compressor_data():
-			# Buscar sem ordenação para evitar índice composto, depois ordenar em Python
-			docs = list(
-				db.collection("sensor_data")
-				.where("id_compressor", "==", id_compressor)
-				.limit(limit * 2)  # Buscar mais para compensar a ordenação local
-				.stream()
-			)
-			# Ordenar por data_medicao em Python
-			dados = [{
-				"firestore_id": doc.id,
-				**doc.to_dict()
-			} for doc in docs]
-			
-			# Ordenar por data_medicao (mais recente primeiro)
-			dados.sort(key=lambda x: x.get("data_medicao", ""), reverse=True)
-			return dados[:limit]  # Aplicar limite após ordenação
+		async def fetch_compressor_data():
+			# Buscar um registro extra para saber se existe próxima página
+			return await repositorio.listar_leituras_async(id_compressor, limit + 1, posicao, desde, ate)
 		
-		dados = await run_in_threadpool(fetch_compressor_data)
+		# Painéis que atualizam juntos compartilham a mesma consulta (single-flight)
+		dados = await leituras_coalescidas.executar(
+			("dados", id_compressor, limit, posicao, desde, ate), fetch_compressor_data
+		)
 		
-		if not dados:
-			logger.warning(f"Nenhum dado encontrado para o compressor {id_compressor}")
+		if not dados and posicao is None:
+			logger.warning("Nenhum dado encontrado para o compressor %s", id_compressor)
 			raise HTTPException(
 				status_code=404, 
 				detail=f"Nenhum dado encontrado para o compressor {id_compressor}"
 			)
 		
-		logger.info(f"Encontrados {len(dados)} registros para o compressor {id_compressor}")
-		return {
+		next_cursor = None
+		if len(dados) > limit:
+			dados = dados[:limit]
+			next_cursor = codificar_cursor(dados[-1]["data_medicao"], dados[-1]["firestore_id"])
+		
+		logger.info("Encontrados %d registros para o compressor %s", len(dados), id_compressor)
+		return resposta_json({
 			"id_compressor": id_compressor,
 			"total": len(dados),
+			"next_cursor": next_cursor,
 			"dados": dados
-		}
+		})
 	except HTTPException:
 		raise
 	except Exception as e:
@@ -271,6 +631,77 @@ async def get_compressor_data(
 
 
 
+@router.get("/dados/{id_compressor}/serie")
+async def get_compressor_series(
+	id_compressor: int,
+	resolucao: str = Query(default="auto", pattern="^(auto|1m|15m|1h)$", description="Resolução dos buckets (auto escolhe pela janela)"),
+	desde: Optional[datetime] = Query(default=None, description="Início da janela (padrão: 24h antes de 'ate')"),
+	ate: Optional[datetime] = Query(default=None, description="Fim da janela (padrão: agora)")
+):
+	"""
+	Série agregada (min/max/média/último e contagem) de um compressor para gráficos.
+	
+	Lê os buckets de rollup (1m, 15m ou 1h) em vez dos pontos brutos. Com
+	resolucao=auto, usa a menor resolução que mantém a série em até 1500 pontos.
+	"""
+	ate = ate or now_br()
+	desde = desde or (ate - timedelta(hours=24))
+	fim = to_utc_timezone(ate).timestamp()
+	comeco = to_utc_timezone(desde).timestamp()
+	if comeco > fim:
+		raise HTTPException(status_code=400, detail="Parâmetro 'desde' deve ser anterior a 'ate'")
+	
+	janela = fim - comeco
+	if resolucao == "auto":
+		resolucao = next((r for r, seg in RESOLUCOES.items() if janela / seg <= MAXIMO_PONTOS_SERIE), "1h")
+	elif janela / RESOLUCOES[resolucao] > MAXIMO_PONTOS_SERIE:
+		raise HTTPException(
+			status_code=400,
+			detail=f"Janela grande demais para a resolução {resolucao} (máximo de {MAXIMO_PONTOS_SERIE} pontos)"
+		)
+	segundos = RESOLUCOES[resolucao]
+	inicio = int(comeco // segundos) * segundos
+	
+	logger.info("Buscando série %s do compressor %s", resolucao, id_compressor)
+	try:
+		gravados = await handle_firestore_exceptions(buscar_serie)(id_compressor, resolucao, inicio, int(fim))
+		pendentes = agregador_rollups.pendentes(id_compressor, resolucao, inicio, int(fim))
+		
+		pontos = []
+		for bucket in sorted(set(gravados) | set(pendentes)):
+			agregado = mesclar_pontos(gravados.get(bucket), pendentes.get(bucket))
+			ponto = {
+				"inicio": to_br_timezone(datetime.fromtimestamp(bucket, tz=timezone.utc)),
+				"n": agregado["n"],
+				"vibracoes": agregado["vibracoes"]
+			}
+			for metrica in METRICAS:
+				valores = agregado["metricas"].get(metrica)
+				if valores:
+					ponto[metrica] = {
+						"min": valores["min"],
+						"max": valores["max"],
+						"media": valores["soma"] / agregado["n"] if agregado["n"] else None,
+						"ultimo": valores["ultimo"]
+					}
+			pontos.append(ponto)
+		
+		logger.info("Série %s do compressor %s com %d pontos", resolucao, id_compressor, len(pontos))
+		return resposta_json({
+			"id_compressor": id_compressor,
+			"resolucao": resolucao,
+			"desde": desde,
+			"ate": ate,
+			"total": len(pontos),
+			"pontos": pontos
+		})
+	except HTTPException:
+		raise
+	except Exception as e:
+		logger.error(f"Erro inesperado ao buscar série do compressor {id_compressor}: {str(e)}")
+		raise HTTPException(status_code=500, detail=f"Erro ao buscar série do compressor: {str(e)}")
+
+
 @router.get("/health")
 async def health_check():
 	"""Health check elaborado da aplicação."""
@@ -278,12 +709,11 @@ async def health_check():
 	try:
 		# Testar conexão com Firestore
 		@handle_firestore_exceptions
-		def test_firestore():
+		async def test_firestore():
 			# Teste simples de leitura
-			docs = list(db.collection("compressores").limit(1).stream())
-			return True
+			return await repositorio.verificar()
 		
-		firestore_ok = await run_in_threadpool(test_firestore)
+		firestore_ok = await test_firestore()
 		
 		from ..utils.datetime_utils import now_br, format_br_datetime
 		
@@ -0,0 +1,91 @@
+from fastapi import APIRouter, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from .sensors import resolver_compressor
+from ..utils.difusao import barramento_eventos, INTERVALO_KEEPALIVE_SEGUNDOS
+from typing import Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["stream"], prefix="/stream")
+
+
+async def gerar_sse(request: Request, assinatura):
+    """Eventos no formato Server-Sent Events, com comentários de keepalive."""
+    try:
+        yield ": conectado\n\n"
+        while True:
+            evento = await assinatura.proximo(INTERVALO_KEEPALIVE_SEGUNDOS)
+            if evento is None:
+                # Desconectado por lentidão: o EventSource do navegador reconecta sozinho
+                return
+            if evento is ...:
+                if await request.is_disconnected():
+                    return
+                yield ": keepalive\n\n"
+                continue
+            tipo, dados = evento
+            yield f"event: {tipo}\ndata: {dados}\n\n"
+    finally:
+        barramento_eventos.cancelar(assinatura)
+
+
+@router.get("/compressores/{id_compressor}")
+async def stream_compressor(id_compressor: int, request: Request):
+    """
+    Stream (SSE) das novas leituras e transições de alertas de um compressor.
+
+    Eventos: `leitura` (cada leitura aceita) e `alerta` (mudança de nível de um parâmetro).
+    Não consulta o Firestore após a conexão.
+    """
+    if not (await resolver_compressor(id_compressor)).existe:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Compressor com ID '{id_compressor}' não encontrado"
+        )
+    assinatura = barramento_eventos.assinar(id_compressor)
+    if assinatura is None:
+        raise HTTPException(status_code=503, detail="Limite de conexões de stream atingido", headers={"Retry-After": "5"})
+    logger.info(f"Nova conexão SSE para o compressor {id_compressor}")
+    return StreamingResponse(
+        gerar_sse(request, assinatura),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.websocket("/ws")
+async def stream_websocket(
+    websocket: WebSocket,
+    id_compressor: Optional[int] = Query(default=None, gt=0, description="Filtrar por compressor (todos se omitido)")
+):
+    """WebSocket com as mesmas mensagens do SSE (JSON com `tipo`, `id_compressor` e `dados`)."""
+    if id_compressor is not None and not (await resolver_compressor(id_compressor)).existe:
+        await websocket.close(code=1008, reason="Compressor não encontrado")
+        return
+    assinatura = barramento_eventos.assinar(id_compressor)
+    if assinatura is None:
+        await websocket.close(code=1013, reason="Limite de conexões de stream atingido")
+        return
+    await websocket.accept()
+    logger.info(f"Nova conexão WebSocket (compressor={id_compressor})")
+    try:
+        while True:
+            evento = await assinatura.proximo(INTERVALO_KEEPALIVE_SEGUNDOS)
+            if evento is None:
+                await websocket.close(code=1013, reason="Cliente lento")
+                return
+            if evento is ...:
+                await websocket.send_text('{"tipo":"keepalive"}')
+                continue
+            await websocket.send_text(evento[1])
+    except WebSocketDisconnect:
+        pass
+    finally:
+        barramento_eventos.cancelar(assinatura)
+
+
+@router.get("/estatisticas")
+async def estatisticas_stream():
+    """Assinantes conectados e contadores de entrega/descarte."""
+    return barramento_eventos.estatisticas()
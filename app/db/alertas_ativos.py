@@ -0,0 +1,361 @@
+"""Transições de nível dos alertas: log de eventos e índice de alertas ativos.
+
+Cada avaliação de alertas de um compressor é comparada com o índice em memória
+dos alertas ativos; apenas os parâmetros cujo nível mudou geram um evento. O índice
+é separado por origem (servidor: 5 níveis; ESP32: 3 níveis), então uma origem não
+desfaz o nível da outra.
+Os eventos são gravados de forma append-only em `alertas_eventos` e o índice é
+espelhado em `alertas_ativos` (um documento por compressor/parâmetro ativo),
+de onde é recarregado em segundo plano após o startup (sem atrasar o `/health`).
+As gravações são feitas em lote por um flusher em segundo plano, fora do caminho
+da requisição. Com vários workers, as transições são difundidas aos demais, que
+atualizam o próprio índice sem gerar eventos (quem detectou a transição os grava).
+"""
+import asyncio
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from .repositorio import LIMITE_OPERACOES_BATCH, OperacaoAlerta, gerar_id_documento, repositorio
+from ..models.parametros import AlertaAtivo, PrioridadeAlerta
+from ..utils.alertas import PARAMETROS_ALERTA, LimitesCompilados
+from ..utils.datetime_utils import to_utc_timezone
+from ..utils.invalidacao import barramento_invalidacao
+
+logger = logging.getLogger(__name__)
+
+INTERVALO_FLUSH_EVENTOS_SEGUNDOS = float(os.getenv("ALERTAS_EVENTOS_INTERVALO", "1.0"))
+# Operações pendentes mantidas enquanto o Firestore não aceita os flushes
+MAXIMO_OPERACOES_PENDENTES = int(os.getenv("ALERTAS_EVENTOS_PENDENTES_MAX", "20000"))
+
+# Prioridade de cada nível por origem (servidor: 5 níveis; ESP32: 3 níveis + vibração "detectada")
+PRIORIDADE_POR_NIVEL = {
+    "servidor": {
+        "critico": PrioridadeAlerta.critica,
+        "muito_baixo": PrioridadeAlerta.alta,
+        "alto": PrioridadeAlerta.atencao,
+        "baixo": PrioridadeAlerta.atencao,
+    },
+    "esp32": {
+        "detectada": PrioridadeAlerta.critica,
+        "acima_do_normal": PrioridadeAlerta.atencao,
+        "abaixo_do_normal": PrioridadeAlerta.atencao,
+    },
+}
+
+# Ordem de exibição (mais grave primeiro)
+ORDEM_PRIORIDADE = {
+    PrioridadeAlerta.critica: 0,
+    PrioridadeAlerta.alta: 1,
+    PrioridadeAlerta.atencao: 2,
+    PrioridadeAlerta.informativo: 3,
+}
+
+NOMES_PARAMETROS = {
+    "pressao": "Pressão",
+    "temperatura_equipamento": "Temperatura do equipamento",
+    "temperatura_ambiente": "Temperatura ambiente",
+    "potencia": "Potência",
+    "umidade": "Umidade",
+    "corrente": "Corrente",
+    "vibracao": "Vibração",
+}
+
+# Campo da leitura e chave dos limites de cada tipo de alerta
+CAMPOS_POR_ALERTA = {chave: (campo, chave_limites) for chave, campo, chave_limites in PARAMETROS_ALERTA}
+
+
+# Chave de um alerta no índice de um compressor: (origem, tipo do alerta)
+ChaveAlerta = Tuple[str, str]
+
+
+def id_documento_ativo(id_compressor: int, origem: str, tipo_alerta: str) -> str:
+    return f"{id_compressor}_{origem}_{tipo_alerta}"
+
+
+def operacao_repositorio(operacao: str, dados: Any) -> OperacaoAlerta:
+    """Converte uma operação pendente do índice na operação gravada pelo repositório."""
+    if operacao == "evento":
+        return operacao, gerar_id_documento(), dados
+    if operacao == "ativar":
+        return operacao, id_documento_ativo(dados.id_compressor, dados.origem, dados.tipo_alerta), {**dados.model_dump(), "prioridade": dados.prioridade.value}
+    # "desativar": o próprio ID do documento
+    return operacao, dados, None
+
+
+class IndiceAlertasAtivos:
+    """Alertas ativos por compressor e tipo, com detecção de transições de nível."""
+
+    def __init__(self, intervalo_flush: float, maximo_pendentes: int = MAXIMO_OPERACOES_PENDENTES):
+        self.intervalo_flush = intervalo_flush
+        self.maximo_pendentes = maximo_pendentes
+        self._ativos: Dict[int, Dict[ChaveAlerta, AlertaAtivo]] = {}
+        self._lock = threading.Lock()
+        # Operações pendentes: ("evento", dados) | ("ativar", AlertaAtivo) | ("desativar", ID do documento)
+        self._pendentes: List[Tuple[str, Any]] = []
+        self._tarefa: Optional[asyncio.Task] = None
+        self.carregado = False
+        # Alertas (compressor, origem, tipo) alterados e compressores removidos antes da
+        # carga: o estado em memória deles é mais recente que o gravado
+        self._alterados_antes_da_carga: Set[Tuple[int, str, str]] = set()
+        self._removidos_antes_da_carga: Set[int] = set()
+        # Contadores
+        self.eventos = 0
+        self.operacoes_gravadas = 0
+        self.falhas_flush = 0
+        self.operacoes_descartadas = 0
+
+    def carregar(self):
+        """Recarrega o índice a partir de `alertas_ativos` (bloqueante; chamado pelo flusher)."""
+        ativos: Dict[int, Dict[ChaveAlerta, AlertaAtivo]] = {}
+        # Documentos anteriores à separação por origem ("{id}_{tipo}"): removidos; os
+        # alertas ainda ativos são reativados na próxima avaliação de cada origem
+        legados: List[str] = []
+        for documento in repositorio.carregar_alertas_ativos():
+            if "origem" not in documento:
+                legados.append(f"{documento['id_compressor']}_{documento['tipo_alerta']}")
+                continue
+            alerta = AlertaAtivo.model_validate(documento)
+            ativos.setdefault(alerta.id_compressor, {})[(alerta.origem, alerta.tipo_alerta)] = alerta
+        with self._lock:
+            self._pendentes.extend(("desativar", doc_id) for doc_id in legados)
+            if not self.carregado:
+                for id_compressor in self._removidos_antes_da_carga:
+                    for origem, tipo_alerta in ativos.pop(id_compressor, {}):
+                        self._pendentes.append(("desativar", id_documento_ativo(id_compressor, origem, tipo_alerta)))
+                for id_compressor, origem, tipo_alerta in self._alterados_antes_da_carga:
+                    chave = (origem, tipo_alerta)
+                    atual = self._ativos.get(id_compressor, {}).get(chave)
+                    if atual is not None:
+                        ativos.setdefault(id_compressor, {})[chave] = atual
+                    else:
+                        ativos.get(id_compressor, {}).pop(chave, None)
+                self._alterados_antes_da_carga.clear()
+                self._removidos_antes_da_carga.clear()
+            self._ativos = {id_compressor: alertas for id_compressor, alertas in ativos.items() if alertas}
+            self.carregado = True
+        logger.info(f"Índice de alertas ativos carregado ({sum(len(a) for a in ativos.values())} alertas)")
+
+    def processar(
+        self,
+        id_compressor: int,
+        alertas: Dict[str, str],
+        instante: datetime,
+        origem: str,
+        leitura: Optional[Dict[str, Any]] = None,
+        limites: Optional[Dict[str, LimitesCompilados]] = None
+    ) -> List[Dict[str, Any]]:
+        """Compara os níveis avaliados com os da mesma origem no índice e registra as transições.
+
+        Retorna os eventos gerados (vazio quando nenhum nível mudou).
+        """
+        eventos = []
+        # Estado novo de cada alerta alterado (None = desativado), para os outros workers
+        alteracoes: Dict[str, Optional[Dict[str, Any]]] = {}
+        prioridades = PRIORIDADE_POR_NIVEL.get(origem, {})
+        with self._lock:
+            ativos = self._ativos.setdefault(id_compressor, {})
+            for tipo_alerta, nivel in alertas.items():
+                chave = (origem, tipo_alerta)
+                atual = ativos.get(chave)
+                nivel_anterior = atual.nivel if atual is not None else "normal"
+                if nivel == nivel_anterior:
+                    continue
+                valor_atual, valor_limite = self._valores(tipo_alerta, nivel, leitura, limites)
+                prioridade = prioridades.get(nivel, PrioridadeAlerta.informativo) if nivel != "normal" else None
+                evento = {
+                    "id_compressor": id_compressor,
+                    "tipo_alerta": tipo_alerta,
+                    "nivel_anterior": nivel_anterior,
+                    "nivel": nivel,
+                    "prioridade": prioridade.value if prioridade is not None else None,
+                    "valor_atual": valor_atual,
+                    "valor_limite": valor_limite,
+                    "origem": origem,
+                    "data_evento": instante
+                }
+                eventos.append(evento)
+                self._pendentes.append(("evento", evento))
+                if not self.carregado:
+                    self._alterados_antes_da_carga.add((id_compressor, origem, tipo_alerta))
+                if prioridade is None:
+                    del ativos[chave]
+                    self._pendentes.append(("desativar", id_documento_ativo(id_compressor, origem, tipo_alerta)))
+                    alteracoes[tipo_alerta] = None
+                else:
+                    alerta = AlertaAtivo(
+                        id_compressor=id_compressor,
+                        tipo_alerta=tipo_alerta,
+                        origem=origem,
+                        nivel=nivel,
+                        prioridade=prioridade,
+                        mensagem=f"{NOMES_PARAMETROS.get(tipo_alerta, tipo_alerta)}: nível {nivel}",
+                        valor_atual=valor_atual,
+                        valor_limite=valor_limite,
+                        data_disparo=instante
+                    )
+                    ativos[chave] = alerta
+                    self._pendentes.append(("ativar", alerta))
+                    alteracoes[tipo_alerta] = alerta.model_dump(mode="json")
+            if not ativos:
+                del self._ativos[id_compressor]
+            self.eventos += len(eventos)
+        if alteracoes:
+            barramento_invalidacao.publicar("alertas", id_compressor, {"origem": origem, "alteracoes": alteracoes})
+        return eventos
+
+    def aplicar_remoto(self, id_compressor: int, dados: Dict[str, Any]):
+        """Aplica ao índice as transições detectadas por outro worker (sem gerar eventos)."""
+        origem = dados["origem"]
+        with self._lock:
+            ativos = self._ativos.setdefault(id_compressor, {})
+            for tipo_alerta, documento in dados["alteracoes"].items():
+                if documento is None:
+                    ativos.pop((origem, tipo_alerta), None)
+                else:
+                    ativos[(origem, tipo_alerta)] = AlertaAtivo.model_validate(documento)
+                if not self.carregado:
+                    self._alterados_antes_da_carga.add((id_compressor, origem, tipo_alerta))
+            if not ativos:
+                del self._ativos[id_compressor]
+
+    @staticmethod
+    def _valores(tipo_alerta, nivel, leitura, limites) -> Tuple[Optional[float], Optional[float]]:
+        if leitura is None or tipo_alerta not in CAMPOS_POR_ALERTA:
+            return None, None
+        campo, chave_limites = CAMPOS_POR_ALERTA[tipo_alerta]
+        valor_limite = limites[chave_limites].limite(nivel) if limites is not None else None
+        return float(leitura[campo]), valor_limite
+
+    def remover_compressor(self, id_compressor: int, registrar: bool = True):
+        """Encerra os alertas ativos de um compressor excluído.
+
+        Com `registrar=False` (exclusão feita por outro worker), apenas atualiza o índice.
+        """
+        with self._lock:
+            for origem, tipo_alerta in self._ativos.pop(id_compressor, {}):
+                if registrar:
+                    self._pendentes.append(("desativar", id_documento_ativo(id_compressor, origem, tipo_alerta)))
+            if not self.carregado:
+                self._removidos_antes_da_carga.add(id_compressor)
+
+    def listar(self, id_compressor: Optional[int] = None, prioridade: Optional[PrioridadeAlerta] = None) -> List[AlertaAtivo]:
+        """Alertas ativos (mais graves e mais recentes primeiro), sem consultar o banco de dados."""
+        with self._lock:
+            if id_compressor is not None:
+                alertas = list(self._ativos.get(id_compressor, {}).values())
+            else:
+                alertas = [alerta for ativos in self._ativos.values() for alerta in ativos.values()]
+        if prioridade is not None:
+            alertas = [alerta for alerta in alertas if alerta.prioridade == prioridade]
+        alertas.sort(key=lambda a: to_utc_timezone(a.data_disparo), reverse=True)
+        alertas.sort(key=lambda a: ORDEM_PRIORIDADE[a.prioridade])
+        return alertas
+
+    def flush(self):
+        """Grava eventos e alterações do índice em commits de até 500 operações (bloqueante)."""
+        with self._lock:
+            pendentes, self._pendentes = self._pendentes, []
+        if not pendentes:
+            return
+        falhas: List[Tuple[str, Any]] = []
+        for inicio in range(0, len(pendentes), LIMITE_OPERACOES_BATCH):
+            lote = pendentes[inicio:inicio + LIMITE_OPERACOES_BATCH]
+            try:
+                repositorio.gravar_alertas([operacao_repositorio(operacao, dados) for operacao, dados in lote])
+                self.operacoes_gravadas += len(lote)
+            except Exception as e:
+                self.falhas_flush += 1
+                logger.error(f"Erro ao gravar {len(lote)} operações de eventos de alerta: {str(e)}")
+                falhas.extend(lote)
+        if falhas:
+            # Devolver para o próximo flush, mantendo a ordem
+            with self._lock:
+                self._pendentes[:0] = falhas
+                if len(self._pendentes) > self.maximo_pendentes:
+                    self._limitar_pendentes()
+
+    def _limitar_pendentes(self):
+        """Limita as operações pendentes durante uma indisponibilidade longa (com o lock).
+
+        Só a última operação do índice de cada compressor/parâmetro importa (o documento
+        espelha o estado atual). Se ainda passar do limite, descarta os eventos mais
+        antigos e, por último, as operações mais antigas do índice.
+        """
+        vistos: Set[str] = set()
+        compactadas: List[Tuple[str, Any]] = []
+        for operacao, dados in reversed(self._pendentes):
+            if operacao != "evento":
+                chave = id_documento_ativo(dados.id_compressor, dados.origem, dados.tipo_alerta) if operacao == "ativar" else dados
+                if chave in vistos:
+                    continue
+                vistos.add(chave)
+            compactadas.append((operacao, dados))
+        compactadas.reverse()
+        excesso = len(compactadas) - self.maximo_pendentes
+        if excesso > 0:
+            descartados = 0
+            mantidas: List[Tuple[str, Any]] = []
+            for operacao, dados in compactadas:
+                if operacao == "evento" and descartados < excesso:
+                    descartados += 1
+                    continue
+                mantidas.append((operacao, dados))
+            compactadas = mantidas[max(len(mantidas) - self.maximo_pendentes, 0):]
+            descartados += len(mantidas) - len(compactadas)
+            self.operacoes_descartadas += descartados
+            logger.warning(f"Limite de operações de alerta pendentes atingido: {descartados} operações mais antigas descartadas")
+        self._pendentes = compactadas
+
+    async def iniciar(self):
+        # A carga do índice é feita pelo flusher, sem bloquear o startup
+        if self._tarefa is None or self._tarefa.done():
+            self._tarefa = asyncio.create_task(self._executar())
+
+    async def parar(self):
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            try:
+                await self._tarefa
+            except asyncio.CancelledError:
+                pass
+            self._tarefa = None
+        await run_in_threadpool(self.flush)
+
+    async def _executar(self):
+        while True:
+            if not self.carregado:
+                try:
+                    await run_in_threadpool(self.carregar)
+                except Exception as e:
+                    # Nova tentativa no próximo ciclo
+                    logger.error(f"Erro ao carregar o índice de alertas ativos: {str(e)}")
+            await asyncio.sleep(self.intervalo_flush)
+            try:
+                await run_in_threadpool(self.flush)
+            except Exception as e:
+                logger.error(f"Erro inesperado no flush dos eventos de alerta: {str(e)}")
+
+    def estatisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "carregado": self.carregado,
+                "compressores_com_alerta": len(self._ativos),
+                "alertas_ativos": sum(len(a) for a in self._ativos.values()),
+                "eventos": self.eventos,
+                "operacoes_pendentes": len(self._pendentes),
+                "operacoes_gravadas": self.operacoes_gravadas,
+                "falhas_flush": self.falhas_flush,
+                "operacoes_descartadas": self.operacoes_descartadas
+            }
+
+
+indice_alertas = IndiceAlertasAtivos(intervalo_flush=INTERVALO_FLUSH_EVENTOS_SEGUNDOS)
+barramento_invalidacao.assinar("alertas", indice_alertas.aplicar_remoto)
+barramento_invalidacao.assinar(
+    "compressor_excluido", lambda id_compressor, _: indice_alertas.remover_compressor(id_compressor, registrar=False)
+)
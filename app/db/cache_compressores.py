@@ -0,0 +1,179 @@
+"""Cache em memória do registro de compressores (id_compressor -> documento do compressor)."""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from .repositorio import repositorio
+from ..utils.invalidacao import barramento_invalidacao
+
+# Configurações do cache (podem ser ajustadas por variáveis de ambiente)
+CACHE_TTL_SEGUNDOS = float(os.getenv("COMPRESSOR_CACHE_TTL", "300"))
+CACHE_TTL_NEGATIVO_SEGUNDOS = float(os.getenv("COMPRESSOR_CACHE_TTL_NEGATIVO", "10"))
+CACHE_MAX_ENTRADAS = int(os.getenv("COMPRESSOR_CACHE_MAX", "2000"))
+
+# Campos do documento mantidos em memória para consultas rápidas
+CAMPOS_QUENTES = ("esta_ligado", "data_ultima_atualizacao", "alertas", "alertas_servidor", "nome_marca", "localizacao")
+
+
+class EntradaCompressor:
+    """Entrada do cache: ID do documento (`ref`) e campos quentes do compressor."""
+    __slots__ = ("ref", "dados", "expira_em")
+
+    def __init__(self, ref, dados: Optional[Dict[str, Any]], expira_em: float):
+        self.ref = ref
+        self.dados = dados
+        self.expira_em = expira_em
+
+    @property
+    def existe(self) -> bool:
+        return self.ref is not None
+
+
+class CacheCompressores:
+    """Cache LRU com TTL para o registro de compressores.
+
+    Também guarda resultados negativos (compressor inexistente) por um TTL curto,
+    evitando que um ESP32 não cadastrado gere uma consulta a cada envio.
+    """
+
+    def __init__(self, ttl: float, ttl_negativo: float, max_entradas: int):
+        self.ttl = ttl
+        self.ttl_negativo = ttl_negativo
+        self.max_entradas = max_entradas
+        self._entradas: "OrderedDict[int, EntradaCompressor]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # Incrementado a cada escrita conhecida em qualquer compressor (write-through ou
+        # invalidação, deste ou de outro worker): base das ETags validadas sem consulta
+        self.modificacoes = 0
+        # Geração de cada compressor (e de todo o cache), incrementada nas invalidações: uma
+        # carga iniciada antes de uma invalidação não registra o documento que leu
+        self._geracoes: Dict[int, int] = {}
+        self._geracao_limpeza = 0
+
+    def obter(self, id_compressor: int) -> Optional[EntradaCompressor]:
+        """Retorna a entrada válida do cache ou None em caso de miss/expiração."""
+        with self._lock:
+            entrada = self._entradas.get(id_compressor)
+            if entrada is None or entrada.expira_em <= time.monotonic():
+                if entrada is not None:
+                    del self._entradas[id_compressor]
+                self.misses += 1
+                return None
+            self._entradas.move_to_end(id_compressor)
+            self.hits += 1
+            return entrada
+
+    def geracao(self, id_compressor: int) -> Tuple[int, int]:
+        """Geração atual do compressor, obtida antes de consultar o repositório."""
+        with self._lock:
+            return self._geracao_limpeza, self._geracoes.get(id_compressor, 0)
+
+    def registrar(self, id_compressor: int, ref, dados: Dict[str, Any], geracao: Optional[Tuple[int, int]] = None) -> EntradaCompressor:
+        """Registra um compressor existente a partir do seu documento.
+
+        Com `geracao`, a entrada só é guardada se o compressor não foi invalidado
+        desde então (a entrada é retornada de qualquer forma).
+        """
+        campos = {campo: dados.get(campo) for campo in CAMPOS_QUENTES}
+        entrada = EntradaCompressor(ref, campos, time.monotonic() + self.ttl)
+        self._guardar(id_compressor, entrada, geracao)
+        return entrada
+
+    def registrar_inexistente(self, id_compressor: int, geracao: Optional[Tuple[int, int]] = None) -> EntradaCompressor:
+        """Registra que o compressor não existe (resultado negativo de TTL curto)."""
+        entrada = EntradaCompressor(None, None, time.monotonic() + self.ttl_negativo)
+        self._guardar(id_compressor, entrada, geracao)
+        return entrada
+
+    def atualizar_campos(self, id_compressor: int, campos: Dict[str, Any]):
+        """Atualiza os campos quentes após uma escrita bem-sucedida (write-through)."""
+        with self._lock:
+            self.modificacoes += 1
+            entrada = self._entradas.get(id_compressor)
+            if entrada is None or not entrada.existe:
+                return
+            for campo, valor in campos.items():
+                if campo in CAMPOS_QUENTES:
+                    entrada.dados[campo] = valor
+
+    def invalidar(self, id_compressor: int, propagar: bool = True):
+        """Remove um compressor do cache (chamado após criar/atualizar/excluir), também nos outros workers."""
+        with self._lock:
+            self.modificacoes += 1
+            self._geracoes[id_compressor] = self._geracoes.get(id_compressor, 0) + 1
+            self._entradas.pop(id_compressor, None)
+        if propagar:
+            barramento_invalidacao.publicar("compressor", id_compressor)
+
+    def limpar(self):
+        """Remove todas as entradas do cache."""
+        with self._lock:
+            self.modificacoes += 1
+            self._geracao_limpeza += 1
+            self._entradas.clear()
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Retorna contadores de uso do cache."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entradas": len(self._entradas),
+                "hits": self.hits,
+                "misses": self.misses,
+                "taxa_acerto": round(self.hits / total, 4) if total else 0.0
+            }
+
+    def _guardar(self, id_compressor: int, entrada: EntradaCompressor, geracao: Optional[Tuple[int, int]] = None):
+        with self._lock:
+            if geracao is not None and geracao != (self._geracao_limpeza, self._geracoes.get(id_compressor, 0)):
+                return
+            self._entradas[id_compressor] = entrada
+            self._entradas.move_to_end(id_compressor)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+
+cache_compressores = CacheCompressores(
+    ttl=CACHE_TTL_SEGUNDOS,
+    ttl_negativo=CACHE_TTL_NEGATIVO_SEGUNDOS,
+    max_entradas=CACHE_MAX_ENTRADAS
+)
+barramento_invalidacao.assinar("compressor", lambda id_compressor, _: cache_compressores.invalidar(id_compressor, propagar=False))
+
+
+def carregar_compressor(id_compressor: int) -> EntradaCompressor:
+    """Consulta o compressor no repositório e registra o resultado no cache (bloqueante)."""
+    geracao = cache_compressores.geracao(id_compressor)
+    encontrado = repositorio.carregar_compressor(id_compressor)
+    if encontrado is None:
+        return cache_compressores.registrar_inexistente(id_compressor, geracao)
+    return cache_compressores.registrar(id_compressor, *encontrado, geracao)
+
+
+def buscar_compressor(id_compressor: int) -> EntradaCompressor:
+    """Resolve um compressor pelo cache, consultando o repositório apenas em caso de miss (bloqueante)."""
+    entrada = cache_compressores.obter(id_compressor)
+    if entrada is not None:
+        return entrada
+    return carregar_compressor(id_compressor)
+
+
+async def carregar_compressor_async(id_compressor: int) -> EntradaCompressor:
+    """Versão assíncrona de `carregar_compressor` (usada pelos handlers)."""
+    geracao = cache_compressores.geracao(id_compressor)
+    encontrado = await repositorio.carregar_compressor_async(id_compressor)
+    if encontrado is None:
+        return cache_compressores.registrar_inexistente(id_compressor, geracao)
+    return cache_compressores.registrar(id_compressor, *encontrado, geracao)
+
+
+async def buscar_compressor_async(id_compressor: int) -> EntradaCompressor:
+    """Resolve um compressor pelo cache, consultando o repositório (assíncrono) apenas em caso de miss."""
+    entrada = cache_compressores.obter(id_compressor)
+    if entrada is not None:
+        return entrada
+    return await carregar_compressor_async(id_compressor)
@@ -0,0 +1,111 @@
+"""Coalescência (single-flight) das leituras repetidas pelos dashboards.
+
+Quando vários painéis atualizam ao mesmo tempo, requisições concorrentes com os mesmos
+parâmetros (`GET /compressores/{id}`, `GET /dados/{id_compressor}`) compartilham uma
+única chamada ao repositório em andamento e o seu resultado (ou exceção). Com
+`COALESCENCIA_JANELA` > 0, o resultado ainda é reaproveitado por essa quantidade de
+segundos (micro-cache); o padrão 0 não guarda nada depois que a chamada termina.
+
+Os resultados são compartilhados entre requisições: os handlers não devem alterá-los.
+Tudo roda no event loop, então não há locks.
+"""
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+from ..utils.invalidacao import barramento_invalidacao
+
+# Configurações (podem ser ajustadas por variáveis de ambiente)
+COALESCENCIA_ATIVA = os.getenv("COALESCENCIA_ATIVA", "true").lower() in ("1", "true", "sim")
+JANELA_SEGUNDOS = float(os.getenv("COALESCENCIA_JANELA", "0"))
+MAX_ENTRADAS = int(os.getenv("COALESCENCIA_CACHE_MAX", "1000"))
+
+
+class CoalescedorLeituras:
+    """Compartilha chamadas idênticas em andamento e, opcionalmente, o resultado recente.
+
+    As chaves são tuplas `(tipo, id_compressor, ...parâmetros)`; `invalidar` descarta
+    tudo o que se refere a um compressor (chamadas em andamento deixam de ser
+    reaproveitadas e o resultado delas não entra no micro-cache).
+    """
+
+    def __init__(self, ativo: bool, janela: float, max_entradas: int):
+        self.ativo = ativo
+        self.janela = janela
+        self.max_entradas = max_entradas
+        self._em_andamento: Dict[Hashable, asyncio.Future] = {}
+        self._recentes: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        # Contadores
+        self.chamadas = 0
+        self.executadas = 0
+        self.coalescidas = 0
+        self.micro_cache = 0
+
+    async def executar(self, chave: Tuple, funcao: Callable[[], Awaitable[Any]]) -> Any:
+        """Executa `funcao()` ou aguarda a execução idêntica já em andamento."""
+        if not self.ativo:
+            return await funcao()
+        self.chamadas += 1
+
+        if self.janela > 0:
+            recente = self._recentes.get(chave)
+            if recente is not None:
+                if recente[0] > time.monotonic():
+                    self.micro_cache += 1
+                    return recente[1]
+                del self._recentes[chave]
+
+        tarefa = self._em_andamento.get(chave)
+        if tarefa is not None:
+            self.coalescidas += 1
+        else:
+            self.executadas += 1
+            tarefa = asyncio.ensure_future(funcao())
+            self._em_andamento[chave] = tarefa
+            tarefa.add_done_callback(lambda concluida: self._concluir(chave, concluida))
+        # shield: o cancelamento de uma requisição (cliente desconectado) não cancela as demais
+        return await asyncio.shield(tarefa)
+
+    def invalidar(self, id_compressor: int):
+        """Descarta chamadas em andamento e resultados recentes do compressor."""
+        for chave in [c for c in self._em_andamento if c[1] == id_compressor]:
+            del self._em_andamento[chave]
+        for chave in [c for c in self._recentes if c[1] == id_compressor]:
+            del self._recentes[chave]
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Retorna contadores de chamadas coalescidas e do micro-cache."""
+        return {
+            "ativa": self.ativo,
+            "janela_segundos": self.janela,
+            "em_andamento": len(self._em_andamento),
+            "entradas_micro_cache": len(self._recentes),
+            "chamadas": self.chamadas,
+            "executadas": self.executadas,
+            "coalescidas": self.coalescidas,
+            "micro_cache": self.micro_cache,
+            "economizadas": self.coalescidas + self.micro_cache
+        }
+
+    def _concluir(self, chave: Tuple, tarefa: asyncio.Future):
+        if self._em_andamento.get(chave) is not tarefa:
+            return  # invalidada durante a chamada
+        del self._em_andamento[chave]
+        # exception() também marca a exceção como consumida se todos os aguardantes saíram
+        if tarefa.cancelled() or tarefa.exception() is not None or self.janela <= 0:
+            return
+        self._recentes[chave] = (time.monotonic() + self.janela, tarefa.result())
+        self._recentes.move_to_end(chave)
+        while len(self._recentes) > self.max_entradas:
+            self._recentes.popitem(last=False)
+
+
+leituras_coalescidas = CoalescedorLeituras(
+    ativo=COALESCENCIA_ATIVA,
+    janela=JANELA_SEGUNDOS,
+    max_entradas=MAX_ENTRADAS
+)
+barramento_invalidacao.assinar("compressor", lambda id_compressor, _: leituras_coalescidas.invalidar(id_compressor))
+barramento_invalidacao.assinar("compressor_excluido", lambda id_compressor, _: leituras_coalescidas.invalidar(id_compressor))
@@ -0,0 +1,71 @@
+"""Configurações de limites por compressor e cache dos limites compilados para a ingestão."""
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from .repositorio import repositorio
+from ..utils.invalidacao import barramento_invalidacao
+from ..utils.alertas import LimitesCompilados, compilar_parametros
+
+# Avaliação de alertas no servidor durante a ingestão (pode ser desativada por variável de ambiente)
+ALERTAS_SERVIDOR_ATIVO = os.getenv("ALERTAS_SERVIDOR", "true").lower() in ("1", "true", "sim")
+CACHE_LIMITES_TTL_SEGUNDOS = float(os.getenv("ALERTAS_CONFIG_CACHE_TTL", "300"))
+
+LimitesCompressor = Dict[str, LimitesCompilados]
+
+
+class CacheLimites:
+    """Limites compilados por compressor, com TTL.
+
+    A compilação é feita uma vez por configuração; o cache é invalidado quando a
+    configuração do compressor é criada, atualizada ou excluída (também nos outros
+    workers da máquina). O TTL cobre alterações feitas por outras máquinas.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entradas: Dict[int, Tuple[LimitesCompressor, float]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def obter(self, id_compressor: int) -> Optional[LimitesCompressor]:
+        with self._lock:
+            entrada = self._entradas.get(id_compressor)
+            if entrada is None or entrada[1] <= time.monotonic():
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entrada[0]
+
+    def registrar(self, id_compressor: int, limites: LimitesCompressor) -> LimitesCompressor:
+        with self._lock:
+            self._entradas[id_compressor] = (limites, time.monotonic() + self.ttl)
+        return limites
+
+    def invalidar(self, id_compressor: int, propagar: bool = True):
+        with self._lock:
+            self._entradas.pop(id_compressor, None)
+        if propagar:
+            barramento_invalidacao.publicar("limites", id_compressor)
+
+    def estatisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entradas": len(self._entradas),
+                "hits": self.hits,
+                "misses": self.misses,
+                "taxa_acerto": round(self.hits / total, 4) if total else 0.0
+            }
+
+
+cache_limites = CacheLimites(ttl=CACHE_LIMITES_TTL_SEGUNDOS)
+barramento_invalidacao.assinar("limites", lambda id_compressor, _: cache_limites.invalidar(id_compressor, propagar=False))
+
+
+async def carregar_limites(id_compressor: int) -> LimitesCompressor:
+    """Lê a configuração do compressor (leitura pontual), compila os limites e registra no cache."""
+    configuracao = await repositorio.carregar_configuracao_async(id_compressor)
+    return cache_limites.registrar(id_compressor, compilar_parametros(configuracao))
@@ -0,0 +1,260 @@
+"""Escritas no documento do compressor apenas quando o estado muda.
+
+Guarda, por compressor, o último estado gravado (status, alertas). Updates que não
+alteram nada são suprimidos; os campos de heartbeat (`data_ultima_atualizacao`,
+`ultima_leitura`, `ultima_atualizacao_alertas*`) são renovados no máximo a cada
+`intervalo_heartbeat` segundos. Mudanças que chegam menos de `janela` segundos após
+a última escrita do mesmo compressor são agrupadas e gravadas uma única vez, com o
+valor mais recente, ao fim da janela. Se o commit falhar, a parte agrupada volta a
+ficar pendente e é gravada de novo no próximo flush.
+
+Com vários workers, cada escrita confirmada é difundida aos demais, que adotam o
+estado gravado: a deduplicação compara com a última escrita de qualquer worker.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from .cache_compressores import cache_compressores
+from .repositorio import LIMITE_OPERACOES_BATCH, repositorio
+from ..utils.error_handling import documento_nao_encontrado
+from ..utils.invalidacao import barramento_invalidacao
+
+logger = logging.getLogger(__name__)
+
+# Configurações (podem ser ajustadas por variáveis de ambiente)
+DEDUPLICACAO_ATIVA = os.getenv("ESCRITAS_DEDUPLICAR", "true").lower() in ("1", "true", "sim")
+JANELA_COALESCENCIA_SEGUNDOS = float(os.getenv("ESCRITAS_JANELA", "2.0"))
+INTERVALO_HEARTBEAT_SEGUNDOS = float(os.getenv("ESCRITAS_HEARTBEAT", "60"))
+
+# Campos que mudam a cada leitura; sozinhos não justificam uma escrita
+CAMPOS_HEARTBEAT = (
+    "data_ultima_atualizacao", "ultima_leitura", "ultima_atualizacao_alertas", "ultima_atualizacao_alertas_servidor"
+)
+
+
+class EstadoEscrito:
+    """Último estado gravado de um compressor e escrita pendente (agrupada)."""
+    __slots__ = ("campos", "escrito_em", "ref", "pendente", "em_voo")
+
+    def __init__(self):
+        self.campos: Dict[str, Any] = {}
+        self.escrito_em = 0.0
+        self.ref = None
+        self.pendente: Optional[Dict[str, Any]] = None
+        # id(campos propostos) -> (campos, parte agrupada que saiu do pendente com eles)
+        self.em_voo: Dict[int, Tuple[Dict[str, Any], Dict[str, Any]]] = {}
+
+
+class EscritasCompressor:
+    """Decide se um update do documento do compressor deve ser gravado agora, agrupado ou suprimido.
+
+    Uso: `propor()` antes da escrita (retorna os campos a gravar ou None) e, após o
+    commit, `confirmar()` em caso de sucesso ou `falhou()` em caso de falha, com o
+    mesmo dicionário retornado por `propor()`.
+    """
+
+    def __init__(self, janela: float, intervalo_heartbeat: float):
+        self.janela = janela
+        self.intervalo_heartbeat = intervalo_heartbeat
+        self._estados: Dict[int, EstadoEscrito] = {}
+        self._lock = threading.Lock()
+        self._tarefa: Optional[asyncio.Task] = None
+        # Contadores
+        self.gravadas = 0
+        self.suprimidas = 0
+        self.agrupadas = 0
+        self.heartbeats = 0
+
+    def propor(self, id_compressor: int, ref, campos: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Retorna os campos a gravar agora, ou None se a escrita foi suprimida/agrupada."""
+        if not DEDUPLICACAO_ATIVA:
+            return campos
+        agora = time.monotonic()
+        with self._lock:
+            estado = self._estados.get(id_compressor)
+            if estado is None:
+                return campos
+            referencia = {**estado.campos, **(estado.pendente or {})}
+            mudou = any(
+                campo not in CAMPOS_HEARTBEAT and valor != referencia.get(campo)
+                for campo, valor in campos.items()
+            )
+            if not mudou:
+                if estado.pendente is not None:
+                    # Vai junto com a escrita agrupada já agendada
+                    estado.pendente.update(campos)
+                    self.agrupadas += 1
+                    return None
+                if agora - estado.escrito_em < self.intervalo_heartbeat:
+                    self.suprimidas += 1
+                    return None
+                self.heartbeats += 1
+                return campos
+            if agora - estado.escrito_em < self.janela:
+                estado.pendente = {**(estado.pendente or {}), **campos}
+                estado.ref = ref
+                self.agrupadas += 1
+                return None
+            if estado.pendente is None:
+                return campos
+            # Gravar agora, levando junto o que estava pendente
+            herdados = estado.pendente
+            campos = {**herdados, **campos}
+            estado.pendente = None
+            estado.em_voo[id(campos)] = (campos, herdados)
+            return campos
+
+    def confirmar(self, id_compressor: int, ref, campos: Dict[str, Any]):
+        """Registra campos gravados com sucesso no documento do compressor."""
+        self.adotar(id_compressor, ref, campos)
+        with self._lock:
+            self.gravadas += 1
+            estado = self._estados.get(id_compressor)
+            if estado is not None:
+                estado.em_voo.pop(id(campos), None)
+        # Publicado mesmo sem deduplicação: os outros workers atualizam o cache de
+        # compressores (e, com ele, as ETags das listagens)
+        estado = {campo: valor for campo, valor in campos.items() if campo not in CAMPOS_HEARTBEAT}
+        barramento_invalidacao.publicar("escrita", id_compressor, {"ref": ref, "campos": estado})
+
+    def adotar(self, id_compressor: int, ref, campos: Dict[str, Any]):
+        """Registra como último estado gravado (escrita própria ou de outro worker)."""
+        with self._lock:
+            estado = self._estados.get(id_compressor)
+            if estado is None:
+                estado = self._estados[id_compressor] = EstadoEscrito()
+            estado.campos.update(campos)
+            estado.escrito_em = time.monotonic()
+            estado.ref = ref
+
+    def falhou(self, id_compressor: int, campos: Dict[str, Any], erro: Optional[Exception] = None,
+               regravar: bool = False):
+        """Registra a falha do commit de `campos` (o dicionário retornado por `propor()`).
+
+        A parte agrupada que saiu do pendente com esses campos volta a ficar pendente
+        (sob as mudanças mais novas) e é regravada no flush após a janela; com
+        `regravar`, todos os campos voltam (escritas sem outra nova tentativa, como o
+        próprio flush). O último estado gravado deixa de ser conhecido, então a
+        próxima proposta não é suprimida. Se o documento não existe mais, tudo é descartado.
+        """
+        if erro is not None and documento_nao_encontrado(erro):
+            self.esquecer(id_compressor)
+            return
+        with self._lock:
+            estado = self._estados.get(id_compressor)
+            if estado is None:
+                if not regravar:
+                    return
+                estado = self._estados[id_compressor] = EstadoEscrito()
+            _, herdados = estado.em_voo.pop(id(campos), (campos, None))
+            restaurar = campos if regravar else herdados
+            if restaurar:
+                estado.pendente = {**restaurar, **(estado.pendente or {})}
+                estado.escrito_em = time.monotonic()
+            estado.campos.clear()
+            if estado.pendente is None and not estado.em_voo:
+                del self._estados[id_compressor]
+
+    def esquecer(self, id_compressor: int):
+        """Descarta o estado conhecido e as escritas pendentes (compressor excluído)."""
+        with self._lock:
+            self._estados.pop(id_compressor, None)
+
+    def descartar_escrito(self, id_compressor: int):
+        """Descarta o último estado gravado, mantendo a escrita agrupada pendente (se houver)."""
+        with self._lock:
+            estado = self._estados.get(id_compressor)
+            if estado is None:
+                return
+            if estado.pendente is None and not estado.em_voo:
+                del self._estados[id_compressor]
+            else:
+                estado.campos.clear()
+
+    def _vencidas(self, todas: bool = False) -> List[Tuple[int, Any, Dict[str, Any]]]:
+        agora = time.monotonic()
+        vencidas = []
+        with self._lock:
+            for id_compressor, estado in self._estados.items():
+                if estado.pendente is not None and (todas or agora - estado.escrito_em >= self.janela):
+                    vencidas.append((id_compressor, estado.ref, estado.pendente))
+                    estado.pendente = None
+        return vencidas
+
+    def flush(self, todas: bool = False):
+        """Grava as escritas agrupadas cuja janela terminou (bloqueante)."""
+        vencidas = self._vencidas(todas)
+        for inicio in range(0, len(vencidas), LIMITE_OPERACOES_BATCH):
+            lote = vencidas[inicio:inicio + LIMITE_OPERACOES_BATCH]
+            try:
+                repositorio.atualizar_compressores([(ref, campos) for _, ref, campos in lote])
+            except Exception as e:
+                logger.error(f"Erro ao gravar {len(lote)} atualizações agrupadas de compressores: {str(e)}")
+                for id_compressor, _, campos in lote:
+                    # Voltam a ficar pendentes para o próximo flush (salvo compressor inexistente)
+                    self.falhou(id_compressor, campos, e, regravar=True)
+                    # O ID do documento em cache pode estar obsoleto (compressor excluído ou migrado)
+                    cache_compressores.invalidar(id_compressor)
+                continue
+            for id_compressor, ref, campos in lote:
+                self.confirmar(id_compressor, ref, campos)
+                cache_compressores.atualizar_campos(id_compressor, campos)
+
+    async def iniciar(self):
+        if self._tarefa is None or self._tarefa.done():
+            self._tarefa = asyncio.create_task(self._executar())
+
+    async def parar(self):
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            try:
+                await self._tarefa
+            except asyncio.CancelledError:
+                pass
+            self._tarefa = None
+        await run_in_threadpool(self.flush, True)
+
+    async def _executar(self):
+        intervalo = max(0.1, self.janela / 2)
+        while True:
+            await asyncio.sleep(intervalo)
+            try:
+                await run_in_threadpool(self.flush)
+            except Exception as e:
+                logger.error(f"Erro inesperado no flush das escritas agrupadas: {str(e)}")
+
+    def estatisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            pendentes = sum(1 for estado in self._estados.values() if estado.pendente is not None)
+            return {
+                "ativa": DEDUPLICACAO_ATIVA,
+                "compressores": len(self._estados),
+                "pendentes": pendentes,
+                "gravadas": self.gravadas,
+                "suprimidas": self.suprimidas,
+                "agrupadas": self.agrupadas,
+                "heartbeats": self.heartbeats
+            }
+
+
+escritas_compressor = EscritasCompressor(
+    janela=JANELA_COALESCENCIA_SEGUNDOS,
+    intervalo_heartbeat=INTERVALO_HEARTBEAT_SEGUNDOS
+)
+
+
+def _adotar_escrita_remota(id_compressor: int, dados: Dict[str, Any]):
+    escritas_compressor.adotar(id_compressor, dados["ref"], dados["campos"])
+    cache_compressores.atualizar_campos(id_compressor, dados["campos"])
+
+
+barramento_invalidacao.assinar("escrita", _adotar_escrita_remota)
+# Compressor alterado pelo CRUD em outro worker: o estado gravado pode ter mudado
+barramento_invalidacao.assinar("compressor", lambda id_compressor, _: escritas_compressor.descartar_escrito(id_compressor))
+barramento_invalidacao.assinar("compressor_excluido", lambda id_compressor, _: escritas_compressor.esquecer(id_compressor))
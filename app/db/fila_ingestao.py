@@ -0,0 +1,233 @@
+"""Fila de ingestão write-behind: leituras aceitas em memória e gravadas em lote no Firestore."""
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from .cache_compressores import buscar_compressor_async, cache_compressores
+from .ingestao import campos_cache_status, gravar_leituras
+from ..utils.error_handling import erro_transitorio
+
+logger = logging.getLogger(__name__)
+
+# Configurações da fila (podem ser ajustadas por variáveis de ambiente)
+WRITE_BEHIND_ATIVO = os.getenv("INGESTAO_WRITE_BEHIND", "false").lower() in ("1", "true", "sim")
+TAMANHO_MAXIMO_FILA = int(os.getenv("INGESTAO_FILA_MAX", "10000"))
+TAMANHO_LOTE = int(os.getenv("INGESTAO_FILA_LOTE", "400"))
+INTERVALO_FLUSH_SEGUNDOS = float(os.getenv("INGESTAO_FILA_INTERVALO", "0.25"))
+MAXIMO_TENTATIVAS = int(os.getenv("INGESTAO_FILA_TENTATIVAS", "3"))
+TIMEOUT_DRENAGEM_SEGUNDOS = float(os.getenv("INGESTAO_FILA_TIMEOUT_DRENAGEM", "20"))
+BACKOFF_MAXIMO_SEGUNDOS = float(os.getenv("INGESTAO_FILA_BACKOFF_MAX", "30"))
+
+
+class FilaIngestao:
+    """Fila limitada de leituras com um flusher assíncrono em segundo plano.
+
+    As leituras são acumuladas por até `intervalo` segundos (ou até `tamanho_lote`
+    itens) e gravadas com `gravar_leituras`, em commits de até 500 operações.
+    Itens de um commit que falhou são retentados com backoff exponencial; só erros
+    permanentes contam para as `maximo_tentativas`. Com o Firestore indisponível
+    (erro transitório), as leituras já aceitas são mantidas até ele voltar.
+    """
+
+    def __init__(self, tamanho_maximo: int, tamanho_lote: int, intervalo: float, maximo_tentativas: int,
+                 backoff_maximo: float = 30.0):
+        self.tamanho_maximo = tamanho_maximo
+        self.tamanho_lote = tamanho_lote
+        self.intervalo = intervalo
+        self.maximo_tentativas = maximo_tentativas
+        self.backoff_maximo = backoff_maximo
+        self._fila: Optional[asyncio.Queue] = None
+        self._retentativas: List[Dict[str, Any]] = []
+        self._tarefa: Optional[asyncio.Task] = None
+        self._gravando = False
+        # Contadores
+        self.enfileiradas = 0
+        self.rejeitadas = 0
+        self.gravadas = 0
+        self.falhas = 0
+        self.descartadas = 0
+        self.lotes = 0
+        self.profundidade_maxima = 0
+        self.flush_ms_total = 0.0
+        self.flush_ms_max = 0.0
+        self.flush_ms_ultimo = 0.0
+
+    @property
+    def ativa(self) -> bool:
+        return self._tarefa is not None and not self._tarefa.done()
+
+    @property
+    def profundidade(self) -> int:
+        return (self._fila.qsize() if self._fila is not None else 0) + len(self._retentativas)
+
+    def enfileirar(self, item: Dict[str, Any]) -> bool:
+        """Adiciona uma leitura à fila; retorna False se a fila (com as retentativas) estiver cheia."""
+        try:
+            if self.profundidade >= self.tamanho_maximo:
+                raise asyncio.QueueFull
+            self._fila.put_nowait({**item, "tentativas": 0})
+        except asyncio.QueueFull:
+            self.rejeitadas += 1
+            return False
+        self.enfileiradas += 1
+        self.profundidade_maxima = max(self.profundidade_maxima, self._fila.qsize())
+        return True
+
+    async def iniciar(self):
+        """Cria a fila e inicia o flusher (chamado no startup da aplicação)."""
+        if self.ativa:
+            return
+        self._fila = asyncio.Queue(maxsize=self.tamanho_maximo)
+        self._tarefa = asyncio.create_task(self._executar())
+        logger.info(f"Fila de ingestão write-behind iniciada (capacidade={self.tamanho_maximo}, lote={self.tamanho_lote})")
+
+    async def parar(self, timeout: float = TIMEOUT_DRENAGEM_SEGUNDOS):
+        """Drena a fila (até `timeout` segundos) e encerra o flusher."""
+        if self._tarefa is None:
+            return
+        prazo = time.monotonic() + timeout
+        while (self.profundidade or self._gravando) and time.monotonic() < prazo:
+            await asyncio.sleep(0.05)
+        self._tarefa.cancel()
+        try:
+            await self._tarefa
+        except asyncio.CancelledError:
+            pass
+        self._tarefa = None
+        if self.profundidade:
+            logger.error(f"Fila de ingestão encerrada com {self.profundidade} leituras não gravadas")
+        else:
+            logger.info("Fila de ingestão drenada e encerrada")
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Retorna profundidade da fila e contadores de gravação."""
+        return {
+            "ativa": self.ativa,
+            "profundidade": self.profundidade,
+            "capacidade": self.tamanho_maximo,
+            "profundidade_maxima": self.profundidade_maxima,
+            "enfileiradas": self.enfileiradas,
+            "rejeitadas": self.rejeitadas,
+            "gravadas": self.gravadas,
+            "falhas": self.falhas,
+            "descartadas": self.descartadas,
+            "lotes": self.lotes,
+            "flush_ms_ultimo": round(self.flush_ms_ultimo, 2),
+            "flush_ms_medio": round(self.flush_ms_total / self.lotes, 2) if self.lotes else 0.0,
+            "flush_ms_max": round(self.flush_ms_max, 2)
+        }
+
+    async def _executar(self):
+        backoff = min(5.0, self.intervalo * 4)
+        while True:
+            retentados = bool(self._retentativas)
+            if retentados:
+                itens, self._retentativas = self._retentativas[:self.tamanho_lote], self._retentativas[self.tamanho_lote:]
+            else:
+                itens = [await self._fila.get()]
+                # Aguardar o lote encher ou o intervalo de flush expirar
+                if self._fila.qsize() < self.tamanho_lote - 1:
+                    await asyncio.sleep(self.intervalo)
+            while len(itens) < self.tamanho_lote and not self._fila.empty():
+                itens.append(self._fila.get_nowait())
+
+            self._gravando = True
+            try:
+                if retentados:
+                    itens = await self._resolver_novamente(itens)
+                falhou = await self._gravar(itens)
+            except Exception as e:
+                logger.error(f"Erro inesperado no flusher da fila de ingestão: {str(e)}")
+                self._reagendar(itens, e)
+                falhou = True
+            finally:
+                self._gravando = False
+            if falhou:
+                # Evitar laço apertado enquanto o Firestore estiver indisponível
+                logger.warning(f"Nova tentativa das leituras da fila de ingestão em {backoff:.1f}s")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.backoff_maximo)
+            else:
+                backoff = min(5.0, self.intervalo * 4)
+
+    async def _resolver_novamente(self, itens: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Atualiza o ID do documento do compressor dos itens retentados (o anterior pode estar obsoleto).
+
+        Se a consulta falhar por indisponibilidade, o item segue com o ID que já tinha.
+        """
+        validos = []
+        for item in itens:
+            try:
+                entrada = await buscar_compressor_async(item["leitura"]["id_compressor"])
+            except Exception as e:
+                if not erro_transitorio(e):
+                    raise
+                validos.append(item)
+                continue
+            if not entrada.existe:
+                self.descartadas += 1
+                logger.warning(
+                    "Leitura %s descartada da fila: compressor %s não existe",
+                    item.get("doc_id"), item["leitura"]["id_compressor"]
+                )
+                continue
+            item["ref"] = entrada.ref
+            validos.append(item)
+        return validos
+
+    async def _gravar(self, itens: List[Dict[str, Any]]) -> bool:
+        """Grava os itens; retorna True se algum falhou (e foi reagendado)."""
+        inicio = time.perf_counter()
+        resultados = await run_in_threadpool(gravar_leituras, itens)
+        duracao_ms = (time.perf_counter() - inicio) * 1000
+        self.lotes += 1
+        self.flush_ms_ultimo = duracao_ms
+        self.flush_ms_total += duracao_ms
+        self.flush_ms_max = max(self.flush_ms_max, duracao_ms)
+
+        falhas = []
+        for item, resultado in zip(itens, resultados):
+            if isinstance(resultado, Exception):
+                falhas.append(resultado)
+                self._reagendar([item], resultado)
+                continue
+            self.gravadas += 1
+            if item.get("atualizar_status", True):
+                leitura = item["leitura"]
+                cache_compressores.atualizar_campos(
+                    leitura["id_compressor"], campos_cache_status(leitura, item.get("alertas"))
+                )
+        if falhas:
+            self.falhas += len(falhas)
+            logger.warning("%d leituras falharam no flush da fila de ingestão: %s", len(falhas), falhas[0])
+        return bool(falhas)
+
+    def _reagendar(self, itens: List[Dict[str, Any]], erro: Exception):
+        """Devolve os itens para nova tentativa; só erros permanentes contam como tentativa."""
+        transitorio = erro_transitorio(erro)
+        for item in itens:
+            if not transitorio:
+                # O ID do documento em cache pode estar obsoleto: resolvido de novo na retentativa
+                cache_compressores.invalidar(item["leitura"]["id_compressor"])
+                item["tentativas"] += 1
+            if item["tentativas"] >= self.maximo_tentativas:
+                self.descartadas += 1
+                logger.error(
+                    f"Leitura {item.get('doc_id')} do compressor {item['leitura']['id_compressor']} "
+                    f"descartada após {item['tentativas']} tentativas"
+                )
+            else:
+                self._retentativas.append(item)
+
+
+fila_ingestao = FilaIngestao(
+    tamanho_maximo=TAMANHO_MAXIMO_FILA,
+    tamanho_lote=TAMANHO_LOTE,
+    intervalo=INTERVALO_FLUSH_SEGUNDOS,
+    maximo_tentativas=MAXIMO_TENTATIVAS,
+    backoff_maximo=BACKOFF_MAXIMO_SEGUNDOS
+)
@@ -1,16 +1,78 @@
-"""Inicialização e configuração do Firebase Firestore."""
+"""Inicialização e configuração do Firebase Firestore.
+
+Nada é criado no import: `firebase_admin`, `google.cloud.firestore` e o `.env` só são
+carregados quando um cliente é pedido pela primeira vez (ou pelo aquecimento iniciado no
+lifespan), para que um cold start responda a `/health` sem pagar por eles. Como a
+criação acontece no primeiro uso, cada worker (gunicorn/`uvicorn --workers`) cria os
+próprios clientes e canais gRPC depois do fork.
+"""
+import asyncio
+import logging
 import os
 import json
-import firebase_admin
-from firebase_admin import credentials, firestore
-from dotenv import load_dotenv
+import threading
+import time
+from typing import Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Inicializar os clientes em segundo plano logo no startup (sem bloquear o /health)
+AQUECER_NO_STARTUP = os.getenv("FIREBASE_AQUECER", "true").lower() == "true"
+
+# Canais gRPC dos handlers: um AsyncClient por canal, usados em rodízio. Cada canal
+# HTTP/2 tem um limite de streams simultâneos (~100); com mais canais, mais RPCs em paralelo
+TAMANHO_POOL_CANAIS = max(1, int(os.getenv("FIRESTORE_CANAIS", "1")))
+KEEPALIVE_MS = int(os.getenv("FIRESTORE_KEEPALIVE_MS", "30000"))
+KEEPALIVE_TIMEOUT_MS = int(os.getenv("FIRESTORE_KEEPALIVE_TIMEOUT_MS", "10000"))
+# Pings também com o canal ocioso (o Firestore pode recusar pings frequentes demais)
+KEEPALIVE_SEM_CHAMADAS = os.getenv("FIRESTORE_KEEPALIVE_SEM_CHAMADAS", "false").lower() == "true"
+
+
+def opcoes_canal() -> List[tuple]:
+    """Opções dos canais gRPC (as padrão da biblioteca + keepalive configurável)."""
+    opcoes = [
+        ("grpc.keepalive_time_ms", KEEPALIVE_MS),
+        ("grpc.keepalive_timeout_ms", KEEPALIVE_TIMEOUT_MS),
+        ("grpc.keepalive_permit_without_calls", int(KEEPALIVE_SEM_CHAMADAS)),
+        ("grpc.max_send_message_length", -1),
+        ("grpc.max_receive_message_length", -1),
+    ]
+    if TAMANHO_POOL_CANAIS > 1:
+        # Sem isso canais com as mesmas opções compartilham a conexão (subchannel pool global)
+        opcoes.append(("grpc.use_local_subchannel_pool", 1))
+    return opcoes
+
 
-# Carrega variáveis de ambiente do arquivo .env
-load_dotenv()
+def classe_com_canal(classe):
+    """Subclasse de `Client`/`AsyncClient` que cria o próprio canal gRPC com `opcoes_canal()`.
+
+    A biblioteca não aceita opções de canal em `client_options`: o canal e o transporte são
+    montados aqui, no primeiro RPC, como a biblioteca faria, e o transporte fica em
+    `transporte` para ser fechado no shutdown (`close()` do cliente não fecha o canal gRPC).
+    Com o emulador, o canal inseguro da biblioteca é mantido.
+    """
+
+    class ClienteComCanal(classe):
+        transporte = None
+
+        def _firestore_api_helper(self, transport, client_class, client_module):
+            if self._firestore_api_internal is None and self._emulator_host is None:
+                canal = transport.create_channel(self._target, credentials=self._credentials, options=opcoes_canal())
+                self._transport = transport(host=self._target, channel=canal)
+                self._firestore_api_internal = client_class(transport=self._transport, client_options=self._client_options)
+                client_module._client_info = self._client_info
+            api = super()._firestore_api_helper(transport, client_class, client_module)
+            self.transporte = api.transport
+            return api
+
+    ClienteComCanal.__name__ = ClienteComCanal.__qualname__ = f"{classe.__name__}ComCanal"
+    return ClienteComCanal
 
 
 def load_credentials():
     """Carrega credenciais do Firebase de diferentes fontes."""
+    from firebase_admin import credentials
+
     # 1) Arquivo serviceAccountKey.json no diretório raiz
     key_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 
                            'serviceAccountKey.json')
@@ -60,9 +122,131 @@ def load_credentials():
     )
 
 
-# Inicializar Firebase
-cred = load_credentials()
-if not firebase_admin._apps:  # Evita inicializar múltiplas vezes
-    firebase_admin.initialize_app(cred)
+def emulador_configurado() -> bool:
+    """Indica se o Firestore Emulator está configurado (FIRESTORE_EMULATOR_HOST)."""
+    return bool(os.environ.get('FIRESTORE_EMULATOR_HOST'))
+
+
+class ClientesFirebase:
+    """Clientes síncrono (`db`) e assíncronos (`adb`) do Firestore, criados sob demanda.
+
+    `db` atende as tarefas em segundo plano (flushers em lote, spool, rollups) e os
+    `FIRESTORE_CANAIS` clientes assíncronos, em rodízio, os handlers. A criação é feita
+    uma única vez por processo, protegida por lock; pelo event loop use `obter_adb()`,
+    que executa a parte bloqueante no threadpool.
+    """
+
+    def __init__(self, tamanho_pool: int):
+        self.tamanho_pool = tamanho_pool
+        self._lock = threading.Lock()
+        self._db: Any = None
+        self._adbs: List[Any] = []
+        self._proximo = 0
+        self._aquecimento: Optional[asyncio.Task] = None
+        self.duracao_inicializacao: Optional[float] = None
+
+    @property
+    def inicializado(self) -> bool:
+        return self._db is not None
+
+    def _inicializar(self):
+        """Importa as bibliotecas, carrega as credenciais e cria os clientes (bloqueante)."""
+        with self._lock:
+            if self._db is not None:
+                return
+            inicio = time.perf_counter()
+            from dotenv import load_dotenv
+            from google.cloud import firestore as cloud_firestore
+            # Carrega variáveis de ambiente do arquivo .env
+            load_dotenv()
+            Cliente, ClienteAsync = cloud_firestore.Client, cloud_firestore.AsyncClient
+            if hasattr(Cliente, "_firestore_api_helper"):
+                Cliente, ClienteAsync = classe_com_canal(Cliente), classe_com_canal(ClienteAsync)
+            else:
+                logger.warning("Opções dos canais gRPC não aplicadas: versão do google-cloud-firestore não suportada")
+            if emulador_configurado():
+                # O emulador não exige credenciais: os clientes usam credenciais anônimas
+                projeto = os.environ.get('FIREBASE_PROJECT_ID') or os.environ.get('GOOGLE_CLOUD_PROJECT') or 'demo-ordem-da-fenix'
+                credenciais = None
+            else:
+                import firebase_admin
+                cred = load_credentials()
+                if not firebase_admin._apps:  # Evita inicializar múltiplas vezes
+                    firebase_admin.initialize_app(cred)
+                app = firebase_admin.get_app()
+                projeto, credenciais = app.project_id, app.credential.get_credential()
+            db = Cliente(project=projeto, credentials=credenciais)
+            # Clientes independentes: cada um abre o próprio canal (no event loop, no primeiro uso)
+            self._adbs = [ClienteAsync(project=projeto, credentials=credenciais) for _ in range(self.tamanho_pool)]
+            # `db` por último: é ele que marca a inicialização como concluída
+            self._db = db
+            self.duracao_inicializacao = time.perf_counter() - inicio
+            logger.info(
+                f"Clientes do Firestore criados em {self.duracao_inicializacao * 1000:.0f} ms "
+                f"(pid={os.getpid()}, canais={self.tamanho_pool})"
+            )
+
+    @property
+    def db(self):
+        """Cliente síncrono (inicializa na primeira chamada; bloqueante)."""
+        if self._db is None:
+            self._inicializar()
+        return self._db
+
+    async def obter_adb(self):
+        """Cliente assíncrono (em rodízio no pool), sem bloquear o event loop durante a inicialização."""
+        if self._db is None:
+            from fastapi.concurrency import run_in_threadpool
+            await run_in_threadpool(self._inicializar)
+        self._proximo = (self._proximo + 1) % len(self._adbs)
+        return self._adbs[self._proximo]
+
+    async def _aquecer(self):
+        try:
+            await self.obter_adb()
+            # Primeira RPC em cada canal: abre as conexões e obtém o token antes da primeira requisição
+            for adb in self._adbs:
+                async for _ in adb.collection("compressores").limit(1).stream():
+                    pass
+            logger.info("Firestore aquecido")
+        except Exception as e:
+            logger.error(f"Erro ao aquecer o Firestore: {str(e)}")
+
+    def iniciar_aquecimento(self):
+        """Dispara a inicialização e a primeira RPC em segundo plano (chamado no lifespan)."""
+        if self._aquecimento is None or self._aquecimento.done():
+            self._aquecimento = asyncio.create_task(self._aquecer())
+
+    def _desmontar(self):
+        """Cancela o aquecimento pendente e remove os clientes; retorna-os para fechar os canais."""
+        if self._aquecimento is not None and not self._aquecimento.done():
+            self._aquecimento.cancel()
+        self._aquecimento = None
+        with self._lock:
+            db, adbs = self._db, self._adbs
+            self._db, self._adbs = None, []
+        if db is not None:
+            db.close()
+            if getattr(db, "transporte", None) is not None:
+                db.transporte.close()
+        return [adb.transporte for adb in adbs if getattr(adb, "transporte", None) is not None]
+
+    def fechar(self):
+        """Fecha os clientes fora do event loop (os canais assíncronos são apenas descartados)."""
+        self._desmontar()
+
+    async def fechar_async(self):
+        """Fecha os clientes e os canais gRPC, inclusive os assíncronos (shutdown, no lifespan)."""
+        for transporte in self._desmontar():
+            await transporte.close()
+
+    def _apos_fork(self):
+        # Canais gRPC não sobrevivem a um fork: o processo filho cria os seus no primeiro uso
+        self._lock = threading.Lock()
+        self._db, self._adbs = None, []
+        self._aquecimento = None
+
 
-db = firestore.client()
+clientes = ClientesFirebase(tamanho_pool=TAMANHO_POOL_CANAIS)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=clientes._apos_fork)
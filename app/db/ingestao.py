@@ -0,0 +1,152 @@
+"""Escrita das leituras de sensores no repositório."""
+from typing import Any, Dict, List, Optional, Union
+
+from .escritas_compressor import escritas_compressor
+from .repositorio import GravacaoLeitura, LIMITE_OPERACOES_BATCH, gerar_id_documento, repositorio
+from ..utils.datetime_utils import now_br, to_utc_timezone
+
+
+def novo_id_leitura() -> str:
+    """Gera localmente (sem round trip) um ID de documento para `sensor_data`."""
+    return gerar_id_documento()
+
+
+# Campos da leitura desnormalizados em `ultima_leitura` no documento do compressor
+CAMPOS_ULTIMA_LEITURA = (
+    "ligado", "pressao", "temp_equipamento", "temp_ambiente", "potencia_kw",
+    "umidade", "vibracao", "corrente", "data_medicao"
+)
+
+
+def resumo_leitura(leitura: Dict[str, Any]) -> Dict[str, Any]:
+    """Resumo da leitura guardado como snapshot da última leitura do compressor."""
+    return {campo: leitura.get(campo) for campo in CAMPOS_ULTIMA_LEITURA}
+
+
+def campos_status(leitura: Dict[str, Any], alertas: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Campos do documento do compressor atualizados a partir de uma leitura.
+
+    Além do status, desnormaliza a última leitura (`ultima_leitura`) no documento,
+    permitindo montar o estado atual de todos os compressores com uma única consulta.
+    `alertas` (avaliação do servidor, gravada em `alertas_servidor`) só é informado
+    quando o nível avaliado mudou, e então vai no mesmo update.
+    """
+    campos = {
+        "esta_ligado": leitura["ligado"],
+        "data_ultima_atualizacao": leitura["data_medicao"],
+        "ultima_leitura": resumo_leitura(leitura)
+    }
+    if alertas is not None:
+        campos["alertas_servidor"] = alertas
+        campos["ultima_atualizacao_alertas_servidor"] = now_br()
+    return campos
+
+
+def campos_cache_status(leitura: Dict[str, Any], alertas: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Campos quentes do cache de compressores atualizados após gravar uma leitura."""
+    campos = {
+        "esta_ligado": leitura["ligado"],
+        "data_ultima_atualizacao": leitura["data_medicao"]
+    }
+    if alertas is not None:
+        campos["alertas_servidor"] = alertas
+    return campos
+
+
+def _instante(item: Dict[str, Any]):
+    # Datas sem timezone são tratadas como horário de Brasília
+    return to_utc_timezone(item["leitura"]["data_medicao"])
+
+
+async def gravar_leitura(ref_compressor, leitura: Dict[str, Any], alertas: Optional[Dict[str, str]] = None) -> str:
+    """Grava a leitura e o status do compressor em um único commit.
+
+    A inserção em `sensor_data` e a atualização de `esta_ligado`/`data_ultima_atualizacao`
+    no documento do compressor são atômicas: ou ambas são aplicadas, ou nenhuma.
+    O update do compressor é omitido quando nada mudou (ver `escritas_compressor`).
+    `ref_compressor` é o ID do documento do compressor; retorna o ID da leitura criada.
+    """
+    id_compressor = leitura["id_compressor"]
+    doc_id = novo_id_leitura()
+    campos = escritas_compressor.propor(id_compressor, ref_compressor, campos_status(leitura, alertas))
+    if campos is None:
+        await repositorio.gravar_leituras_async([(doc_id, leitura, None, None)])
+        return doc_id
+    try:
+        await repositorio.gravar_leituras_async([(doc_id, leitura, ref_compressor, campos)])
+    except Exception as e:
+        # A leitura não foi gravada; só a parte agrupada de leituras anteriores volta a ficar pendente
+        escritas_compressor.falhou(id_compressor, campos, e)
+        raise
+    escritas_compressor.confirmar(id_compressor, ref_compressor, campos)
+    return doc_id
+
+
+def gravar_leituras(itens: List[Dict[str, Any]]) -> List[Union[str, Exception]]:
+    """Grava várias leituras (de um ou mais compressores) em commits de até 500 operações.
+
+    Cada item contém `ref` (ID do documento do compressor), `leitura` e,
+    opcionalmente, `doc_id` (ID pré-gerado do documento em `sensor_data`),
+    `alertas` (novos alertas do compressor, quando mudaram) e
+    `atualizar_status=False` para nunca atualizar o status a partir dele.
+    O status de cada compressor é atualizado apenas a partir da sua leitura mais
+    recente, no mesmo commit dessa leitura, e só quando mudou (ou o heartbeat
+    venceu — ver `escritas_compressor`). Função bloqueante; retorna, na ordem
+    dos itens, o ID do documento criado ou a exceção do commit que falhou.
+    """
+    # Índice da leitura mais recente de cada compressor
+    mais_recente: Dict[str, int] = {}
+    for indice, item in enumerate(itens):
+        if not item.get("atualizar_status", True):
+            continue
+        chave = item["ref"]
+        atual = mais_recente.get(chave)
+        if atual is None or _instante(item) >= _instante(itens[atual]):
+            mais_recente[chave] = indice
+    status: Dict[int, Dict[str, Any]] = {}
+    for indice in mais_recente.values():
+        item = itens[indice]
+        campos = escritas_compressor.propor(
+            item["leitura"]["id_compressor"], item["ref"], campos_status(item["leitura"], item.get("alertas"))
+        )
+        if campos is not None:
+            status[indice] = campos
+
+    # Agrupar em lotes respeitando o limite de operações por commit
+    lotes: List[List[int]] = []
+    lote_atual: List[int] = []
+    operacoes = 0
+    for indice in range(len(itens)):
+        custo = 2 if indice in status else 1
+        if operacoes + custo > LIMITE_OPERACOES_BATCH:
+            lotes.append(lote_atual)
+            lote_atual, operacoes = [], 0
+        lote_atual.append(indice)
+        operacoes += custo
+    if lote_atual:
+        lotes.append(lote_atual)
+
+    resultados: List[Union[str, Exception]] = [None] * len(itens)
+    for lote in lotes:
+        gravacoes: List[GravacaoLeitura] = []
+        ids = {}
+        for indice in lote:
+            item = itens[indice]
+            ids[indice] = item.get("doc_id") or novo_id_leitura()
+            if indice in status:
+                gravacoes.append((ids[indice], item["leitura"], item["ref"], status[indice]))
+            else:
+                gravacoes.append((ids[indice], item["leitura"], None, None))
+        try:
+            repositorio.gravar_leituras(gravacoes)
+        except Exception as e:
+            for indice in lote:
+                resultados[indice] = e
+                if indice in status:
+                    escritas_compressor.falhou(itens[indice]["leitura"]["id_compressor"], status[indice], e)
+            continue
+        for indice, doc_id in ids.items():
+            resultados[indice] = doc_id
+            if indice in status:
+                escritas_compressor.confirmar(itens[indice]["leitura"]["id_compressor"], itens[indice]["ref"], status[indice])
+    return resultados
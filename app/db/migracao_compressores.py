@@ -0,0 +1,95 @@
+"""Migração online dos compressores para o ID de documento determinístico (`str(id_compressor)`).
+
+Cada documento de `compressores` com ID automático é movido, em uma transação, para
+`compressores/{id_compressor}`: a transação lê o documento original, cria o novo com
+os mesmos dados e exclui o original. Se a API atualizar o original durante a
+migração, a transação é repetida com os dados mais recentes.
+
+A API pode continuar no ar: enquanto COMPRESSORES_CONSULTA_LEGADA estiver ativa, os
+compressores ainda não migrados são encontrados pela consulta por `id_compressor`; uma
+escrita com um ID antigo em cache falha com NotFound, o cache é invalidado e a
+gravação é repetida com o novo ID (spool, fila write-behind) ou na próxima leitura.
+Depois da migração, defina COMPRESSORES_CONSULTA_LEGADA=false para que um compressor
+inexistente custe apenas uma leitura.
+
+    python -m app.db.migracao_compressores              # só lista o que seria migrado
+    python -m app.db.migracao_compressores --executar
+
+Dois documentos com o mesmo `id_compressor` (duplicatas criadas antes da criação
+transacional) são reportados como conflito e mantidos: resolva-os manualmente.
+"""
+import logging
+import sys
+from typing import Dict
+
+from .firebase import clientes
+from .repositorio import id_documento_compressor
+from .repositorio_firestore import COLECAO_COMPRESSORES
+
+logger = logging.getLogger(__name__)
+
+
+class ConflitoMigracao(Exception):
+    """Já existe um documento com o ID determinístico de outro compressor."""
+
+
+def mover_documento(db, origem, destino) -> bool:
+    """Move o documento em uma transação; False se a origem já não existe."""
+    from google.cloud import firestore
+
+    @firestore.transactional
+    def mover(transacao) -> bool:
+        snapshot = origem.get(transaction=transacao)
+        if not snapshot.exists:
+            return False
+        if destino.get(transaction=transacao).exists:
+            raise ConflitoMigracao(f"{destino.id} já existe (origem {origem.id})")
+        transacao.create(destino, snapshot.to_dict())
+        transacao.delete(origem)
+        return True
+
+    return mover(db.transaction())
+
+
+def migrar(executar: bool = False) -> Dict[str, int]:
+    """Percorre a coleção e move os documentos com ID automático; retorna os contadores."""
+    db = clientes.db
+    colecao = db.collection(COLECAO_COMPRESSORES)
+    contadores = {"migrados": 0, "ja_migrados": 0, "pendentes": 0, "conflitos": 0, "invalidos": 0}
+    for doc in colecao.stream():
+        id_compressor = (doc.to_dict() or {}).get("id_compressor")
+        if id_compressor is None:
+            contadores["invalidos"] += 1
+            logger.warning(f"Documento {doc.id} sem id_compressor ignorado")
+            continue
+        destino = id_documento_compressor(id_compressor)
+        if doc.id == destino:
+            contadores["ja_migrados"] += 1
+            continue
+        if not executar:
+            contadores["pendentes"] += 1
+            logger.info(f"{doc.id} -> {destino}")
+            continue
+        try:
+            if mover_documento(db, doc.reference, colecao.document(destino)):
+                contadores["migrados"] += 1
+                logger.info(f"Compressor {id_compressor} migrado ({doc.id} -> {destino})")
+        except ConflitoMigracao as e:
+            contadores["conflitos"] += 1
+            logger.error(f"Conflito ao migrar o compressor {id_compressor}: {str(e)}")
+    return contadores
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s - %(message)s")
+    executar = "--executar" in sys.argv[1:]
+    contadores = migrar(executar)
+    print(("Migração concluída: " if executar else "Simulação (use --executar para migrar): ") + ", ".join(
+        f"{nome}={valor}" for nome, valor in contadores.items()
+    ))
+    if contadores["conflitos"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""Camada de repositório: compressores, leituras e alertas independentes do banco de dados.
+
+O backend é escolhido pela variável de ambiente `ARMAZENAMENTO`:
+
+- `firestore` (padrão): Firebase/Firestore (`repositorio_firestore`);
+- `memoria`: estruturas em memória, sem persistência (testes de carga e profiling local);
+- `sqlite`: arquivo SQLite em modo WAL (`ARMAZENAMENTO_SQLITE`), para implantações de
+  borda sem Firestore.
+
+Os métodos síncronos são usados pelas tarefas em segundo plano (executadas em threads);
+os `*_async`, pelos handlers. Por padrão os assíncronos delegam aos síncronos — no
+threadpool quando o backend é bloqueante; o Firestore implementa os dois com os
+clientes `db` e `adb`.
+"""
+import os
+import secrets
+import string
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from ..utils.metricas import METRICAS_ATIVAS, executar_no_threadpool, medir_chamada
+
+BACKEND_ARMAZENAMENTO = os.getenv("ARMAZENAMENTO", "firestore").lower()
+CAMINHO_SQLITE = os.getenv("ARMAZENAMENTO_SQLITE", "ordem_da_fenix.db")
+
+# Limite de operações por commit imposto pelo Firestore (os demais backends seguem o mesmo)
+LIMITE_OPERACOES_BATCH = 500
+
+Documento = Dict[str, Any]
+# Posição de paginação: (valor do campo de ordenação, ID do documento)
+Cursor = Tuple[datetime, str]
+# (ID da leitura, leitura, ID do documento do compressor ou None, campos do compressor ou None)
+GravacaoLeitura = Tuple[str, Documento, Optional[str], Optional[Documento]]
+# (ID do documento, campos de identificação do bucket, estatísticas no formato de `como_ponto`)
+GravacaoRollup = Tuple[str, Documento, Documento]
+# ("evento" | "ativar" | "desativar", ID do documento, documento ou None)
+OperacaoAlerta = Tuple[str, str, Optional[Documento]]
+
+# Coleção do Firestore (tabela equivalente nos demais backends) de cada operação, usada
+# como rótulo nas métricas das chamadas
+COLECOES_POR_OPERACAO = {
+    "carregar_compressor": "compressores",
+    "listar_compressores": "compressores",
+    "estado_compressores": "compressores",
+    "criar_compressor": "compressores",
+    "atualizar_compressor": "compressores",
+    "atualizar_compressores": "compressores",
+    "excluir_compressor": "compressores",
+    "carregar_configuracao": "configuracoes_compressor",
+    "criar_configuracao": "configuracoes_compressor",
+    "atualizar_configuracao": "configuracoes_compressor",
+    "excluir_configuracao": "configuracoes_compressor",
+    "gravar_leituras": "sensor_data",
+    "listar_leituras": "sensor_data",
+    "gravar_rollups": "sensor_rollups",
+    "buscar_rollups": "sensor_rollups",
+    "carregar_alertas_ativos": "alertas_ativos",
+    "gravar_alertas": "alertas_eventos",
+    "listar_eventos_alerta": "alertas_eventos",
+}
+
+_ALFABETO_ID = string.ascii_letters + string.digits
+
+
+def gerar_id_documento() -> str:
+    """ID aleatório de 20 caracteres, no mesmo formato dos IDs automáticos do Firestore."""
+    return "".join(secrets.choice(_ALFABETO_ID) for _ in range(20))
+
+
+def id_documento_compressor(id_compressor: int) -> str:
+    """ID do documento do compressor: o próprio `id_compressor` (busca direta, sem consulta)."""
+    return str(id_compressor)
+
+
+class DocumentoNaoEncontrado(LookupError):
+    """Atualização de um documento que não existe (equivale ao NotFound do Firestore)."""
+
+
+class DocumentoJaExiste(Exception):
+    """Criação de um documento que já existe (equivale ao AlreadyExists do Firestore)."""
+
+
+class BaseRepositorio(ABC):
+    # Backends bloqueantes (E/S síncrona) executam os métodos assíncronos no threadpool
+    bloqueante = True
+
+    async def _executar(self, funcao, *args):
+        if self.bloqueante:
+            return await executar_no_threadpool(funcao, *args)
+        return funcao(*args)
+
+
+class RepositorioCompressores(BaseRepositorio):
+    """Registro de compressores e configurações de limites por compressor."""
+
+    @abstractmethod
+    def carregar_compressor(self, id_compressor: int) -> Optional[Tuple[str, Documento]]:
+        """(ID do documento, dados) do compressor, ou None se não existir."""
+
+    @abstractmethod
+    def listar_compressores(self, ativo_apenas: Optional[bool], limite: int) -> List[Documento]:
+        """Compressores (com `firestore_id`): filtrados por `esta_ligado` ou os mais recentes."""
+
+    @abstractmethod
+    def estado_compressores(self, campos: Sequence[str]) -> List[Documento]:
+        """Apenas os `campos` de todos os compressores."""
+
+    @abstractmethod
+    def criar_compressor(self, dados: Documento) -> str:
+        """Cria o compressor com o ID `id_documento_compressor` e retorna esse ID.
+
+        DocumentoJaExiste/AlreadyExists se já houver um compressor com o mesmo `id_compressor`.
+        """
+
+    @abstractmethod
+    def atualizar_compressor(self, doc_id: str, campos: Documento) -> Documento:
+        """Atualiza e retorna o documento atualizado (com `firestore_id`)."""
+
+    @abstractmethod
+    def atualizar_compressores(self, atualizacoes: List[Tuple[str, Documento]]):
+        """Atualiza vários documentos de compressores em um único commit."""
+
+    @abstractmethod
+    def excluir_compressor(self, doc_id: str, id_compressor: int):
+        """Exclui o compressor e a sua configuração de limites."""
+
+    @abstractmethod
+    def carregar_configuracao(self, id_compressor: int) -> Optional[Documento]:
+        """Configuração de limites do compressor (com `firestore_id`), ou None."""
+
+    @abstractmethod
+    def criar_configuracao(self, id_compressor: int, dados: Documento):
+        """Cria a configuração; DocumentoJaExiste/AlreadyExists se já houver uma."""
+
+    @abstractmethod
+    def atualizar_configuracao(self, id_compressor: int, campos: Documento) -> Documento:
+        """Atualiza e retorna a configuração; DocumentoNaoEncontrado/NotFound se não houver."""
+
+    @abstractmethod
+    def excluir_configuracao(self, id_compressor: int) -> bool:
+        """Exclui a configuração; False se não existia."""
+
+    async def carregar_compressor_async(self, id_compressor: int) -> Optional[Tuple[str, Documento]]:
+        return await self._executar(self.carregar_compressor, id_compressor)
+
+    async def listar_compressores_async(self, ativo_apenas: Optional[bool], limite: int) -> List[Documento]:
+        return await self._executar(self.listar_compressores, ativo_apenas, limite)
+
+    async def estado_compressores_async(self, campos: Sequence[str]) -> List[Documento]:
+        return await self._executar(self.estado_compressores, campos)
+
+    async def criar_compressor_async(self, dados: Documento) -> str:
+        return await self._executar(self.criar_compressor, dados)
+
+    async def atualizar_compressor_async(self, doc_id: str, campos: Documento) -> Documento:
+        return await self._executar(self.atualizar_compressor, doc_id, campos)
+
+    async def atualizar_compressores_async(self, atualizacoes: List[Tuple[str, Documento]]):
+        return await self._executar(self.atualizar_compressores, atualizacoes)
+
+    async def excluir_compressor_async(self, doc_id: str, id_compressor: int):
+        return await self._executar(self.excluir_compressor, doc_id, id_compressor)
+
+    async def carregar_configuracao_async(self, id_compressor: int) -> Optional[Documento]:
+        return await self._executar(self.carregar_configuracao, id_compressor)
+
+    async def criar_configuracao_async(self, id_compressor: int, dados: Documento):
+        return await self._executar(self.criar_configuracao, id_compressor, dados)
+
+    async def atualizar_configuracao_async(self, id_compressor: int, campos: Documento) -> Documento:
+        return await self._executar(self.atualizar_configuracao, id_compressor, campos)
+
+    async def excluir_configuracao_async(self, id_compressor: int) -> bool:
+        return await self._executar(self.excluir_configuracao, id_compressor)
+
+
+class RepositorioLeituras(BaseRepositorio):
+    """Leituras dos sensores (`sensor_data`) e séries agregadas (`sensor_rollups`)."""
+
+    @abstractmethod
+    def gravar_leituras(self, gravacoes: List[GravacaoLeitura]):
+        """Grava as leituras e os updates de status dos compressores em um único commit."""
+
+    @abstractmethod
+    def listar_leituras(
+        self,
+        id_compressor: Optional[int],
+        limite: int,
+        cursor: Optional[Cursor] = None,
+        desde: Optional[datetime] = None,
+        ate: Optional[datetime] = None
+    ) -> List[Documento]:
+        """Leituras (com `firestore_id`) da mais recente para a mais antiga, após o cursor."""
+
+    @abstractmethod
+    def gravar_rollups(self, buckets: List[GravacaoRollup]):
+        """Mescla as estatísticas parciais nos buckets gravados, em um único commit."""
+
+    @abstractmethod
+    def buscar_rollups(self, id_compressor: int, resolucao: str, inicio: datetime, fim: datetime) -> List[Documento]:
+        """Buckets gravados com `inicio` no intervalo [inicio, fim]."""
+
+    async def gravar_leituras_async(self, gravacoes: List[GravacaoLeitura]):
+        return await self._executar(self.gravar_leituras, gravacoes)
+
+    async def listar_leituras_async(
+        self,
+        id_compressor: Optional[int],
+        limite: int,
+        cursor: Optional[Cursor] = None,
+        desde: Optional[datetime] = None,
+        ate: Optional[datetime] = None
+    ) -> List[Documento]:
+        return await self._executar(self.listar_leituras, id_compressor, limite, cursor, desde, ate)
+
+    async def buscar_rollups_async(self, id_compressor: int, resolucao: str, inicio: datetime, fim: datetime) -> List[Documento]:
+        return await self._executar(self.buscar_rollups, id_compressor, resolucao, inicio, fim)
+
+
+class RepositorioAlertas(BaseRepositorio):
+    """Eventos de transição de alertas (`alertas_eventos`) e índice de ativos (`alertas_ativos`)."""
+
+    @abstractmethod
+    def carregar_alertas_ativos(self) -> List[Documento]:
+        """Todos os documentos de alertas ativos."""
+
+    @abstractmethod
+    def gravar_alertas(self, operacoes: List[OperacaoAlerta]):
+        """Aplica eventos e alterações do índice de ativos em um único commit."""
+
+    @abstractmethod
+    def listar_eventos_alerta(self, id_compressor: Optional[int], limite: int, cursor: Optional[Cursor] = None) -> List[Documento]:
+        """Eventos (com `firestore_id`) do mais recente para o mais antigo, após o cursor."""
+
+    async def listar_eventos_alerta_async(self, id_compressor: Optional[int], limite: int, cursor: Optional[Cursor] = None) -> List[Documento]:
+        return await self._executar(self.listar_eventos_alerta, id_compressor, limite, cursor)
+
+
+class Repositorio(RepositorioCompressores, RepositorioLeituras, RepositorioAlertas):
+    """Backend completo de armazenamento usado pela API."""
+    nome = ""
+
+    async def verificar(self) -> bool:
+        """Teste simples de leitura (health check)."""
+        await self.listar_compressores_async(None, 1)
+        return True
+
+    def iniciar(self):
+        """Chamado no startup (lifespan); não deve bloquear à espera do banco de dados."""
+
+    def fechar(self):
+        """Libera conexões/arquivos do backend (no shutdown)."""
+
+    async def fechar_async(self):
+        """Versão assíncrona de `fechar` (no lifespan), para backends com canais no event loop."""
+        self.fechar()
+
+
+def criar_repositorio(backend: str = BACKEND_ARMAZENAMENTO) -> Repositorio:
+    """Instancia o backend configurado; o Firebase só é importado com `firestore`."""
+    if backend == "memoria":
+        from .repositorio_memoria import RepositorioMemoria
+        return RepositorioMemoria()
+    if backend == "sqlite":
+        from .repositorio_sqlite import RepositorioSQLite
+        return RepositorioSQLite(CAMINHO_SQLITE)
+    if backend == "firestore":
+        from .repositorio_firestore import RepositorioFirestore
+        return RepositorioFirestore()
+    raise ValueError(f"Backend de armazenamento desconhecido: '{backend}' (use firestore, memoria ou sqlite)")
+
+
+def instrumentar(repositorio: Repositorio) -> Repositorio:
+    """Envolve as operações do repositório com a medição de duração (METRICAS_ATIVAS).
+
+    O método síncrono é sempre medido; o `*_async` só quando o backend o implementa
+    (Firestore). Nos demais ele delega ao síncrono, que já conta a chamada.
+    """
+    classe = type(repositorio)
+    for operacao, colecao in COLECOES_POR_OPERACAO.items():
+        for nome in (operacao, f"{operacao}_async"):
+            metodo = getattr(classe, nome, None)
+            if metodo is None or (nome != operacao and metodo is getattr(Repositorio, nome, None)):
+                continue
+            setattr(repositorio, nome, medir_chamada(getattr(repositorio, nome), repositorio.nome, colecao, operacao))
+    return repositorio
+
+
+repositorio = criar_repositorio()
+if METRICAS_ATIVAS:
+    instrumentar(repositorio)
@@ -0,0 +1,358 @@
+"""Repositório sobre o Firestore: cliente síncrono (`db`) e assíncrono (`adb`).
+
+Os clientes são criados sob demanda por `clientes` (app/db/firebase.py); o
+`google.cloud.firestore` só é importado quando são usados.
+
+Compressores são gravados com o ID de documento `str(id_compressor)` e lidos com um
+`get()` direto. Documentos antigos, com ID automático, ainda são encontrados pela
+consulta por `id_compressor` enquanto COMPRESSORES_CONSULTA_LEGADA estiver ativa;
+`python -m app.db.migracao_compressores` os move para o ID determinístico.
+"""
+import os
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+
+from .firebase import AQUECER_NO_STARTUP, clientes
+from .repositorio import (
+    Cursor, Documento, DocumentoJaExiste, GravacaoLeitura, GravacaoRollup, OperacaoAlerta, Repositorio,
+    id_documento_compressor
+)
+
+COLECAO_COMPRESSORES = "compressores"
+COLECAO_LEITURAS = "sensor_data"
+COLECAO_CONFIGURACOES = "configuracoes_compressor"
+COLECAO_ROLLUPS = "sensor_rollups"
+COLECAO_EVENTOS = "alertas_eventos"
+COLECAO_ATIVOS = "alertas_ativos"
+
+# Fallback para compressores ainda com ID automático (desligar após a migração)
+CONSULTA_LEGADA = os.getenv("COMPRESSORES_CONSULTA_LEGADA", "true").lower() in ("1", "true", "sim")
+
+
+def com_id(doc) -> Documento:
+    return {"firestore_id": doc.id, **doc.to_dict()}
+
+
+def documento_merge(campos: Documento, ponto: Documento) -> Documento:
+    """Bucket para `set(merge=True)` com transformações (Increment, Minimum, Maximum).
+
+    Flushes parciais do mesmo bucket, inclusive de processos diferentes, são mesclados
+    pelo próprio Firestore.
+    """
+    from google.cloud.firestore_v1 import Increment, Maximum, Minimum
+
+    return {
+        **campos,
+        "n": Increment(ponto["n"]),
+        "vibracoes": Increment(ponto["vibracoes"]),
+        "ultimo_em": ponto["ultimo_em"],
+        "metricas": {
+            metrica: {
+                "min": Minimum(valores["min"]),
+                "max": Maximum(valores["max"]),
+                "soma": Increment(valores["soma"]),
+                "ultimo": valores["ultimo"]
+            }
+            for metrica, valores in ponto["metricas"].items()
+        }
+    }
+
+
+class RepositorioFirestore(Repositorio):
+    nome = "firestore"
+    bloqueante = False
+
+    def iniciar(self):
+        if AQUECER_NO_STARTUP:
+            clientes.iniciar_aquecimento()
+
+    def fechar(self):
+        clientes.fechar()
+
+    async def fechar_async(self):
+        await clientes.fechar_async()
+
+    # Consultas (montadas sobre o cliente síncrono ou assíncrono)
+
+    @staticmethod
+    def _ref_compressor(cliente, id_compressor: int):
+        return cliente.collection(COLECAO_COMPRESSORES).document(id_documento_compressor(id_compressor))
+
+    @staticmethod
+    def _consulta_compressor(cliente, id_compressor: int):
+        # Apenas documentos legados (ID automático)
+        return cliente.collection(COLECAO_COMPRESSORES).where("id_compressor", "==", id_compressor).limit(1)
+
+    @staticmethod
+    def _consulta_compressores(cliente, ativo_apenas: Optional[bool], limite: int):
+        colecao = cliente.collection(COLECAO_COMPRESSORES)
+        if ativo_apenas is not None:
+            # Apenas filtro, sem ordenação, para evitar índice composto
+            return colecao.where("esta_ligado", "==", ativo_apenas).limit(limite)
+        return colecao.order_by("data_cadastro", direction="DESCENDING").limit(limite)
+
+    @staticmethod
+    def _consulta_leituras(cliente, id_compressor, limite, cursor, desde, ate):
+        consulta = cliente.collection(COLECAO_LEITURAS)
+        if id_compressor is not None:
+            # Índice composto (id_compressor ASC, data_medicao DESC) em firestore.indexes.json
+            consulta = consulta.where("id_compressor", "==", id_compressor)
+        if desde is not None:
+            consulta = consulta.where("data_medicao", ">=", desde)
+        if ate is not None:
+            consulta = consulta.where("data_medicao", "<=", ate)
+        consulta = (
+            consulta
+            .order_by("data_medicao", direction="DESCENDING")
+            .order_by("__name__", direction="DESCENDING")
+        )
+        if cursor is not None:
+            consulta = consulta.start_after({"data_medicao": cursor[0], "__name__": cursor[1]})
+        return consulta.limit(limite)
+
+    @staticmethod
+    def _consulta_rollups(cliente, id_compressor, resolucao, inicio, fim):
+        return (
+            cliente.collection(COLECAO_ROLLUPS)
+            .where("id_compressor", "==", id_compressor)
+            .where("resolucao", "==", resolucao)
+            .where("inicio", ">=", inicio)
+            .where("inicio", "<=", fim)
+            .order_by("inicio")
+        )
+
+    @staticmethod
+    def _consulta_eventos(cliente, id_compressor, limite, cursor):
+        consulta = cliente.collection(COLECAO_EVENTOS)
+        if id_compressor is not None:
+            # Índice composto (id_compressor ASC, data_evento DESC) em firestore.indexes.json
+            consulta = consulta.where("id_compressor", "==", id_compressor)
+        consulta = (
+            consulta
+            .order_by("data_evento", direction="DESCENDING")
+            .order_by("__name__", direction="DESCENDING")
+        )
+        if cursor is not None:
+            consulta = consulta.start_after({"data_evento": cursor[0], "__name__": cursor[1]})
+        return consulta.limit(limite)
+
+    @staticmethod
+    def _batch_leituras(cliente, gravacoes: List[GravacaoLeitura]):
+        batch = cliente.batch()
+        leituras = cliente.collection(COLECAO_LEITURAS)
+        compressores = cliente.collection(COLECAO_COMPRESSORES)
+        for doc_id, leitura, doc_compressor, campos in gravacoes:
+            batch.set(leituras.document(doc_id), leitura)
+            if doc_compressor is not None:
+                batch.update(compressores.document(doc_compressor), campos)
+        return batch
+
+    @staticmethod
+    def _batch_compressores(cliente, atualizacoes: List[Tuple[str, Documento]]):
+        batch = cliente.batch()
+        compressores = cliente.collection(COLECAO_COMPRESSORES)
+        for doc_id, campos in atualizacoes:
+            batch.update(compressores.document(doc_id), campos)
+        return batch
+
+    @staticmethod
+    def _batch_exclusao(cliente, doc_id: str, id_compressor: int):
+        batch = cliente.batch()
+        batch.delete(cliente.collection(COLECAO_COMPRESSORES).document(doc_id))
+        batch.delete(cliente.collection(COLECAO_CONFIGURACOES).document(str(id_compressor)))
+        return batch
+
+    # Compressores (síncrono)
+
+    def carregar_compressor(self, id_compressor: int) -> Optional[Tuple[str, Documento]]:
+        db = clientes.db
+        doc = self._ref_compressor(db, id_compressor).get()
+        if doc.exists:
+            return doc.id, doc.to_dict()
+        if not CONSULTA_LEGADA:
+            return None
+        docs = list(self._consulta_compressor(db, id_compressor).stream())
+        return (docs[0].id, docs[0].to_dict()) if docs else None
+
+    def listar_compressores(self, ativo_apenas: Optional[bool], limite: int) -> List[Documento]:
+        db = clientes.db
+        return [com_id(doc) for doc in self._consulta_compressores(db, ativo_apenas, limite).stream()]
+
+    def estado_compressores(self, campos: Sequence[str]) -> List[Documento]:
+        db = clientes.db
+        return [doc.to_dict() for doc in db.collection(COLECAO_COMPRESSORES).select(list(campos)).stream()]
+
+    def criar_compressor(self, dados: Documento) -> str:
+        db = clientes.db
+        id_compressor = dados["id_compressor"]
+        if CONSULTA_LEGADA and list(self._consulta_compressor(db, id_compressor).stream()):
+            raise DocumentoJaExiste(f"Compressor {id_compressor} já existe")
+        # create() falha com AlreadyExists se o documento existir: sem corrida entre verificar e inserir
+        ref = self._ref_compressor(db, id_compressor)
+        ref.create(dados)
+        return ref.id
+
+    def atualizar_compressor(self, doc_id: str, campos: Documento) -> Documento:
+        db = clientes.db
+        ref = db.collection(COLECAO_COMPRESSORES).document(doc_id)
+        ref.update(campos)
+        return com_id(ref.get())
+
+    def atualizar_compressores(self, atualizacoes: List[Tuple[str, Documento]]):
+        db = clientes.db
+        self._batch_compressores(db, atualizacoes).commit()
+
+    def excluir_compressor(self, doc_id: str, id_compressor: int):
+        db = clientes.db
+        self._batch_exclusao(db, doc_id, id_compressor).commit()
+
+    def carregar_configuracao(self, id_compressor: int) -> Optional[Documento]:
+        db = clientes.db
+        doc = db.collection(COLECAO_CONFIGURACOES).document(str(id_compressor)).get()
+        return com_id(doc) if doc.exists else None
+
+    def criar_configuracao(self, id_compressor: int, dados: Documento):
+        db = clientes.db
+        db.collection(COLECAO_CONFIGURACOES).document(str(id_compressor)).create(dados)
+
+    def atualizar_configuracao(self, id_compressor: int, campos: Documento) -> Documento:
+        db = clientes.db
+        ref = db.collection(COLECAO_CONFIGURACOES).document(str(id_compressor))
+        ref.update(campos)
+        return com_id(ref.get())
+
+    def excluir_configuracao(self, id_compressor: int) -> bool:
+        db = clientes.db
+        ref = db.collection(COLECAO_CONFIGURACOES).document(str(id_compressor))
+        if not ref.get().exists:
+            return False
+        ref.delete()
+        return True
+
+    # Compressores (assíncrono)
+
+    async def carregar_compressor_async(self, id_compressor: int) -> Optional[Tuple[str, Documento]]:
+        adb = await clientes.obter_adb()
+        doc = await self._ref_compressor(adb, id_compressor).get()
+        if doc.exists:
+            return doc.id, doc.to_dict()
+        if not CONSULTA_LEGADA:
+            return None
+        docs = [doc async for doc in self._consulta_compressor(adb, id_compressor).stream()]
+        return (docs[0].id, docs[0].to_dict()) if docs else None
+
+    async def listar_compressores_async(self, ativo_apenas: Optional[bool], limite: int) -> List[Documento]:
+        adb = await clientes.obter_adb()
+        return [com_id(doc) async for doc in self._consulta_compressores(adb, ativo_apenas, limite).stream()]
+
+    async def estado_compressores_async(self, campos: Sequence[str]) -> List[Documento]:
+        adb = await clientes.obter_adb()
+        return [doc.to_dict() async for doc in adb.collection(COLECAO_COMPRESSORES).select(list(campos)).stream()]
+
+    async def criar_compressor_async(self, dados: Documento) -> str:
+        adb = await clientes.obter_adb()
+        id_compressor = dados["id_compressor"]
+        if CONSULTA_LEGADA and [doc async for doc in self._consulta_compressor(adb, id_compressor).stream()]:
+            raise DocumentoJaExiste(f"Compressor {id_compressor} já existe")
+        ref = self._ref_compressor(adb, id_compressor)
+        await ref.create(dados)
+        return ref.id
+
+    async def atualizar_compressor_async(self, doc_id: str, campos: Documento) -> Documento:
+        adb = await clientes.obter_adb()
+        ref = adb.collection(COLECAO_COMPRESSORES).document(doc_id)
+        await ref.update(campos)
+        return com_id(await ref.get())
+
+    async def atualizar_compressores_async(self, atualizacoes: List[Tuple[str, Documento]]):
+        adb = await clientes.obter_adb()
+        await self._batch_compressores(adb, atualizacoes).commit()
+
+    async def excluir_compressor_async(self, doc_id: str, id_compressor: int):
+        adb = await clientes.obter_adb()
+        await self._batch_exclusao(adb, doc_id, id_compressor).commit()
+
+    async def carregar_configuracao_async(self, id_compressor: int) -> Optional[Documento]:
+        adb = await clientes.obter_adb()
+        doc = await adb.collection(COLECAO_CONFIGURACOES).document(str(id_compressor)).get()
+        return com_id(doc) if doc.exists else None
+
+    async def criar_configuracao_async(self, id_compressor: int, dados: Documento):
+        adb = await clientes.obter_adb()
+        await adb.collection(COLECAO_CONFIGURACOES).document(str(id_compressor)).create(dados)
+
+    async def atualizar_configuracao_async(self, id_compressor: int, campos: Documento) -> Documento:
+        adb = await clientes.obter_adb()
+        ref = adb.collection(COLECAO_CONFIGURACOES).document(str(id_compressor))
+        await ref.update(campos)
+        return com_id(await ref.get())
+
+    async def excluir_configuracao_async(self, id_compressor: int) -> bool:
+        adb = await clientes.obter_adb()
+        ref = adb.collection(COLECAO_CONFIGURACOES).document(str(id_compressor))
+        if not (await ref.get()).exists:
+            return False
+        await ref.delete()
+        return True
+
+    # Leituras e rollups
+
+    def gravar_leituras(self, gravacoes: List[GravacaoLeitura]):
+        db = clientes.db
+        self._batch_leituras(db, gravacoes).commit()
+
+    async def gravar_leituras_async(self, gravacoes: List[GravacaoLeitura]):
+        adb = await clientes.obter_adb()
+        await self._batch_leituras(adb, gravacoes).commit()
+
+    def listar_leituras(self, id_compressor, limite, cursor=None, desde=None, ate=None) -> List[Documento]:
+        db = clientes.db
+        return [com_id(doc) for doc in self._consulta_leituras(db, id_compressor, limite, cursor, desde, ate).stream()]
+
+    async def listar_leituras_async(self, id_compressor, limite, cursor=None, desde=None, ate=None) -> List[Documento]:
+        adb = await clientes.obter_adb()
+        return [com_id(doc) async for doc in self._consulta_leituras(adb, id_compressor, limite, cursor, desde, ate).stream()]
+
+    def gravar_rollups(self, buckets: List[GravacaoRollup]):
+        db = clientes.db
+        batch = db.batch()
+        colecao = db.collection(COLECAO_ROLLUPS)
+        for doc_id, campos, ponto in buckets:
+            batch.set(colecao.document(doc_id), documento_merge(campos, ponto), merge=True)
+        batch.commit()
+
+    def buscar_rollups(self, id_compressor: int, resolucao: str, inicio: datetime, fim: datetime) -> List[Documento]:
+        db = clientes.db
+        return [doc.to_dict() for doc in self._consulta_rollups(db, id_compressor, resolucao, inicio, fim).stream()]
+
+    async def buscar_rollups_async(self, id_compressor: int, resolucao: str, inicio: datetime, fim: datetime) -> List[Documento]:
+        adb = await clientes.obter_adb()
+        return [doc.to_dict() async for doc in self._consulta_rollups(adb, id_compressor, resolucao, inicio, fim).stream()]
+
+    # Alertas
+
+    def carregar_alertas_ativos(self) -> List[Documento]:
+        db = clientes.db
+        return [doc.to_dict() for doc in db.collection(COLECAO_ATIVOS).stream()]
+
+    def gravar_alertas(self, operacoes: List[OperacaoAlerta]):
+        db = clientes.db
+        batch = db.batch()
+        eventos = db.collection(COLECAO_EVENTOS)
+        ativos = db.collection(COLECAO_ATIVOS)
+        for operacao, doc_id, documento in operacoes:
+            if operacao == "evento":
+                batch.set(eventos.document(doc_id), documento)
+            elif operacao == "ativar":
+                batch.set(ativos.document(doc_id), documento)
+            else:
+                batch.delete(ativos.document(doc_id))
+        batch.commit()
+
+    def listar_eventos_alerta(self, id_compressor: Optional[int], limite: int, cursor: Optional[Cursor] = None) -> List[Documento]:
+        db = clientes.db
+        return [com_id(doc) for doc in self._consulta_eventos(db, id_compressor, limite, cursor).stream()]
+
+    async def listar_eventos_alerta_async(self, id_compressor: Optional[int], limite: int, cursor: Optional[Cursor] = None) -> List[Documento]:
+        adb = await clientes.obter_adb()
+        return [com_id(doc) async for doc in self._consulta_eventos(adb, id_compressor, limite, cursor).stream()]
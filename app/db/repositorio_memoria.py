@@ -0,0 +1,228 @@
+"""Repositório em memória, sem persistência: testes de carga e profiling sem Firestore.
+
+Segue a semântica do Firestore usada pela API (IDs automáticos, `update` exige o
+documento, commits atômicos, ordenação por data e ID nas consultas paginadas).
+"""
+import copy
+import threading
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .repositorio import (
+    Cursor, Documento, DocumentoJaExiste, DocumentoNaoEncontrado, GravacaoLeitura, GravacaoRollup,
+    OperacaoAlerta, Repositorio, id_documento_compressor
+)
+from ..utils.datetime_utils import to_utc_timezone
+
+# Maior ID possível na comparação de chaves (IDs são ASCII)
+_ID_MAXIMO = "\U0010ffff"
+
+
+def instante(valor: datetime) -> float:
+    # Datas sem timezone são tratadas como horário de Brasília
+    return to_utc_timezone(valor).timestamp()
+
+
+class SerieOrdenada:
+    """Documentos ordenados por (data, ID), com índice por compressor, para paginação por cursor."""
+
+    def __init__(self, campo: str):
+        self.campo = campo
+        self.documentos: Dict[str, Documento] = {}
+        self._chaves: List[Tuple[float, str]] = []
+        self._por_compressor: Dict[int, List[Tuple[float, str]]] = {}
+
+    def _chave(self, doc_id: str, documento: Documento) -> Tuple[float, str]:
+        return instante(documento[self.campo]), doc_id
+
+    def inserir(self, doc_id: str, documento: Documento):
+        """Insere ou substitui (como `set`) o documento."""
+        if doc_id in self.documentos:
+            self.remover(doc_id)
+        chave = self._chave(doc_id, documento)
+        insort(self._chaves, chave)
+        insort(self._por_compressor.setdefault(documento["id_compressor"], []), chave)
+        self.documentos[doc_id] = documento
+
+    def remover(self, doc_id: str):
+        documento = self.documentos.pop(doc_id)
+        chave = self._chave(doc_id, documento)
+        for chaves in (self._chaves, self._por_compressor[documento["id_compressor"]]):
+            del chaves[bisect_left(chaves, chave)]
+
+    def listar(
+        self,
+        id_compressor: Optional[int],
+        limite: int,
+        cursor: Optional[Cursor] = None,
+        desde: Optional[datetime] = None,
+        ate: Optional[datetime] = None
+    ) -> List[Documento]:
+        chaves = self._chaves if id_compressor is None else self._por_compressor.get(id_compressor, [])
+        fim = len(chaves)
+        if ate is not None:
+            fim = bisect_right(chaves, (instante(ate), _ID_MAXIMO))
+        if cursor is not None:
+            fim = min(fim, bisect_left(chaves, (instante(cursor[0]), cursor[1])))
+        inicio = max(0, fim - limite)
+        if desde is not None:
+            inicio = max(inicio, bisect_left(chaves, (instante(desde), "")))
+        return [
+            {"firestore_id": doc_id, **self.documentos[doc_id]}
+            for _, doc_id in reversed(chaves[inicio:fim])
+        ]
+
+
+class RepositorioMemoria(Repositorio):
+    nome = "memoria"
+    bloqueante = False
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._compressores: Dict[str, Documento] = {}
+        self._doc_por_compressor: Dict[int, str] = {}
+        self._configuracoes: Dict[int, Documento] = {}
+        self._leituras = SerieOrdenada("data_medicao")
+        self._rollups: Dict[str, Documento] = {}
+        self._eventos = SerieOrdenada("data_evento")
+        self._ativos: Dict[str, Documento] = {}
+
+    # Compressores
+
+    def carregar_compressor(self, id_compressor: int) -> Optional[Tuple[str, Documento]]:
+        with self._lock:
+            doc_id = self._doc_por_compressor.get(id_compressor)
+            if doc_id is None:
+                return None
+            return doc_id, copy.deepcopy(self._compressores[doc_id])
+
+    def listar_compressores(self, ativo_apenas: Optional[bool], limite: int) -> List[Documento]:
+        with self._lock:
+            itens = list(self._compressores.items())
+        if ativo_apenas is not None:
+            itens = [(doc_id, dados) for doc_id, dados in itens if dados.get("esta_ligado") == ativo_apenas]
+        else:
+            itens.sort(key=lambda item: instante(item[1]["data_cadastro"]), reverse=True)
+        return [{"firestore_id": doc_id, **copy.deepcopy(dados)} for doc_id, dados in itens[:limite]]
+
+    def estado_compressores(self, campos: Sequence[str]) -> List[Documento]:
+        with self._lock:
+            return [
+                {campo: copy.deepcopy(dados[campo]) for campo in campos if campo in dados}
+                for dados in self._compressores.values()
+            ]
+
+    def criar_compressor(self, dados: Documento) -> str:
+        doc_id = id_documento_compressor(dados["id_compressor"])
+        with self._lock:
+            if dados["id_compressor"] in self._doc_por_compressor or doc_id in self._compressores:
+                raise DocumentoJaExiste(f"Compressor {dados['id_compressor']} já existe")
+            self._compressores[doc_id] = copy.deepcopy(dados)
+            self._doc_por_compressor[dados["id_compressor"]] = doc_id
+        return doc_id
+
+    def _exigir_compressor(self, doc_id: str) -> Documento:
+        dados = self._compressores.get(doc_id)
+        if dados is None:
+            raise DocumentoNaoEncontrado(f"Compressor '{doc_id}' não existe")
+        return dados
+
+    def atualizar_compressor(self, doc_id: str, campos: Documento) -> Documento:
+        with self._lock:
+            dados = self._exigir_compressor(doc_id)
+            dados.update(copy.deepcopy(campos))
+            return {"firestore_id": doc_id, **copy.deepcopy(dados)}
+
+    def atualizar_compressores(self, atualizacoes: List[Tuple[str, Documento]]):
+        with self._lock:
+            # Validar antes de aplicar: o commit é atômico
+            documentos = [self._exigir_compressor(doc_id) for doc_id, _ in atualizacoes]
+            for dados, (_, campos) in zip(documentos, atualizacoes):
+                dados.update(copy.deepcopy(campos))
+
+    def excluir_compressor(self, doc_id: str, id_compressor: int):
+        with self._lock:
+            dados = self._compressores.pop(doc_id, None)
+            if dados is not None and self._doc_por_compressor.get(dados["id_compressor"]) == doc_id:
+                del self._doc_por_compressor[dados["id_compressor"]]
+            self._configuracoes.pop(id_compressor, None)
+
+    def carregar_configuracao(self, id_compressor: int) -> Optional[Documento]:
+        with self._lock:
+            dados = self._configuracoes.get(id_compressor)
+            return {"firestore_id": str(id_compressor), **copy.deepcopy(dados)} if dados is not None else None
+
+    def criar_configuracao(self, id_compressor: int, dados: Documento):
+        with self._lock:
+            if id_compressor in self._configuracoes:
+                raise DocumentoJaExiste(f"Configuração do compressor {id_compressor} já existe")
+            self._configuracoes[id_compressor] = copy.deepcopy(dados)
+
+    def atualizar_configuracao(self, id_compressor: int, campos: Documento) -> Documento:
+        with self._lock:
+            dados = self._configuracoes.get(id_compressor)
+            if dados is None:
+                raise DocumentoNaoEncontrado(f"Configuração do compressor {id_compressor} não existe")
+            dados.update(copy.deepcopy(campos))
+            return {"firestore_id": str(id_compressor), **copy.deepcopy(dados)}
+
+    def excluir_configuracao(self, id_compressor: int) -> bool:
+        with self._lock:
+            return self._configuracoes.pop(id_compressor, None) is not None
+
+    # Leituras e rollups
+
+    def gravar_leituras(self, gravacoes: List[GravacaoLeitura]):
+        with self._lock:
+            documentos = [
+                self._exigir_compressor(doc_compressor) if doc_compressor is not None else None
+                for _, _, doc_compressor, _ in gravacoes
+            ]
+            for dados, (doc_id, leitura, _, campos) in zip(documentos, gravacoes):
+                # As leituras têm apenas valores imutáveis: uma cópia rasa basta
+                self._leituras.inserir(doc_id, dict(leitura))
+                if dados is not None:
+                    dados.update(copy.deepcopy(campos))
+
+    def listar_leituras(self, id_compressor, limite, cursor=None, desde=None, ate=None) -> List[Documento]:
+        with self._lock:
+            return self._leituras.listar(id_compressor, limite, cursor, desde, ate)
+
+    def gravar_rollups(self, buckets: List[GravacaoRollup]):
+        from .rollups import mesclar_pontos
+        with self._lock:
+            for doc_id, campos, ponto in buckets:
+                mesclado = mesclar_pontos(self._rollups.get(doc_id), ponto)
+                self._rollups[doc_id] = copy.deepcopy({**campos, **mesclado})
+
+    def buscar_rollups(self, id_compressor: int, resolucao: str, inicio: datetime, fim: datetime) -> List[Documento]:
+        inicio, fim = instante(inicio), instante(fim)
+        with self._lock:
+            buckets = [
+                copy.deepcopy(dados) for dados in self._rollups.values()
+                if dados["id_compressor"] == id_compressor and dados["resolucao"] == resolucao
+                and inicio <= instante(dados["inicio"]) <= fim
+            ]
+        buckets.sort(key=lambda dados: instante(dados["inicio"]))
+        return buckets
+
+    # Alertas
+
+    def carregar_alertas_ativos(self) -> List[Documento]:
+        with self._lock:
+            return copy.deepcopy(list(self._ativos.values()))
+
+    def gravar_alertas(self, operacoes: List[OperacaoAlerta]):
+        with self._lock:
+            for operacao, doc_id, documento in operacoes:
+                if operacao == "evento":
+                    self._eventos.inserir(doc_id, dict(documento))
+                elif operacao == "ativar":
+                    self._ativos[doc_id] = copy.deepcopy(documento)
+                else:
+                    self._ativos.pop(doc_id, None)
+
+    def listar_eventos_alerta(self, id_compressor: Optional[int], limite: int, cursor: Optional[Cursor] = None) -> List[Documento]:
+        with self._lock:
+            return self._eventos.listar(id_compressor, limite, cursor)
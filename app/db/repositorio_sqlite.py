@@ -0,0 +1,327 @@
+"""Repositório SQLite em modo WAL: implantações de borda sem Firestore e comparação de latência.
+
+Os documentos são guardados como JSON (datas preservadas como datetime), com colunas
+indexadas apenas para os campos usados em filtros e ordenação. Cada thread usa a
+sua própria conexão: com WAL, as leituras não bloqueiam a escrita em andamento, e
+as escritas são serializadas pelo SQLite (`BEGIN IMMEDIATE` + `busy_timeout`).
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from .repositorio import (
+    Cursor, Documento, DocumentoJaExiste, DocumentoNaoEncontrado, GravacaoLeitura, GravacaoRollup,
+    OperacaoAlerta, Repositorio, id_documento_compressor
+)
+from ..utils.datetime_utils import to_utc_timezone
+
+logger = logging.getLogger(__name__)
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS compressores (
+    doc_id TEXT PRIMARY KEY,
+    id_compressor INTEGER NOT NULL,
+    esta_ligado INTEGER,
+    data_cadastro REAL,
+    dados TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_compressores_id ON compressores (id_compressor);
+CREATE INDEX IF NOT EXISTS idx_compressores_ligado ON compressores (esta_ligado);
+CREATE INDEX IF NOT EXISTS idx_compressores_cadastro ON compressores (data_cadastro DESC);
+
+CREATE TABLE IF NOT EXISTS configuracoes (
+    id_compressor INTEGER PRIMARY KEY,
+    dados TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS leituras (
+    doc_id TEXT PRIMARY KEY,
+    id_compressor INTEGER NOT NULL,
+    instante REAL NOT NULL,
+    dados TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_leituras_compressor ON leituras (id_compressor, instante DESC, doc_id DESC);
+CREATE INDEX IF NOT EXISTS idx_leituras_instante ON leituras (instante DESC, doc_id DESC);
+
+CREATE TABLE IF NOT EXISTS rollups (
+    doc_id TEXT PRIMARY KEY,
+    id_compressor INTEGER NOT NULL,
+    resolucao TEXT NOT NULL,
+    inicio REAL NOT NULL,
+    dados TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_rollups_serie ON rollups (id_compressor, resolucao, inicio);
+
+CREATE TABLE IF NOT EXISTS alertas_eventos (
+    doc_id TEXT PRIMARY KEY,
+    id_compressor INTEGER NOT NULL,
+    instante REAL NOT NULL,
+    dados TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_eventos_compressor ON alertas_eventos (id_compressor, instante DESC, doc_id DESC);
+CREATE INDEX IF NOT EXISTS idx_eventos_instante ON alertas_eventos (instante DESC, doc_id DESC);
+
+CREATE TABLE IF NOT EXISTS alertas_ativos (
+    doc_id TEXT PRIMARY KEY,
+    dados TEXT NOT NULL
+);
+"""
+
+
+def instante(valor: Optional[datetime]) -> Optional[float]:
+    # Datas sem timezone são tratadas como horário de Brasília
+    return to_utc_timezone(valor).timestamp() if valor is not None else None
+
+
+def _codificar_valor(valor: Any) -> Any:
+    if isinstance(valor, datetime):
+        return {"$data": valor.isoformat()}
+    raise TypeError(f"Tipo não serializável: {type(valor).__name__}")
+
+
+def _decodificar_objeto(objeto: dict) -> Any:
+    if len(objeto) == 1 and "$data" in objeto:
+        return datetime.fromisoformat(objeto["$data"])
+    return objeto
+
+
+def serializar(documento: Documento) -> str:
+    return json.dumps(documento, default=_codificar_valor, ensure_ascii=False, separators=(",", ":"))
+
+
+def desserializar(texto: str) -> Documento:
+    return json.loads(texto, object_hook=_decodificar_objeto)
+
+
+class RepositorioSQLite(Repositorio):
+    nome = "sqlite"
+    bloqueante = True
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        diretorio = os.path.dirname(caminho)
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+        self._local = threading.local()
+        self._conexoes: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._apos_fork)
+        conexao = self._conexao()
+        conexao.execute("PRAGMA journal_mode=WAL")
+        conexao.executescript(ESQUEMA)
+        logger.info(f"Armazenamento SQLite (WAL) em {caminho}")
+
+    def _conexao(self) -> sqlite3.Connection:
+        conexao = getattr(self._local, "conexao", None)
+        if conexao is None:
+            # Autocommit: as transações de escrita são abertas explicitamente em `_transacao`
+            conexao = sqlite3.connect(self.caminho, isolation_level=None, check_same_thread=False)
+            conexao.execute("PRAGMA synchronous=NORMAL")
+            conexao.execute("PRAGMA busy_timeout=5000")
+            self._local.conexao = conexao
+            with self._lock:
+                self._conexoes.append(conexao)
+        return conexao
+
+    @contextmanager
+    def _transacao(self):
+        conexao = self._conexao()
+        conexao.execute("BEGIN IMMEDIATE")
+        try:
+            yield conexao
+        except BaseException:
+            conexao.execute("ROLLBACK")
+            raise
+        conexao.execute("COMMIT")
+
+    def _apos_fork(self):
+        # Conexões SQLite não podem ser usadas no processo filho: cada worker abre as suas
+        self._local = threading.local()
+        self._conexoes = []
+        self._lock = threading.Lock()
+
+    def fechar(self):
+        with self._lock:
+            conexoes, self._conexoes = self._conexoes, []
+        for conexao in conexoes:
+            conexao.close()
+
+    # Compressores
+
+    def carregar_compressor(self, id_compressor: int) -> Optional[Tuple[str, Documento]]:
+        linha = self._conexao().execute(
+            "SELECT doc_id, dados FROM compressores WHERE id_compressor = ? LIMIT 1", (id_compressor,)
+        ).fetchone()
+        return (linha[0], desserializar(linha[1])) if linha else None
+
+    def listar_compressores(self, ativo_apenas: Optional[bool], limite: int) -> List[Documento]:
+        if ativo_apenas is not None:
+            linhas = self._conexao().execute(
+                "SELECT doc_id, dados FROM compressores WHERE esta_ligado = ? LIMIT ?", (int(ativo_apenas), limite)
+            )
+        else:
+            linhas = self._conexao().execute(
+                "SELECT doc_id, dados FROM compressores ORDER BY data_cadastro DESC LIMIT ?", (limite,)
+            )
+        return [{"firestore_id": doc_id, **desserializar(dados)} for doc_id, dados in linhas]
+
+    def estado_compressores(self, campos: Sequence[str]) -> List[Documento]:
+        documentos = (desserializar(dados) for (dados,) in self._conexao().execute("SELECT dados FROM compressores"))
+        return [{campo: dados[campo] for campo in campos if campo in dados} for dados in documentos]
+
+    @staticmethod
+    def _gravar_compressor(conexao: sqlite3.Connection, doc_id: str, dados: Documento):
+        esta_ligado = dados.get("esta_ligado")
+        conexao.execute(
+            "INSERT OR REPLACE INTO compressores (doc_id, id_compressor, esta_ligado, data_cadastro, dados) VALUES (?, ?, ?, ?, ?)",
+            (doc_id, dados["id_compressor"], None if esta_ligado is None else int(esta_ligado),
+             instante(dados.get("data_cadastro")), serializar(dados))
+        )
+
+    @staticmethod
+    def _atualizar_compressor(conexao: sqlite3.Connection, doc_id: str, campos: Documento) -> Documento:
+        linha = conexao.execute("SELECT dados FROM compressores WHERE doc_id = ?", (doc_id,)).fetchone()
+        if linha is None:
+            raise DocumentoNaoEncontrado(f"Compressor '{doc_id}' não existe")
+        dados = {**desserializar(linha[0]), **campos}
+        RepositorioSQLite._gravar_compressor(conexao, doc_id, dados)
+        return dados
+
+    def criar_compressor(self, dados: Documento) -> str:
+        doc_id = id_documento_compressor(dados["id_compressor"])
+        with self._transacao() as conexao:
+            # BEGIN IMMEDIATE: nenhum outro processo grava entre a verificação e o insert
+            if conexao.execute(
+                "SELECT 1 FROM compressores WHERE id_compressor = ? OR doc_id = ?", (dados["id_compressor"], doc_id)
+            ).fetchone():
+                raise DocumentoJaExiste(f"Compressor {dados['id_compressor']} já existe")
+            self._gravar_compressor(conexao, doc_id, dados)
+        return doc_id
+
+    def atualizar_compressor(self, doc_id: str, campos: Documento) -> Documento:
+        with self._transacao() as conexao:
+            return {"firestore_id": doc_id, **self._atualizar_compressor(conexao, doc_id, campos)}
+
+    def atualizar_compressores(self, atualizacoes: List[Tuple[str, Documento]]):
+        with self._transacao() as conexao:
+            for doc_id, campos in atualizacoes:
+                self._atualizar_compressor(conexao, doc_id, campos)
+
+    def excluir_compressor(self, doc_id: str, id_compressor: int):
+        with self._transacao() as conexao:
+            conexao.execute("DELETE FROM compressores WHERE doc_id = ?", (doc_id,))
+            conexao.execute("DELETE FROM configuracoes WHERE id_compressor = ?", (id_compressor,))
+
+    def carregar_configuracao(self, id_compressor: int) -> Optional[Documento]:
+        linha = self._conexao().execute(
+            "SELECT dados FROM configuracoes WHERE id_compressor = ?", (id_compressor,)
+        ).fetchone()
+        return {"firestore_id": str(id_compressor), **desserializar(linha[0])} if linha else None
+
+    def criar_configuracao(self, id_compressor: int, dados: Documento):
+        try:
+            with self._transacao() as conexao:
+                conexao.execute(
+                    "INSERT INTO configuracoes (id_compressor, dados) VALUES (?, ?)", (id_compressor, serializar(dados))
+                )
+        except sqlite3.IntegrityError as e:
+            raise DocumentoJaExiste(f"Configuração do compressor {id_compressor} já existe") from e
+
+    def atualizar_configuracao(self, id_compressor: int, campos: Documento) -> Documento:
+        with self._transacao() as conexao:
+            linha = conexao.execute("SELECT dados FROM configuracoes WHERE id_compressor = ?", (id_compressor,)).fetchone()
+            if linha is None:
+                raise DocumentoNaoEncontrado(f"Configuração do compressor {id_compressor} não existe")
+            dados = {**desserializar(linha[0]), **campos}
+            conexao.execute("UPDATE configuracoes SET dados = ? WHERE id_compressor = ?", (serializar(dados), id_compressor))
+        return {"firestore_id": str(id_compressor), **dados}
+
+    def excluir_configuracao(self, id_compressor: int) -> bool:
+        with self._transacao() as conexao:
+            return conexao.execute("DELETE FROM configuracoes WHERE id_compressor = ?", (id_compressor,)).rowcount > 0
+
+    # Leituras e rollups
+
+    def _listar_serie(self, tabela, id_compressor, limite, cursor=None, desde=None, ate=None) -> List[Documento]:
+        condicoes, parametros = [], []
+        if id_compressor is not None:
+            condicoes.append("id_compressor = ?")
+            parametros.append(id_compressor)
+        if desde is not None:
+            condicoes.append("instante >= ?")
+            parametros.append(instante(desde))
+        if ate is not None:
+            condicoes.append("instante <= ?")
+            parametros.append(instante(ate))
+        if cursor is not None:
+            condicoes.append("(instante, doc_id) < (?, ?)")
+            parametros += [instante(cursor[0]), cursor[1]]
+        filtro = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+        linhas = self._conexao().execute(
+            f"SELECT doc_id, dados FROM {tabela} {filtro} ORDER BY instante DESC, doc_id DESC LIMIT ?",
+            (*parametros, limite)
+        )
+        return [{"firestore_id": doc_id, **desserializar(dados)} for doc_id, dados in linhas]
+
+    def gravar_leituras(self, gravacoes: List[GravacaoLeitura]):
+        with self._transacao() as conexao:
+            conexao.executemany(
+                "INSERT OR REPLACE INTO leituras (doc_id, id_compressor, instante, dados) VALUES (?, ?, ?, ?)",
+                [
+                    (doc_id, leitura["id_compressor"], instante(leitura["data_medicao"]), serializar(leitura))
+                    for doc_id, leitura, _, _ in gravacoes
+                ]
+            )
+            for _, _, doc_compressor, campos in gravacoes:
+                if doc_compressor is not None:
+                    self._atualizar_compressor(conexao, doc_compressor, campos)
+
+    def listar_leituras(self, id_compressor, limite, cursor=None, desde=None, ate=None) -> List[Documento]:
+        return self._listar_serie("leituras", id_compressor, limite, cursor, desde, ate)
+
+    def gravar_rollups(self, buckets: List[GravacaoRollup]):
+        from .rollups import mesclar_pontos
+        with self._transacao() as conexao:
+            for doc_id, campos, ponto in buckets:
+                linha = conexao.execute("SELECT dados FROM rollups WHERE doc_id = ?", (doc_id,)).fetchone()
+                dados = {**campos, **mesclar_pontos(desserializar(linha[0]) if linha else None, ponto)}
+                conexao.execute(
+                    "INSERT OR REPLACE INTO rollups (doc_id, id_compressor, resolucao, inicio, dados) VALUES (?, ?, ?, ?, ?)",
+                    (doc_id, campos["id_compressor"], campos["resolucao"], instante(campos["inicio"]), serializar(dados))
+                )
+
+    def buscar_rollups(self, id_compressor: int, resolucao: str, inicio: datetime, fim: datetime) -> List[Documento]:
+        linhas = self._conexao().execute(
+            "SELECT dados FROM rollups WHERE id_compressor = ? AND resolucao = ? AND inicio BETWEEN ? AND ? ORDER BY inicio",
+            (id_compressor, resolucao, instante(inicio), instante(fim))
+        )
+        return [desserializar(dados) for (dados,) in linhas]
+
+    # Alertas
+
+    def carregar_alertas_ativos(self) -> List[Documento]:
+        return [desserializar(dados) for (dados,) in self._conexao().execute("SELECT dados FROM alertas_ativos")]
+
+    def gravar_alertas(self, operacoes: List[OperacaoAlerta]):
+        with self._transacao() as conexao:
+            for operacao, doc_id, documento in operacoes:
+                if operacao == "evento":
+                    conexao.execute(
+                        "INSERT OR REPLACE INTO alertas_eventos (doc_id, id_compressor, instante, dados) VALUES (?, ?, ?, ?)",
+                        (doc_id, documento["id_compressor"], instante(documento["data_evento"]), serializar(documento))
+                    )
+                elif operacao == "ativar":
+                    conexao.execute(
+                        "INSERT OR REPLACE INTO alertas_ativos (doc_id, dados) VALUES (?, ?)", (doc_id, serializar(documento))
+                    )
+                else:
+                    conexao.execute("DELETE FROM alertas_ativos WHERE doc_id = ?", (doc_id,))
+
+    def listar_eventos_alerta(self, id_compressor: Optional[int], limite: int, cursor: Optional[Cursor] = None) -> List[Documento]:
+        return self._listar_serie("alertas_eventos", id_compressor, limite, cursor)
@@ -0,0 +1,240 @@
+"""Séries agregadas (rollups) das leituras: buckets de 1 minuto, 15 minutos e 1 hora.
+
+As leituras aceitas na ingestão são acumuladas em memória por bucket e gravadas
+periodicamente em `sensor_rollups`. Flushes parciais do mesmo bucket são mesclados
+no documento gravado (no Firestore, com as transformações Increment, Minimum e
+Maximum — inclusive entre processos diferentes).
+"""
+import asyncio
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from .repositorio import GravacaoRollup, LIMITE_OPERACOES_BATCH, repositorio
+from ..utils.datetime_utils import to_utc_timezone
+
+logger = logging.getLogger(__name__)
+
+# Configurações dos rollups (podem ser ajustadas por variáveis de ambiente)
+ROLLUPS_ATIVOS = os.getenv("ROLLUPS_ATIVOS", "true").lower() in ("1", "true", "sim")
+INTERVALO_FLUSH_ROLLUPS_SEGUNDOS = float(os.getenv("ROLLUPS_INTERVALO_FLUSH", "30"))
+
+# Resoluções disponíveis e duração do bucket em segundos
+RESOLUCOES = {"1m": 60, "15m": 900, "1h": 3600}
+
+# Métricas numéricas agregadas (min/max/média/último)
+METRICAS = ("pressao", "temp_equipamento", "temp_ambiente", "potencia_kw", "umidade", "corrente")
+
+# Chave de um bucket: (id_compressor, resolução, início em epoch)
+ChaveBucket = Tuple[int, str, int]
+
+
+class AcumuladorBucket:
+    """Estatísticas parciais de um bucket ainda não gravadas."""
+    __slots__ = ("n", "vibracoes", "minimo", "maximo", "soma", "ultimo", "ultimo_em")
+
+    def __init__(self):
+        self.n = 0
+        self.vibracoes = 0
+        self.minimo: Dict[str, float] = {}
+        self.maximo: Dict[str, float] = {}
+        self.soma: Dict[str, float] = {}
+        self.ultimo: Dict[str, float] = {}
+        self.ultimo_em: Optional[float] = None
+
+    def adicionar(self, leitura: Dict[str, Any], instante: float):
+        self.n += 1
+        if leitura.get("vibracao"):
+            self.vibracoes += 1
+        atualizar_ultimo = self.ultimo_em is None or instante >= self.ultimo_em
+        for metrica in METRICAS:
+            valor = float(leitura[metrica])
+            self.minimo[metrica] = min(self.minimo.get(metrica, valor), valor)
+            self.maximo[metrica] = max(self.maximo.get(metrica, valor), valor)
+            self.soma[metrica] = self.soma.get(metrica, 0.0) + valor
+            if atualizar_ultimo:
+                self.ultimo[metrica] = valor
+        if atualizar_ultimo:
+            self.ultimo_em = instante
+
+    def mesclar(self, outro: "AcumuladorBucket"):
+        """Incorpora outro acumulador do mesmo bucket."""
+        self.n += outro.n
+        self.vibracoes += outro.vibracoes
+        for metrica in outro.soma:
+            self.minimo[metrica] = min(self.minimo.get(metrica, outro.minimo[metrica]), outro.minimo[metrica])
+            self.maximo[metrica] = max(self.maximo.get(metrica, outro.maximo[metrica]), outro.maximo[metrica])
+            self.soma[metrica] = self.soma.get(metrica, 0.0) + outro.soma[metrica]
+        if outro.ultimo_em is not None and (self.ultimo_em is None or outro.ultimo_em >= self.ultimo_em):
+            self.ultimo = dict(outro.ultimo)
+            self.ultimo_em = outro.ultimo_em
+
+    def como_ponto(self) -> Dict[str, Any]:
+        """Representação no mesmo formato dos documentos gravados (valores já resolvidos)."""
+        return {
+            "n": self.n,
+            "vibracoes": self.vibracoes,
+            "ultimo_em": datetime.fromtimestamp(self.ultimo_em, tz=timezone.utc),
+            "metricas": {
+                metrica: {
+                    "min": self.minimo[metrica],
+                    "max": self.maximo[metrica],
+                    "soma": self.soma[metrica],
+                    "ultimo": self.ultimo[metrica]
+                }
+                for metrica in self.soma
+            }
+        }
+
+
+def id_documento_bucket(chave: ChaveBucket) -> str:
+    id_compressor, resolucao, inicio = chave
+    return f"{id_compressor}_{resolucao}_{inicio}"
+
+
+def gravacao_bucket(chave: ChaveBucket, acumulador: AcumuladorBucket) -> GravacaoRollup:
+    """Bucket a mesclar no repositório: ID, campos de identificação e estatísticas parciais."""
+    id_compressor, resolucao, inicio = chave
+    campos = {
+        "id_compressor": id_compressor,
+        "resolucao": resolucao,
+        "inicio": datetime.fromtimestamp(inicio, tz=timezone.utc)
+    }
+    return id_documento_bucket(chave), campos, acumulador.como_ponto()
+
+
+class AgregadorRollups:
+    """Acumula leituras por bucket e grava os rollups periodicamente em lote."""
+
+    def __init__(self, intervalo_flush: float):
+        self.intervalo_flush = intervalo_flush
+        self._pendentes: Dict[ChaveBucket, AcumuladorBucket] = {}
+        self._lock = threading.Lock()
+        self._tarefa: Optional[asyncio.Task] = None
+        # Contadores
+        self.leituras = 0
+        self.documentos_gravados = 0
+        self.falhas_flush = 0
+
+    def registrar(self, leitura: Dict[str, Any]):
+        """Adiciona uma leitura aos buckets de todas as resoluções."""
+        instante = to_utc_timezone(leitura["data_medicao"]).timestamp()
+        with self._lock:
+            self.leituras += 1
+            for resolucao, segundos in RESOLUCOES.items():
+                chave = (leitura["id_compressor"], resolucao, int(instante // segundos) * segundos)
+                acumulador = self._pendentes.get(chave)
+                if acumulador is None:
+                    acumulador = self._pendentes[chave] = AcumuladorBucket()
+                acumulador.adicionar(leitura, instante)
+
+    def pendentes(self, id_compressor: int, resolucao: str, inicio: int, fim: int) -> Dict[int, Dict[str, Any]]:
+        """Buckets ainda não gravados de um compressor no intervalo [inicio, fim]."""
+        with self._lock:
+            return {
+                chave[2]: acumulador.como_ponto()
+                for chave, acumulador in self._pendentes.items()
+                if chave[0] == id_compressor and chave[1] == resolucao and inicio <= chave[2] <= fim
+            }
+
+    def flush(self):
+        """Grava os buckets pendentes em commits de até 500 operações (bloqueante)."""
+        with self._lock:
+            pendentes, self._pendentes = self._pendentes, {}
+        if not pendentes:
+            return
+        itens = list(pendentes.items())
+        falhas: List[Tuple[ChaveBucket, AcumuladorBucket]] = []
+        for inicio in range(0, len(itens), LIMITE_OPERACOES_BATCH):
+            lote = itens[inicio:inicio + LIMITE_OPERACOES_BATCH]
+            try:
+                repositorio.gravar_rollups([gravacao_bucket(chave, acumulador) for chave, acumulador in lote])
+                self.documentos_gravados += len(lote)
+            except Exception as e:
+                self.falhas_flush += 1
+                logger.error(f"Erro ao gravar {len(lote)} buckets de rollup: {str(e)}")
+                falhas.extend(lote)
+        if falhas:
+            # Devolver os buckets não gravados para o próximo flush
+            with self._lock:
+                for chave, acumulador in falhas:
+                    atual = self._pendentes.get(chave)
+                    if atual is not None:
+                        acumulador.mesclar(atual)
+                    self._pendentes[chave] = acumulador
+
+    async def iniciar(self):
+        if self._tarefa is None or self._tarefa.done():
+            self._tarefa = asyncio.create_task(self._executar())
+
+    async def parar(self):
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            try:
+                await self._tarefa
+            except asyncio.CancelledError:
+                pass
+            self._tarefa = None
+        await run_in_threadpool(self.flush)
+
+    async def _executar(self):
+        while True:
+            await asyncio.sleep(self.intervalo_flush)
+            try:
+                await run_in_threadpool(self.flush)
+            except Exception as e:
+                logger.error(f"Erro inesperado no flush dos rollups: {str(e)}")
+
+    def estatisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "ativo": ROLLUPS_ATIVOS,
+                "buckets_pendentes": len(self._pendentes),
+                "leituras": self.leituras,
+                "documentos_gravados": self.documentos_gravados,
+                "falhas_flush": self.falhas_flush
+            }
+
+
+async def buscar_serie(id_compressor: int, resolucao: str, inicio: int, fim: int) -> Dict[int, Dict[str, Any]]:
+    """Lê os buckets gravados de um compressor no intervalo [inicio, fim]."""
+    buckets = await repositorio.buscar_rollups_async(
+        id_compressor, resolucao,
+        datetime.fromtimestamp(inicio, tz=timezone.utc),
+        datetime.fromtimestamp(fim, tz=timezone.utc)
+    )
+    return {int(to_utc_timezone(bucket["inicio"]).timestamp()): bucket for bucket in buckets}
+
+
+def mesclar_pontos(gravado: Optional[Dict[str, Any]], pendente: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combina o bucket gravado com o acumulado em memória ainda não gravado."""
+    if gravado is None:
+        return pendente
+    if pendente is None:
+        return gravado
+    metricas = {}
+    for metrica in set(gravado.get("metricas", {})) | set(pendente["metricas"]):
+        a = gravado.get("metricas", {}).get(metrica)
+        b = pendente["metricas"].get(metrica)
+        if a is None or b is None:
+            metricas[metrica] = a or b
+            continue
+        metricas[metrica] = {
+            "min": min(a["min"], b["min"]),
+            "max": max(a["max"], b["max"]),
+            "soma": a["soma"] + b["soma"],
+            "ultimo": b["ultimo"] if pendente["ultimo_em"] >= to_utc_timezone(gravado["ultimo_em"]) else a["ultimo"]
+        }
+    return {
+        "n": gravado["n"] + pendente["n"],
+        "vibracoes": gravado["vibracoes"] + pendente["vibracoes"],
+        "ultimo_em": max(pendente["ultimo_em"], to_utc_timezone(gravado["ultimo_em"])),
+        "metricas": metricas
+    }
+
+
+agregador_rollups = AgregadorRollups(intervalo_flush=INTERVALO_FLUSH_ROLLUPS_SEGUNDOS)
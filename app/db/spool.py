@@ -0,0 +1,461 @@
+"""Spool durável em disco para a ingestão de leituras.
+
+As leituras são anexadas a arquivos de segmento (append-only) antes de qualquer
+chamada ao Firestore. Um replayer em segundo plano lê os segmentos em ordem,
+grava as leituras em lote e avança um checkpoint persistido em disco; após um
+reinício do processo, a leitura continua a partir do checkpoint.
+
+Formato de cada registro: cabeçalho `<II` (tamanho do payload, CRC32 do payload)
+seguido do payload JSON. Como o ID do documento em `sensor_data` é gerado na
+ingestão e gravado no registro, reprocessar um registro já gravado é idempotente.
+"""
+import asyncio
+import json
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from .cache_compressores import cache_compressores, buscar_compressor
+from .ingestao import campos_cache_status, gravar_leituras
+from ..utils.error_handling import documento_nao_encontrado, erro_transitorio
+
+logger = logging.getLogger(__name__)
+
+# Configurações do spool (podem ser ajustadas por variáveis de ambiente)
+DIRETORIO_SPOOL = os.getenv("INGESTAO_SPOOL_DIR")
+POLITICA_FSYNC = os.getenv("INGESTAO_SPOOL_FSYNC", "intervalo")  # sempre | intervalo | nunca
+INTERVALO_FSYNC_SEGUNDOS = float(os.getenv("INGESTAO_SPOOL_FSYNC_INTERVALO", "1.0"))
+TAMANHO_MAXIMO_SEGMENTO = int(os.getenv("INGESTAO_SPOOL_SEGMENTO_MAX", str(8 * 1024 * 1024)))
+TAMANHO_LOTE_REPLAY = int(os.getenv("INGESTAO_SPOOL_LOTE", "400"))
+INTERVALO_REPLAY_SEGUNDOS = float(os.getenv("INGESTAO_SPOOL_INTERVALO", "0.5"))
+BACKOFF_MAXIMO_SEGUNDOS = float(os.getenv("INGESTAO_SPOOL_BACKOFF_MAX", "30"))
+
+CABECALHO = struct.Struct("<II")
+TAMANHO_MAXIMO_REGISTRO = 1024 * 1024
+PREFIXO_SEGMENTO = "segmento-"
+SUFIXO_SEGMENTO = ".log"
+ARQUIVO_CHECKPOINT = "checkpoint.json"
+ARQUIVO_LOCK = ".lock"
+
+# Arquivos de lock dos diretórios reservados (mantidos abertos até o fim do processo)
+_locks_diretorios = []
+
+# Posição no spool: (número do segmento, offset em bytes)
+Posicao = Tuple[int, int]
+
+
+def serializar_leitura(leitura: Dict[str, Any]) -> Dict[str, Any]:
+    """Converte a leitura para um dicionário serializável em JSON."""
+    return {k: (v.isoformat() if isinstance(v, datetime) else v) for k, v in leitura.items()}
+
+
+def registro_spool(doc_id: str, leitura: Dict[str, Any], atualizar_status: bool = True,
+                   alertas: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Monta o registro gravado no spool para uma leitura (e os alertas, se mudaram)."""
+    registro = {"doc_id": doc_id, "leitura": serializar_leitura(leitura), "atualizar_status": atualizar_status}
+    if alertas is not None:
+        registro["alertas"] = alertas
+    return registro
+
+
+def desserializar_leitura(dados: Dict[str, Any]) -> Dict[str, Any]:
+    """Reconstrói a leitura gravada no spool (data_medicao volta a ser datetime)."""
+    leitura = dict(dados)
+    if isinstance(leitura.get("data_medicao"), str):
+        leitura["data_medicao"] = datetime.fromisoformat(leitura["data_medicao"])
+    return leitura
+
+
+def reservar_diretorio(base: str) -> str:
+    """Diretório do spool deste processo: o primeiro livre entre `base`, `base/worker-1`, ...
+
+    Com vários workers, cada um mantém um lock exclusivo (flock) no seu diretório
+    enquanto estiver vivo; um worker reiniciado retoma um diretório liberado a partir
+    do checkpoint de quem o usava. Com um único worker o diretório é o próprio `base`.
+    """
+    try:
+        import fcntl
+    except ImportError:  # Sem flock (Windows): um único processo
+        return base
+    numero = 0
+    while True:
+        diretorio = base if numero == 0 else os.path.join(base, f"worker-{numero}")
+        os.makedirs(diretorio, exist_ok=True)
+        arquivo = open(os.path.join(diretorio, ARQUIVO_LOCK), "a")
+        try:
+            fcntl.flock(arquivo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            arquivo.close()
+            numero += 1
+            continue
+        _locks_diretorios.append(arquivo)
+        return diretorio
+
+
+class Spool:
+    """Log append-only em segmentos, com CRC por registro e checkpoint de leitura."""
+
+    def __init__(self, diretorio: str, politica_fsync: str = "intervalo",
+                 intervalo_fsync: float = 1.0, tamanho_maximo_segmento: int = 8 * 1024 * 1024):
+        if politica_fsync not in ("sempre", "intervalo", "nunca"):
+            raise ValueError(f"Política de fsync inválida: {politica_fsync}")
+        self.diretorio = diretorio
+        self.politica_fsync = politica_fsync
+        self.intervalo_fsync = intervalo_fsync
+        self.tamanho_maximo_segmento = tamanho_maximo_segmento
+        self._lock = threading.Lock()
+        self._arquivo = None
+        self._segmento_atual = 0
+        self._ultimo_fsync = 0.0
+        self.anexados = 0
+        self.corrompidos = 0
+        # Registros inválidos já contados (relidos até o checkpoint passar por eles)
+        self._corrompidos_vistos: Set[Posicao] = set()
+        os.makedirs(diretorio, exist_ok=True)
+        # Nunca continuar um segmento antigo: a cauda pode ter ficado incompleta após um crash
+        segmentos = self.segmentos()
+        self._abrir_segmento((segmentos[-1] + 1) if segmentos else 1)
+
+    # Escrita
+
+    def anexar(self, registros: List[Dict[str, Any]]):
+        """Anexa registros ao spool aplicando a política de fsync (bloqueante)."""
+        dados = bytearray()
+        for registro in registros:
+            payload = json.dumps(registro, separators=(",", ":")).encode("utf-8")
+            dados += CABECALHO.pack(len(payload), zlib.crc32(payload))
+            dados += payload
+        with self._lock:
+            if self._arquivo.tell() + len(dados) > self.tamanho_maximo_segmento and self._arquivo.tell() > 0:
+                self._fechar_segmento()
+                self._abrir_segmento(self._segmento_atual + 1)
+            self._arquivo.write(dados)
+            self._arquivo.flush()
+            agora = time.monotonic()
+            if self.politica_fsync == "sempre" or (
+                self.politica_fsync == "intervalo" and agora - self._ultimo_fsync >= self.intervalo_fsync
+            ):
+                os.fsync(self._arquivo.fileno())
+                self._ultimo_fsync = agora
+            self.anexados += len(registros)
+
+    def sincronizar(self):
+        """Força o fsync do segmento atual."""
+        with self._lock:
+            if self._arquivo is not None:
+                self._arquivo.flush()
+                os.fsync(self._arquivo.fileno())
+                self._ultimo_fsync = time.monotonic()
+
+    def fechar(self):
+        with self._lock:
+            self._fechar_segmento()
+
+    # Leitura
+
+    def ler(self, posicao: Posicao, limite: int) -> Tuple[List[Tuple[Posicao, Dict[str, Any]]], Posicao]:
+        """Lê até `limite` registros a partir de `posicao`.
+
+        Retorna os pares (posição após o registro, registro) e a posição onde a
+        próxima leitura deve começar. Um registro incompleto no segmento ativo é
+        tratado como ainda não escrito; em um segmento selado (cauda corrompida por
+        crash), o restante é ignorado e a leitura segue para o próximo segmento,
+        mesmo que nenhum registro válido tenha sido lido.
+        """
+        resultado: List[Tuple[Posicao, Dict[str, Any]]] = []
+        segmento, offset = posicao
+        fim = posicao
+        for numero in self.segmentos():
+            if numero < segmento:
+                continue
+            if numero > segmento:
+                segmento, offset = numero, 0
+            ativo = numero == self._segmento_atual
+            with open(self._caminho(numero), "rb") as arquivo:
+                arquivo.seek(offset)
+                while len(resultado) < limite:
+                    cabecalho = arquivo.read(CABECALHO.size)
+                    if len(cabecalho) < CABECALHO.size:
+                        break
+                    tamanho, crc = CABECALHO.unpack(cabecalho)
+                    payload = arquivo.read(tamanho) if tamanho <= TAMANHO_MAXIMO_REGISTRO else b""
+                    if len(payload) < tamanho or zlib.crc32(payload) != crc:
+                        if not ativo and (numero, offset) not in self._corrompidos_vistos:
+                            self._corrompidos_vistos.add((numero, offset))
+                            self.corrompidos += 1
+                            logger.error(f"Registro inválido no segmento {numero} (offset {offset}); restante do segmento ignorado")
+                        break
+                    offset += CABECALHO.size + tamanho
+                    resultado.append(((numero, offset), json.loads(payload)))
+            fim = (numero, offset)
+            if len(resultado) >= limite or ativo:
+                break
+            # Segmento selado consumido (ou com a cauda corrompida): o checkpoint pode seguir para o próximo
+            proximo = self._proximo_segmento(numero)
+            if proximo is not None:
+                fim = (proximo, 0)
+                if resultado and resultado[-1][0][0] == numero:
+                    resultado[-1] = (fim, resultado[-1][1])
+        return resultado, fim
+
+    def _normalizar_posicao(self, posicao: Posicao) -> Posicao:
+        """Normaliza uma posição para o início do próximo segmento quando o atual já foi descartado."""
+        segmentos = self.segmentos()
+        if posicao[0] not in segmentos:
+            posteriores = [n for n in segmentos if n > posicao[0]]
+            return (posteriores[0], 0) if posteriores else posicao
+        return posicao
+
+    # Checkpoint
+
+    def carregar_checkpoint(self) -> Posicao:
+        caminho = os.path.join(self.diretorio, ARQUIVO_CHECKPOINT)
+        try:
+            with open(caminho, "r", encoding="utf-8") as arquivo:
+                dados = json.load(arquivo)
+            return self._normalizar_posicao((int(dados["segmento"]), int(dados["offset"])))
+        except FileNotFoundError:
+            segmentos = self.segmentos()
+            return (segmentos[0], 0) if segmentos else (self._segmento_atual, 0)
+        except (ValueError, KeyError) as e:
+            logger.error(f"Checkpoint do spool inválido ({str(e)}); reiniciando do primeiro segmento")
+            return (self.segmentos()[0], 0)
+
+    def salvar_checkpoint(self, posicao: Posicao):
+        """Persiste o checkpoint de forma atômica e remove segmentos já consumidos."""
+        caminho = os.path.join(self.diretorio, ARQUIVO_CHECKPOINT)
+        temporario = caminho + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as arquivo:
+            json.dump({"segmento": posicao[0], "offset": posicao[1]}, arquivo)
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+        os.replace(temporario, caminho)
+        for numero in self.segmentos():
+            if numero < posicao[0] and numero != self._segmento_atual:
+                os.remove(self._caminho(numero))
+
+    def pendentes_bytes(self, posicao: Posicao) -> int:
+        """Quantidade aproximada de bytes ainda não reprocessados."""
+        total = 0
+        for numero in self.segmentos():
+            if numero >= posicao[0]:
+                tamanho = os.path.getsize(self._caminho(numero))
+                total += tamanho - posicao[1] if numero == posicao[0] else tamanho
+        return max(total, 0)
+
+    # Segmentos
+
+    def segmentos(self) -> List[int]:
+        numeros = []
+        for nome in os.listdir(self.diretorio):
+            if nome.startswith(PREFIXO_SEGMENTO) and nome.endswith(SUFIXO_SEGMENTO):
+                try:
+                    numeros.append(int(nome[len(PREFIXO_SEGMENTO):-len(SUFIXO_SEGMENTO)]))
+                except ValueError:
+                    continue
+        return sorted(numeros)
+
+    def _proximo_segmento(self, numero: int) -> Optional[int]:
+        posteriores = [n for n in self.segmentos() if n > numero]
+        return posteriores[0] if posteriores else None
+
+    def _caminho(self, numero: int) -> str:
+        return os.path.join(self.diretorio, f"{PREFIXO_SEGMENTO}{numero:08d}{SUFIXO_SEGMENTO}")
+
+    def _abrir_segmento(self, numero: int):
+        self._segmento_atual = numero
+        self._arquivo = open(self._caminho(numero), "ab")
+        # Garantir que o novo arquivo de segmento sobreviva a um crash
+        fd = os.open(self.diretorio, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    def _fechar_segmento(self):
+        if self._arquivo is not None:
+            self._arquivo.flush()
+            if self.politica_fsync != "nunca":
+                os.fsync(self._arquivo.fileno())
+            self._arquivo.close()
+            self._arquivo = None
+
+
+class ReplayerSpool:
+    """Drena o spool para o Firestore em ordem, em lotes, com backoff durante indisponibilidade.
+
+    `gravar` e `resolver` podem ser substituídos (ex.: por um Firestore falso que
+    injeta falhas) para testar o comportamento de recuperação.
+    """
+
+    def __init__(self, spool: Spool, tamanho_lote: int = 400, intervalo: float = 0.5,
+                 backoff_maximo: float = 30.0,
+                 gravar: Callable[[List[Dict[str, Any]]], List[Any]] = gravar_leituras,
+                 resolver: Callable[[int], Any] = buscar_compressor):
+        self.spool = spool
+        self.tamanho_lote = tamanho_lote
+        self.intervalo = intervalo
+        self.backoff_maximo = backoff_maximo
+        self.gravar = gravar
+        self.resolver = resolver
+        self.posicao: Posicao = spool.carregar_checkpoint()
+        self._tarefa: Optional[asyncio.Task] = None
+        # Contadores
+        self.reprocessados = 0
+        self.descartados = 0
+        self.falhas_transitorias = 0
+        self.ultimo_erro: Optional[str] = None
+
+    @property
+    def ativo(self) -> bool:
+        return self._tarefa is not None and not self._tarefa.done()
+
+    async def iniciar(self):
+        if self.ativo:
+            return
+        self._tarefa = asyncio.create_task(self._executar())
+        logger.info(f"Replayer do spool iniciado em {self.spool.diretorio} (checkpoint={self.posicao})")
+
+    async def parar(self):
+        if self._tarefa is None:
+            return
+        self._tarefa.cancel()
+        try:
+            await self._tarefa
+        except asyncio.CancelledError:
+            pass
+        self._tarefa = None
+        await run_in_threadpool(self.spool.fechar)
+
+    def processar_lote(self) -> Tuple[int, bool]:
+        """Reprocessa um lote a partir do checkpoint (bloqueante).
+
+        Retorna (registros lidos, houve falha transitória). Em falha transitória
+        o checkpoint avança apenas até o último registro gravado antes dela.
+        """
+        lidos, fim = self.spool.ler(self.posicao, self.tamanho_lote)
+        if not lidos:
+            if fim != self.posicao:
+                # Só registros inválidos no fim de um segmento selado: seguir para o próximo
+                self.spool.salvar_checkpoint(fim)
+                self.posicao = fim
+            return 0, False
+
+        itens, posicoes, registros = [], [], []
+        for posicao, registro in lidos:
+            leitura = desserializar_leitura(registro["leitura"])
+            entrada = self.resolver(leitura["id_compressor"])
+            if not entrada.existe:
+                itens.append(None)
+            else:
+                itens.append({
+                    "ref": entrada.ref,
+                    "leitura": leitura,
+                    "doc_id": registro["doc_id"],
+                    "atualizar_status": registro.get("atualizar_status", True),
+                    "alertas": registro.get("alertas")
+                })
+            posicoes.append(posicao)
+            registros.append(registro)
+
+        validos = [item for item in itens if item is not None]
+        resultados = iter(self.gravar(validos) if validos else [])
+
+        nova_posicao = self.posicao
+        transitoria = False
+        for posicao, item, registro in zip(posicoes, itens, registros):
+            if item is None:
+                # Contado só aqui: um registro depois de uma falha transitória volta no próximo lote
+                self.descartados += 1
+                logger.warning(
+                    f"Leitura {registro['doc_id']} descartada do spool: "
+                    f"compressor {registro['leitura']['id_compressor']} não existe"
+                )
+                nova_posicao = posicao
+                continue
+            resultado = next(resultados)
+            if isinstance(resultado, Exception):
+                # NotFound: ID do compressor obsoleto em cache (ex.: migrado); é resolvido de novo
+                if erro_transitorio(resultado) or documento_nao_encontrado(resultado):
+                    transitoria = True
+                    self.falhas_transitorias += 1
+                    self.ultimo_erro = str(resultado)
+                    cache_compressores.invalidar(item["leitura"]["id_compressor"])
+                    break
+                self.descartados += 1
+                logger.error(f"Leitura {item['doc_id']} descartada do spool após erro permanente: {str(resultado)}")
+            else:
+                self.reprocessados += 1
+                if not item["atualizar_status"]:
+                    nova_posicao = posicao
+                    continue
+                leitura = item["leitura"]
+                cache_compressores.atualizar_campos(
+                    leitura["id_compressor"], campos_cache_status(leitura, item.get("alertas"))
+                )
+            nova_posicao = posicao
+
+        if nova_posicao != self.posicao:
+            self.spool.salvar_checkpoint(nova_posicao)
+            self.posicao = nova_posicao
+        return len(lidos), transitoria
+
+    async def _executar(self):
+        backoff = self.intervalo
+        while True:
+            try:
+                lidos, transitoria = await run_in_threadpool(self.processar_lote)
+            except Exception as e:
+                lidos, transitoria = 0, True
+                self.ultimo_erro = str(e)
+                logger.error(f"Erro inesperado no replayer do spool: {str(e)}")
+            if transitoria:
+                logger.warning(f"Firestore indisponível para o replay do spool; nova tentativa em {backoff:.1f}s")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.backoff_maximo)
+                continue
+            backoff = self.intervalo
+            if lidos < self.tamanho_lote:
+                await asyncio.sleep(self.intervalo)
+
+    def estatisticas(self) -> Dict[str, Any]:
+        return {
+            "ativo": self.ativo,
+            "diretorio": self.spool.diretorio,
+            "politica_fsync": self.spool.politica_fsync,
+            "checkpoint": {"segmento": self.posicao[0], "offset": self.posicao[1]},
+            "pendentes_bytes": self.spool.pendentes_bytes(self.posicao),
+            "anexados": self.spool.anexados,
+            "reprocessados": self.reprocessados,
+            "descartados": self.descartados,
+            "corrompidos": self.spool.corrompidos,
+            "falhas_transitorias": self.falhas_transitorias,
+            "ultimo_erro": self.ultimo_erro
+        }
+
+
+spool_ingestao: Optional[Spool] = None
+replayer_spool: Optional[ReplayerSpool] = None
+
+if DIRETORIO_SPOOL:
+    spool_ingestao = Spool(
+        reservar_diretorio(DIRETORIO_SPOOL),
+        politica_fsync=POLITICA_FSYNC,
+        intervalo_fsync=INTERVALO_FSYNC_SEGUNDOS,
+        tamanho_maximo_segmento=TAMANHO_MAXIMO_SEGMENTO
+    )
+    replayer_spool = ReplayerSpool(
+        spool_ingestao,
+        tamanho_lote=TAMANHO_LOTE_REPLAY,
+        intervalo=INTERVALO_REPLAY_SEGUNDOS,
+        backoff_maximo=BACKOFF_MAXIMO_SEGUNDOS
+    )
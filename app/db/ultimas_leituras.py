@@ -0,0 +1,35 @@
+"""Snapshot em memória da última leitura recebida de cada compressor."""
+import threading
+from typing import Any, Dict, Optional
+
+from .ingestao import resumo_leitura
+from ..utils.invalidacao import barramento_invalidacao
+from ..utils.datetime_utils import to_utc_timezone
+
+
+class UltimasLeituras:
+    """Mantém, por compressor, o resumo da leitura mais recente aceita na ingestão."""
+
+    def __init__(self):
+        self._leituras: Dict[int, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, leitura: Dict[str, Any]):
+        """Registra a leitura se ela for mais recente que a atual do compressor."""
+        resumo = resumo_leitura(leitura)
+        with self._lock:
+            atual = self._leituras.get(leitura["id_compressor"])
+            if atual is None or to_utc_timezone(resumo["data_medicao"]) >= to_utc_timezone(atual["data_medicao"]):
+                self._leituras[leitura["id_compressor"]] = resumo
+
+    def obter(self, id_compressor: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._leituras.get(id_compressor)
+
+    def remover(self, id_compressor: int):
+        with self._lock:
+            self._leituras.pop(id_compressor, None)
+
+
+ultimas_leituras = UltimasLeituras()
+barramento_invalidacao.assinar("compressor_excluido", lambda id_compressor, _: ultimas_leituras.remover(id_compressor))
@@ -1,15 +1,73 @@
+import logging
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from .api.sensors import router as sensors_router
 from .api.compressores import router as compressores_router
 from .api.configuracoes import router as configuracoes_router
+from .api.alertas import router as alertas_router
+from .api.stream import router as stream_router
+from .db.fila_ingestao import fila_ingestao, WRITE_BEHIND_ATIVO
+from .db.spool import replayer_spool
+from .db.rollups import agregador_rollups, ROLLUPS_ATIVOS
+from .db.escritas_compressor import escritas_compressor
+from .db.alertas_ativos import indice_alertas
+from .db.repositorio import repositorio
+from .db.cache_compressores import cache_compressores
+from .db.configuracoes_compressor import cache_limites
+from .db.coalescencia import leituras_coalescidas
+from .utils.difusao import barramento_eventos
+from .utils.alertas import numpy_disponivel
 from .utils.error_handling import setup_logging
+from .utils.invalidacao import barramento_invalidacao
+from .utils.metricas import METRICAS_ATIVAS, MiddlewareMetricas, metricas
+from .utils.respostas_json import JSON_RAPIDO
 
 # Arquivo principal da aplicação dentro do pacote app.
 
 # Configurar logging
 setup_logging()
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Dependências opcionais (requirements.txt): qual caminho está ativo neste worker
+    logger.info(
+        "Serialização das respostas: %s; alertas em lote: %s",
+        "orjson (JSON_RAPIDO)" if JSON_RAPIDO else "padrão do FastAPI",
+        "NumPy" if numpy_disponivel() else "bisect (NumPy não instalado)"
+    )
+    # Backend de armazenamento: o Firestore é inicializado/aquecido em segundo plano
+    repositorio.iniciar()
+    # Canal de invalidação dos caches entre os workers da máquina (aberto depois do fork)
+    await barramento_invalidacao.iniciar()
+    # Flusher da fila de ingestão write-behind (opcional)
+    if WRITE_BEHIND_ATIVO:
+        await fila_ingestao.iniciar()
+    # Replayer do spool em disco (opcional): retoma a partir do checkpoint
+    if replayer_spool is not None:
+        await replayer_spool.iniciar()
+    # Flush periódico dos rollups (séries de 1m/15m/1h)
+    if ROLLUPS_ATIVOS:
+        await agregador_rollups.iniciar()
+    # Gravação das atualizações de compressores agrupadas na janela de coalescência
+    await escritas_compressor.iniciar()
+    # Índice de alertas ativos (recarregado do repositório em segundo plano) e gravação dos eventos de transição
+    await indice_alertas.iniciar()
+    yield
+    # Drenar leituras pendentes antes de encerrar
+    await fila_ingestao.parar()
+    if replayer_spool is not None:
+        await replayer_spool.parar()
+    if ROLLUPS_ATIVOS:
+        await agregador_rollups.parar()
+    await escritas_compressor.parar()
+    await indice_alertas.parar()
+    await barramento_invalidacao.parar()
+    await repositorio.fechar_async()
+
 
 def create_app() -> FastAPI:
     app = FastAPI(
@@ -17,7 +75,8 @@ def create_app() -> FastAPI:
         description="API para monitoramento de compressores industriais com sistema de alertas inteligente",
         version="1.0.0",
         docs_url="/docs" if os.getenv("ENVIRONMENT") != "production" else None,
-        redoc_url="/redoc" if os.getenv("ENVIRONMENT") != "production" else None
+        redoc_url="/redoc" if os.getenv("ENVIRONMENT") != "production" else None,
+        lifespan=lifespan
     )
     
     # Configurar CORS - mais restritivo em produção
@@ -42,8 +101,30 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
         allow_headers=["*"],
+        # Dashboards que fazem GET condicional leem a ETag da resposta
+        expose_headers=["ETag"],
     )
     
+    # Métricas de desempenho (opcional): latência por rota, chamadas ao banco e caches
+    if METRICAS_ATIVAS:
+        app.add_middleware(MiddlewareMetricas)
+        metricas.registrar_coletor("cache_compressores", cache_compressores.estatisticas)
+        metricas.registrar_coletor("cache_limites", cache_limites.estatisticas)
+        metricas.registrar_coletor("fila_ingestao", fila_ingestao.estatisticas)
+        metricas.registrar_coletor("escritas_compressor", escritas_compressor.estatisticas)
+        metricas.registrar_coletor("alertas_ativos", indice_alertas.estatisticas)
+        metricas.registrar_coletor("streams", barramento_eventos.estatisticas)
+        metricas.registrar_coletor("invalidacao_workers", barramento_invalidacao.estatisticas)
+        metricas.registrar_coletor("coalescencia_leituras", leituras_coalescidas.estatisticas)
+        if ROLLUPS_ATIVOS:
+            metricas.registrar_coletor("rollups", agregador_rollups.estatisticas)
+        if replayer_spool is not None:
+            metricas.registrar_coletor("spool", replayer_spool.estatisticas)
+
+        @app.get("/metrics", include_in_schema=False)
+        async def exportar_metricas():
+            return PlainTextResponse(metricas.exportar(), media_type="text/plain; version=0.0.4")
+    
     # Rota de health check
     @app.get("/health")
     async def health_check():
@@ -53,6 +134,8 @@ def create_app() -> FastAPI:
     app.include_router(sensors_router)
     app.include_router(compressores_router)
     app.include_router(configuracoes_router)
+    app.include_router(alertas_router)
+    app.include_router(stream_router)
     
     return app
 
@@ -98,10 +98,12 @@ class AlertaAtivo(BaseModel):
     """Modelo para alertas ativos no sistema."""
     id_compressor: int = Field(..., gt=0, description="ID do compressor")
     tipo_alerta: str = Field(..., description="Tipo do alerta")
+    origem: str = Field(..., description="Origem da avaliação (servidor: 5 níveis; esp32: 3 níveis)")
+    nivel: str = Field(..., description="Nível avaliado do parâmetro (ex.: alto, critico)")
     prioridade: PrioridadeAlerta = Field(..., description="Prioridade do alerta")
     mensagem: str = Field(..., description="Mensagem do alerta")
-    valor_atual: float = Field(..., description="Valor atual que disparou o alerta")
-    valor_limite: float = Field(..., description="Valor limite configurado")
+    valor_atual: Optional[float] = Field(default=None, description="Valor atual que disparou o alerta (não informado pelo ESP32)")
+    valor_limite: Optional[float] = Field(default=None, description="Valor limite configurado (não informado pelo ESP32)")
     data_disparo: datetime = Field(..., description="Data e hora do disparo")
     ativo: bool = Field(default=True, description="Se o alerta ainda está ativo")
     reconhecido: bool = Field(default=False, description="Se o alerta foi reconhecido pelo operador")
\ No newline at end of file
@@ -1,8 +1,34 @@
-from typing import Dict, Any
+import copy
+import importlib.util
+import os
+from bisect import bisect_left
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Sequence
 from ..models.sensor import SensorData
-from ..utils.datetime_utils import now_br
+from ..utils.datetime_utils import BR_TIMEZONE
 import logging
 
+# NumPy é opcional (sem ele, a avaliação em lote usa bisect) e só é importado no
+# primeiro lote: o import custa ~100 ms no cold start
+_numpy: Any = None
+
+
+def carregar_numpy():
+    """Módulo `numpy`, importado sob demanda; None se não estiver instalado."""
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+            _numpy = numpy
+        except ImportError:
+            _numpy = False
+    return _numpy or None
+
+
+def numpy_disponivel() -> bool:
+    """Se o NumPy está instalado, sem importá-lo (log do startup)."""
+    return _numpy is not False and (_numpy is not None or importlib.util.find_spec("numpy") is not None)
+
 logger = logging.getLogger(__name__)
 
 # Configurações baseadas em Compressores Médios (15-37 kW) - 5 níveis
@@ -57,60 +83,215 @@ def avaliar_nivel(valor: float, limites: Dict[str, Dict[str, float]]) -> str:
     # Fallback para normal se não encontrar correspondência
     return "normal"
 
-def gerar_alertas(sensor_data: SensorData) -> Dict[str, str]:
-    """Gera alertas baseados nos dados do sensor e nas configurações fixas."""
-    logger.info(f"Gerando alertas para compressor {sensor_data.id_compressor}")
-    
-    alertas = {}
-    
-    # Avaliar pressão
-    alertas["pressao"] = avaliar_nivel(sensor_data.pressao, CONFIGURACAO_FIXA["limites_pressao"])
-    
-    # Avaliar temperatura do equipamento
-    alertas["temperatura_equipamento"] = avaliar_nivel(
-        sensor_data.temp_equipamento, 
-        CONFIGURACAO_FIXA["limites_temp_equipamento"]
-    )
-    
-    # Avaliar temperatura ambiente
-    alertas["temperatura_ambiente"] = avaliar_nivel(
-        sensor_data.temp_ambiente, 
-        CONFIGURACAO_FIXA["limites_temp_ambiente"]
-    )
-    
-    # Avaliar potência/consumo
-    alertas["potencia"] = avaliar_nivel(
-        sensor_data.potencia_kw, 
-        CONFIGURACAO_FIXA["limites_potencia"]
-    )
-    
-    # Avaliar umidade
-    alertas["umidade"] = avaliar_nivel(
-        sensor_data.umidade, 
-        CONFIGURACAO_FIXA["limites_umidade"]
-    )
+class LimitesCompilados:
+    """Limites de um parâmetro compilados em fronteiras ordenadas.
+
+    As fronteiras (todos os `min`/`max`) dividem a reta em pontos e intervalos
+    abertos; o nível de cada um é pré-calculado com `avaliar_nivel`, preservando
+    exatamente suas regras (prioridade critico -> muito_baixo nas faixas
+    sobrepostas, limites inclusivos e fallback "normal"). A avaliação passa a
+    ser uma busca binária (`bisect`) ou `numpy.searchsorted` para lotes.
+    """
+
+    NIVEIS = ("critico", "alto", "normal", "baixo", "muito_baixo")
+
+    def __init__(self, limites: Dict[str, Dict[str, float]]):
+        pontos = sorted({valor for nivel in self.NIVEIS for valor in (limites[nivel]["min"], limites[nivel]["max"])})
+        codigos = {nivel: codigo for codigo, nivel in enumerate(self.NIVEIS)}
+        self.limites = limites
+        self.pontos = pontos
+        self.niveis_ponto = [avaliar_nivel(p, limites) for p in pontos]
+        self.niveis_intervalo = [
+            avaliar_nivel(self._representante(pontos, i), limites) for i in range(len(pontos) + 1)
+        ]
+        self._codigo_normal = codigos["normal"]
+        # Vetores do NumPy, montados no primeiro `avaliar_lote`
+        self._vetores = None
+
+    @staticmethod
+    def _representante(pontos: List[float], i: int) -> float:
+        # Valor interno ao intervalo aberto entre pontos[i-1] e pontos[i]
+        if i == 0:
+            return pontos[0] - max(1.0, abs(pontos[0]))
+        if i == len(pontos):
+            return pontos[-1] + max(1.0, abs(pontos[-1]))
+        a, b = pontos[i - 1], pontos[i]
+        if a == float("-inf") and b == float("inf"):
+            return 0.0
+        if a == float("-inf"):
+            return b - max(1.0, abs(b))
+        if b == float("inf"):
+            return a + max(1.0, abs(a))
+        return a + (b - a) / 2
+
+    def limite(self, nivel: str) -> Optional[float]:
+        """Fronteira que dispara o nível: `min` para alto/critico, `max` para baixo/muito_baixo."""
+        if nivel in ("alto", "critico"):
+            return self.limites[nivel]["min"]
+        if nivel in ("baixo", "muito_baixo"):
+            return self.limites[nivel]["max"]
+        return None
+
+    def avaliar(self, valor: float) -> str:
+        """Avalia um único valor (equivalente a `avaliar_nivel`)."""
+        if valor != valor:  # NaN não pertence a nenhuma faixa
+            return "normal"
+        i = bisect_left(self.pontos, valor)
+        if i < len(self.pontos) and self.pontos[i] == valor:
+            return self.niveis_ponto[i]
+        return self.niveis_intervalo[i]
+
+    def _montar_vetores(self, np):
+        codigos = {nivel: codigo for codigo, nivel in enumerate(self.NIVEIS)}
+        self._vetores = (
+            np.asarray(self.pontos, dtype=float),
+            np.asarray([codigos[n] for n in self.niveis_ponto], dtype=np.int8),
+            np.asarray([codigos[n] for n in self.niveis_intervalo], dtype=np.int8),
+            np.asarray(self.NIVEIS, dtype=object),
+        )
+        return self._vetores
+
+    def avaliar_lote(self, valores: Sequence[float]) -> List[str]:
+        """Avalia uma coluna de valores de uma vez (vetorizado com NumPy, se disponível)."""
+        np = carregar_numpy()
+        if np is None:
+            return [self.avaliar(v) for v in valores]
+        arr = np.asarray(valores, dtype=float)
+        if not len(self.pontos):
+            return ["normal"] * len(arr)
+        pontos, codigos_ponto, codigos_intervalo, nomes = self._vetores or self._montar_vetores(np)
+        idx = np.searchsorted(pontos, arr, side="left")
+        idx_ponto = np.minimum(idx, len(self.pontos) - 1)
+        no_ponto = (idx < len(self.pontos)) & (pontos[idx_ponto] == arr)
+        codigos = np.where(no_ponto, codigos_ponto[idx_ponto], codigos_intervalo[idx])
+        codigos[np.isnan(arr)] = self._codigo_normal
+        return nomes[codigos].tolist()
+
+
+# Parâmetros avaliados: (chave do alerta, campo da leitura, chave dos limites)
+PARAMETROS_ALERTA = (
+    ("pressao", "pressao", "limites_pressao"),
+    ("temperatura_equipamento", "temp_equipamento", "limites_temp_equipamento"),
+    ("temperatura_ambiente", "temp_ambiente", "limites_temp_ambiente"),
+    ("potencia", "potencia_kw", "limites_potencia"),
+    ("umidade", "umidade", "limites_umidade"),
+)
+
+
+def compilar_configuracao(configuracao: Dict[str, Dict[str, Dict[str, float]]]) -> Dict[str, LimitesCompilados]:
+    """Compila todos os limites de uma configuração (feito uma vez, não por leitura)."""
+    return {chave: LimitesCompilados(limites) for chave, limites in configuracao.items()}
+
+
+# Configuração fixa compilada no carregamento do módulo
+CONFIGURACAO_FIXA_COMPILADA = compilar_configuracao(CONFIGURACAO_FIXA)
+
+
+def gerar_alertas_lote(leituras: Sequence[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """Classifica várias leituras de uma vez, avaliando cada parâmetro como uma coluna.
+
+    Útil para reclassificar históricos (backfills, relatórios) e ingestão em lote.
+    """
+    colunas = {}
+    for chave, campo, chave_limites in PARAMETROS_ALERTA:
+        colunas[chave] = CONFIGURACAO_FIXA_COMPILADA[chave_limites].avaliar_lote([l[campo] for l in leituras])
+    colunas["vibracao"] = ["critico" if l["vibracao"] else "normal" for l in leituras]
+    return [dict(zip(colunas, niveis)) for niveis in zip(*colunas.values())]
+
+
+# Limites configuráveis por compressor (ConfiguracaoParametros) e chave correspondente na configuração fixa
+LIMITES_CONFIGURAVEIS = ("limites_pressao", "limites_temp_equipamento", "limites_temp_ambiente")
+
+
+def faixas_de_limites(limites: Dict[str, float]) -> Dict[str, Dict[str, float]]:
+    """Converte LimitesPressao/LimitesTemperatura nas 5 faixas usadas na avaliação.
+
+    muito_baixo abaixo de `minimo`, baixo até `ideal_minimo`, normal até `ideal_maximo`,
+    alto até `critico` e critico a partir dele. O `maximo` (limite operacional) fica
+    dentro da faixa "alto". Nas fronteiras vale a mesma prioridade de `avaliar_nivel`.
+    """
+    return {
+        "muito_baixo": {"min": float("-inf"), "max": limites["minimo"]},
+        "baixo": {"min": limites["minimo"], "max": limites["ideal_minimo"]},
+        "normal": {"min": limites["ideal_minimo"], "max": limites["ideal_maximo"]},
+        "alto": {"min": limites["ideal_maximo"], "max": limites["critico"]},
+        "critico": {"min": limites["critico"], "max": float("inf")}
+    }
+
+
+def compilar_parametros(configuracao: Optional[Dict[str, Any]]) -> Dict[str, LimitesCompilados]:
+    """Compila os limites de um compressor: faixas configuradas sobre a configuração fixa.
+
+    Sem configuração (ou para parâmetros não configurados) vale a configuração fixa.
+    """
+    if not configuracao:
+        return CONFIGURACAO_FIXA_COMPILADA
+    compilados = dict(CONFIGURACAO_FIXA_COMPILADA)
+    for chave_limites in LIMITES_CONFIGURAVEIS:
+        if configuracao.get(chave_limites):
+            compilados[chave_limites] = LimitesCompilados(faixas_de_limites(configuracao[chave_limites]))
+    return compilados
+
+
+def avaliar_leitura(leitura: Dict[str, Any], limites: Dict[str, LimitesCompilados] = CONFIGURACAO_FIXA_COMPILADA) -> Dict[str, str]:
+    """Avalia o nível de cada parâmetro de uma leitura (sem logs; usado no caminho da ingestão)."""
+    alertas = {
+        chave: limites[chave_limites].avaliar(leitura[campo])
+        for chave, campo, chave_limites in PARAMETROS_ALERTA
+    }
+    # Vibração é booleana: crítico se detectada
+    alertas["vibracao"] = "critico" if leitura["vibracao"] else "normal"
+    return alertas
+
+
+def gerar_alertas(sensor_data: SensorData, limites: Dict[str, LimitesCompilados] = CONFIGURACAO_FIXA_COMPILADA) -> Dict[str, str]:
+    """Gera alertas baseados nos dados do sensor e nos limites (fixos, por padrão)."""
+    logger.debug("Gerando alertas para compressor %s", sensor_data.id_compressor)
     
-    # Avaliar vibração (booleano - crítico se detectada)
-    alertas["vibracao"] = "critico" if sensor_data.vibracao else "normal"
+    alertas = avaliar_leitura(sensor_data.model_dump(), limites)
     
     # Log dos alertas gerados
     alertas_anormais = {k: v for k, v in alertas.items() if v != "normal"}
     if alertas_anormais:
-        logger.warning(f"Alertas detectados no compressor {sensor_data.id_compressor}: {alertas_anormais}")
+        logger.warning("Alertas detectados no compressor %s: %s", sensor_data.id_compressor, alertas_anormais)
     else:
-        logger.info(f"Todos os parâmetros normais no compressor {sensor_data.id_compressor}")
+        logger.debug("Todos os parâmetros normais no compressor %s", sensor_data.id_compressor)
     
     return alertas
 
 def obter_configuracao_fixa() -> Dict[str, Any]:
-    """Retorna a configuração fixa do sistema."""
-    return {
+    """Retorna uma cópia da configuração fixa do sistema (montada uma única vez, na carga do módulo)."""
+    return copy.deepcopy(_CONFIGURACAO_FIXA_COMPLETA)
+
+
+def _data_aplicacao_configuracao_fixa() -> Optional[datetime]:
+    """Data em que a versão atual da configuração fixa entrou em vigor, informada no deploy.
+
+    Datas sem timezone são do horário de Brasília; sem a variável (ou com valor inválido),
+    `data_aplicacao` é omitido da configuração.
+    """
+    valor = os.getenv("CONFIGURACAO_FIXA_DATA_APLICACAO")
+    if not valor:
+        return None
+    try:
+        data = datetime.fromisoformat(valor)
+    except ValueError:
+        logger.warning("CONFIGURACAO_FIXA_DATA_APLICACAO inválida (%r): data_aplicacao omitida", valor)
+        return None
+    return data if data.tzinfo is not None else data.replace(tzinfo=BR_TIMEZONE)
+
+
+# Igual em todos os processos (não é o instante em que cada um carregou o módulo)
+DATA_APLICACAO_CONFIGURACAO_FIXA = _data_aplicacao_configuracao_fixa()
+
+
+def _montar_configuracao_fixa() -> Dict[str, Any]:
+    configuracao = {
         "configuracao": CONFIGURACAO_FIXA,
         "descricao": "Compressores Médios (15-37 kW) - Faixa intermediária ideal",
         "categoria": "compressores_medios",
         "faixa_potencia": "15-37 kW",
         "versao": "1.1",
-        "data_aplicacao": now_br(),
         "especificacoes_gerais": {
             "potencia_kw": {"minimo": 15, "maximo": 37, "ideal": 22},
             "pressao_bar": {"minimo": 7, "maximo": 10, "padrao": 8.5},
@@ -154,4 +335,10 @@ def obter_configuracao_fixa() -> Dict[str, Any]:
             "alto": {"cor": "laranja", "descricao": "Valor alto - atenção necessária"},
             "critico": {"cor": "vermelho", "descricao": "Valor crítico - intervenção imediata"}
         }
-    }
\ No newline at end of file
+    }
+    if DATA_APLICACAO_CONFIGURACAO_FIXA is not None:
+        configuracao["data_aplicacao"] = DATA_APLICACAO_CONFIGURACAO_FIXA
+    return configuracao
+
+
+_CONFIGURACAO_FIXA_COMPLETA = _montar_configuracao_fixa()
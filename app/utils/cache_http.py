@@ -0,0 +1,70 @@
+"""ETags e GET condicional (`If-None-Match` -> 304) para as rotas consultadas por dashboards.
+
+- Respostas dinâmicas (compressores): ETag fraca derivada da versão dos documentos
+  (`data_ultima_atualizacao` etc.); com 304 o corpo não é montado nem serializado.
+- Respostas estáticas (configuração fixa): `RespostaEstatica` serializa o corpo uma única
+  vez e o envia com `Cache-Control: max-age`.
+"""
+import hashlib
+import os
+from typing import Any, Optional
+
+import pydantic_core
+from fastapi import Request, Response
+
+# Configurações (podem ser ajustadas por variáveis de ambiente)
+MAX_AGE_CONFIGURACAO_SEGUNDOS = int(os.getenv("HTTP_CACHE_CONFIGURACAO_MAX_AGE", "300"))
+MAX_AGE_COMPRESSORES_SEGUNDOS = int(os.getenv("HTTP_CACHE_COMPRESSORES_MAX_AGE", "0"))
+
+
+def cache_control(max_age: int, publico: bool = False) -> str:
+    """Valor do `Cache-Control`: com max-age 0 o cliente sempre revalida (ETag)."""
+    escopo = "public" if publico else "private"
+    return f"{escopo}, max-age={max_age}" if max_age > 0 else f"{escopo}, no-cache"
+
+
+CACHE_CONTROL_CONFIGURACAO = cache_control(MAX_AGE_CONFIGURACAO_SEGUNDOS, publico=True)
+CACHE_CONTROL_COMPRESSORES = cache_control(MAX_AGE_COMPRESSORES_SEGUNDOS)
+
+
+def calcular_etag(*versao: Any) -> str:
+    """ETag fraca a partir dos valores que identificam a versão da resposta."""
+    return f'W/"{hashlib.blake2b(repr(versao).encode(), digest_size=12).hexdigest()}"'
+
+
+def etag_confere(request: Request, etag: str) -> bool:
+    """Se algum ETag de `If-None-Match` corresponde (comparação fraca, como no RFC 9110)."""
+    cabecalho = request.headers.get("if-none-match")
+    if not cabecalho:
+        return False
+    if cabecalho.strip() == "*":
+        return True
+    alvo = etag.removeprefix("W/")
+    return any(item.strip().removeprefix("W/") == alvo for item in cabecalho.split(","))
+
+
+def nao_modificado(etag: str, controle: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": controle})
+
+
+def definir_cabecalhos(response: Response, etag: str, controle: str):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = controle
+
+
+class RespostaEstatica:
+    """Corpo JSON serializado uma única vez, no mesmo formato das respostas do FastAPI (inf/nan -> null).
+
+    Sem `etag`, usa uma ETag forte do conteúdo; informe uma ETag de versão quando o corpo
+    tiver campos que variam entre processos (ex.: instante de carga) mas não mudam o significado.
+    """
+
+    def __init__(self, conteudo: Any, controle: str, etag: Optional[str] = None):
+        self.corpo = pydantic_core.to_json(conteudo, inf_nan_mode="null")
+        self.etag = etag or f'"{hashlib.blake2b(self.corpo, digest_size=12).hexdigest()}"'
+        self.cabecalhos = {"ETag": self.etag, "Cache-Control": controle}
+
+    def responder(self, request: Request) -> Response:
+        if etag_confere(request, self.etag):
+            return Response(status_code=304, headers=self.cabecalhos)
+        return Response(content=self.corpo, media_type="application/json", headers=self.cabecalhos)
@@ -0,0 +1,148 @@
+"""Difusão em tempo real (pub/sub em memória) de leituras e transições de alertas.
+
+Cada assinante (conexão SSE ou WebSocket) tem uma fila limitada. A publicação
+nunca espera por um assinante: se a fila dele estiver cheia, o assinante é
+considerado lento e desconectado (o cliente pode reconectar). O evento é
+serializado uma única vez, independentemente do número de assinantes.
+Deve ser usado a partir do event loop (handlers assíncronos).
+
+Com vários workers, cada um tem os seus assinantes, mas a leitura é recebida por
+apenas um deles. Com `STREAM_ENTRE_WORKERS` ativo (padrão), o evento também é
+repassado pelo barramento de invalidação aos workers que têm assinantes no momento
+(marcador `eventos`); sem ele, os clientes de stream só veem as leituras recebidas
+pelo próprio worker e precisam ficar fixados nele. O repasse segue a regra do
+barramento: com o buffer do destino cheio, o evento é descartado (`descartadas`).
+"""
+import asyncio
+import logging
+import os
+from typing import Any, Dict, Optional, Set
+
+from .invalidacao import barramento_invalidacao
+from .paginacao import linha_ndjson
+
+logger = logging.getLogger(__name__)
+
+# Configurações (podem ser ajustadas por variáveis de ambiente)
+TAMANHO_FILA_ASSINANTE = int(os.getenv("STREAM_FILA_MAX", "100"))
+MAXIMO_ASSINANTES = int(os.getenv("STREAM_MAX_ASSINANTES", "1000"))
+INTERVALO_KEEPALIVE_SEGUNDOS = float(os.getenv("STREAM_KEEPALIVE", "15"))
+REPASSE_ENTRE_WORKERS = os.getenv("STREAM_ENTRE_WORKERS", "true").lower() in ("1", "true", "sim")
+
+# Marcador dos workers com assinantes no barramento de invalidação
+MARCADOR_ASSINANTES = "eventos"
+
+
+class Assinatura:
+    """Fila de eventos de um assinante, opcionalmente filtrada por compressor."""
+    __slots__ = ("id_compressor", "fila", "encerrada")
+
+    def __init__(self, id_compressor: Optional[int], tamanho_fila: int):
+        self.id_compressor = id_compressor
+        # +1 para sempre caber o aviso de encerramento
+        self.fila: asyncio.Queue = asyncio.Queue(maxsize=tamanho_fila + 1)
+        self.encerrada = False
+
+    async def proximo(self, timeout: float):
+        """Próximo evento (tipo, json), None se encerrada ou `...` em caso de timeout (keepalive)."""
+        try:
+            return await asyncio.wait_for(self.fila.get(), timeout)
+        except asyncio.TimeoutError:
+            return ...
+
+
+class BarramentoEventos:
+    """Distribui eventos para os assinantes do compressor e para os assinantes de todos."""
+
+    def __init__(self, tamanho_fila: int, maximo_assinantes: int, repassar: bool = False):
+        self.tamanho_fila = tamanho_fila
+        self.maximo_assinantes = maximo_assinantes
+        self.repassar = repassar
+        self._por_compressor: Dict[int, Set[Assinatura]] = {}
+        self._todos: Set[Assinatura] = set()
+        # Contadores
+        self.publicados = 0
+        self.entregues = 0
+        self.desconectados_lentos = 0
+        self.recebidos_workers = 0
+
+    @property
+    def total_assinantes(self) -> int:
+        return len(self._todos) + sum(len(s) for s in self._por_compressor.values())
+
+    def assinar(self, id_compressor: Optional[int] = None) -> Optional[Assinatura]:
+        """Cria uma assinatura (None quando o limite de assinantes foi atingido)."""
+        if self.total_assinantes >= self.maximo_assinantes:
+            return None
+        assinatura = Assinatura(id_compressor, self.tamanho_fila)
+        if self.repassar and self.total_assinantes == 0:
+            # Primeiro assinante: passar a receber os eventos dos outros workers
+            barramento_invalidacao.marcar(MARCADOR_ASSINANTES, True)
+        if id_compressor is None:
+            self._todos.add(assinatura)
+        else:
+            self._por_compressor.setdefault(id_compressor, set()).add(assinatura)
+        return assinatura
+
+    def cancelar(self, assinatura: Assinatura):
+        if assinatura.encerrada:
+            return
+        assinatura.encerrada = True
+        if assinatura.id_compressor is None:
+            self._todos.discard(assinatura)
+        else:
+            assinaturas = self._por_compressor.get(assinatura.id_compressor)
+            if assinaturas is not None:
+                assinaturas.discard(assinatura)
+                if not assinaturas:
+                    del self._por_compressor[assinatura.id_compressor]
+        if self.repassar and self.total_assinantes == 0:
+            barramento_invalidacao.marcar(MARCADOR_ASSINANTES, False)
+
+    def publicar(self, tipo: str, id_compressor: int, dados: Dict[str, Any], propagar: bool = True):
+        """Publica um evento; sem assinantes interessados, não serializa nada.
+
+        Com `propagar`, repassa também aos workers com assinantes (ver docstring do módulo).
+        """
+        if propagar and self.repassar:
+            barramento_invalidacao.publicar("evento", id_compressor, {"tipo": tipo, "dados": dados}, MARCADOR_ASSINANTES)
+        destinos = self._por_compressor.get(id_compressor)
+        if not destinos and not self._todos:
+            return
+        self.publicados += 1
+        evento = (tipo, linha_ndjson({"tipo": tipo, "id_compressor": id_compressor, "dados": dados}).rstrip("\n"))
+        for assinatura in list(destinos or ()) + list(self._todos):
+            if assinatura.fila.qsize() >= self.tamanho_fila:
+                # Assinante lento: desconectar em vez de acumular eventos em memória
+                self.desconectados_lentos += 1
+                self.cancelar(assinatura)
+                assinatura.fila.put_nowait(None)
+                logger.warning(f"Assinante lento desconectado do stream (compressor={assinatura.id_compressor})")
+                continue
+            assinatura.fila.put_nowait(evento)
+            self.entregues += 1
+
+    def estatisticas(self) -> Dict[str, Any]:
+        return {
+            "assinantes": self.total_assinantes,
+            "assinantes_todos": len(self._todos),
+            "compressores_assinados": len(self._por_compressor),
+            "capacidade_fila": self.tamanho_fila,
+            "publicados": self.publicados,
+            "entregues": self.entregues,
+            "desconectados_lentos": self.desconectados_lentos,
+            "repasse_entre_workers": self.repassar,
+            "recebidos_workers": self.recebidos_workers
+        }
+
+    def _receber_repasse(self, id_compressor: int, evento: Dict[str, Any]):
+        self.recebidos_workers += 1
+        self.publicar(evento["tipo"], id_compressor, evento["dados"], propagar=False)
+
+
+barramento_eventos = BarramentoEventos(
+    tamanho_fila=TAMANHO_FILA_ASSINANTE,
+    maximo_assinantes=MAXIMO_ASSINANTES,
+    repassar=REPASSE_ENTRE_WORKERS
+)
+barramento_invalidacao.assinar("evento", barramento_eventos._receber_repasse)
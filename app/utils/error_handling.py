@@ -1,8 +1,17 @@
 """Utilitários para tratamento de erros e logging."""
+import atexit
+import functools
+import inspect
+import itertools
+import json
 import logging
-from typing import Any, Callable, Optional
+import logging.handlers
+import os
+import queue
+import time
+from typing import Any, Callable, List, Optional
 from fastapi import HTTPException
-from firebase_admin import exceptions as firebase_exceptions
+from ..db.repositorio import DocumentoJaExiste, DocumentoNaoEncontrado
 
 # Configurar logger
 logger = logging.getLogger(__name__)
@@ -13,36 +22,107 @@ class FirestoreError(Exception):
     pass
 
 
+def _excecoes_firestore():
+    # Importadas só quando há um erro a classificar: o firebase_admin pesa no cold start
+    from firebase_admin import exceptions as firebase_exceptions
+    from google.api_core import exceptions as google_exceptions
+    return firebase_exceptions, google_exceptions
+
+
+def converter_excecao_firestore(e: Exception) -> HTTPException:
+    """Converte uma exceção do banco de dados na HTTPException correspondente (com log)."""
+    firebase_exceptions, google_exceptions = _excecoes_firestore()
+    if isinstance(e, (firebase_exceptions.NotFoundError, google_exceptions.NotFound, DocumentoNaoEncontrado)):
+        logger.warning(f"Documento não encontrado: {str(e)}")
+        return HTTPException(status_code=404, detail="Documento não encontrado")
+    if isinstance(e, (firebase_exceptions.AlreadyExistsError, google_exceptions.AlreadyExists, DocumentoJaExiste)):
+        logger.warning(f"Documento já existe: {str(e)}")
+        return HTTPException(status_code=409, detail="Documento já existe")
+    if isinstance(e, (firebase_exceptions.PermissionDeniedError, google_exceptions.PermissionDenied)):
+        logger.error(f"Permissão negada no Firestore: {str(e)}")
+        return HTTPException(status_code=403, detail="Acesso negado ao banco de dados")
+    if isinstance(e, (firebase_exceptions.UnavailableError, google_exceptions.ServiceUnavailable)):
+        logger.error(f"Firestore indisponível: {str(e)}")
+        return HTTPException(status_code=503, detail="Serviço de banco de dados temporariamente indisponível")
+    if isinstance(e, (firebase_exceptions.DeadlineExceededError, google_exceptions.DeadlineExceeded)):
+        logger.error(f"Timeout no Firestore: {str(e)}")
+        return HTTPException(status_code=504, detail="Timeout na operação do banco de dados")
+    if isinstance(e, (firebase_exceptions.ResourceExhaustedError, google_exceptions.ResourceExhausted)):
+        logger.error(f"Recursos esgotados no Firestore: {str(e)}")
+        return HTTPException(status_code=429, detail="Muitas requisições. Tente novamente em alguns segundos")
+    logger.error(f"Erro inesperado no Firestore: {str(e)}")
+    return HTTPException(status_code=500, detail="Erro interno do servidor")
+
+
 def handle_firestore_exceptions(func: Callable) -> Callable:
-    """Decorator para tratamento de exceções do Firestore."""
+    """Decorator para tratamento de exceções do Firestore.
+
+    Funciona com funções síncronas (executadas via run_in_threadpool) e com
+    corrotinas (métodos `*_async` do repositório).
+    """
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def wrapper_async(*args, **kwargs):
+            try:
+                return await func(*args, **kwargs)
+            except HTTPException:
+                raise
+            except Exception as e:
+                raise converter_excecao_firestore(e) from e
+        return wrapper_async
+
+    @functools.wraps(func)
     def wrapper(*args, **kwargs):
         try:
             return func(*args, **kwargs)
-        except firebase_exceptions.NotFoundError as e:
-            logger.warning(f"Documento não encontrado: {str(e)}")
-            raise HTTPException(status_code=404, detail="Documento não encontrado")
-        except firebase_exceptions.AlreadyExistsError as e:
-            logger.warning(f"Documento já existe: {str(e)}")
-            raise HTTPException(status_code=409, detail="Documento já existe")
-        except firebase_exceptions.PermissionDeniedError as e:
-            logger.error(f"Permissão negada no Firestore: {str(e)}")
-            raise HTTPException(status_code=403, detail="Acesso negado ao banco de dados")
-        except firebase_exceptions.UnavailableError as e:
-            logger.error(f"Firestore indisponível: {str(e)}")
-            raise HTTPException(status_code=503, detail="Serviço de banco de dados temporariamente indisponível")
-        except firebase_exceptions.DeadlineExceededError as e:
-            logger.error(f"Timeout no Firestore: {str(e)}")
-            raise HTTPException(status_code=504, detail="Timeout na operação do banco de dados")
-        except firebase_exceptions.ResourceExhaustedError as e:
-            logger.error(f"Recursos esgotados no Firestore: {str(e)}")
-            raise HTTPException(status_code=429, detail="Muitas requisições. Tente novamente em alguns segundos")
+        except HTTPException:
+            raise
         except Exception as e:
-            logger.error(f"Erro inesperado no Firestore: {str(e)}")
-            raise HTTPException(status_code=500, detail="Erro interno do servidor")
+            raise converter_excecao_firestore(e) from e
     
     return wrapper
 
 
+def erros_transitorios() -> tuple:
+    """Erros do Firestore que indicam indisponibilidade temporária (vale a pena retentar)."""
+    firebase_exceptions, google_exceptions = _excecoes_firestore()
+    return (
+        firebase_exceptions.UnavailableError,
+        firebase_exceptions.DeadlineExceededError,
+        firebase_exceptions.ResourceExhaustedError,
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.DeadlineExceeded,
+        google_exceptions.ResourceExhausted,
+        google_exceptions.Aborted,
+        google_exceptions.InternalServerError,
+    )
+
+
+def erro_transitorio(erro: Exception) -> bool:
+    """Indica se o erro é uma falha temporária do Firestore (indisponibilidade/timeout)."""
+    if isinstance(erro, HTTPException):
+        return erro.status_code in (429, 503, 504)
+    return isinstance(erro, erros_transitorios())
+
+
+def documento_ja_existe(erro: Exception) -> bool:
+    """Indica se o erro é a criação de um documento que já existe (qualquer backend)."""
+    if isinstance(erro, DocumentoJaExiste):
+        return True
+    firebase_exceptions, google_exceptions = _excecoes_firestore()
+    return isinstance(erro, (firebase_exceptions.AlreadyExistsError, google_exceptions.AlreadyExists))
+
+
+def documento_nao_encontrado(erro: Exception) -> bool:
+    """Indica se o erro é a escrita em um documento que não existe (ex.: ID obsoleto em cache)."""
+    if isinstance(erro, HTTPException):
+        return erro.status_code == 404
+    if isinstance(erro, DocumentoNaoEncontrado):
+        return True
+    firebase_exceptions, google_exceptions = _excecoes_firestore()
+    return isinstance(erro, (firebase_exceptions.NotFoundError, google_exceptions.NotFound))
+
+
 def log_operation(operation: str, entity_type: str, entity_id: Optional[str] = None):
     """Log estruturado para operações."""
     def decorator(func: Callable) -> Callable:
@@ -62,27 +142,169 @@ def log_operation(operation: str, entity_type: str, entity_id: Optional[str] = N
     return decorator
 
 
+# Configurações de logging (podem ser ajustadas por variáveis de ambiente)
+# Formato da saída: "texto" (padrão) ou "json" (uma linha por registro)
+FORMATO_LOG = os.getenv("LOG_FORMATO", "texto").lower()
+# Escrita dos logs em uma thread separada (QueueHandler/QueueListener)
+LOG_ASSINCRONO = os.getenv("LOG_ASSINCRONO", "true").lower() in ("1", "true", "sim")
+# Logs info/debug da ingestão: 1 a cada N por rota (ex.: "/sensor=100,/sensor/batch=1");
+# o padrão 1 registra todos
+AMOSTRAGEM_PADRAO = int(os.getenv("LOG_AMOSTRAGEM_PADRAO", "1"))
+AMOSTRAGEM_ROTAS = {
+    rota.strip(): int(taxa)
+    for rota, _, taxa in (item.partition("=") for item in os.getenv("LOG_AMOSTRAGEM", "").split(",") if item.strip())
+}
+
+_TIPOS_IMUTAVEIS = (str, int, float, bool, type(None))
+
+
+class FormatadorJSON(logging.Formatter):
+    """Um objeto JSON por linha: instante, nível, logger, mensagem e exceção (se houver)."""
+
+    def __init__(self):
+        super().__init__()
+        # Instante formatado do segundo atual (prefixo, fuso); só os milissegundos mudam
+        self._segundo = None
+        self._prefixo = self._fuso = ""
+
+    def _instante(self, record: logging.LogRecord) -> str:
+        segundo = int(record.created)
+        if segundo != self._segundo:
+            local = time.localtime(segundo)
+            self._segundo = segundo
+            self._prefixo = time.strftime("%Y-%m-%dT%H:%M:%S", local)
+            fuso = time.strftime("%z", local)
+            self._fuso = f"{fuso[:3]}:{fuso[3:]}"
+        return f"{self._prefixo}.{int(record.msecs):03d}{self._fuso}"
+
+    def format(self, record: logging.LogRecord) -> str:
+        registro = {
+            "instante": self._instante(record),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "mensagem": record.getMessage()
+        }
+        amostragem = getattr(record, "amostragem", None)
+        if amostragem:
+            registro["amostragem"] = amostragem
+        if record.exc_info:
+            registro["excecao"] = self.formatException(record.exc_info)
+        return json.dumps(registro, ensure_ascii=False, default=str)
+
+
+class QueueHandlerLazy(logging.handlers.QueueHandler):
+    """QueueHandler que deixa a formatação da mensagem para a thread do listener.
+
+    O `QueueHandler` padrão formata a mensagem na thread que registrou o log; aqui o
+    registro vai para a fila como está. Argumentos mutáveis (dicts, listas) são
+    resolvidos antes, pois poderiam mudar até a mensagem ser formatada.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.args and not (
+            isinstance(record.args, tuple) and all(isinstance(arg, _TIPOS_IMUTAVEIS) for arg in record.args)
+        ):
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+
+class LoggerAmostrado:
+    """Logger de uma rota da ingestão: registra 1 a cada N mensagens info/debug.
+
+    Warnings e erros sempre passam. Os registros amostrados levam o campo
+    `amostragem` (N), para que as contagens possam ser reescaladas.
+    """
+
+    def __init__(self, logger: logging.Logger, a_cada: int):
+        self.logger = logger
+        self.a_cada = max(1, a_cada)
+        self._extra = {"amostragem": self.a_cada} if self.a_cada > 1 else None
+        self._contador = itertools.count()
+
+    def _registrar(self, nivel: int, msg: str, args: tuple):
+        # next() em itertools.count é atômico no CPython
+        if self.logger.isEnabledFor(nivel) and next(self._contador) % self.a_cada == 0:
+            # stacklevel=3: o registro aponta para quem chamou info()/debug()
+            self.logger.log(nivel, msg, *args, extra=self._extra, stacklevel=3)
+
+    def debug(self, msg: str, *args):
+        self._registrar(logging.DEBUG, msg, args)
+
+    def info(self, msg: str, *args):
+        self._registrar(logging.INFO, msg, args)
+
+    def warning(self, msg: str, *args, **kwargs):
+        self.logger.warning(msg, *args, stacklevel=2, **kwargs)
+
+    def error(self, msg: str, *args, **kwargs):
+        self.logger.error(msg, *args, stacklevel=2, **kwargs)
+
+
+def logger_amostrado(logger: logging.Logger, rota: str) -> LoggerAmostrado:
+    """Logger com a taxa de amostragem configurada para a rota (LOG_AMOSTRAGEM)."""
+    return LoggerAmostrado(logger, AMOSTRAGEM_ROTAS.get(rota, AMOSTRAGEM_PADRAO))
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def _iniciar_listener(queue_handler: logging.handlers.QueueHandler, handlers: List[logging.Handler]):
+    global _listener
+    queue_handler.queue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def parar_logging():
+    """Escreve os registros pendentes na fila e encerra a thread do listener."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
 def setup_logging():
-    """Configura logging para a aplicação."""
-    import os
+    """Configura logging para a aplicação.
+
+    Com LOG_ASSINCRONO (padrão) o root logger só enfileira os registros; a formatação
+    e a escrita no stdout/arquivo acontecem na thread do QueueListener.
+    """
+    raiz = logging.getLogger()
+    if raiz.handlers:
+        # Já configurado (mesmo comportamento do logging.basicConfig)
+        return
     
     # Definir nível de log baseado no ambiente
     log_level = logging.DEBUG if os.getenv("ENVIRONMENT") == "development" else logging.INFO
     
     # Configurar handlers baseado no ambiente
-    handlers = [logging.StreamHandler()]
+    handlers: List[logging.Handler] = [logging.StreamHandler()]
     
     # Em desenvolvimento local, também logar em arquivo
     if os.getenv("ENVIRONMENT") == "development":
         handlers.append(logging.FileHandler('app.log', encoding='utf-8'))
     
-    logging.basicConfig(
-        level=log_level,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=handlers
-    )
+    if FORMATO_LOG == "json":
+        formatador = FormatadorJSON()
+    else:
+        formatador = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    for handler in handlers:
+        handler.setFormatter(formatador)
+    
+    raiz.setLevel(log_level)
+    if LOG_ASSINCRONO:
+        queue_handler = QueueHandlerLazy(queue.SimpleQueue())
+        _iniciar_listener(queue_handler, handlers)
+        raiz.addHandler(queue_handler)
+        atexit.register(parar_logging)
+        # A thread do listener não sobrevive ao fork (gunicorn com preload): recriar no filho
+        os.register_at_fork(after_in_child=lambda: _iniciar_listener(queue_handler, handlers))
+    else:
+        for handler in handlers:
+            raiz.addHandler(handler)
     
     # Reduzir verbosidade de bibliotecas externas
     logging.getLogger('google').setLevel(logging.WARNING)
     logging.getLogger('firebase_admin').setLevel(logging.WARNING)
-    logging.getLogger('grpc').setLevel(logging.WARNING)
\ No newline at end of file
+    logging.getLogger('grpc').setLevel(logging.WARNING)
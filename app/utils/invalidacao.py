@@ -0,0 +1,225 @@
+"""Coordenação dos caches em memória entre os workers da mesma máquina.
+
+Com vários workers (gunicorn ou `uvicorn --workers`), cada processo tem os seus
+caches (registro de compressores, limites compilados, último estado gravado,
+índice de alertas ativos). Cada worker abre um socket Unix de datagramas em
+`INVALIDACAO_DIR` (um arquivo por PID) e envia as mudanças aos sockets dos demais;
+o recebimento é feito no event loop e chama os callbacks registrados por tipo.
+
+O envio nunca bloqueia: se o buffer de um worker estiver cheio, a mensagem é
+descartada e o TTL dos caches limita a defasagem (o mesmo vale entre máquinas).
+A lista de sockets dos outros workers fica em memória: é relida a cada
+`INVALIDACAO_DESCOBERTA` segundos, quando um worker novo (ou um marcador novo) se
+anuncia e quando um destino não existe mais. Com um único worker não há
+destinatários e publicar retorna sem serializar a mensagem.
+
+Mensagens frequentes que só interessam a alguns workers (eventos dos streams) são
+enviadas apenas aos que criaram o marcador correspondente (`<pid>.<marcador>`, ver
+`marcar`), sem ocupar o buffer dos demais.
+"""
+import asyncio
+import json
+import logging
+import os
+import socket
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set
+
+from .paginacao import linha_ndjson
+
+logger = logging.getLogger(__name__)
+
+# Configurações (podem ser ajustadas por variáveis de ambiente)
+INVALIDACAO_ATIVA = os.getenv("INVALIDACAO_ENTRE_WORKERS", "true").lower() in ("1", "true", "sim")
+# Um diretório por porta: instâncias diferentes na mesma máquina não se misturam
+DIRETORIO_INVALIDACAO = os.getenv(
+    "INVALIDACAO_DIR",
+    os.path.join(tempfile.gettempdir(), f"ordem-da-fenix-workers-{os.getenv('PORT', '8000')}")
+)
+
+# Intervalo máximo (s) entre releituras de `INVALIDACAO_DIR` para descobrir os outros workers
+INTERVALO_DESCOBERTA_SEGUNDOS = float(os.getenv("INVALIDACAO_DESCOBERTA", "5"))
+
+SUFIXO_SOCKET = ".sock"
+TAMANHO_MAXIMO_MENSAGEM = 64 * 1024
+# Mensagem interna enviada por um worker que abriu o socket ou criou um marcador:
+# os demais releem o diretório antes da próxima publicação
+TIPO_DESCOBERTA = "_descoberta"
+
+# Callback: (id_compressor, dados)
+Callback = Callable[[int, Any], None]
+
+
+class Pares(NamedTuple):
+    """Sockets dos outros workers e os PIDs com cada marcador, lidos de `INVALIDACAO_DIR`."""
+    expira_em: float
+    sockets: List[str]
+    marcados: Dict[str, Set[str]]
+
+
+class BarramentoInvalidacao:
+    """Difunde invalidações/atualizações de estado para os outros workers."""
+
+    def __init__(self, diretorio: str):
+        self.diretorio = diretorio
+        self._assinantes: Dict[str, List[Callback]] = {}
+        self._socket: Optional[socket.socket] = None
+        self._caminho: Optional[str] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._marcadores: Set[str] = set()
+        # Substituído por inteiro (publicar pode ser chamado de threads); None = reler
+        self._pares: Optional[Pares] = None
+        # Contadores
+        self.enviadas = 0
+        self.recebidas = 0
+        self.descartadas = 0
+
+    @property
+    def ativo(self) -> bool:
+        return self._socket is not None
+
+    def assinar(self, tipo: str, callback: Callback):
+        """Registra o callback para as mensagens `tipo` vindas de outros workers."""
+        self._assinantes.setdefault(tipo, []).append(callback)
+
+    def publicar(self, tipo: str, id_compressor: int, dados: Any = None, marcador: Optional[str] = None):
+        """Envia a mensagem aos outros workers (não bloqueia; pode ser chamado de threads).
+
+        Com `marcador`, apenas aos workers que o marcaram (ver `marcar`).
+        """
+        sock = self._socket
+        if sock is None:
+            return
+        pares = self._pares_atuais()
+        destinos = pares.sockets
+        if marcador is not None:
+            marcados = pares.marcados.get(marcador, ())
+            destinos = [nome for nome in destinos if nome[:-len(SUFIXO_SOCKET)] in marcados]
+        mensagem = None
+        for nome in destinos:
+            if mensagem is None:
+                mensagem = linha_ndjson({"tipo": tipo, "id_compressor": id_compressor, "dados": dados}).encode()
+                if len(mensagem) > TAMANHO_MAXIMO_MENSAGEM:
+                    logger.warning(f"Mensagem de invalidação '{tipo}' grande demais ({len(mensagem)} bytes)")
+                    return
+            caminho = os.path.join(self.diretorio, nome)
+            try:
+                sock.sendto(mensagem, caminho)
+                self.enviadas += 1
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Worker encerrado (sem remover o socket, no caso de ConnectionRefused)
+                self._pares = None
+                try:
+                    os.unlink(caminho)
+                except OSError:
+                    pass
+            except (BlockingIOError, OSError):
+                self.descartadas += 1
+
+    def _pares_atuais(self) -> Pares:
+        pares = self._pares
+        agora = time.monotonic()
+        if pares is not None and pares.expira_em > agora:
+            return pares
+        try:
+            nomes = os.listdir(self.diretorio)
+        except OSError:
+            nomes = []
+        proprio = os.path.basename(self._caminho or "")
+        sockets, marcados = [], {}
+        for nome in nomes:
+            if nome.endswith(SUFIXO_SOCKET):
+                if nome != proprio:
+                    sockets.append(nome)
+            elif "." in nome:
+                pid, marcador = nome.split(".", 1)
+                marcados.setdefault(marcador, set()).add(pid)
+        pares = self._pares = Pares(agora + INTERVALO_DESCOBERTA_SEGUNDOS, sockets, marcados)
+        return pares
+
+    def marcar(self, marcador: str, ativo: bool):
+        """Cria (ou remove) o marcador deste worker, para receber as mensagens publicadas com ele."""
+        if self._socket is None:
+            return
+        caminho = os.path.join(self.diretorio, f"{os.getpid()}.{marcador}")
+        try:
+            if ativo:
+                open(caminho, "a").close()
+                self._marcadores.add(caminho)
+                self.publicar(TIPO_DESCOBERTA, 0)
+            else:
+                self._marcadores.discard(caminho)
+                os.unlink(caminho)
+        except OSError as e:
+            logger.error(f"Erro ao atualizar o marcador '{marcador}' do worker: {str(e)}")
+
+    def _receber(self):
+        while True:
+            try:
+                mensagem = self._socket.recv(TAMANHO_MAXIMO_MENSAGEM)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                logger.error(f"Erro ao receber mensagem de invalidação: {str(e)}")
+                return
+            self.recebidas += 1
+            try:
+                conteudo = json.loads(mensagem)
+                if conteudo["tipo"] == TIPO_DESCOBERTA:
+                    self._pares = None
+                    continue
+                for callback in self._assinantes.get(conteudo["tipo"], ()):
+                    callback(conteudo["id_compressor"], conteudo["dados"])
+            except Exception as e:
+                logger.error(f"Erro ao aplicar mensagem de invalidação: {str(e)}")
+
+    async def iniciar(self):
+        """Abre o socket do worker (no lifespan, ou seja, depois do fork)."""
+        if not INVALIDACAO_ATIVA or self._socket is not None or not hasattr(socket, "AF_UNIX"):
+            return
+        try:
+            os.makedirs(self.diretorio, exist_ok=True)
+            caminho = os.path.join(self.diretorio, f"{os.getpid()}{SUFIXO_SOCKET}")
+            if os.path.exists(caminho):
+                # PID reutilizado após um reinício
+                os.unlink(caminho)
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            sock.setblocking(False)
+            sock.bind(caminho)
+        except OSError as e:
+            logger.error(f"Invalidação entre workers desativada: {str(e)}")
+            return
+        self._socket, self._caminho = sock, caminho
+        self._loop = asyncio.get_running_loop()
+        self._loop.add_reader(sock.fileno(), self._receber)
+        self._pares = None
+        # Os outros workers passam a incluir este socket sem esperar a próxima releitura
+        self.publicar(TIPO_DESCOBERTA, 0)
+        logger.info(f"Invalidação entre workers em {caminho}")
+
+    async def parar(self):
+        if self._socket is None:
+            return
+        self._loop.remove_reader(self._socket.fileno())
+        self._socket.close()
+        for caminho in [self._caminho, *self._marcadores]:
+            try:
+                os.unlink(caminho)
+            except OSError:
+                pass
+        self._marcadores.clear()
+        self._socket = self._caminho = self._loop = self._pares = None
+
+    def estatisticas(self) -> Dict[str, Any]:
+        workers = len(self._pares_atuais().sockets) + 1 if self.ativo else 0
+        return {
+            "ativo": self.ativo,
+            "workers": workers,
+            "enviadas": self.enviadas,
+            "recebidas": self.recebidas,
+            "descartadas": self.descartadas
+        }
+
+
+barramento_invalidacao = BarramentoInvalidacao(DIRETORIO_INVALIDACAO)
@@ -0,0 +1,151 @@
+"""Formato binário compacto das leituras de sensor (`POST /sensor` e `POST /sensor/batch`).
+
+Alternativa ao JSON para o ESP32, enviada com `Content-Type: application/vnd.ordem-da-fenix.leitura`.
+Cada leitura é um registro little-endian de tamanho fixo; o primeiro byte é a versão
+do formato. Versão 1 (38 bytes, contra ~200 do JSON equivalente):
+
+    offset  tipo      campo
+    0       uint8     versão (1)
+    1       uint32    id_compressor
+    5       uint8     flags: bit 0 = ligado, bit 1 = vibracao
+    6       int32 x6  pressao, temp_equipamento, temp_ambiente, potencia_kw, umidade,
+                      corrente, em centésimos (valor x 100)
+    30      int64     data_medicao em milissegundos desde 1970-01-01 UTC (0 = não informada)
+
+Em `/sensor/batch`, o corpo é a concatenação dos registros. O registro é decodificado
+para o mesmo dicionário que o JSON produziria, entregue diretamente ao FastAPI (sem
+serializar nem reler JSON) e validado com `SensorData` (mesmos limites e mesmos erros 422).
+"""
+import struct
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+from fastapi import HTTPException, Request, Response
+from fastapi.routing import APIRoute
+
+from .datetime_utils import BR_TIMEZONE
+
+TIPO_LEITURA_BINARIA = "application/vnd.ordem-da-fenix.leitura"
+
+VERSAO_1 = 1
+REGISTRO_V1 = struct.Struct("<BIB6iq")
+
+FLAG_LIGADO = 0x01
+FLAG_VIBRACAO = 0x02
+
+# Documentação do corpo binário no OpenAPI (somada ao corpo JSON da rota)
+OPENAPI_LEITURA_BINARIA = {
+    "requestBody": {
+        "content": {TIPO_LEITURA_BINARIA: {"schema": {"type": "string", "format": "binary"}}}
+    }
+}
+
+
+def _leitura_v1(versao, id_compressor, flags, pressao, temp_equipamento, temp_ambiente,
+                potencia_kw, umidade, corrente, data_medicao) -> Dict[str, Any]:
+    return {
+        "id_compressor": id_compressor,
+        "ligado": bool(flags & FLAG_LIGADO),
+        "pressao": pressao / 100,
+        "temp_equipamento": temp_equipamento / 100,
+        "temp_ambiente": temp_ambiente / 100,
+        "potencia_kw": potencia_kw / 100,
+        "umidade": umidade / 100,
+        "vibracao": bool(flags & FLAG_VIBRACAO),
+        "corrente": corrente / 100,
+        "data_medicao": datetime.fromtimestamp(data_medicao / 1000, BR_TIMEZONE) if data_medicao else None
+    }
+
+
+def codificar_leitura(leitura: Dict[str, Any]) -> bytes:
+    """Registro versão 1 de uma leitura (usado nos benchmarks e como referência do firmware)."""
+    flags = (FLAG_LIGADO if leitura["ligado"] else 0) | (FLAG_VIBRACAO if leitura["vibracao"] else 0)
+    data_medicao = leitura.get("data_medicao")
+    return REGISTRO_V1.pack(
+        VERSAO_1, leitura["id_compressor"], flags,
+        *(round(leitura[campo] * 100) for campo in (
+            "pressao", "temp_equipamento", "temp_ambiente", "potencia_kw", "umidade", "corrente"
+        )),
+        round(data_medicao.timestamp() * 1000) if data_medicao else 0
+    )
+
+
+def decodificar_lote(corpo: bytes) -> List[Dict[str, Any]]:
+    """Decodifica registros concatenados (400 se a versão ou o tamanho forem inválidos)."""
+    if not corpo:
+        raise HTTPException(status_code=400, detail="Corpo binário vazio")
+    versoes = set(corpo[::REGISTRO_V1.size]) if len(corpo) % REGISTRO_V1.size == 0 else None
+    if versoes != {VERSAO_1}:
+        if corpo[0] != VERSAO_1:
+            raise HTTPException(status_code=400, detail=f"Versão do formato binário não suportada: {corpo[0]}")
+        raise HTTPException(
+            status_code=400,
+            detail=f"Corpo binário inválido: esperados registros de {REGISTRO_V1.size} bytes da versão {VERSAO_1}"
+        )
+    return [_leitura_v1(*campos) for campos in REGISTRO_V1.iter_unpack(corpo)]
+
+
+def decodificar_leitura(corpo: bytes) -> Dict[str, Any]:
+    """Decodifica exatamente um registro (corpo de `POST /sensor`)."""
+    if len(corpo) != REGISTRO_V1.size:
+        leituras = decodificar_lote(corpo)
+        raise HTTPException(
+            status_code=400,
+            detail=f"POST /sensor recebe uma única leitura; {len(leituras)} enviadas (use /sensor/batch)"
+        )
+    if corpo[0] != VERSAO_1:
+        raise HTTPException(status_code=400, detail=f"Versão do formato binário não suportada: {corpo[0]}")
+    return _leitura_v1(*REGISTRO_V1.unpack(corpo))
+
+
+class RequisicaoLeituraBinaria(Request):
+    """Requisição com corpo binário cujo `json()` retorna as leituras já decodificadas.
+
+    O `content-type` é apresentado ao FastAPI como `application/json`: ele valida o
+    resultado de `json()` com o modelo da rota, como faria com o corpo JSON.
+    """
+
+    def __init__(self, request: Request, corpo: bytes, leituras: Any):
+        escopo = dict(request.scope)
+        escopo["headers"] = [
+            (nome, valor) for nome, valor in request.scope["headers"] if nome != b"content-type"
+        ] + [(b"content-type", b"application/json")]
+        super().__init__(escopo, request.receive)
+        self._corpo_binario = corpo
+        self._leituras = leituras
+
+    async def body(self) -> bytes:
+        return self._corpo_binario
+
+    async def json(self) -> Any:
+        return self._leituras
+
+
+def rota_leitura_binaria(decodificadores: Dict[str, Callable[[bytes], Any]]) -> type:
+    """Classe de rota que aceita o corpo binário nas rotas de `decodificadores` (path -> função).
+
+    O corpo é decodificado antes do FastAPI processar a requisição e entregue à rota por
+    uma `RequisicaoLeituraBinaria`; as demais rotas e os corpos JSON não são alterados.
+    """
+
+    class RotaLeituraBinaria(APIRoute):
+        def get_route_handler(self) -> Callable:
+            original = super().get_route_handler()
+            decodificar = decodificadores.get(self.path)
+            if decodificar is None:
+                return original
+
+            async def handler(request: Request) -> Response:
+                tipo = request.headers.get("content-type", "")
+                if tipo.split(";", 1)[0].strip().lower() != TIPO_LEITURA_BINARIA:
+                    return await original(request)
+                corpo = await request.body()
+                try:
+                    leituras = decodificar(corpo)
+                except (OverflowError, OSError, ValueError):
+                    raise HTTPException(status_code=400, detail="Corpo binário inválido: data_medicao fora do intervalo")
+                return await original(RequisicaoLeituraBinaria(request, corpo, leituras))
+
+            return handler
+
+    return RotaLeituraBinaria
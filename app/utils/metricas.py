@@ -0,0 +1,240 @@
+"""Métricas de desempenho no formato texto do Prometheus (`GET /metrics`).
+
+Com `METRICAS_ATIVAS=true` são registrados:
+
+- latência por rota (template do path, método e status) e, por requisição, o tempo
+  e o número de chamadas ao banco de dados feitas dentro dela;
+- chamadas ao repositório por backend/coleção/operação (contagem, duração, erros);
+- espera na fila do threadpool (do envio até o início da execução);
+- contadores dos componentes em memória (caches, fila, spool...), lidos apenas no
+  momento da coleta a partir dos seus `estatisticas()`.
+
+Desativadas (padrão), nada é instalado: sem middleware, sem wrappers no repositório,
+e `executar_no_threadpool` é o `run_in_threadpool` direto.
+"""
+import bisect
+import contextvars
+import functools
+import inspect
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+METRICAS_ATIVAS = os.getenv("METRICAS_ATIVAS", "false").lower() in ("1", "true", "sim")
+
+# Limites superiores dos buckets dos histogramas (segundos)
+BUCKETS_SEGUNDOS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Rotulos = Tuple[Tuple[str, str], ...]
+
+# Tempo e número de chamadas ao banco de dados da requisição em andamento: [segundos, chamadas]
+_banco_requisicao: contextvars.ContextVar[Optional[List[float]]] = contextvars.ContextVar("banco_requisicao", default=None)
+
+
+class Histograma:
+    __slots__ = ("contagens", "soma", "total")
+
+    def __init__(self):
+        self.contagens = [0] * (len(BUCKETS_SEGUNDOS) + 1)
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor: float):
+        self.contagens[bisect.bisect_left(BUCKETS_SEGUNDOS, valor)] += 1
+        self.soma += valor
+        self.total += 1
+
+
+class RegistroMetricas:
+    """Histogramas e contadores em memória, por nome e rótulos."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histogramas: Dict[str, Dict[Rotulos, Histograma]] = {}
+        self._contadores: Dict[str, Dict[Rotulos, float]] = {}
+        self._descricoes: Dict[str, str] = {}
+        # (prefixo, função que retorna o dicionário de estatísticas do componente)
+        self._coletores: List[Tuple[str, Callable[[], Dict[str, Any]]]] = []
+
+    def descrever(self, nome: str, descricao: str):
+        self._descricoes[nome] = descricao
+
+    def observar(self, nome: str, rotulos: Rotulos, valor: float):
+        with self._lock:
+            serie = self._histogramas.setdefault(nome, {})
+            histograma = serie.get(rotulos)
+            if histograma is None:
+                histograma = serie[rotulos] = Histograma()
+            histograma.observar(valor)
+
+    def incrementar(self, nome: str, rotulos: Rotulos, valor: float = 1):
+        with self._lock:
+            serie = self._contadores.setdefault(nome, {})
+            serie[rotulos] = serie.get(rotulos, 0) + valor
+
+    def registrar_coletor(self, prefixo: str, estatisticas: Callable[[], Dict[str, Any]]):
+        """Exporta os valores numéricos de `estatisticas()` como gauges `<prefixo>_<chave>`."""
+        self._coletores.append((prefixo, estatisticas))
+
+    def exportar(self) -> str:
+        linhas: List[str] = []
+        with self._lock:
+            histogramas = {nome: {r: (list(h.contagens), h.soma, h.total) for r, h in serie.items()}
+                           for nome, serie in self._histogramas.items()}
+            contadores = {nome: dict(serie) for nome, serie in self._contadores.items()}
+
+        for nome, serie in sorted(histogramas.items()):
+            self._cabecalho(linhas, nome, "histogram")
+            for rotulos, (contagens, soma, total) in sorted(serie.items()):
+                acumulado = 0
+                for limite, contagem in zip(BUCKETS_SEGUNDOS, contagens):
+                    acumulado += contagem
+                    linhas.append(f"{nome}_bucket{_formatar(rotulos + (('le', repr(limite)),))} {acumulado}")
+                linhas.append(f"{nome}_bucket{_formatar(rotulos + (('le', '+Inf'),))} {total}")
+                linhas.append(f"{nome}_sum{_formatar(rotulos)} {soma!r}")
+                linhas.append(f"{nome}_count{_formatar(rotulos)} {total}")
+
+        for nome, serie in sorted(contadores.items()):
+            self._cabecalho(linhas, nome, "counter")
+            for rotulos, valor in sorted(serie.items()):
+                linhas.append(f"{nome}{_formatar(rotulos)} {valor}")
+
+        for prefixo, estatisticas in self._coletores:
+            try:
+                valores = estatisticas()
+            except Exception:
+                continue
+            for chave, valor in valores.items():
+                if isinstance(valor, bool):
+                    valor = int(valor)
+                elif not isinstance(valor, (int, float)):
+                    continue
+                nome = f"{prefixo}_{chave}"
+                self._cabecalho(linhas, nome, "gauge")
+                linhas.append(f"{nome} {valor}")
+
+        return "\n".join(linhas) + "\n"
+
+    def _cabecalho(self, linhas: List[str], nome: str, tipo: str):
+        if nome in self._descricoes:
+            linhas.append(f"# HELP {nome} {self._descricoes[nome]}")
+        linhas.append(f"# TYPE {nome} {tipo}")
+
+
+def _formatar(rotulos: Rotulos) -> str:
+    if not rotulos:
+        return ""
+    return "{" + ",".join(f'{chave}="{_escapar(valor)}"' for chave, valor in rotulos) + "}"
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+metricas = RegistroMetricas()
+metricas.descrever("http_requisicao_duracao_segundos", "Latência das requisições HTTP por rota")
+metricas.descrever("http_requisicao_banco_segundos", "Tempo gasto em chamadas ao banco de dados dentro de cada requisição")
+metricas.descrever("http_requisicao_banco_chamadas_total", "Chamadas ao banco de dados por requisição")
+metricas.descrever("repositorio_chamada_duracao_segundos", "Duração das chamadas ao repositório por coleção/operação")
+metricas.descrever("repositorio_erros_total", "Chamadas ao repositório que terminaram em exceção")
+metricas.descrever("threadpool_espera_segundos", "Espera na fila do threadpool antes do início da execução")
+
+
+class MiddlewareMetricas:
+    """Middleware ASGI: latência por rota e tempo de banco de dados por requisição.
+
+    A rota é o template do path (`/compressores/{id_compressor}`), lido de
+    `scope["route"]` depois do roteamento; paths sem rota viram `"sem_rota"` para
+    não criar uma série por URL inválida.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def enviar(mensagem):
+            nonlocal status
+            if mensagem["type"] == "http.response.start":
+                status = mensagem["status"]
+            await send(mensagem)
+
+        banco = [0.0, 0]
+        token = _banco_requisicao.set(banco)
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            duracao = time.perf_counter() - inicio
+            _banco_requisicao.reset(token)
+            rota = scope.get("route")
+            caminho = getattr(rota, "path", None) or "sem_rota"
+            rotulos = (("metodo", scope["method"]), ("rota", caminho), ("status", str(status)))
+            metricas.observar("http_requisicao_duracao_segundos", rotulos, duracao)
+            if banco[1]:
+                por_rota = (("metodo", scope["method"]), ("rota", caminho))
+                metricas.observar("http_requisicao_banco_segundos", por_rota, banco[0])
+                metricas.incrementar("http_requisicao_banco_chamadas_total", por_rota, banco[1])
+
+
+def _registrar_chamada(rotulos: Rotulos, inicio: float, erro: bool):
+    duracao = time.perf_counter() - inicio
+    metricas.observar("repositorio_chamada_duracao_segundos", rotulos, duracao)
+    if erro:
+        metricas.incrementar("repositorio_erros_total", rotulos)
+    banco = _banco_requisicao.get()
+    if banco is not None:
+        banco[0] += duracao
+        banco[1] += 1
+
+
+def medir_chamada(funcao: Callable, backend: str, colecao: str, operacao: str) -> Callable:
+    """Envolve um método do repositório (síncrono ou corrotina) registrando a duração."""
+    rotulos = (("backend", backend), ("colecao", colecao), ("operacao", operacao))
+
+    if inspect.iscoroutinefunction(funcao):
+        @functools.wraps(funcao)
+        async def medida_async(*args, **kwargs):
+            inicio = time.perf_counter()
+            erro = True
+            try:
+                resultado = await funcao(*args, **kwargs)
+                erro = False
+                return resultado
+            finally:
+                _registrar_chamada(rotulos, inicio, erro)
+        return medida_async
+
+    @functools.wraps(funcao)
+    def medida(*args, **kwargs):
+        inicio = time.perf_counter()
+        erro = True
+        try:
+            resultado = funcao(*args, **kwargs)
+            erro = False
+            return resultado
+        finally:
+            _registrar_chamada(rotulos, inicio, erro)
+    return medida
+
+
+async def executar_no_threadpool(funcao: Callable, *args):
+    """`run_in_threadpool` registrando a espera até uma thread livre assumir a função."""
+    if not METRICAS_ATIVAS:
+        return await run_in_threadpool(funcao, *args)
+
+    enviado = time.perf_counter()
+
+    def medida():
+        metricas.observar("threadpool_espera_segundos", (), time.perf_counter() - enviado)
+        return funcao(*args)
+
+    return await run_in_threadpool(medida)
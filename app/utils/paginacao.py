@@ -0,0 +1,33 @@
+"""Utilitários para paginação por cursor e respostas NDJSON."""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, Tuple
+from fastapi import HTTPException
+
+
+def codificar_cursor(valor: datetime, doc_id: str) -> str:
+    """Gera um cursor opaco a partir do campo de ordenação e do ID do documento."""
+    bruto = json.dumps({"v": valor.isoformat(), "id": doc_id}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(bruto).decode("ascii").rstrip("=")
+
+
+def decodificar_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Decodifica um cursor gerado por `codificar_cursor` (400 se inválido)."""
+    try:
+        bruto = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        dados = json.loads(bruto)
+        return datetime.fromisoformat(dados["v"]), str(dados["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor de paginação inválido")
+
+
+def _serializar_valor(valor: Any) -> Any:
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    raise TypeError(f"Tipo não serializável: {type(valor).__name__}")
+
+
+def linha_ndjson(documento: Dict[str, Any]) -> str:
+    """Serializa um documento como uma linha NDJSON."""
+    return json.dumps(documento, default=_serializar_valor, ensure_ascii=False) + "\n"
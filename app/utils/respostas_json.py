@@ -0,0 +1,72 @@
+"""Serialização rápida (orjson) das respostas grandes, ativada com `JSON_RAPIDO=true`.
+
+No caminho padrão do FastAPI, o dicionário retornado pelo handler passa pelo
+`jsonable_encoder` (que percorre e copia cada valor em Python, convertendo os
+`datetime` em texto) e depois pelo `json.dumps`; com `response_model=dict` ainda há
+uma validação do dicionário. Com `JSON_RAPIDO`, os handlers retornam a
+`RespostaJSONRapida` pronta: o FastAPI não valida nem converte nada e o orjson
+serializa os dados diretamente.
+
+A saída é o mesmo JSON: datetimes em ISO 8601 (`isoformat()`, inclusive os
+`DatetimeWithNanoseconds` do Firestore) e inf/nan como null. O orjson é opcional
+(`pip install orjson`); sem ele, o caminho padrão continua sendo usado.
+"""
+import logging
+import os
+from datetime import datetime
+from typing import Any, Optional
+
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+JSON_RAPIDO = os.getenv("JSON_RAPIDO", "false").lower() in ("1", "true", "sim")
+
+orjson: Any = None
+if JSON_RAPIDO:
+    try:
+        import orjson
+    except ImportError:
+        JSON_RAPIDO = False
+        logger.warning("JSON_RAPIDO ativo, mas o orjson não está instalado: usando a serialização padrão")
+
+
+def _padrao(valor: Any) -> Any:
+    # O orjson só converte `datetime` exatos; subclasses (Firestore) e demais tipos caem aqui.
+    # Recriar o datetime e deixar o orjson formatá-lo custa metade de um `isoformat()`.
+    if isinstance(valor, datetime):
+        return datetime(
+            valor.year, valor.month, valor.day, valor.hour, valor.minute, valor.second,
+            valor.microsecond, valor.tzinfo, fold=valor.fold
+        )
+    return jsonable_encoder(valor)
+
+
+def serializar(conteudo: Any) -> bytes:
+    """JSON compacto em bytes, no mesmo formato das respostas do FastAPI."""
+    return orjson.dumps(conteudo, default=_padrao, option=orjson.OPT_NON_STR_KEYS)
+
+
+class RespostaJSONRapida(JSONResponse):
+    """JSONResponse serializada pelo orjson."""
+
+    def render(self, content: Any) -> bytes:
+        return serializar(content)
+
+
+def resposta_json(conteudo: Any, response: Optional[Response] = None) -> Any:
+    """Retorno dos handlers: `RespostaJSONRapida` com JSON_RAPIDO, senão o próprio conteúdo.
+
+    `response` é o parâmetro `Response` do handler: status e cabeçalhos definidos nele
+    (ETag, Cache-Control...) são copiados, pois o FastAPI só os aplica quando o handler
+    não retorna uma Response.
+    """
+    if not JSON_RAPIDO:
+        return conteudo
+    if response is None:
+        return RespostaJSONRapida(conteudo)
+    resposta = RespostaJSONRapida(conteudo, status_code=response.status_code or 200)
+    resposta.raw_headers.extend(response.headers.raw)
+    return resposta
@@ -0,0 +1,90 @@
+"""Tempo de cold start: import de `app.main` e tempo até o primeiro 200.
+
+Cada rodada usa um processo novo (como uma máquina do Fly.io saindo de
+`min_machines_running = 0`):
+
+- `import`: tempo de `import app.main` (sem iniciar o servidor);
+- `/health`: do spawn do uvicorn até o primeiro 200 em `/health`;
+- rota de dados: do spawn até o primeiro 200 em uma rota que usa o banco de dados
+  (padrão `/compressores/?limit=1`), o que inclui a criação dos clientes do Firestore.
+
+    python -m benchmarks.arranque [rodadas] [rota_de_dados]
+
+Sem credenciais do Firebase, rode com `ARMAZENAMENTO=memoria` ou com o emulador
+(`FIRESTORE_EMULATOR_HOST=localhost:8080`); `FIREBASE_AQUECER=false` desliga o
+aquecimento no startup para comparação.
+"""
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TIMEOUT_SEGUNDOS = 60
+
+
+def tempo_import() -> float:
+    codigo = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+    saida = subprocess.run([sys.executable, "-c", codigo], cwd=RAIZ, capture_output=True, text=True, check=True)
+    return float(saida.stdout.strip().splitlines()[-1])
+
+
+def porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def esperar_200(url: str, inicio: float) -> float:
+    while time.perf_counter() - inicio < TIMEOUT_SEGUNDOS:
+        try:
+            with urllib.request.urlopen(url, timeout=TIMEOUT_SEGUNDOS) as resposta:
+                if resposta.status == 200:
+                    return time.perf_counter() - inicio
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.005)
+    raise TimeoutError(f"{url} não respondeu 200 em {TIMEOUT_SEGUNDOS} s")
+
+
+def tempo_primeiro_200(rota_dados: str):
+    """(segundos até o 1º 200 em /health, segundos até o 1º 200 na rota de dados)."""
+    porta = porta_livre()
+    inicio = time.perf_counter()
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(porta), "--log-level", "warning"],
+        cwd=RAIZ, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        base = f"http://127.0.0.1:{porta}"
+        return esperar_200(f"{base}/health", inicio), esperar_200(f"{base}{rota_dados}", inicio)
+    finally:
+        processo.terminate()
+        processo.wait()
+
+
+def resumo(nome: str, valores):
+    print(
+        f"{nome:<34} mediana {statistics.median(valores) * 1000:>7.0f} ms  "
+        f"mín {min(valores) * 1000:>7.0f} ms  máx {max(valores) * 1000:>7.0f} ms"
+    )
+
+
+def main():
+    rodadas = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    rota_dados = sys.argv[2] if len(sys.argv) > 2 else "/compressores/?limit=1"
+
+    imports = [tempo_import() for _ in range(rodadas)]
+    primeiros = [tempo_primeiro_200(rota_dados) for _ in range(rodadas)]
+
+    print(f"{rodadas} rodadas (ARMAZENAMENTO={os.getenv('ARMAZENAMENTO', 'firestore')})\n")
+    resumo("import app.main", imports)
+    resumo("1º 200 em /health", [health for health, _ in primeiros])
+    resumo(f"1º 200 em {rota_dados}", [dados for _, dados in primeiros])
+
+
+if __name__ == "__main__":
+    main()
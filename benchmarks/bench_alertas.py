@@ -0,0 +1,85 @@
+"""Micro-benchmark da avaliação de alertas: `avaliar_nivel` x limites compilados.
+
+Verifica que os níveis são idênticos (incluindo valores exatamente nas fronteiras
+e configurações com faixas sobrepostas/lacunas) e mede o tempo de cada abordagem.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_alertas [quantidade_de_valores]
+"""
+import random
+import sys
+import time
+
+from app.utils.alertas import CONFIGURACAO_FIXA, LimitesCompilados, avaliar_nivel, carregar_numpy
+
+
+def valores_de_teste(limites, quantidade, rng):
+    fronteiras = sorted({v for faixa in limites.values() for v in (faixa["min"], faixa["max"])})
+    finitas = [v for v in fronteiras if v not in (float("inf"), float("-inf"))]
+    baixo, alto = min(finitas) - 20, max(finitas) + 20
+    valores = [rng.uniform(baixo, alto) for _ in range(quantidade)]
+    # Fronteiras exatas, vizinhos imediatos e valores especiais
+    for v in finitas:
+        valores += [v, v - 1e-9, v + 1e-9]
+    valores += [float("inf"), float("-inf"), float("nan")]
+    return valores
+
+
+def limites_aleatorios(rng):
+    """Configuração com faixas sobrepostas e com lacunas entre elas."""
+    limites = {}
+    for nivel in LimitesCompilados.NIVEIS:
+        a, b = sorted(rng.uniform(-50, 150) for _ in range(2))
+        limites[nivel] = {"min": a, "max": b}
+    return limites
+
+
+def verificar(limites, valores):
+    compilado = LimitesCompilados(limites)
+    esperado = [avaliar_nivel(v, limites) for v in valores]
+    assert [compilado.avaliar(v) for v in valores] == esperado, "divergência em avaliar()"
+    assert compilado.avaliar_lote(valores) == esperado, "divergência em avaliar_lote()"
+
+
+def medir(funcao, repeticoes=5):
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def main():
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rng = random.Random(42)
+
+    # 1) Equivalência: configuração fixa e 200 configurações aleatórias
+    for limites in CONFIGURACAO_FIXA.values():
+        verificar(limites, valores_de_teste(limites, 2_000, rng))
+    for _ in range(200):
+        limites = limites_aleatorios(rng)
+        verificar(limites, valores_de_teste(limites, 500, rng))
+    print("Níveis idênticos à implementação atual (fronteiras e faixas sobrepostas incluídas)")
+
+    # 2) Desempenho na configuração de pressão
+    limites = CONFIGURACAO_FIXA["limites_pressao"]
+    compilado = LimitesCompilados(limites)
+    valores = [rng.uniform(0, 15) for _ in range(quantidade)]
+
+    t_atual = medir(lambda: [avaliar_nivel(v, limites) for v in valores])
+    t_bisect = medir(lambda: [compilado.avaliar(v) for v in valores])
+    print(f"\n{quantidade} valores:")
+    print(f"  avaliar_nivel (atual)        {t_atual * 1000:9.2f} ms")
+    print(f"  compilado.avaliar (bisect)   {t_bisect * 1000:9.2f} ms  ({t_atual / t_bisect:5.1f}x)")
+    np = carregar_numpy()
+    if np is not None:
+        coluna = np.asarray(valores)
+        t_lote = medir(lambda: compilado.avaliar_lote(coluna))
+        print(f"  compilado.avaliar_lote (np)  {t_lote * 1000:9.2f} ms  ({t_atual / t_lote:5.1f}x)")
+    else:
+        print("  NumPy não instalado: avaliar_lote usa bisect (pip install numpy para o caminho vetorizado)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Teste de carga contra o emulador do Firestore: cliente síncrono + threadpool x AsyncClient.
+
+Reproduz o padrão de acesso dos handlers (consulta do compressor por `id_compressor`
+seguida de um WriteBatch com a leitura e o update do status) com N requisições
+concorrentes, nos dois modos:
+
+- `threadpool`: `firestore.Client` chamado via `run_in_threadpool` (modo anterior,
+  limitado pelas threads do AnyIO — 40 por padrão);
+- `async`: `firestore.AsyncClient` aguardado diretamente no event loop.
+
+Requer o emulador em execução (nunca use contra um projeto real):
+    firebase emulators:start --only firestore
+    FIRESTORE_EMULATOR_HOST=localhost:8080 python -m benchmarks.carga_firestore [operacoes] [concorrencias]
+
+Exemplo: `python -m benchmarks.carga_firestore 2000 10,50,200`
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+from fastapi.concurrency import run_in_threadpool
+from google.cloud import firestore
+
+PROJETO = os.getenv("FIREBASE_PROJECT_ID", "demo-ordem-da-fenix")
+QUANTIDADE_COMPRESSORES = 50
+COLECAO_COMPRESSORES = "bench_compressores"
+COLECAO_LEITURAS = "bench_sensor_data"
+
+
+def leitura(id_compressor: int, sequencia: int):
+    return {
+        "id_compressor": id_compressor,
+        "ligado": sequencia % 2 == 0,
+        "pressao": 7.5,
+        "temp_equipamento": 80.0,
+        "temp_ambiente": 25.0,
+        "potencia_kw": 20.0,
+        "umidade": 50.0,
+        "vibracao": False,
+        "corrente": 30.0,
+        "data_medicao": firestore.SERVER_TIMESTAMP
+    }
+
+
+def preparar(cliente: firestore.Client):
+    batch = cliente.batch()
+    for id_compressor in range(1, QUANTIDADE_COMPRESSORES + 1):
+        batch.set(cliente.collection(COLECAO_COMPRESSORES).document(f"c{id_compressor}"), {
+            "id_compressor": id_compressor,
+            "nome_marca": "Bench",
+            "esta_ligado": False
+        })
+    batch.commit()
+
+
+def operacao_sincrona(cliente: firestore.Client, sequencia: int):
+    id_compressor = sequencia % QUANTIDADE_COMPRESSORES + 1
+    docs = list(cliente.collection(COLECAO_COMPRESSORES).where("id_compressor", "==", id_compressor).limit(1).stream())
+    batch = cliente.batch()
+    batch.set(cliente.collection(COLECAO_LEITURAS).document(), leitura(id_compressor, sequencia))
+    batch.update(docs[0].reference, {"esta_ligado": sequencia % 2 == 0})
+    batch.commit()
+
+
+async def operacao_assincrona(cliente: firestore.AsyncClient, sequencia: int):
+    id_compressor = sequencia % QUANTIDADE_COMPRESSORES + 1
+    consulta = cliente.collection(COLECAO_COMPRESSORES).where("id_compressor", "==", id_compressor).limit(1)
+    docs = [doc async for doc in consulta.stream()]
+    batch = cliente.batch()
+    batch.set(cliente.collection(COLECAO_LEITURAS).document(), leitura(id_compressor, sequencia))
+    batch.update(docs[0].reference, {"esta_ligado": sequencia % 2 == 0})
+    await batch.commit()
+
+
+async def executar(operacao, quantidade: int, concorrencia: int):
+    """Executa `quantidade` operações com no máximo `concorrencia` simultâneas."""
+    latencias = []
+    semaforo = asyncio.Semaphore(concorrencia)
+
+    async def uma(sequencia):
+        async with semaforo:
+            inicio = time.perf_counter()
+            await operacao(sequencia)
+            latencias.append(time.perf_counter() - inicio)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(uma(i) for i in range(quantidade)))
+    return time.perf_counter() - inicio, latencias
+
+
+def resumo(modo, concorrencia, duracao, latencias):
+    latencias = sorted(latencias)
+    p99 = latencias[int(len(latencias) * 0.99) - 1]
+    print(
+        f"{modo:<10} {concorrencia:>5}  {len(latencias) / duracao:>9.0f} op/s  "
+        f"p50 {statistics.median(latencias) * 1000:>7.1f} ms  p99 {p99 * 1000:>7.1f} ms"
+    )
+
+
+async def main():
+    if not os.getenv("FIRESTORE_EMULATOR_HOST"):
+        sys.exit("Defina FIRESTORE_EMULATOR_HOST (ex.: localhost:8080); este teste não deve rodar contra o Firestore real.")
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000
+    concorrencias = [int(c) for c in sys.argv[2].split(",")] if len(sys.argv) > 2 else [10, 50, 200]
+
+    cliente = firestore.Client(project=PROJETO)
+    cliente_async = firestore.AsyncClient(project=PROJETO)
+    preparar(cliente)
+    # Aquecimento dos canais gRPC
+    await run_in_threadpool(operacao_sincrona, cliente, 0)
+    await operacao_assincrona(cliente_async, 0)
+
+    print(f"{quantidade} operações (consulta + batch de 2 escritas) por rodada\n")
+    print(f"{'modo':<10} {'conc.':>5}  {'vazão':>14}  {'latência':>10}")
+    for concorrencia in concorrencias:
+        duracao, latencias = await executar(
+            lambda i: run_in_threadpool(operacao_sincrona, cliente, i), quantidade, concorrencia
+        )
+        resumo("threadpool", concorrencia, duracao, latencias)
+        duracao, latencias = await executar(
+            lambda i: operacao_assincrona(cliente_async, i), quantidade, concorrencia
+        )
+        resumo("async", concorrencia, duracao, latencias)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,182 @@
+"""Vazão do `POST /sensor` em função do número de workers (`uvicorn --workers N`).
+
+Para cada quantidade de workers, sobe o servidor em um processo novo, cadastra os
+compressores e dispara leituras durante alguns segundos a partir de vários processos
+geradores de carga (cada um com um event loop e `concorrencia` requisições em voo).
+
+Durante a carga, `assinantes` clientes SSE acompanham o primeiro compressor
+(`/stream/compressores/{id}`); cada conexão cai em um worker qualquer. A coluna
+"stream" é a menor fração das leituras aceitas desse compressor que chegou a um
+assinante: perto de 100% com o repasse entre workers (`STREAM_ENTRE_WORKERS`,
+padrão) e cerca de 1/workers com ele desligado. Com 0 assinantes, mede só a vazão.
+
+    python -m benchmarks.escala_workers [workers] [segundos] [geradores] [concorrencia] [assinantes]
+
+Exemplo: `python -m benchmarks.escala_workers 1,2,4 10 4 32 4`. Por padrão usa o backend
+SQLite em um arquivo temporário (compartilhado entre os workers); com o emulador
+(`FIRESTORE_EMULATOR_HOST`) e `ARMAZENAMENTO=firestore` mede o caminho real. O ganho
+depende dos núcleos livres da máquina: os geradores de carga competem pela mesma CPU.
+Requer `httpx` (pip install httpx).
+"""
+import asyncio
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+QUANTIDADE_COMPRESSORES = 20
+ID_BASE = 910_000
+
+
+def porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def leitura(id_compressor: int, sequencia: int) -> dict:
+    return {
+        "id_compressor": id_compressor,
+        "ligado": True,
+        "pressao": 7.0 + (sequencia % 30) / 10,
+        "temp_equipamento": 80.0,
+        "temp_ambiente": 25.0,
+        "potencia_kw": 20.0,
+        "umidade": 50.0,
+        "vibracao": False,
+        "corrente": 30.0
+    }
+
+
+def esperar_servidor(base: str):
+    limite = time.monotonic() + 60
+    while time.monotonic() < limite:
+        try:
+            if httpx.get(f"{base}/health", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            time.sleep(0.05)
+    raise TimeoutError("O servidor não respondeu em 60 s")
+
+
+def preparar(base: str):
+    for id_compressor in range(ID_BASE, ID_BASE + QUANTIDADE_COMPRESSORES):
+        httpx.post(f"{base}/compressores/", json={
+            "id_compressor": id_compressor,
+            "nome_marca": "Bench",
+            "localizacao": "Bancada",
+            "potencia_nominal_kw": 20,
+            "data_ultima_manutencao": "2025-01-01T00:00:00",
+            "esta_ligado": False
+        }, timeout=10)
+
+
+async def gerar_carga(base: str, segundos: float, concorrencia: int, semente: int):
+    """Retorna (leituras aceitas, leituras aceitas do compressor acompanhado pelo stream)."""
+    fim = time.monotonic() + segundos
+    respondidas = 0
+    acompanhadas = 0
+
+    async def uma(cliente: httpx.AsyncClient, trabalhador: int):
+        nonlocal respondidas, acompanhadas
+        sequencia = semente * 1_000_000 + trabalhador * 10_000
+        while time.monotonic() < fim:
+            sequencia += 1
+            id_compressor = ID_BASE + sequencia % QUANTIDADE_COMPRESSORES
+            resposta = await cliente.post(f"{base}/sensor", json=leitura(id_compressor, sequencia))
+            if resposta.status_code < 300:
+                respondidas += 1
+                acompanhadas += id_compressor == ID_BASE
+
+    limites = httpx.Limits(max_connections=concorrencia, max_keepalive_connections=concorrencia)
+    async with httpx.AsyncClient(limits=limites, timeout=30) as cliente:
+        await asyncio.gather(*(uma(cliente, t) for t in range(concorrencia)))
+    return respondidas, acompanhadas
+
+
+def processo_gerador(argumentos):
+    return asyncio.run(gerar_carga(*argumentos))
+
+
+def ouvir_stream(base: str, contagens: list, indice: int, conectado: threading.Event):
+    """Conta os eventos `leitura` recebidos por um assinante SSE (até o servidor encerrar)."""
+    try:
+        with httpx.stream("GET", f"{base}/stream/compressores/{ID_BASE}", timeout=None) as resposta:
+            for linha in resposta.iter_lines():
+                if linha == ": conectado":
+                    conectado.set()
+                elif linha == "event: leitura":
+                    contagens[indice] += 1
+    except httpx.HTTPError:
+        pass
+
+
+def rodar(workers: int, segundos: float, geradores: int, concorrencia: int, assinantes: int, diretorio: str):
+    porta = porta_livre()
+    ambiente = {
+        "ARMAZENAMENTO": "sqlite",
+        "ARMAZENAMENTO_SQLITE": os.path.join(diretorio, f"escala-{workers}.db"),
+        **os.environ,
+        "PORT": str(porta),
+    }
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(porta),
+         "--workers", str(workers), "--log-level", "warning",
+         # As conexões SSE ficam abertas: sem limite, o encerramento esperaria por elas
+         "--timeout-graceful-shutdown", "2"],
+        cwd=RAIZ, env=ambiente, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base = f"http://127.0.0.1:{porta}"
+    try:
+        esperar_servidor(base)
+        preparar(base)
+        contagens = [0] * assinantes
+        for indice in range(assinantes):
+            conectado = threading.Event()
+            threading.Thread(target=ouvir_stream, args=(base, contagens, indice, conectado), daemon=True).start()
+            conectado.wait(10)
+        with multiprocessing.Pool(geradores) as pool:
+            inicio = time.perf_counter()
+            resultados = pool.map(processo_gerador, [(base, segundos, concorrencia, g) for g in range(geradores)])
+            duracao = time.perf_counter() - inicio
+        respondidas = sum(r[0] for r in resultados)
+        acompanhadas = sum(r[1] for r in resultados)
+        # Tempo para os últimos eventos chegarem aos assinantes
+        time.sleep(1)
+        entrega = min(contagens) / acompanhadas if assinantes and acompanhadas else None
+        return respondidas / duracao, entrega
+    finally:
+        processo.terminate()
+        processo.wait()
+
+
+def main():
+    lista_workers = [int(w) for w in sys.argv[1].split(",")] if len(sys.argv) > 1 else [1, 2, 4]
+    segundos = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+    geradores = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    concorrencia = int(sys.argv[4]) if len(sys.argv) > 4 else 32
+    assinantes = int(sys.argv[5]) if len(sys.argv) > 5 else 4
+
+    print(
+        f"POST /sensor por {segundos:.0f} s, {geradores} geradores x {concorrencia} em voo, "
+        f"{assinantes} assinantes SSE ({os.cpu_count()} CPUs)\n"
+    )
+    print(f"{'workers':>7}  {'vazão':>12}  {'ganho':>6}  {'stream':>7}")
+    referencia = None
+    with tempfile.TemporaryDirectory() as diretorio:
+        for workers in lista_workers:
+            vazao, entrega = rodar(workers, segundos, geradores, concorrencia, assinantes, diretorio)
+            referencia = referencia or vazao
+            stream = f"{entrega:>6.0%}" if entrega is not None else "      -"
+            print(f"{workers:>7}  {vazao:>8.0f} req/s  {vazao / referencia:>5.2f}x  {stream}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""Bytes por leitura e CPU do servidor: JSON x formato binário compacto na ingestão.
+
+Compara, por leitura de `POST /sensor`:
+
+- o tamanho do corpo e da requisição HTTP (linha de requisição + cabeçalhos mínimos);
+- o tempo de CPU do servidor para transformar o corpo em `SensorData` validado, isolado e em
+  lotes de 100: `json.loads` ou a decodificação do registro seguidos da validação do modelo, o
+  mesmo caminho que a rota executa (o corpo binário decodificado não passa por JSON);
+- o tempo da requisição completa pelo app (ASGI, backend em memória), que inclui o
+  roteamento, o handler e a resposta.
+
+Cada medida é o menor tempo (`perf_counter`) de `RODADAS` rodadas; na requisição
+completa, as rodadas alternam os formatos, para que ruído da máquina e aquecimento
+afetem todos igualmente. O logging fica desligado durante as medidas: os logs por
+leitura (amostrados ou não) dominariam a diferença entre os formatos.
+
+Se o `msgpack` estiver instalado, inclui o MessagePack (mapa com as mesmas chaves) como
+referência.
+
+    python -m benchmarks.ingestao_binaria [leituras]
+"""
+import asyncio
+import gc
+import json
+import logging
+import os
+import sys
+import time
+
+# O app é importado com o backend em memória: mede-se o caminho do servidor, não o banco
+os.environ.setdefault("ARMAZENAMENTO", "memoria")
+
+import httpx
+
+from app.models.sensor import SensorData
+from app.utils.leitura_binaria import TIPO_LEITURA_BINARIA, codificar_leitura, decodificar_leitura, decodificar_lote
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+ID_COMPRESSOR = 920_000
+TAMANHO_LOTE = 100
+RODADAS = 5
+
+
+def leitura(sequencia: int) -> dict:
+    return {
+        "id_compressor": ID_COMPRESSOR,
+        "ligado": True,
+        "pressao": 7.0 + (sequencia % 30) / 10,
+        "temp_equipamento": 80.5,
+        "temp_ambiente": 25.25,
+        "potencia_kw": 20.0,
+        "umidade": 50.5,
+        "vibracao": sequencia % 7 == 0,
+        "corrente": 30.4
+    }
+
+
+def requisicao_http(caminho: str, tipo: str, corpo: bytes) -> int:
+    """Tamanho da requisição HTTP/1.1 com os cabeçalhos mínimos que o ESP32 envia."""
+    cabecalhos = (
+        f"POST {caminho} HTTP/1.1\r\nHost: ordem-da-fenix.fly.dev\r\n"
+        f"Content-Type: {tipo}\r\nContent-Length: {len(corpo)}\r\n\r\n"
+    )
+    return len(cabecalhos.encode()) + len(corpo)
+
+
+def json_para_modelo(corpo: bytes):
+    return SensorData.model_validate(json.loads(corpo))
+
+
+def binario_para_modelo(corpo: bytes):
+    return SensorData.model_validate(decodificar_leitura(corpo))
+
+
+def msgpack_para_modelo(corpo: bytes):
+    return SensorData.model_validate(msgpack.unpackb(corpo))
+
+
+def lote_json(corpo: bytes):
+    return [SensorData.model_validate(item) for item in json.loads(corpo)]
+
+
+def lote_binario(corpo: bytes):
+    return [SensorData.model_validate(item) for item in decodificar_lote(corpo)]
+
+
+def lote_msgpack(corpo: bytes):
+    return [SensorData.model_validate(item) for item in msgpack.unpackb(corpo)]
+
+
+def medir(funcao, corpos, leituras_por_corpo: int) -> float:
+    """Menor tempo por leitura (µs) entre as rodadas."""
+    gc.collect()
+    melhor = float("inf")
+    for _ in range(RODADAS):
+        inicio = time.perf_counter()
+        for corpo in corpos:
+            funcao(corpo)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor / (len(corpos) * leituras_por_corpo) * 1e6
+
+
+async def medir_requisicoes(formatos, quantidade: int):
+    from app.main import app
+
+    resultados = {}
+    async with app.router.lifespan_context(app):
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as cliente:
+            await cliente.post("/compressores/", json={
+                "id_compressor": ID_COMPRESSOR,
+                "nome_marca": "Bench",
+                "localizacao": "Bancada",
+                "potencia_nominal_kw": 20,
+                "data_ultima_manutencao": "2025-01-01T00:00:00",
+                "esta_ligado": False
+            })
+            # A API não aceita MessagePack: apenas referência de tamanho/CPU
+            enviados = [
+                (nome, tipo, [codificar(leitura(s)) for s in range(quantidade)])
+                for nome, tipo, codificar, _, _ in formatos if tipo != "application/msgpack"
+            ]
+            for nome, tipo, corpos in enviados:
+                await cliente.post("/sensor", content=corpos[0], headers={"content-type": tipo})
+            for _ in range(RODADAS):
+                for nome, tipo, corpos in enviados:
+                    gc.collect()
+                    inicio = time.perf_counter()
+                    for corpo in corpos:
+                        resposta = await cliente.post("/sensor", content=corpo, headers={"content-type": tipo})
+                        if resposta.status_code >= 300:
+                            raise RuntimeError(f"{nome}: {resposta.status_code} {resposta.text}")
+                    micros = (time.perf_counter() - inicio) / quantidade * 1e6
+                    resultados[nome] = min(resultados.get(nome, micros), micros)
+    return resultados
+
+
+def main():
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    logging.disable(logging.CRITICAL)
+
+    formatos = [
+        ("JSON", "application/json", lambda l: json.dumps(l, separators=(",", ":")).encode(), json_para_modelo, lote_json),
+        ("binário v1", TIPO_LEITURA_BINARIA, codificar_leitura, binario_para_modelo, lote_binario),
+    ]
+    if msgpack is not None:
+        formatos.append(("MessagePack (ref.)", "application/msgpack", msgpack.packb, msgpack_para_modelo, lote_msgpack))
+
+    lotes = quantidade // TAMANHO_LOTE
+    print(f"{quantidade} leituras; lotes de {TAMANHO_LOTE}; µs por leitura (menor de {RODADAS} rodadas)\n")
+    print(f"{'formato':<20} {'corpo':>7} {'HTTP':>7} {'lote/leitura':>13} {'tempo':>8} {'tempo lote':>10}")
+    for nome, tipo, codificar, para_modelo, lote_para_modelo in formatos:
+        corpos = [codificar(leitura(s)) for s in range(quantidade)]
+        if tipo == "application/json":
+            corpos_lote = [
+                json.dumps([leitura(s) for s in range(i, i + TAMANHO_LOTE)], separators=(",", ":")).encode()
+                for i in range(0, lotes * TAMANHO_LOTE, TAMANHO_LOTE)
+            ]
+        elif tipo == TIPO_LEITURA_BINARIA:
+            corpos_lote = [b"".join(corpos[i:i + TAMANHO_LOTE]) for i in range(0, lotes * TAMANHO_LOTE, TAMANHO_LOTE)]
+        else:
+            corpos_lote = [
+                msgpack.packb([leitura(s) for s in range(i, i + TAMANHO_LOTE)])
+                for i in range(0, lotes * TAMANHO_LOTE, TAMANHO_LOTE)
+            ]
+        corpo = corpos[0]
+        print(
+            f"{nome:<20} {len(corpo):>5} B {requisicao_http('/sensor', tipo, corpo):>5} B "
+            f"{len(corpos_lote[0]) / TAMANHO_LOTE:>11.1f} B "
+            f"{medir(para_modelo, corpos, 1):>8.2f} {medir(lote_para_modelo, corpos_lote, TAMANHO_LOTE):>10.2f}"
+        )
+
+    print(
+        f"\nRequisição completa POST /sensor pelo app (ASGI, backend em memória), "
+        f"{quantidade // 10} por formato, menor de {RODADAS} rodadas"
+    )
+    for nome, micros in asyncio.run(medir_requisicoes(formatos, quantidade // 10)).items():
+        print(f"{nome:<20} {micros:>8.1f} µs por requisição")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Latência dos caminhos críticos em cada backend do repositório (memória, SQLite, Firestore).
+
+Mede, com o mesmo código para todos os backends, as operações do ingest e das
+consultas: busca do compressor por `id_compressor`, commit de uma leitura com o
+update de status (`gravar_leituras`) e a primeira página de `/dados/{id}`.
+
+    ARMAZENAMENTO=memoria python -m benchmarks.latencia_repositorio [operacoes] [backends]
+
+Exemplo: `ARMAZENAMENTO=memoria python -m benchmarks.latencia_repositorio 2000 memoria,sqlite`.
+`ARMAZENAMENTO=memoria` evita que o import de `app.db.repositorio` crie o cliente do
+Firebase. O backend `firestore` só é aceito com o emulador (FIRESTORE_EMULATOR_HOST) —
+nunca contra um projeto real; o SQLite usa um arquivo temporário.
+"""
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+QUANTIDADE_COMPRESSORES = 50
+ID_BASE = 900_000
+
+
+def criar(backend: str, diretorio: str):
+    if backend == "firestore" and not os.getenv("FIRESTORE_EMULATOR_HOST"):
+        sys.exit("Defina FIRESTORE_EMULATOR_HOST (ex.: localhost:8080); este teste não deve rodar contra o Firestore real.")
+    if backend == "sqlite":
+        from app.db.repositorio_sqlite import RepositorioSQLite
+        return RepositorioSQLite(os.path.join(diretorio, "bench.db"))
+    from app.db.repositorio import criar_repositorio
+    return criar_repositorio(backend)
+
+
+def preparar(repositorio) -> dict:
+    """Cadastra os compressores e retorna {id_compressor: ID do documento}."""
+    docs = {}
+    for id_compressor in range(ID_BASE, ID_BASE + QUANTIDADE_COMPRESSORES):
+        docs[id_compressor] = repositorio.criar_compressor({
+            "id_compressor": id_compressor,
+            "nome_marca": "Bench",
+            "esta_ligado": False,
+            "data_cadastro": datetime.now()
+        })
+    return docs
+
+
+def leitura(id_compressor: int, sequencia: int) -> dict:
+    return {
+        "id_compressor": id_compressor,
+        "ligado": sequencia % 2 == 0,
+        "pressao": 7.5,
+        "temp_equipamento": 80.0,
+        "temp_ambiente": 25.0,
+        "potencia_kw": 20.0,
+        "umidade": 50.0,
+        "vibracao": False,
+        "corrente": 30.0,
+        "data_medicao": datetime.now() - timedelta(microseconds=sequencia)
+    }
+
+
+async def medir(operacao, quantidade: int):
+    latencias = []
+    for sequencia in range(quantidade):
+        inicio = time.perf_counter()
+        await operacao(sequencia)
+        latencias.append(time.perf_counter() - inicio)
+    return latencias
+
+
+def resumo(backend, nome, latencias):
+    latencias = sorted(latencias)
+    p99 = latencias[max(0, int(len(latencias) * 0.99) - 1)]
+    print(
+        f"{backend:<10} {nome:<20} p50 {statistics.median(latencias) * 1e6:>9.0f} µs  "
+        f"p99 {p99 * 1e6:>9.0f} µs"
+    )
+
+
+async def rodar(backend: str, quantidade: int, diretorio: str):
+    from app.db.repositorio import gerar_id_documento
+
+    repositorio = criar(backend, diretorio)
+    docs = preparar(repositorio)
+
+    def id_de(sequencia):
+        return ID_BASE + sequencia % QUANTIDADE_COMPRESSORES
+
+    async def carregar(sequencia):
+        await repositorio.carregar_compressor_async(id_de(sequencia))
+
+    async def gravar(sequencia):
+        id_compressor = id_de(sequencia)
+        await repositorio.gravar_leituras_async([(
+            gerar_id_documento(), leitura(id_compressor, sequencia),
+            docs[id_compressor], {"esta_ligado": sequencia % 2 == 0}
+        )])
+
+    async def listar(sequencia):
+        await repositorio.listar_leituras_async(id_de(sequencia), 50)
+
+    for nome, operacao in (("carregar_compressor", carregar), ("gravar_leituras", gravar), ("listar_leituras", listar)):
+        resumo(backend, nome, await medir(operacao, quantidade))
+    repositorio.fechar()
+
+
+async def main():
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000
+    backends = sys.argv[2].split(",") if len(sys.argv) > 2 else ["memoria", "sqlite"]
+
+    print(f"{quantidade} operações sequenciais por caminho\n")
+    with tempfile.TemporaryDirectory() as diretorio:
+        for backend in backends:
+            await rodar(backend, quantidade, diretorio)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
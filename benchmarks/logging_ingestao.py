@@ -0,0 +1,91 @@
+"""Custo do logging por requisição de ingestão (`POST /sensor`), antes e depois.
+
+Reproduz as mensagens info emitidas por leitura recebida (recebimento e gravação)
+com a saída indo para `os.devnull`, em quatro configurações:
+
+- `antes`: f-strings e StreamHandler síncrono com formato texto (setup anterior);
+- `lazy + JSON síncrono`: argumentos `%` e FormatadorJSON, ainda escrevendo na thread da requisição;
+- `fila + JSON`: QueueHandler/QueueListener (formatação e escrita na thread do listener);
+- `fila + JSON + amostragem`: como acima, registrando 1 a cada N (LoggerAmostrado).
+
+Mede o tempo na thread da requisição (o que aumenta a latência) e o tempo total até
+a fila ser drenada (CPU gasto com logging, relevante com uma única vCPU).
+
+    python -m benchmarks.logging_ingestao [requisicoes] [amostragem]
+"""
+import logging
+import os
+import queue
+import sys
+import time
+
+from app.utils.error_handling import FormatadorJSON, LoggerAmostrado, QueueHandlerLazy
+
+FORMATO_TEXTO = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+def criar_logger(nome: str, formatador: logging.Formatter, assincrono: bool, destino):
+    logger = logging.getLogger(f"bench.{nome}")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    handler = logging.StreamHandler(destino)
+    handler.setFormatter(formatador)
+    listener = None
+    if assincrono:
+        fila = queue.SimpleQueue()
+        listener = logging.handlers.QueueListener(fila, handler)
+        listener.start()
+        logger.addHandler(QueueHandlerLazy(fila))
+    else:
+        logger.addHandler(handler)
+    return logger, listener
+
+
+def requisicao_antes(logger, id_compressor: int, doc_id: str):
+    logger.info(f"Recebendo dados do sensor para compressor {id_compressor}")
+    logger.info(f"Dados do sensor salvos com sucesso (ID: {doc_id}), status do compressor atualizado para: ligado")
+
+
+def requisicao_depois(logger, id_compressor: int, doc_id: str):
+    logger.info("Recebendo dados do sensor para compressor %s", id_compressor)
+    logger.info("Dados do sensor salvos com sucesso (ID: %s), status do compressor atualizado para: %s", doc_id, "ligado")
+
+
+def medir(nome, logger, listener, requisicao, quantidade: int):
+    inicio = time.perf_counter()
+    for sequencia in range(quantidade):
+        requisicao(logger, 900_000 + sequencia % 50, f"doc{sequencia:016d}")
+    na_requisicao = time.perf_counter() - inicio
+    if listener is not None:
+        listener.stop()
+    total = time.perf_counter() - inicio
+    print(
+        f"{nome:<28} {na_requisicao / quantidade * 1e6:>8.2f} µs/req na requisição  "
+        f"{total / quantidade * 1e6:>8.2f} µs/req total"
+    )
+
+
+def main():
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    amostragem = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+    print(f"{quantidade} requisições, 2 logs info por requisição\n")
+    with open(os.devnull, "w") as destino:
+        logger, listener = criar_logger("antes", logging.Formatter(FORMATO_TEXTO), False, destino)
+        medir("antes", logger, listener, requisicao_antes, quantidade)
+
+        logger, listener = criar_logger("lazy_json", FormatadorJSON(), False, destino)
+        medir("lazy + JSON síncrono", logger, listener, requisicao_depois, quantidade)
+
+        logger, listener = criar_logger("fila", FormatadorJSON(), True, destino)
+        medir("fila + JSON", logger, listener, requisicao_depois, quantidade)
+
+        logger, listener = criar_logger("amostrado", FormatadorJSON(), True, destino)
+        medir(
+            f"fila + JSON + 1/{amostragem}", LoggerAmostrado(logger, amostragem), listener,
+            requisicao_depois, quantidade
+        )
+
+
+if __name__ == "__main__":
+    main()
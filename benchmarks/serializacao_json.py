@@ -0,0 +1,114 @@
+"""Custo de serializar respostas grandes de `/dados`: caminho padrão do FastAPI x orjson.
+
+Monta uma página de `/dados/{id_compressor}` com N leituras (com `datetime`, como as
+devolvidas pelo repositório) e mede o tempo e o pico de memória alocada (tracemalloc)
+de cada caminho até os bytes do corpo:
+
+- `jsonable_encoder + json.dumps`: handler sem `response_model` (caminho padrão);
+- `response_model=dict`: validação do dicionário + `dump_json` do Pydantic (rotas de compressores);
+- `orjson`: `RespostaJSONRapida` (JSON_RAPIDO=true).
+
+Os dois últimos caminhos também são medidos com os `datetime` do Firestore
+(`DatetimeWithNanoseconds`, uma subclasse), que o orjson converte pelo `default`. Requer `orjson` (pip install orjson).
+
+    python -m benchmarks.serializacao_json [quantidades] [repeticoes]
+"""
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+# A RespostaJSONRapida só importa o orjson com JSON_RAPIDO ativo
+os.environ["JSON_RAPIDO"] = "true"
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from app.utils.datetime_utils import now_br
+from app.utils.respostas_json import RespostaJSONRapida
+
+
+class DatetimeFirestore(datetime):
+    """Subclasse de datetime, como a `DatetimeWithNanoseconds` devolvida pelo Firestore."""
+
+
+def pagina(quantidade: int, tipo_data=datetime) -> dict:
+    inicio = now_br()
+    dados = []
+    for sequencia in range(quantidade):
+        medicao = inicio - timedelta(seconds=sequencia * 5)
+        dados.append({
+            "firestore_id": f"doc{sequencia:016d}",
+            "id_compressor": 1001,
+            "ligado": True,
+            "pressao": 7.0 + (sequencia % 30) / 10,
+            "temp_equipamento": 80.5,
+            "temp_ambiente": 25.2,
+            "potencia_kw": 20.0,
+            "umidade": 50.0,
+            "vibracao": sequencia % 7 == 0,
+            "corrente": 30.4,
+            "data_medicao": tipo_data.fromtimestamp(medicao.timestamp(), medicao.tzinfo)
+        })
+    return {"id_compressor": 1001, "total": quantidade, "next_cursor": None, "dados": dados}
+
+
+ADAPTADOR_DICT = TypeAdapter(dict)
+
+
+def padrao(conteudo: dict) -> bytes:
+    return JSONResponse(jsonable_encoder(conteudo)).body
+
+
+def response_model_dict(conteudo: dict) -> bytes:
+    return ADAPTADOR_DICT.dump_json(ADAPTADOR_DICT.validate_python(conteudo))
+
+
+def rapida(conteudo: dict) -> bytes:
+    return RespostaJSONRapida(conteudo).body
+
+
+def medir(funcao, conteudo: dict, repeticoes: int):
+    gc.collect()
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        corpo = funcao(conteudo)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    # Pico de memória medido em uma execução separada (o tracemalloc deixa tudo mais lento)
+    tracemalloc.start()
+    funcao(conteudo)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return melhor, pico, len(corpo)
+
+
+def main():
+    quantidades = [int(q) for q in sys.argv[1].split(",")] if len(sys.argv) > 1 else [1_000, 10_000, 100_000]
+    repeticoes = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    casos = [
+        ("jsonable_encoder + json.dumps", padrao, datetime),
+        ("response_model=dict", response_model_dict, datetime),
+        ("orjson", rapida, datetime),
+        ("response_model=dict (Firestore)", response_model_dict, DatetimeFirestore),
+        ("orjson (Firestore)", rapida, DatetimeFirestore),
+    ]
+    print(f"{'leituras':>9}  {'caminho':<32} {'tempo':>10} {'pico mem.':>11} {'corpo':>10} {'ganho':>7}")
+    for quantidade in quantidades:
+        referencia = None
+        for nome, funcao, tipo_data in casos:
+            tempo, pico, tamanho = medir(funcao, pagina(quantidade, tipo_data), repeticoes)
+            referencia = referencia or tempo
+            print(
+                f"{quantidade:>9}  {nome:<32} {tempo * 1e3:>7.1f} ms {pico / 2**20:>7.1f} MiB "
+                f"{tamanho / 2**20:>6.1f} MiB {referencia / tempo:>6.1f}x"
+            )
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+"""Configuração do gunicorn para o modo multi-worker (um event loop uvicorn por processo).
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+Cada worker importa a aplicação depois do fork e cria os próprios clientes/canais
+gRPC do Firestore no primeiro uso; os caches em memória são coordenados entre os
+workers da máquina por `app/utils/invalidacao.py`.
+"""
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn_worker.UvicornWorker"
+
+# Sem preload: o import (e qualquer recurso criado nele, como o spool em disco) acontece
+# em cada worker. Com GUNICORN_PRELOAD=true o import é feito uma vez no master (forks mais
+# rápidos); os clientes do Firestore continuam sendo criados depois do fork, mas o spool
+# (INGESTAO_SPOOL_DIR) exige preload desligado, pois cada worker precisa do próprio diretório.
+preload_app = os.getenv("GUNICORN_PRELOAD", "false").lower() == "true"
+if preload_app and os.getenv("INGESTAO_SPOOL_DIR"):
+    raise RuntimeError("GUNICORN_PRELOAD=true não é compatível com INGESTAO_SPOOL_DIR")
+
+# Tempo para o lifespan drenar fila, spool e escritas agrupadas no shutdown
+# (INGESTAO_FILA_TIMEOUT_DRENAGEM é 20 s por padrão)
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+keepalive = 5
+accesslog = None
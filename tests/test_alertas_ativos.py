@@ -0,0 +1,104 @@
+"""Índice de alertas ativos: transições por origem e limite das operações pendentes.
+
+    python -m pytest tests
+"""
+import os
+
+# Backend em memória: o teste não depende de credenciais do Firestore
+os.environ.setdefault("ARMAZENAMENTO", "memoria")
+
+import pytest
+
+from app.db import alertas_ativos
+from app.db.alertas_ativos import IndiceAlertasAtivos
+from app.models.parametros import PrioridadeAlerta
+from app.utils.datetime_utils import now_br
+
+ID_COMPRESSOR = 920_013
+
+# Mesmo estado nas duas origens: pressão alta e o resto normal
+ALERTAS_SERVIDOR = {
+    "pressao": "alto",
+    "temperatura_equipamento": "normal",
+    "temperatura_ambiente": "normal",
+    "potencia": "normal",
+    "umidade": "normal",
+    "vibracao": "normal"
+}
+ALERTAS_ESP32 = {
+    "pressao": "acima_do_normal",
+    "temperatura_equipamento": "normal",
+    "temperatura_ambiente": "normal",
+    "potencia": "normal",
+    "umidade": "normal",
+    "corrente": "normal",
+    "vibracao": "normal"
+}
+
+
+@pytest.fixture
+def indice():
+    indice = IndiceAlertasAtivos(intervalo_flush=1.0, maximo_pendentes=50)
+    indice.carregado = True
+    return indice
+
+
+def test_origens_alternadas_sem_mudanca_nao_geram_transicoes(indice):
+    assert len(indice.processar(ID_COMPRESSOR, ALERTAS_SERVIDOR, now_br(), "servidor")) == 1
+    assert len(indice.processar(ID_COMPRESSOR, ALERTAS_ESP32, now_br(), "esp32")) == 1
+
+    eventos = []
+    for _ in range(5):
+        eventos += indice.processar(ID_COMPRESSOR, ALERTAS_SERVIDOR, now_br(), "servidor")
+        eventos += indice.processar(ID_COMPRESSOR, ALERTAS_ESP32, now_br(), "esp32")
+    assert eventos == []
+
+    ativos = {(alerta.origem, alerta.tipo_alerta): alerta for alerta in indice.listar(ID_COMPRESSOR)}
+    assert set(ativos) == {("servidor", "pressao"), ("esp32", "pressao")}
+    assert ativos[("servidor", "pressao")].nivel == "alto"
+    assert ativos[("esp32", "pressao")].prioridade == PrioridadeAlerta.atencao
+
+
+def test_normal_de_uma_origem_nao_encerra_o_alerta_da_outra(indice):
+    indice.processar(ID_COMPRESSOR, {"vibracao": "critico"}, now_br(), "servidor")
+    eventos = indice.processar(ID_COMPRESSOR, {"vibracao": "normal"}, now_br(), "esp32")
+    assert eventos == []
+    assert [alerta.origem for alerta in indice.listar(ID_COMPRESSOR)] == ["servidor"]
+
+
+def test_pendentes_limitados_durante_indisponibilidade(indice, monkeypatch):
+    def indisponivel(operacoes):
+        raise RuntimeError("Firestore indisponível")
+
+    monkeypatch.setattr(alertas_ativos.repositorio, "gravar_alertas", indisponivel)
+    for sequencia in range(200):
+        nivel = "alto" if sequencia % 2 == 0 else "normal"
+        indice.processar(ID_COMPRESSOR, {"pressao": nivel}, now_br(), "servidor")
+        indice.processar(ID_COMPRESSOR + 1 + sequencia, {"pressao": "alto"}, now_br(), "servidor")
+        indice.flush()
+
+    estatisticas = indice.estatisticas()
+    assert estatisticas["operacoes_pendentes"] <= 50
+    assert estatisticas["operacoes_descartadas"] > 0
+    # Índice em memória intacto: só o espelho gravado perde operações
+    assert estatisticas["alertas_ativos"] == 200
+
+
+def test_documentos_anteriores_a_origem_sao_removidos_na_carga(monkeypatch):
+    legado = {
+        "id_compressor": ID_COMPRESSOR,
+        "tipo_alerta": "pressao",
+        "nivel": "alto",
+        "prioridade": "atencao",
+        "mensagem": "Pressão: nível alto",
+        "data_disparo": now_br()
+    }
+    monkeypatch.setattr(alertas_ativos.repositorio, "carregar_alertas_ativos", lambda: [legado])
+    gravadas = []
+    monkeypatch.setattr(alertas_ativos.repositorio, "gravar_alertas", gravadas.extend)
+
+    indice = IndiceAlertasAtivos(intervalo_flush=1.0)
+    indice.carregar()
+    indice.flush()
+    assert indice.listar() == []
+    assert gravadas == [("desativar", f"{ID_COMPRESSOR}_pressao", None)]
@@ -0,0 +1,84 @@
+"""Equivalência da avaliação de alertas: `avaliar_nivel` x bisect x NumPy.
+
+Valores aleatórios, todas as fronteiras (e vizinhos imediatos), infinitos e NaN
+nas faixas fixas e nas faixas configuradas por compressor.
+
+    python -m pytest tests
+"""
+import math
+import os
+import random
+
+# Backend em memória: o teste não depende de credenciais do Firestore
+os.environ.setdefault("ARMAZENAMENTO", "memoria")
+
+import pytest
+
+from app.utils import alertas
+from app.utils.alertas import (
+    CONFIGURACAO_FIXA, LimitesCompilados, avaliar_leitura, avaliar_nivel, faixas_de_limites, gerar_alertas_lote
+)
+
+LIMITES_CONFIGURADOS = {"minimo": 4.0, "ideal_minimo": 6.5, "ideal_maximo": 9.0, "maximo": 10.0, "critico": 12.0}
+
+FAIXAS = {
+    **CONFIGURACAO_FIXA,
+    "configurado": faixas_de_limites(LIMITES_CONFIGURADOS),
+    # Faixas sobrepostas: vale a prioridade critico -> muito_baixo
+    "sobrepostas": {
+        "muito_baixo": {"min": 0.0, "max": 6.0},
+        "baixo": {"min": 5.0, "max": 8.0},
+        "normal": {"min": 7.0, "max": 10.0},
+        "alto": {"min": 9.0, "max": 12.0},
+        "critico": {"min": 12.0, "max": 12.0}
+    }
+}
+
+
+def valores_de_teste(limites):
+    gerador = random.Random(2025)
+    valores = [float("inf"), float("-inf"), float("nan"), 0.0, -0.0]
+    for faixa in limites.values():
+        for fronteira in (faixa["min"], faixa["max"]):
+            if math.isfinite(fronteira):
+                valores += [fronteira, math.nextafter(fronteira, -math.inf), math.nextafter(fronteira, math.inf)]
+    valores += [gerador.uniform(-50.0, 200.0) for _ in range(2000)]
+    return valores
+
+
+@pytest.mark.parametrize("nome", sorted(FAIXAS))
+def test_bisect_equivale_a_avaliar_nivel(nome):
+    limites = FAIXAS[nome]
+    compilados = LimitesCompilados(limites)
+    for valor in valores_de_teste(limites):
+        assert compilados.avaliar(valor) == avaliar_nivel(valor, limites), valor
+
+
+@pytest.mark.parametrize("nome", sorted(FAIXAS))
+@pytest.mark.parametrize("com_numpy", [True, False])
+def test_lote_equivale_a_avaliar_nivel(monkeypatch, nome, com_numpy):
+    if com_numpy:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(alertas, "_numpy", False)
+    limites = FAIXAS[nome]
+    valores = valores_de_teste(limites)
+    esperado = [avaliar_nivel(valor, limites) for valor in valores]
+    assert LimitesCompilados(limites).avaliar_lote(valores) == esperado
+    assert LimitesCompilados(limites).avaliar_lote([]) == []
+
+
+def test_gerar_alertas_lote_equivale_a_avaliar_leitura():
+    gerador = random.Random(7)
+    leituras = [
+        {
+            "pressao": gerador.uniform(0, 15),
+            "temp_equipamento": gerador.uniform(40, 120),
+            "temp_ambiente": gerador.uniform(-15, 50),
+            "potencia_kw": gerador.uniform(0, 50),
+            "umidade": gerador.uniform(0, 110),
+            "vibracao": gerador.random() < 0.1
+        }
+        for _ in range(500)
+    ]
+    assert gerar_alertas_lote(leituras) == [avaliar_leitura(leitura) for leitura in leituras]
@@ -0,0 +1,80 @@
+"""Alertas do servidor e do ESP32 no mesmo compressor, sem mudança real de nível.
+
+A avaliação do servidor (5 níveis) fica em `alertas_servidor` e a do ESP32 (3 níveis)
+em `alertas`: enviadas alternadamente com os mesmos valores, nenhuma das duas
+sobrescreve a outra, então o documento do compressor não é regravado.
+
+    python -m pytest tests
+"""
+import os
+
+# Backend em memória: o teste não depende de credenciais do Firestore
+os.environ.setdefault("ARMAZENAMENTO", "memoria")
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.db.escritas_compressor import escritas_compressor
+from app.db.repositorio import repositorio
+from app.main import create_app
+
+ID_COMPRESSOR = 920_011
+
+LEITURA = {
+    "id_compressor": ID_COMPRESSOR,
+    "ligado": True,
+    "pressao": 10.5,
+    "temp_equipamento": 80.0,
+    "temp_ambiente": 25.0,
+    "potencia_kw": 20.0,
+    "umidade": 50.0,
+    "vibracao": False,
+    "corrente": 30.0
+}
+
+ALERTAS_ESP32 = {
+    "id_compressor": ID_COMPRESSOR,
+    "alerta_potencia": "normal",
+    "alerta_pressao": "acima_do_normal",
+    "alerta_temperatura_ambiente": "normal",
+    "alerta_temperatura_equipamento": "normal",
+    "alerta_umidade": "normal",
+    "alerta_corrente": "normal",
+    "vibracao": False
+}
+
+
+@pytest.fixture
+def cliente():
+    with TestClient(create_app()) as cliente:
+        cliente.post("/compressores/", json={
+            "id_compressor": ID_COMPRESSOR,
+            "nome_marca": "Teste",
+            "localizacao": "Bancada",
+            "potencia_nominal_kw": 20,
+            "data_ultima_manutencao": "2025-01-01T00:00:00",
+            "esta_ligado": False
+        })
+        yield cliente
+
+
+def test_origens_alternadas_nao_regravam_o_compressor(cliente):
+    assert cliente.post("/sensor", json=LEITURA).status_code == 200
+    assert cliente.post("/esp32/alertas", json=ALERTAS_ESP32).status_code == 200
+    escritas_compressor.flush(todas=True)
+    _, documento = repositorio.carregar_compressor(ID_COMPRESSOR)
+    assert documento["alertas_servidor"]["pressao"] == "alto"
+    assert documento["alertas"]["pressao"] == "acima_do_normal"
+
+    antes = escritas_compressor.estatisticas()
+    for _ in range(5):
+        assert cliente.post("/sensor", json=LEITURA).status_code == 200
+        assert cliente.post("/esp32/alertas", json=ALERTAS_ESP32).status_code == 200
+    escritas_compressor.flush(todas=True)
+    depois = escritas_compressor.estatisticas()
+
+    assert depois["gravadas"] == antes["gravadas"]
+    assert depois["suprimidas"] - antes["suprimidas"] == 10
+    _, documento = repositorio.carregar_compressor(ID_COMPRESSOR)
+    assert documento["alertas_servidor"]["pressao"] == "alto"
+    assert documento["alertas"]["pressao"] == "acima_do_normal"
@@ -0,0 +1,96 @@
+"""Cache do registro de compressores: TTL, resultados negativos e invalidação durante a carga.
+
+    python -m pytest tests
+"""
+import asyncio
+import os
+
+# Backend em memória: o teste não depende de credenciais do Firestore
+os.environ.setdefault("ARMAZENAMENTO", "memoria")
+
+import pytest
+
+from app.db import cache_compressores as modulo
+from app.db.cache_compressores import CacheCompressores, EntradaCompressor
+
+ID_COMPRESSOR = 920_001
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = CacheCompressores(ttl=60, ttl_negativo=60, max_entradas=3)
+    monkeypatch.setattr(modulo, "cache_compressores", cache)
+    return cache
+
+
+class RepositorioLento:
+    """`carregar_compressor(_async)` que invalida o compressor no meio da consulta."""
+
+    def __init__(self, cache, documento=None, invalidar=None):
+        self.cache = cache
+        self.documento = documento
+        # Chamado durante a consulta (ex.: invalidação vinda de outro worker)
+        self.invalidar = invalidar or (lambda: cache.invalidar(ID_COMPRESSOR, propagar=False))
+        self.consultas = 0
+
+    def carregar_compressor(self, id_compressor):
+        self.consultas += 1
+        self.invalidar()
+        return (f"doc-{id_compressor}", self.documento) if self.documento is not None else None
+
+    async def carregar_compressor_async(self, id_compressor):
+        await asyncio.sleep(0)
+        return self.carregar_compressor(id_compressor)
+
+
+def test_hit_miss_e_lru(cache):
+    for id_compressor in range(1, 5):
+        cache.registrar(id_compressor, f"doc-{id_compressor}", {"esta_ligado": True, "extra": 1})
+    assert cache.obter(1) is None
+    entrada = cache.obter(4)
+    assert entrada.ref == "doc-4"
+    # Só os campos quentes ficam em memória
+    assert "extra" not in entrada.dados
+    assert cache.estatisticas()["hits"] == 1 and cache.estatisticas()["misses"] == 1
+
+
+def test_resultado_negativo_e_expiracao(cache):
+    cache.registrar_inexistente(ID_COMPRESSOR)
+    assert cache.obter(ID_COMPRESSOR).existe is False
+    cache.registrar(ID_COMPRESSOR + 1, "doc", {})
+    cache._entradas[ID_COMPRESSOR + 1] = EntradaCompressor("doc", {}, 0.0)
+    assert cache.obter(ID_COMPRESSOR + 1) is None
+
+
+def test_atualizar_campos_write_through(cache):
+    cache.registrar(ID_COMPRESSOR, "doc", {"esta_ligado": False})
+    cache.atualizar_campos(ID_COMPRESSOR, {"esta_ligado": True, "ultima_leitura": {}})
+    assert cache.obter(ID_COMPRESSOR).dados["esta_ligado"] is True
+    assert "ultima_leitura" not in cache.obter(ID_COMPRESSOR).dados
+
+
+def test_invalidacao_durante_a_carga_nao_registra_documento_obsoleto(cache, monkeypatch):
+    repositorio = RepositorioLento(cache, {"esta_ligado": False})
+    monkeypatch.setattr(modulo, "repositorio", repositorio)
+
+    entrada = modulo.buscar_compressor(ID_COMPRESSOR)
+    assert entrada.existe and entrada.dados["esta_ligado"] is False
+    assert cache.obter(ID_COMPRESSOR) is None
+
+    entrada = asyncio.run(modulo.buscar_compressor_async(ID_COMPRESSOR))
+    assert entrada.existe
+    assert cache.obter(ID_COMPRESSOR) is None
+    assert repositorio.consultas == 2
+
+    # Sem invalidação durante a consulta, o resultado é registrado normalmente
+    repositorio.invalidar = lambda: None
+    entrada = asyncio.run(modulo.buscar_compressor_async(ID_COMPRESSOR))
+    assert cache.obter(ID_COMPRESSOR) is entrada
+
+
+def test_resultado_negativo_e_limpeza_durante_a_carga(cache, monkeypatch):
+    monkeypatch.setattr(modulo, "repositorio", RepositorioLento(cache, invalidar=cache.limpar))
+
+    entrada = modulo.buscar_compressor(ID_COMPRESSOR)
+    assert entrada.existe is False
+    assert cache.obter(ID_COMPRESSOR) is None
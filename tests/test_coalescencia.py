@@ -0,0 +1,119 @@
+"""Coalescência (single-flight) de leituras idênticas concorrentes.
+
+    python -m pytest tests
+"""
+import asyncio
+import os
+
+# Backend em memória: o teste não depende de credenciais do Firestore
+os.environ.setdefault("ARMAZENAMENTO", "memoria")
+
+import pytest
+
+from app.db.coalescencia import CoalescedorLeituras
+
+ID_COMPRESSOR = 920_023
+
+
+class Consulta:
+    """Consulta ao repositório que só termina quando `liberar` é sinalizado."""
+
+    def __init__(self, erro=None):
+        self.execucoes = 0
+        self.erro = erro
+        self.liberar = None
+
+    async def __call__(self):
+        self.execucoes += 1
+        await self.liberar.wait()
+        if self.erro is not None:
+            raise self.erro
+        return {"execucao": self.execucoes}
+
+
+async def concorrentes(coalescedor, chave, consulta, quantidade=10):
+    consulta.liberar = asyncio.Event()
+    tarefas = [asyncio.ensure_future(coalescedor.executar(chave, consulta)) for _ in range(quantidade)]
+    await asyncio.sleep(0)
+    consulta.liberar.set()
+    return await asyncio.gather(*tarefas, return_exceptions=True)
+
+
+def test_chamadas_identicas_compartilham_uma_execucao():
+    async def cenario():
+        coalescedor = CoalescedorLeituras(ativo=True, janela=0, max_entradas=10)
+        consulta = Consulta()
+        resultados = await concorrentes(coalescedor, ("dados", ID_COMPRESSOR, 50), consulta)
+        assert consulta.execucoes == 1
+        assert all(resultado is resultados[0] for resultado in resultados)
+        assert coalescedor.estatisticas()["coalescidas"] == 9
+        # Sem janela, nada é guardado depois que a chamada termina
+        await concorrentes(coalescedor, ("dados", ID_COMPRESSOR, 50), consulta, quantidade=1)
+        assert consulta.execucoes == 2
+        # Parâmetros diferentes não são coalescidos
+        outra = Consulta()
+        outra.liberar = consulta.liberar
+        await asyncio.gather(
+            coalescedor.executar(("dados", ID_COMPRESSOR, 50), consulta),
+            coalescedor.executar(("dados", ID_COMPRESSOR, 100), outra)
+        )
+        assert outra.execucoes == 1
+
+    asyncio.run(cenario())
+
+
+def test_excecao_e_compartilhada_e_nao_fica_em_cache():
+    async def cenario():
+        coalescedor = CoalescedorLeituras(ativo=True, janela=60, max_entradas=10)
+        consulta = Consulta(erro=RuntimeError("falhou"))
+        resultados = await concorrentes(coalescedor, ("compressor", ID_COMPRESSOR), consulta)
+        assert consulta.execucoes == 1
+        assert all(isinstance(resultado, RuntimeError) for resultado in resultados)
+        consulta.erro = None
+        await concorrentes(coalescedor, ("compressor", ID_COMPRESSOR), consulta, quantidade=1)
+        assert consulta.execucoes == 2
+
+    asyncio.run(cenario())
+
+
+def test_micro_cache_e_invalidacao():
+    async def cenario():
+        coalescedor = CoalescedorLeituras(ativo=True, janela=60, max_entradas=10)
+        consulta = Consulta()
+        chave = ("compressor", ID_COMPRESSOR)
+        await concorrentes(coalescedor, chave, consulta, quantidade=1)
+        assert await coalescedor.executar(chave, consulta) == {"execucao": 1}
+        assert coalescedor.estatisticas()["micro_cache"] == 1
+
+        coalescedor.invalidar(ID_COMPRESSOR)
+        await concorrentes(coalescedor, chave, consulta, quantidade=1)
+        assert consulta.execucoes == 2
+
+        # Invalidado durante a chamada: o resultado não entra no micro-cache
+        consulta.liberar = asyncio.Event()
+        tarefa = asyncio.ensure_future(coalescedor.executar(("dados", ID_COMPRESSOR), consulta))
+        await asyncio.sleep(0)
+        coalescedor.invalidar(ID_COMPRESSOR)
+        consulta.liberar.set()
+        await tarefa
+        assert coalescedor.estatisticas()["entradas_micro_cache"] == 0
+
+    asyncio.run(cenario())
+
+
+def test_cancelar_uma_requisicao_nao_cancela_as_outras():
+    async def cenario():
+        coalescedor = CoalescedorLeituras(ativo=True, janela=0, max_entradas=10)
+        consulta = Consulta()
+        consulta.liberar = asyncio.Event()
+        chave = ("dados", ID_COMPRESSOR)
+        primeira = asyncio.ensure_future(coalescedor.executar(chave, consulta))
+        segunda = asyncio.ensure_future(coalescedor.executar(chave, consulta))
+        await asyncio.sleep(0)
+        primeira.cancel()
+        consulta.liberar.set()
+        assert await segunda == {"execucao": 1}
+        with pytest.raises(asyncio.CancelledError):
+            await primeira
+
+    asyncio.run(cenario())
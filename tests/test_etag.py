@@ -0,0 +1,121 @@
+"""ETag e GET condicional (`If-None-Match` -> 304) dos compressores e da configuração fixa.
+
+Inclui escritas de status feitas por outro worker, recebidas pelo barramento de
+invalidação: a listagem lembrada deixa de responder 304 sem consultar o repositório.
+
+    python -m pytest tests
+"""
+import os
+from datetime import timedelta
+
+# Backend em memória: o teste não depende de credenciais do Firestore
+os.environ.setdefault("ARMAZENAMENTO", "memoria")
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.db import escritas_compressor as modulo_escritas
+from app.db.escritas_compressor import EscritasCompressor, _adotar_escrita_remota
+from app.db.repositorio import repositorio
+from app.main import create_app
+from app.utils.datetime_utils import now_br
+
+ID_COMPRESSOR = 920_022
+
+
+@pytest.fixture
+def cliente(monkeypatch):
+    with TestClient(create_app()) as cliente:
+        cliente.post("/compressores/", json={
+            "id_compressor": ID_COMPRESSOR,
+            "nome_marca": "Teste",
+            "localizacao": "Bancada",
+            "potencia_nominal_kw": 20,
+            "data_ultima_manutencao": "2025-01-01T00:00:00",
+            "esta_ligado": False
+        })
+        # Conta as consultas feitas ao repositório
+        cliente.consultas = []
+        for nome in ("carregar_compressor_async", "listar_compressores_async"):
+            original = getattr(repositorio, nome)
+
+            async def contada(*args, _original=original, _nome=nome):
+                cliente.consultas.append(_nome)
+                return await _original(*args)
+
+            monkeypatch.setattr(repositorio, nome, contada)
+        yield cliente
+
+
+def condicional(cliente, url, etag, **parametros):
+    return cliente.get(url, params=parametros, headers={"If-None-Match": etag})
+
+
+def escrita_remota(ligado: bool):
+    """Status gravado por outro worker: o documento muda e chega a mensagem "escrita" do barramento."""
+    doc_id, _ = repositorio.carregar_compressor(ID_COMPRESSOR)
+    campos = {"esta_ligado": ligado, "data_ultima_atualizacao": now_br() + timedelta(seconds=1)}
+    repositorio.atualizar_compressor(doc_id, campos)
+    _adotar_escrita_remota(ID_COMPRESSOR, {"ref": doc_id, "campos": {"esta_ligado": ligado}})
+
+
+def test_compressor_304_sem_consulta_e_escrita_remota(cliente):
+    url = f"/compressores/{ID_COMPRESSOR}"
+    resposta = cliente.get(url)
+    etag = resposta.headers["etag"]
+    assert resposta.status_code == 200 and etag.startswith('W/"')
+
+    cliente.consultas.clear()
+    resposta = condicional(cliente, url, etag)
+    assert resposta.status_code == 304 and resposta.content == b""
+    assert resposta.headers["etag"] == etag
+    assert cliente.consultas == []
+
+    escrita_remota(True)
+    resposta = condicional(cliente, url, etag)
+    assert resposta.status_code == 200
+    assert resposta.headers["etag"] != etag
+    assert resposta.json()["compressor"]["esta_ligado"] is True
+
+
+def test_listagem_304_sem_consulta_e_escrita_remota(cliente):
+    resposta = cliente.get("/compressores/", params={"limit": 1000})
+    etag = resposta.headers["etag"]
+
+    cliente.consultas.clear()
+    assert condicional(cliente, "/compressores/", etag, limit=1000).status_code == 304
+    assert cliente.consultas == []
+    # Outros parâmetros são outra resposta
+    assert condicional(cliente, "/compressores/", etag, limit=999).status_code == 200
+
+    escrita_remota(True)
+    cliente.consultas.clear()
+    resposta = condicional(cliente, "/compressores/", etag, limit=1000)
+    assert resposta.status_code == 200
+    assert cliente.consultas == ["listar_compressores_async"]
+    nova = resposta.headers["etag"]
+    assert nova != etag
+    assert condicional(cliente, "/compressores/", nova, limit=1000).status_code == 304
+
+
+def test_escrita_publicada_sem_deduplicacao(monkeypatch):
+    publicadas = []
+    monkeypatch.setattr(modulo_escritas, "DEDUPLICACAO_ATIVA", False)
+    monkeypatch.setattr(
+        modulo_escritas.barramento_invalidacao, "publicar",
+        lambda tipo, id_compressor, dados=None, marcador=None: publicadas.append((tipo, id_compressor, dados))
+    )
+    campos = {"esta_ligado": True, "data_ultima_atualizacao": now_br()}
+    EscritasCompressor(janela=0, intervalo_heartbeat=60).confirmar(ID_COMPRESSOR, "doc", campos)
+    assert publicadas == [("escrita", ID_COMPRESSOR, {"ref": "doc", "campos": {"esta_ligado": True}})]
+
+
+def test_configuracao_fixa(cliente):
+    resposta = cliente.get("/configuracoes/")
+    etag = resposta.headers["etag"]
+    assert resposta.status_code == 200
+    assert "max-age" in resposta.headers["cache-control"]
+    # Sem CONFIGURACAO_FIXA_DATA_APLICACAO, a data não é inventada
+    assert "data_aplicacao" not in resposta.json()
+    assert condicional(cliente, "/configuracoes/", etag).status_code == 304
+    assert condicional(cliente, "/configuracoes/", 'W/"outra"').status_code == 200
@@ -0,0 +1,156 @@
+"""Fila de ingestão write-behind com o Firestore fora do ar.
+
+`gravar_leituras` e a consulta do compressor são substituídos por um Firestore falso
+que fica indisponível por algumas chamadas. Verifica que as leituras já aceitas (202)
+não são descartadas durante a indisponibilidade e são gravadas uma única vez quando
+ele volta; só erros permanentes descartam leituras.
+
+    python -m pytest tests
+"""
+import asyncio
+import os
+from collections import Counter
+from types import SimpleNamespace
+
+# Backend em memória: o teste não depende de credenciais do Firestore
+os.environ.setdefault("ARMAZENAMENTO", "memoria")
+
+import pytest
+from fastapi import HTTPException
+
+from app.db import fila_ingestao
+from app.db.fila_ingestao import FilaIngestao
+from app.utils.datetime_utils import now_br
+
+ID_COMPRESSOR = 920_004
+ID_INEXISTENTE = 920_404
+
+
+class FirestoreFalso:
+    """Substitui `gravar_leituras` e `buscar_compressor_async` da fila."""
+
+    def __init__(self, chamadas_indisponivel=0, erro_permanente=None):
+        self.gravados = Counter()
+        self.consultas = 0
+        self.commits = 0
+        # Número de commits (e consultas) que falham por indisponibilidade
+        self.chamadas_indisponivel = chamadas_indisponivel
+        self.erro_permanente = erro_permanente
+
+    def gravar(self, itens):
+        self.commits += 1
+        if self.commits <= self.chamadas_indisponivel:
+            return [HTTPException(status_code=503, detail="Firestore indisponível") for _ in itens]
+        if self.erro_permanente is not None:
+            return [self.erro_permanente for _ in itens]
+        resultados = []
+        for item in itens:
+            if item["leitura"]["id_compressor"] == ID_INEXISTENTE:
+                # Update do status em um documento que não existe (compressor excluído)
+                resultados.append(HTTPException(status_code=404, detail="Compressor não encontrado"))
+                continue
+            self.gravados[item["doc_id"]] += 1
+            resultados.append(item["doc_id"])
+        return resultados
+
+    async def buscar(self, id_compressor):
+        self.consultas += 1
+        if self.commits <= self.chamadas_indisponivel:
+            raise HTTPException(status_code=503, detail="Firestore indisponível")
+        return SimpleNamespace(existe=id_compressor != ID_INEXISTENTE, ref=f"ref-{id_compressor}")
+
+
+def leitura(id_compressor=ID_COMPRESSOR):
+    return {
+        "id_compressor": id_compressor,
+        "ligado": True,
+        "pressao": 7.5,
+        "temp_equipamento": 80.0,
+        "temp_ambiente": 25.0,
+        "potencia_kw": 20.0,
+        "umidade": 50.0,
+        "vibracao": False,
+        "corrente": 30.0,
+        "data_medicao": now_br()
+    }
+
+
+@pytest.fixture
+def firestore(monkeypatch):
+    def instalar(**kwargs):
+        falso = FirestoreFalso(**kwargs)
+        monkeypatch.setattr(fila_ingestao, "gravar_leituras", falso.gravar)
+        monkeypatch.setattr(fila_ingestao, "buscar_compressor_async", falso.buscar)
+        return falso
+    return instalar
+
+
+def processar(fila, itens, timeout=5.0):
+    """Enfileira os itens e drena a fila (como no shutdown da aplicação)."""
+    async def executar():
+        await fila.iniciar()
+        for item in itens:
+            assert fila.enfileirar(item)
+        await fila.parar(timeout=timeout)
+    asyncio.run(executar())
+
+
+def nova_fila(**kwargs):
+    return FilaIngestao(tamanho_maximo=100, tamanho_lote=10, intervalo=0.01, maximo_tentativas=3,
+                        backoff_maximo=0.05, **kwargs)
+
+
+def itens(quantidade, id_compressor=ID_COMPRESSOR, inicio=0):
+    return [
+        {"ref": f"ref-{id_compressor}", "leitura": leitura(id_compressor), "doc_id": f"leitura{numero:04d}"}
+        for numero in range(inicio, inicio + quantidade)
+    ]
+
+
+def test_indisponibilidade_nao_descarta_leituras_aceitas(firestore):
+    # Mais chamadas indisponíveis que `maximo_tentativas`: nenhuma conta como tentativa
+    falso = firestore(chamadas_indisponivel=8)
+    fila = nova_fila()
+    enviados = itens(5)
+
+    processar(fila, enviados)
+
+    assert fila.descartadas == 0
+    assert fila.gravadas == 5
+    assert set(falso.gravados) == {item["doc_id"] for item in enviados}
+    assert max(falso.gravados.values()) == 1
+    assert falso.consultas > 0
+
+
+def test_compressor_inexistente_e_descartado(firestore):
+    falso = firestore(chamadas_indisponivel=1)
+    fila = nova_fila()
+
+    processar(fila, itens(3) + itens(2, ID_INEXISTENTE, inicio=3))
+
+    assert fila.descartadas == 2
+    assert len(falso.gravados) == 3
+
+
+def test_erro_permanente_descarta_apos_maximo_de_tentativas(firestore):
+    falso = firestore(erro_permanente=ValueError("argumento inválido"))
+    fila = nova_fila()
+
+    processar(fila, itens(4))
+
+    assert fila.descartadas == 4
+    assert falso.commits == 3
+    assert not falso.gravados
+
+
+def test_retentativas_contam_na_capacidade():
+    fila = FilaIngestao(tamanho_maximo=3, tamanho_lote=10, intervalo=0.01, maximo_tentativas=3)
+
+    async def executar():
+        fila._fila = asyncio.Queue(maxsize=fila.tamanho_maximo)
+        fila._retentativas = itens(2)
+        assert fila.enfileirar(itens(1)[0])
+        assert not fila.enfileirar(itens(1)[0])
+
+    asyncio.run(executar())
+    assert fila.rejeitadas == 1
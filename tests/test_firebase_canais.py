@@ -0,0 +1,61 @@
+"""Canais gRPC dos clientes do Firestore: opções de `opcoes_canal()` e fechamento no shutdown.
+
+Nenhum RPC é feito: o canal gRPC só conecta no primeiro uso.
+
+    python -m pytest tests
+"""
+import asyncio
+import os
+
+# Backend em memória: o teste não depende de credenciais do Firestore
+os.environ.setdefault("ARMAZENAMENTO", "memoria")
+
+import pytest
+
+firestore = pytest.importorskip("google.cloud.firestore")
+import grpc
+from google.auth.credentials import AnonymousCredentials
+from google.cloud.firestore_v1.services.firestore.transports import grpc as transporte_grpc
+from google.cloud.firestore_v1.services.firestore.transports import grpc_asyncio as transporte_grpc_asyncio
+
+from app.db.firebase import ClientesFirebase, classe_com_canal, opcoes_canal
+
+
+@pytest.fixture
+def opcoes_usadas(monkeypatch):
+    monkeypatch.delenv("FIRESTORE_EMULATOR_HOST", raising=False)
+    usadas = []
+    for transporte in (transporte_grpc.FirestoreGrpcTransport, transporte_grpc_asyncio.FirestoreGrpcAsyncIOTransport):
+        original = transporte.create_channel
+
+        def create_channel(*args, _original=original, **kwargs):
+            usadas.append(kwargs.get("options"))
+            return _original(*args, **kwargs)
+
+        monkeypatch.setattr(transporte, "create_channel", create_channel)
+    return usadas
+
+
+def test_canais_com_opcoes_e_fechados(opcoes_usadas):
+    async def cenario():
+        clientes = ClientesFirebase(tamanho_pool=2)
+        Cliente, ClienteAsync = classe_com_canal(firestore.Client), classe_com_canal(firestore.AsyncClient)
+        credenciais = AnonymousCredentials()
+        clientes._db = Cliente(project="demo", credentials=credenciais)
+        clientes._adbs = [ClienteAsync(project="demo", credentials=credenciais) for _ in range(2)]
+        for cliente in (clientes._db, *clientes._adbs):
+            # O GAPIC (e o canal) é criado no primeiro uso
+            cliente._firestore_api
+
+        assert opcoes_usadas == [opcoes_canal()] * 3
+        canais = [clientes._db.transporte.grpc_channel] + [adb.transporte.grpc_channel for adb in clientes._adbs]
+
+        await clientes.fechar_async()
+        assert not clientes.inicializado
+        # Canal síncrono fechado: novas chamadas falham
+        with pytest.raises(ValueError):
+            canais[0].unary_unary("/teste/Metodo")(b"")
+        for canal in canais[1:]:
+            assert canal.get_state() == grpc.ChannelConnectivity.SHUTDOWN
+
+    asyncio.run(cenario())
@@ -0,0 +1,110 @@
+"""Ingestão em lote: commits de até 500 operações e status a partir da leitura mais recente.
+
+    python -m pytest tests
+"""
+import os
+from datetime import timedelta
+
+# Backend em memória: o teste não depende de credenciais do Firestore
+os.environ.setdefault("ARMAZENAMENTO", "memoria")
+
+import pytest
+
+from app.db import ingestao
+from app.db.escritas_compressor import EscritasCompressor
+from app.db.repositorio import LIMITE_OPERACOES_BATCH, id_documento_compressor
+from app.db.repositorio_memoria import RepositorioMemoria
+from app.utils.datetime_utils import now_br
+
+ID_COMPRESSOR = 920_003
+
+
+class RepositorioContado(RepositorioMemoria):
+    """Repositório em memória que registra o número de operações de cada commit."""
+
+    def __init__(self):
+        super().__init__()
+        self.commits = []
+        self.falhar_commits = set()
+
+    def gravar_leituras(self, gravacoes):
+        self.commits.append(sum(2 if campos is not None else 1 for *_, campos in gravacoes))
+        if len(self.commits) in self.falhar_commits:
+            raise RuntimeError("commit recusado")
+        super().gravar_leituras(gravacoes)
+
+
+@pytest.fixture
+def repositorio(monkeypatch):
+    repositorio = RepositorioContado()
+    for id_compressor in (ID_COMPRESSOR, ID_COMPRESSOR + 1):
+        repositorio.criar_compressor({"id_compressor": id_compressor, "data_cadastro": now_br()})
+    monkeypatch.setattr(ingestao, "repositorio", repositorio)
+    monkeypatch.setattr(ingestao, "escritas_compressor", EscritasCompressor(janela=0, intervalo_heartbeat=60))
+    return repositorio
+
+
+def item(id_compressor, data_medicao, ligado=True):
+    return {
+        "ref": id_documento_compressor(id_compressor),
+        "leitura": {
+            "id_compressor": id_compressor,
+            "ligado": ligado,
+            "pressao": 7.5,
+            "temp_equipamento": 80.0,
+            "temp_ambiente": 25.0,
+            "potencia_kw": 20.0,
+            "umidade": 50.0,
+            "vibracao": False,
+            "corrente": 30.0,
+            "data_medicao": data_medicao
+        }
+    }
+
+
+def test_commits_respeitam_o_limite_de_operacoes(repositorio):
+    inicio = now_br()
+    itens = [item(ID_COMPRESSOR + indice % 2, inicio + timedelta(seconds=indice)) for indice in range(1200)]
+
+    resultados = ingestao.gravar_leituras(itens)
+
+    assert all(isinstance(resultado, str) for resultado in resultados)
+    assert len(set(resultados)) == len(itens)
+    assert max(repositorio.commits) <= LIMITE_OPERACOES_BATCH
+    # 1200 leituras + 2 updates de status
+    assert sum(repositorio.commits) == len(itens) + 2
+    assert len(repositorio.commits) == 3
+
+
+def test_status_vem_da_leitura_mais_recente(repositorio):
+    inicio = now_br()
+    # Fora de ordem: a mais recente (desligado) não é a última da lista
+    itens = [
+        item(ID_COMPRESSOR, inicio, ligado=True),
+        item(ID_COMPRESSOR, inicio + timedelta(seconds=10), ligado=False),
+        item(ID_COMPRESSOR, inicio + timedelta(seconds=5), ligado=True)
+    ]
+    itens.append({**item(ID_COMPRESSOR, inicio + timedelta(seconds=20)), "atualizar_status": False})
+
+    ingestao.gravar_leituras(itens)
+
+    _, documento = repositorio.carregar_compressor(ID_COMPRESSOR)
+    assert documento["esta_ligado"] is False
+    assert documento["data_ultima_atualizacao"] == inicio + timedelta(seconds=10)
+    assert documento["ultima_leitura"]["ligado"] is False
+    assert repositorio.commits == [len(itens) + 1]
+
+
+def test_falha_de_um_commit_nao_afeta_os_outros(repositorio):
+    repositorio.falhar_commits = {1}
+    inicio = now_br()
+    itens = [item(ID_COMPRESSOR, inicio + timedelta(seconds=indice)) for indice in range(LIMITE_OPERACOES_BATCH + 10)]
+
+    resultados = ingestao.gravar_leituras(itens)
+
+    # O status vai no commit da leitura mais recente (o segundo), que é gravado
+    assert repositorio.commits == [LIMITE_OPERACOES_BATCH, 11]
+    assert all(isinstance(resultado, RuntimeError) for resultado in resultados[:LIMITE_OPERACOES_BATCH])
+    assert all(isinstance(resultado, str) for resultado in resultados[LIMITE_OPERACOES_BATCH:])
+    _, documento = repositorio.carregar_compressor(ID_COMPRESSOR)
+    assert documento["data_ultima_atualizacao"] == itens[-1]["leitura"]["data_medicao"]
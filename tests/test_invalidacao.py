@@ -0,0 +1,108 @@
+"""Barramento de invalidação entre workers: lista de destinos em memória.
+
+Um socket de datagramas comum faz o papel do outro worker. Publicar não relê o
+diretório a cada mensagem; um worker novo é incluído quando se anuncia e um
+worker encerrado é removido no primeiro envio que falha.
+
+    python -m pytest tests
+"""
+import asyncio
+import json
+import os
+import socket
+
+# Backend em memória: o teste não depende de credenciais do Firestore
+os.environ.setdefault("ARMAZENAMENTO", "memoria")
+
+import pytest
+
+from app.utils import invalidacao
+from app.utils.invalidacao import SUFIXO_SOCKET, TIPO_DESCOBERTA, BarramentoInvalidacao
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="requer sockets Unix")
+
+
+@pytest.fixture
+def leituras_diretorio(monkeypatch):
+    chamadas = []
+    listdir = os.listdir
+
+    def contado(caminho):
+        chamadas.append(caminho)
+        return listdir(caminho)
+
+    monkeypatch.setattr(invalidacao.os, "listdir", contado)
+    return chamadas
+
+
+def outro_worker(diretorio, pid="999999"):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    sock.setblocking(False)
+    sock.bind(os.path.join(diretorio, f"{pid}{SUFIXO_SOCKET}"))
+    return sock
+
+
+def recebidas(sock):
+    mensagens = []
+    while True:
+        try:
+            mensagens.append(json.loads(sock.recv(65536)))
+        except BlockingIOError:
+            return mensagens
+
+
+def test_destinos_em_memoria(tmp_path, leituras_diretorio):
+    async def cenario():
+        barramento = BarramentoInvalidacao(str(tmp_path))
+        await barramento.iniciar()
+        try:
+            # Sem outros workers: nada é serializado nem enviado, e o diretório não é relido
+            leituras_diretorio.clear()
+            for id_compressor in range(100):
+                barramento.publicar("compressor", id_compressor)
+            assert barramento.enviadas == 0
+            assert len(leituras_diretorio) <= 1
+
+            # Worker novo: incluído assim que se anuncia
+            par = outro_worker(str(tmp_path))
+            barramento.publicar("compressor", 1)
+            assert recebidas(par) == []
+            par.sendto(json.dumps({"tipo": TIPO_DESCOBERTA, "id_compressor": 0, "dados": None}).encode(), barramento._caminho)
+            await asyncio.sleep(0.05)
+            leituras_diretorio.clear()
+            for id_compressor in range(10):
+                barramento.publicar("compressor", id_compressor)
+            assert [m["id_compressor"] for m in recebidas(par)] == list(range(10))
+            assert len(leituras_diretorio) == 1
+            assert barramento.estatisticas()["workers"] == 2
+
+            # Marcador: só os workers que o criaram recebem
+            barramento.publicar("leitura", 1, marcador="assinantes")
+            assert recebidas(par) == []
+
+            # Worker encerrado: removido no primeiro envio que falha
+            par.close()
+            os.unlink(os.path.join(str(tmp_path), f"999999{SUFIXO_SOCKET}"))
+            barramento.publicar("compressor", 1)
+            barramento.publicar("compressor", 2)
+            assert barramento.estatisticas()["workers"] == 1
+        finally:
+            await barramento.parar()
+
+    asyncio.run(cenario())
+
+
+def test_worker_novo_anuncia_aos_demais(tmp_path):
+    async def cenario():
+        par = outro_worker(str(tmp_path))
+        barramento = BarramentoInvalidacao(str(tmp_path))
+        await barramento.iniciar()
+        try:
+            assert [m["tipo"] for m in recebidas(par)] == [TIPO_DESCOBERTA]
+            barramento.marcar("assinantes", True)
+            assert [m["tipo"] for m in recebidas(par)] == [TIPO_DESCOBERTA]
+        finally:
+            await barramento.parar()
+            par.close()
+
+    asyncio.run(cenario())
@@ -0,0 +1,112 @@
+"""Formato binário compacto das leituras (`POST /sensor` e `POST /sensor/batch`).
+
+Registros de tamanho e versão inválidos, `data_medicao` fora do intervalo e a
+equivalência com o corpo JSON (mesma leitura gravada, mesmos erros 422).
+
+    python -m pytest tests
+"""
+import os
+from datetime import datetime, timezone
+
+# Backend em memória: o teste não depende de credenciais do Firestore
+os.environ.setdefault("ARMAZENAMENTO", "memoria")
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from app.main import create_app
+from app.utils.leitura_binaria import (
+    REGISTRO_V1, TIPO_LEITURA_BINARIA, VERSAO_1, codificar_leitura, decodificar_leitura, decodificar_lote
+)
+
+ID_COMPRESSOR = 920_025
+BINARIO = {"content-type": TIPO_LEITURA_BINARIA}
+
+LEITURA = {
+    "id_compressor": ID_COMPRESSOR,
+    "ligado": True,
+    "pressao": 8.25,
+    "temp_equipamento": 75.5,
+    "temp_ambiente": 20.0,
+    "potencia_kw": 20.0,
+    "umidade": 50.0,
+    "vibracao": True,
+    "corrente": 10.4
+}
+
+
+@pytest.fixture
+def cliente():
+    with TestClient(create_app()) as cliente:
+        cliente.post("/compressores/", json={
+            "id_compressor": ID_COMPRESSOR,
+            "nome_marca": "Teste",
+            "localizacao": "Bancada",
+            "potencia_nominal_kw": 20,
+            "data_ultima_manutencao": "2025-01-01T00:00:00",
+            "esta_ligado": False
+        })
+        yield cliente
+
+
+def test_ida_e_volta():
+    data_medicao = datetime(2026, 1, 2, 3, 4, 5, 123000, tzinfo=timezone.utc)
+    leitura = decodificar_leitura(codificar_leitura({**LEITURA, "data_medicao": data_medicao}))
+    assert leitura == {**LEITURA, "data_medicao": data_medicao}
+    assert decodificar_leitura(codificar_leitura(LEITURA))["data_medicao"] is None
+    assert len(codificar_leitura(LEITURA)) == REGISTRO_V1.size == 38
+
+
+@pytest.mark.parametrize("corpo", [
+    b"",
+    codificar_leitura(LEITURA)[:-1],
+    codificar_leitura(LEITURA) + b"\x01",
+    bytes([2]) + codificar_leitura(LEITURA)[1:],
+    codificar_leitura(LEITURA) + bytes([2]) + codificar_leitura(LEITURA)[1:],
+])
+def test_lote_com_tamanho_ou_versao_invalidos(corpo):
+    with pytest.raises(HTTPException) as erro:
+        decodificar_lote(corpo)
+    assert erro.value.status_code == 400
+
+
+def test_sensor_binario_equivale_ao_json(cliente):
+    data_medicao = datetime(2026, 1, 2, 3, 4, 5, 123000, tzinfo=timezone.utc)
+    resposta = cliente.post("/sensor", content=codificar_leitura({**LEITURA, "data_medicao": data_medicao}), headers=BINARIO)
+    assert resposta.status_code == 200, resposta.text
+    assert datetime.fromisoformat(resposta.json()["data_medicao"]) == data_medicao
+
+    # Mesma validação do SensorData que o corpo JSON
+    invalida = {**LEITURA, "umidade": 150.0}
+    binaria = cliente.post("/sensor", content=codificar_leitura(invalida), headers=BINARIO)
+    em_json = cliente.post("/sensor", json=invalida)
+    assert binaria.status_code == em_json.status_code == 422
+    assert [erro["loc"] for erro in binaria.json()["detail"]] == [erro["loc"] for erro in em_json.json()["detail"]]
+
+
+def test_sensor_binario_erros_400(cliente):
+    registro = codificar_leitura(LEITURA)
+    # Mais de um registro em /sensor
+    assert cliente.post("/sensor", content=registro * 2, headers=BINARIO).status_code == 400
+    # Tamanho inválido
+    assert cliente.post("/sensor", content=registro[:-3], headers=BINARIO).status_code == 400
+    # Versão desconhecida
+    resposta = cliente.post("/sensor", content=bytes([VERSAO_1 + 1]) + registro[1:], headers=BINARIO)
+    assert resposta.status_code == 400 and "Versão" in resposta.json()["detail"]
+    # data_medicao fora do intervalo de datetime
+    fora = REGISTRO_V1.pack(VERSAO_1, ID_COMPRESSOR, 1, 800, 7500, 2000, 2000, 5000, 1000, 2 ** 62)
+    resposta = cliente.post("/sensor", content=fora, headers=BINARIO)
+    assert resposta.status_code == 400 and "data_medicao" in resposta.json()["detail"]
+
+
+def test_lote_binario(cliente):
+    registros = [codificar_leitura({**LEITURA, "pressao": 7.0 + indice}) for indice in range(3)]
+    invalido = codificar_leitura({**LEITURA, "umidade": 150.0})
+    resposta = cliente.post("/sensor/batch", content=b"".join(registros) + invalido, headers=BINARIO)
+    assert resposta.status_code == 200, resposta.text
+    corpo = resposta.json()
+    assert corpo["total"] == 4
+    itens = corpo["resultados"]
+    assert [item["status"] for item in itens[:3]] == ["sucesso"] * 3
+    assert itens[3]["status"] != "sucesso"
@@ -0,0 +1,69 @@
+"""Logger amostrado da ingestão: 1 a cada N, registro atribuído a quem chamou, padrões sem amostragem.
+
+    python -m pytest tests
+"""
+import inspect
+import logging
+import os
+
+# Backend em memória: o teste não depende de credenciais do Firestore
+os.environ.setdefault("ARMAZENAMENTO", "memoria")
+
+import pytest
+
+from app.utils import error_handling
+from app.utils.error_handling import LoggerAmostrado
+
+
+class Coletor(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.DEBUG)
+        self.registros = []
+
+    def emit(self, record):
+        self.registros.append(record)
+
+
+@pytest.fixture
+def coletor():
+    logger = logging.getLogger("tests.amostrado")
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    coletor = Coletor()
+    logger.addHandler(coletor)
+    yield logger, coletor
+    logger.removeHandler(coletor)
+
+
+def test_um_a_cada_n_e_warnings_sempre(coletor):
+    logger, coletor = coletor
+    amostrado = LoggerAmostrado(logger, 10)
+    for indice in range(25):
+        amostrado.info("leitura %s", indice)
+    amostrado.warning("aviso %s", 1)
+    assert [registro.getMessage() for registro in coletor.registros] == [
+        "leitura 0", "leitura 10", "leitura 20", "aviso 1"
+    ]
+    assert coletor.registros[0].amostragem == 10
+    assert not hasattr(coletor.registros[-1], "amostragem")
+
+
+def test_registro_aponta_para_quem_chamou(coletor):
+    logger, coletor = coletor
+    amostrado = LoggerAmostrado(logger, 1)
+    amostrado.info("info")
+    linha = inspect.currentframe().f_lineno - 1
+    amostrado.debug("debug")
+    amostrado.error("erro")
+    assert [registro.funcName for registro in coletor.registros] == ["test_registro_aponta_para_quem_chamou"] * 3
+    assert coletor.registros[0].lineno == linha
+    assert coletor.registros[0].pathname == __file__
+    # Sem amostragem, o registro não leva o campo
+    assert not hasattr(coletor.registros[0], "amostragem")
+
+
+def test_padroes_sem_amostragem_e_em_texto():
+    if "LOG_AMOSTRAGEM_PADRAO" not in os.environ and "LOG_AMOSTRAGEM" not in os.environ:
+        assert error_handling.logger_amostrado(logging.getLogger("tests"), "/sensor").a_cada == 1
+    if "LOG_FORMATO" not in os.environ:
+        assert error_handling.FORMATO_LOG == "texto"
@@ -0,0 +1,71 @@
+"""Simulação (dry run) da migração dos compressores para o ID de documento determinístico.
+
+Os documentos ficam no repositório em memória; um adaptador com a parte da API do
+cliente do Firestore usada na simulação (`collection().stream()`) os expõe à migração.
+Sem `--executar`, nada é alterado.
+
+    python -m pytest tests
+"""
+import os
+from types import SimpleNamespace
+
+# Backend em memória: o teste não depende de credenciais do Firestore
+os.environ.setdefault("ARMAZENAMENTO", "memoria")
+
+import pytest
+
+from app.db import migracao_compressores
+from app.db.repositorio import id_documento_compressor
+from app.db.repositorio_firestore import COLECAO_COMPRESSORES
+from app.db.repositorio_memoria import RepositorioMemoria
+from app.utils.datetime_utils import now_br
+
+
+class ClienteMemoria:
+    """`collection(COLECAO_COMPRESSORES).stream()` sobre os documentos do repositório em memória."""
+
+    def __init__(self, repositorio: RepositorioMemoria):
+        self.repositorio = repositorio
+
+    def collection(self, nome):
+        assert nome == COLECAO_COMPRESSORES
+        return self
+
+    def stream(self):
+        for doc_id, dados in list(self.repositorio._compressores.items()):
+            yield SimpleNamespace(id=doc_id, reference=doc_id, to_dict=lambda dados=dados: dict(dados))
+
+    def transaction(self):
+        raise AssertionError("A simulação não deve abrir transações")
+
+
+@pytest.fixture
+def repositorio(monkeypatch):
+    repositorio = RepositorioMemoria()
+    # Já migrado: criado com o ID determinístico
+    repositorio.criar_compressor({"id_compressor": 1, "nome_marca": "A", "data_cadastro": now_br()})
+    # Legados, com ID automático (criados antes do ID determinístico)
+    repositorio._compressores["Xa81kQ2"] = {"id_compressor": 2, "nome_marca": "B", "data_cadastro": now_br()}
+    repositorio._compressores["Pz07mL4"] = {"id_compressor": 3, "nome_marca": "C", "data_cadastro": now_br()}
+    # Sem id_compressor: ignorado
+    repositorio._compressores["Qq11aa1"] = {"nome_marca": "D"}
+    monkeypatch.setattr(migracao_compressores, "clientes", SimpleNamespace(db=ClienteMemoria(repositorio)))
+    return repositorio
+
+
+def test_simulacao_conta_pendentes_sem_alterar(repositorio):
+    antes = {doc_id: dict(dados) for doc_id, dados in repositorio._compressores.items()}
+
+    contadores = migracao_compressores.migrar(executar=False)
+
+    assert contadores == {"migrados": 0, "ja_migrados": 1, "pendentes": 2, "conflitos": 0, "invalidos": 1}
+    assert repositorio._compressores == antes
+    assert id_documento_compressor(1) in repositorio._compressores
+
+
+def test_main_sem_executar_e_simulacao(repositorio, monkeypatch, capsys):
+    monkeypatch.setattr(migracao_compressores.sys, "argv", ["migracao_compressores"])
+    migracao_compressores.main()
+    saida = capsys.readouterr().out
+    assert saida.startswith("Simulação")
+    assert "pendentes=2" in saida
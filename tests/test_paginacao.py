@@ -0,0 +1,112 @@
+"""Paginação por cursor de GET /dados e GET /dados/{id_compressor}.
+
+Leituras com a mesma `data_medicao` (desempate pelo ID do documento) e limites de
+página exatos: percorrer as páginas retorna cada leitura uma única vez, em ordem.
+
+    python -m pytest tests
+"""
+import json
+import os
+from datetime import timedelta
+
+# Backend em memória: o teste não depende de credenciais do Firestore
+os.environ.setdefault("ARMAZENAMENTO", "memoria")
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.db.repositorio import repositorio
+from app.main import create_app
+from app.utils.datetime_utils import now_br
+from app.utils.paginacao import codificar_cursor, decodificar_cursor
+
+ID_COMPRESSOR = 920_006
+TOTAL = 25
+
+
+@pytest.fixture(scope="module")
+def leituras():
+    """IDs das leituras gravadas, do mais recente para o mais antigo."""
+    inicio = now_br() - timedelta(days=1)
+    gravacoes = []
+    for indice in range(TOTAL):
+        # Grupos de 5 leituras com o mesmo instante
+        data_medicao = inicio + timedelta(seconds=indice // 5)
+        gravacoes.append((f"pag-{indice:03d}", {
+            "id_compressor": ID_COMPRESSOR,
+            "ligado": True,
+            "pressao": 7.5,
+            "temp_equipamento": 80.0,
+            "temp_ambiente": 25.0,
+            "potencia_kw": 20.0,
+            "umidade": 50.0,
+            "vibracao": False,
+            "corrente": 30.0,
+            "data_medicao": data_medicao
+        }, None, None))
+    repositorio.gravar_leituras(gravacoes)
+    return [doc_id for doc_id, *_ in reversed(gravacoes)], inicio
+
+
+@pytest.fixture
+def cliente():
+    with TestClient(create_app()) as cliente:
+        yield cliente
+
+
+def percorrer(cliente, url, **parametros):
+    ids, paginas, cursor = [], 0, None
+    while True:
+        resposta = cliente.get(url, params={**parametros, **({"cursor": cursor} if cursor else {})})
+        assert resposta.status_code == 200, resposta.text
+        corpo = resposta.json()
+        ids.extend(documento["firestore_id"] for documento in corpo["dados"])
+        paginas += 1
+        cursor = corpo["next_cursor"]
+        if cursor is None:
+            return ids, paginas
+
+
+@pytest.mark.parametrize("limite, paginas", [(5, 5), (7, 4), (25, 1), (24, 2)])
+def test_paginas_do_compressor_sem_repeticao(cliente, leituras, limite, paginas):
+    ids, _ = leituras
+    obtidos, obtidas = percorrer(cliente, f"/dados/{ID_COMPRESSOR}", limit=limite)
+    assert obtidos == ids
+    assert obtidas == paginas
+
+
+def test_paginas_globais_incluem_todas_as_leituras(cliente, leituras):
+    ids, _ = leituras
+    obtidos, _ = percorrer(cliente, "/dados", page_size=4)
+    assert len(obtidos) == len(set(obtidos))
+    # Outras leituras podem existir no repositório compartilhado; a ordem relativa se mantém
+    assert [doc_id for doc_id in obtidos if doc_id in ids] == ids
+
+
+def test_intervalo_inclusivo(cliente, leituras):
+    ids, inicio = leituras
+    parametros = {"desde": (inicio + timedelta(seconds=1)).isoformat(), "ate": (inicio + timedelta(seconds=3)).isoformat()}
+    obtidos, _ = percorrer(cliente, f"/dados/{ID_COMPRESSOR}", limit=4, **parametros)
+    # Instantes 1, 2 e 3: os grupos de índices 5..19
+    assert obtidos == ids[5:20]
+
+
+def test_stream_ndjson_a_partir_do_cursor(cliente, leituras):
+    ids, _ = leituras
+    resposta = cliente.get(f"/dados/{ID_COMPRESSOR}", params={"limit": 10})
+    cursor = resposta.json()["next_cursor"]
+    resposta = cliente.get("/dados", params={"formato": "ndjson", "cursor": cursor})
+    linhas = [json.loads(linha) for linha in resposta.text.splitlines()]
+    assert [linha["firestore_id"] for linha in linhas if linha["firestore_id"] in ids] == ids[10:]
+
+
+def test_cursor_invalido_e_intervalo_invertido(cliente, leituras):
+    _, inicio = leituras
+    assert cliente.get(f"/dados/{ID_COMPRESSOR}", params={"cursor": "nao-e-um-cursor"}).status_code == 400
+    parametros = {"desde": (inicio + timedelta(seconds=3)).isoformat(), "ate": inicio.isoformat()}
+    assert cliente.get(f"/dados/{ID_COMPRESSOR}", params=parametros).status_code == 400
+
+
+def test_cursor_ida_e_volta():
+    instante = now_br()
+    assert decodificar_cursor(codificar_cursor(instante, "abc")) == (instante, "abc")
@@ -0,0 +1,215 @@
+"""Recuperação do replayer do spool com falhas injetadas na gravação.
+
+O `gravar` e o `resolver` do `ReplayerSpool` são substituídos por um Firestore falso
+que registra cada documento gravado e pode falhar a partir de um ponto do lote (como
+um commit que não chegou ao Firestore). Verifica que o replay recomeça do checkpoint
+sem perder nem duplicar leituras, inclusive após reiniciar o processo.
+
+    python -m pytest tests
+"""
+import os
+from collections import Counter
+from types import SimpleNamespace
+
+# Backend em memória: o teste não depende de credenciais do Firestore
+os.environ.setdefault("ARMAZENAMENTO", "memoria")
+
+import pytest
+from fastapi import HTTPException
+
+from app.db.spool import ReplayerSpool, Spool, registro_spool
+from app.utils.datetime_utils import now_br
+
+ID_COMPRESSOR = 910_001
+ID_INEXISTENTE = 910_404
+
+
+class FirestoreFalso:
+    """Substitui `gravar_leituras` e `buscar_compressor`, com falhas programadas."""
+
+    def __init__(self):
+        self.gravados = Counter()
+        self.chamadas = 0
+        # chamada -> índice do item a partir do qual o lote falha
+        self.falhas = {}
+        # chamada -> exceção levantada pelo próprio `gravar`
+        self.excecoes = {}
+        self.indisponivel = False
+
+    def gravar(self, itens):
+        self.chamadas += 1
+        if self.chamadas in self.excecoes:
+            raise self.excecoes[self.chamadas]
+        inicio_falha = self.falhas.get(self.chamadas, len(itens))
+        resultados = []
+        for indice, item in enumerate(itens):
+            if indice >= inicio_falha:
+                resultados.append(HTTPException(status_code=503, detail="Firestore indisponível"))
+                continue
+            self.gravados[item["doc_id"]] += 1
+            resultados.append(item["doc_id"])
+        return resultados
+
+    def resolver(self, id_compressor):
+        if self.indisponivel:
+            raise HTTPException(status_code=503, detail="Firestore indisponível")
+        return SimpleNamespace(existe=id_compressor != ID_INEXISTENTE, ref=f"ref-{id_compressor}", dados={})
+
+
+def leitura(id_compressor=ID_COMPRESSOR):
+    return {
+        "id_compressor": id_compressor,
+        "ligado": True,
+        "pressao": 7.5,
+        "temp_equipamento": 80.0,
+        "temp_ambiente": 25.0,
+        "potencia_kw": 20.0,
+        "umidade": 50.0,
+        "vibracao": False,
+        "corrente": 30.0,
+        "data_medicao": now_br()
+    }
+
+
+def anexar(spool, quantidade, inicio=0, id_compressor=ID_COMPRESSOR):
+    ids = [f"leitura{numero:06d}" for numero in range(inicio, inicio + quantidade)]
+    for doc_id in ids:
+        spool.anexar([registro_spool(doc_id, leitura(id_compressor), atualizar_status=False)])
+    return ids
+
+
+def drenar(replayer, limite=100):
+    """Chama `processar_lote` até esvaziar o spool; retorna quantas falhas transitórias ocorreram."""
+    transitorias = 0
+    for _ in range(limite):
+        try:
+            lidos, transitoria = replayer.processar_lote()
+        except HTTPException:
+            # `_executar` trata exceções do lote como falha transitória (backoff e nova tentativa)
+            transitorias += 1
+            continue
+        transitorias += transitoria
+        if not lidos:
+            return transitorias
+    raise AssertionError("o spool não esvaziou")
+
+
+@pytest.fixture
+def spool(tmp_path):
+    # Segmentos pequenos: o replay atravessa várias trocas de segmento
+    spool = Spool(str(tmp_path), politica_fsync="nunca", tamanho_maximo_segmento=2048)
+    yield spool
+    spool.fechar()
+
+
+def novo_replayer(spool, firestore, tamanho_lote=7):
+    return ReplayerSpool(spool, tamanho_lote=tamanho_lote, gravar=firestore.gravar, resolver=firestore.resolver)
+
+
+def test_falha_parcial_retoma_do_checkpoint(spool):
+    ids = anexar(spool, 40)
+    firestore = FirestoreFalso()
+    # Lote 2 falha a partir do 4º item; lote 3 falha por inteiro
+    firestore.falhas = {2: 3, 3: 0}
+    replayer = novo_replayer(spool, firestore)
+
+    assert drenar(replayer) == 2
+    assert set(firestore.gravados) == set(ids)
+    assert max(firestore.gravados.values()) == 1
+    assert replayer.reprocessados == len(ids)
+    assert replayer.descartados == 0
+    assert replayer.falhas_transitorias == 2
+    assert spool.pendentes_bytes(replayer.posicao) == 0
+
+
+def test_excecao_no_lote_nao_avanca_checkpoint(spool):
+    ids = anexar(spool, 20)
+    firestore = FirestoreFalso()
+    firestore.excecoes = {1: HTTPException(status_code=504, detail="timeout")}
+    replayer = novo_replayer(spool, firestore)
+    posicao = replayer.posicao
+
+    with pytest.raises(HTTPException):
+        replayer.processar_lote()
+    assert replayer.posicao == posicao
+
+    # Compressor não resolvido (Firestore fora do ar): nada é gravado nem descartado
+    firestore.indisponivel = True
+    with pytest.raises(HTTPException):
+        replayer.processar_lote()
+    assert replayer.posicao == posicao and replayer.descartados == 0
+
+    firestore.indisponivel = False
+    drenar(replayer)
+    assert set(firestore.gravados) == set(ids)
+    assert max(firestore.gravados.values()) == 1
+
+
+def test_reinicio_continua_do_checkpoint_persistido(tmp_path):
+    spool = Spool(str(tmp_path), politica_fsync="nunca", tamanho_maximo_segmento=2048)
+    ids = anexar(spool, 30)
+    firestore = FirestoreFalso()
+    # O Firestore cai no meio do 3º lote e o processo é encerrado antes da nova tentativa
+    firestore.falhas = {3: 2}
+    replayer = novo_replayer(spool, firestore)
+    for _ in range(3):
+        replayer.processar_lote()
+    gravados_antes = set(firestore.gravados)
+    assert len(gravados_antes) == 16
+    spool.fechar()
+
+    # Novo processo: spool e replayer reabertos a partir do checkpoint em disco
+    spool = Spool(str(tmp_path), politica_fsync="nunca", tamanho_maximo_segmento=2048)
+    ids += anexar(spool, 10, inicio=30)
+    replayer = novo_replayer(spool, firestore)
+    assert drenar(replayer) == 0
+    spool.fechar()
+
+    assert set(firestore.gravados) == set(ids)
+    assert max(firestore.gravados.values()) == 1
+    assert replayer.reprocessados == len(ids) - len(gravados_antes)
+
+
+def test_compressor_inexistente_e_descartado_sem_bloquear(spool):
+    ids = anexar(spool, 5)
+    anexar(spool, 3, inicio=5, id_compressor=ID_INEXISTENTE)
+    ids += anexar(spool, 5, inicio=8)
+    firestore = FirestoreFalso()
+    firestore.falhas = {1: 3}
+    replayer = novo_replayer(spool, firestore)
+
+    drenar(replayer)
+    assert set(firestore.gravados) == set(ids)
+    assert max(firestore.gravados.values()) == 1
+    assert replayer.descartados == 3
+
+
+def test_registro_corrompido_no_fim_de_segmento_selado(tmp_path):
+    spool = Spool(str(tmp_path), politica_fsync="nunca", tamanho_maximo_segmento=2048)
+    ids = anexar(spool, 3)
+    spool.fechar()
+    # Último registro do segmento truncado (crash no meio da escrita)
+    segmento = spool.segmentos()[0]
+    caminho = spool._caminho(segmento)
+    with open(caminho, "r+b") as arquivo:
+        arquivo.truncate(os.path.getsize(caminho) - 5)
+
+    # Novo processo: o segmento antigo fica selado e um novo segmento é aberto
+    spool = Spool(str(tmp_path), politica_fsync="nunca", tamanho_maximo_segmento=2048)
+    firestore = FirestoreFalso()
+    # O lote termina logo antes do registro inválido: o checkpoint fica parado nele
+    replayer = novo_replayer(spool, firestore, tamanho_lote=2)
+    drenar(replayer)
+    for _ in range(3):
+        assert replayer.processar_lote() == (0, False)
+
+    assert replayer.posicao == (spool.segmentos()[-1], 0)
+    assert spool.corrompidos == 1
+    assert set(firestore.gravados) == set(ids[:2])
+
+    # Leituras novas continuam sendo reprocessadas
+    novos = anexar(spool, 2, inicio=3)
+    drenar(replayer)
+    spool.fechar()
+    assert set(firestore.gravados) == set(ids[:2] + novos)
+    assert max(firestore.gravados.values()) == 1